@@ -0,0 +1,135 @@
+"""
+Per-learner adaptive difficulty for PractiVerbo.
+
+Each learner has two Thompson-sampling bandits: one over question types and
+one over tenses. Every arm keeps a Beta(successes, failures) posterior. To
+pick the next question we draw one sample per arm and take the arm whose
+draw is closest to the target success rate. Learners are steered towards
+material they get right about that often, instead of what is easiest or
+hardest.
+
+A learner's parameters are one packed float32 array, stored in the shared
+state backend under ``adaptive:<learner>``. A selection is one read; a batch
+of graded answers (a single check, or a whole offline sync) is one read and
+one compare-and-set write, read again and retried if another worker updated
+the learner in between. The cost per request depends only on the number of
+arms, never on the number of learners. Posteriors are capped at ``window`` observations
+per arm so they keep tracking a learner who improves.
+"""
+import base64
+import os
+import re
+from array import array
+
+LEARNER_PATTERN = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+LEARNER_TTL = 90 * 24 * 3600
+# Compare-and-set attempts per batch before the batch is dropped and counted
+RECORD_ATTEMPTS = 10
+
+
+def valid_learner(learner):
+    return isinstance(learner, str) and LEARNER_PATTERN.match(learner) is not None
+
+
+class AdaptiveSelector:
+    """Thompson-sampling choice of (question type, tense) per learner"""
+
+    def __init__(self, backend, question_types, tenses, target=0.7, window=50, prior=1.0):
+        self.backend = backend
+        self.question_types = list(question_types)
+        self.tenses = list(tenses)
+        self.arms = self.question_types + self.tenses
+        self.type_index = {name: i for i, name in enumerate(self.question_types)}
+        self.tense_index = {name: len(self.question_types) + i for i, name in enumerate(self.tenses)}
+        self.target = target
+        self.window = window
+        self.prior = prior
+        # Layout: [alpha_0, beta_0, alpha_1, beta_1, ...] over types then tenses
+        self.fresh = array('f', [prior] * (2 * len(self.arms)))
+        self.selections = 0
+        self.updates = 0
+        self.conflicts = 0
+        self.lost_batches = 0
+
+    @classmethod
+    def from_env(cls, backend, question_types, tenses, environ=None):
+        """Create a selector if ADAPTIVE_DIFFICULTY is on, else None"""
+        environ = os.environ if environ is None else environ
+        if environ.get('ADAPTIVE_DIFFICULTY', '0') == '0':
+            return None
+        return cls(backend, question_types, tenses,
+                   target=float(environ.get('ADAPTIVE_TARGET', 0.7)),
+                   window=float(environ.get('ADAPTIVE_WINDOW', 50)))
+
+    def load(self, learner):
+        """A learner's packed Beta parameters, or the prior for a new learner"""
+        return self.unpack(self.backend.get(f'adaptive:{learner}'))
+
+    def unpack(self, encoded):
+        if encoded is not None:
+            params = array('f')
+            params.frombytes(base64.b64decode(encoded))
+            if len(params) == len(self.fresh):
+                return params
+        return array('f', self.fresh)
+
+    def choose(self, learner, rng):
+        """Pick (question_type, tense) for the learner's next question"""
+        params = self.load(learner)
+        self.selections += 1
+        question_type = self.question_types[self._pick(params, 0, len(self.question_types), rng)]
+        tense = self.tenses[self._pick(params, len(self.question_types), len(self.arms), rng) -
+                            len(self.question_types)]
+        return question_type, tense
+
+    def _pick(self, params, start, end, rng):
+        best, best_gap = start, 2.0
+        target = self.target
+        for arm in range(start, end):
+            gap = abs(rng.betavariate(params[2 * arm], params[2 * arm + 1]) - target)
+            if gap < best_gap:
+                best, best_gap = arm, gap
+        return best
+
+    def record(self, learner, outcomes):
+        """Apply a batch of (question_type, tense, correct) outcomes in one read and write"""
+        updates = []
+        for question_type, tense, correct in outcomes:
+            arms = [self.type_index.get(question_type), self.tense_index.get(tense)]
+            arms = [arm for arm in arms if arm is not None]
+            if arms:
+                updates.append((arms, correct))
+        if not updates:
+            return
+        key = f'adaptive:{learner}'
+        for _ in range(RECORD_ATTEMPTS):
+            encoded = self.backend.get(key)
+            params = self.unpack(encoded)
+            for arms, correct in updates:
+                self._observe(params, arms, correct)
+            if self.backend.compare_and_set(key, encoded, base64.b64encode(params.tobytes()).decode('ascii'),
+                                            ttl=LEARNER_TTL):
+                self.updates += len(updates)
+                return
+            self.conflicts += 1
+        self.lost_batches += 1
+
+    def _observe(self, params, arms, correct):
+        for arm in arms:
+            offset = 2 * arm + (0 if correct else 1)
+            params[offset] += 1
+            total = params[2 * arm] + params[2 * arm + 1]
+            if total > self.window:
+                scale = self.window / total
+                params[2 * arm] *= scale
+                params[2 * arm + 1] *= scale
+
+    def posterior(self, learner):
+        """Mean success rate per arm, for inspection"""
+        params = self.load(learner)
+        return {name: params[2 * i] / (params[2 * i] + params[2 * i + 1])
+                for i, name in enumerate(self.arms)}
+
+    def stats(self):
+        return {'target': self.target, 'window': self.window, 'selections': self.selections,
+                'updates': self.updates, 'conflicts': self.conflicts, 'lost_batches': self.lost_batches}
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+"""
+Offline analytics over rotated answer logs.
+
+Reads ``*.jsonl`` and ``*.jsonl.gz`` files written by ``answer_log.AnswerLog``,
+streams them in chunks across a process pool and writes a compact difficulty
+artifact with per-(verb, tense, pronoun) attempt/error counts and the most
+common confusions. The app can load the artifact (``DIFFICULTY_PATH``) to
+weight question selection towards cells learners get wrong.
+
+Usage:
+    python analytics.py logs/ -o difficulty.json --workers 8
+"""
+import argparse
+import bisect
+import gzip
+import itertools
+import json
+import os
+import sys
+import time
+from collections import Counter
+from multiprocessing import Pool
+
+ARTIFACT_VERSION = 1
+CHUNK_BYTES = 16 * 1024 * 1024
+TOP_CONFUSIONS = 3
+
+
+def cell_key(verb, tense, pronoun):
+    """Key used for a (verb, tense, pronoun) cell in the artifact"""
+    return f'{verb}|{tense}|{pronoun}'
+
+
+def find_log_files(paths):
+    """Expand directories into the answer log files they contain"""
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith('.jsonl') or name.endswith('.jsonl.gz'):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def iter_chunks(files, chunk_bytes=CHUNK_BYTES):
+    """Split files into (path, start, end) byte ranges; gzip files are one chunk each"""
+    for path in files:
+        if path.endswith('.gz'):
+            yield (path, 0, None)
+            continue
+        size = os.path.getsize(path)
+        for start in range(0, max(size, 1), chunk_bytes):
+            yield (path, start, min(start + chunk_bytes, size))
+
+
+def iter_lines(path, start=0, end=None):
+    """Stream the lines that start inside [start, end) of a log file"""
+    if end is None:
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rb') as f:
+            yield from f
+        return
+    with open(path, 'rb') as f:
+        if start:
+            # Skip to the first line that starts at or after `start`; a line
+            # straddling the boundary belongs to the previous chunk
+            f.seek(start - 1)
+            f.readline()
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            yield line
+
+
+def iter_check_events(lines):
+    """Parse lines into check events, skipping anything malformed"""
+    for line in lines:
+        try:
+            event = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(event, dict) and event.get('event') == 'check' and event.get('verb'):
+            yield event
+
+
+def process_chunk(chunk):
+    """Aggregate one chunk; memory is bounded by the cell space, not the log size"""
+    path, start, end = chunk
+    cells = Counter()
+    wrong = Counter()
+    confusions = Counter()
+    events = 0
+    for event in iter_check_events(iter_lines(path, start, end)):
+        events += 1
+        key = cell_key(event['verb'], event.get('tense', ''), event.get('pronoun', ''))
+        cells[key] += 1
+        if not event.get('correct'):
+            wrong[key] += 1
+            answer = str(event.get('answer', '')).strip().lower()
+            if answer:
+                confusions[(key, answer)] += 1
+    return events, cells, wrong, confusions
+
+
+def analyze(paths, workers=None, chunk_bytes=CHUNK_BYTES):
+    """Run the aggregation over all log files and return the artifact dict"""
+    chunks = iter_chunks(find_log_files(paths), chunk_bytes)
+    events = 0
+    cells = Counter()
+    wrong = Counter()
+    confusions = Counter()
+
+    def merge(results):
+        nonlocal events
+        for chunk_events, chunk_cells, chunk_wrong, chunk_confusions in results:
+            events += chunk_events
+            cells.update(chunk_cells)
+            wrong.update(chunk_wrong)
+            confusions.update(chunk_confusions)
+
+    if workers == 1:
+        merge(map(process_chunk, chunks))
+    else:
+        with Pool(workers) as pool:
+            merge(pool.imap_unordered(process_chunk, chunks))
+
+    top = {}
+    for (key, answer), count in sorted(confusions.items(), key=lambda item: -item[1]):
+        answers = top.setdefault(key, [])
+        if len(answers) < TOP_CONFUSIONS:
+            answers.append([answer, count])
+
+    return {
+        'version': ARTIFACT_VERSION,
+        'generated_at': int(time.time()),
+        'events': events,
+        'cells': {key: [cells[key], wrong[key]] for key in sorted(cells)},
+        'confusions': top,
+    }
+
+
+class DifficultyWeights:
+    """Weighted (verb, tense, pronoun) sampler built from a difficulty artifact"""
+
+    def __init__(self, artifact, verbs, tenses, pronouns):
+        if artifact.get('version') != ARTIFACT_VERSION:
+            raise ValueError(f"Unsupported difficulty artifact version: {artifact.get('version')}")
+        stats = artifact.get('cells', {})
+        self.cells = list(itertools.product(verbs, tenses, pronouns))
+        weights = []
+        for cell in self.cells:
+            attempts, errors = stats.get(cell_key(*cell), (0, 0))
+            # Smoothed error rate: unseen cells get 0.5, hard cells approach 1
+            weights.append((errors + 1) / (attempts + 2))
+        self.cum_weights = list(itertools.accumulate(weights))
+        self.total = self.cum_weights[-1] if self.cum_weights else 0
+
+    @classmethod
+    def load(cls, path, verbs, tenses, pronouns):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f), verbs, tenses, pronouns)
+
+    def choose(self, rng):
+        """Pick a (verb, tense, pronoun) cell in O(log n)"""
+        index = bisect.bisect_right(self.cum_weights, rng.random() * self.total)
+        return self.cells[min(index, len(self.cells) - 1)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build a difficulty artifact from answer logs')
+    parser.add_argument('paths', nargs='+', help='Log files or directories of rotated logs')
+    parser.add_argument('-o', '--output', default='difficulty.json', help='Artifact path')
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help='Worker processes (default: one per CPU)')
+    parser.add_argument('--chunk-mb', type=int, default=CHUNK_BYTES // (1024 * 1024),
+                        help='Size of the byte ranges plain logs are split into')
+    args = parser.parse_args(argv)
+
+    artifact = analyze(args.paths, workers=args.workers, chunk_bytes=args.chunk_mb * 1024 * 1024)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(artifact, f, ensure_ascii=False, separators=(',', ':'))
+    print(f"Analyzed {artifact['events']} answers across {len(artifact['cells'])} cells -> {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
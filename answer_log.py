@@ -0,0 +1,164 @@
+"""
+Buffered, rotating answer-event log for PractiVerbo.
+
+Handlers hand events to ``AnswerLog.log`` which only appends them to an
+in-memory queue. A background writer thread serializes the events as JSON
+lines, rotates the active file by size and age, and gzip-compresses rotated
+files. When the queue is full events are dropped and counted, so a request
+never waits on the disk.
+"""
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+
+
+class AnswerLog:
+    """Non-blocking JSONL event log with size/time rotation"""
+
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, max_age=3600,
+                 buffer_size=10000, flush_interval=1.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=buffer_size)
+        self.logged = 0
+        self.dropped = 0
+        self.written = 0
+        self.rotations = 0
+        self.write_errors = 0
+        self._file = None
+        self._opened_at = None
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='answer-log-writer', daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_env(cls, environ=None):
+        """Create a log from ANSWER_LOG_* environment variables, or None if disabled"""
+        environ = os.environ if environ is None else environ
+        path = environ.get('ANSWER_LOG_PATH')
+        if not path:
+            return None
+        return cls(
+            path,
+            max_bytes=int(environ.get('ANSWER_LOG_MAX_BYTES', 10 * 1024 * 1024)),
+            max_age=float(environ.get('ANSWER_LOG_MAX_AGE', 3600)),
+            buffer_size=int(environ.get('ANSWER_LOG_BUFFER', 10000)),
+            flush_interval=float(environ.get('ANSWER_LOG_FLUSH_INTERVAL', 1.0)),
+        )
+
+    def log(self, event):
+        """Queue an event for writing; never blocks. Returns False if dropped."""
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.logged += 1
+        return True
+
+    def stats(self):
+        """Counters for the metrics endpoint"""
+        return {
+            'logged': self.logged,
+            'dropped': self.dropped,
+            'written': self.written,
+            'pending': self.queue.qsize(),
+            'rotations': self.rotations,
+            'write_errors': self.write_errors,
+        }
+
+    def flush(self, timeout=5.0):
+        """Wait until everything queued so far has been written (used by tests and shutdown)"""
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.queue.unfinished_tasks == 0
+
+    def close(self, timeout=5.0):
+        """Drain the queue, stop the writer thread and close the active file"""
+        self.flush(timeout)
+        self._stopping.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                event = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                try:
+                    self._maybe_rotate()
+                    if self._file:
+                        self._file.flush()
+                except OSError:
+                    self.write_errors += 1
+                continue
+            batch = [event]
+            # Drain whatever else is already waiting so it is written in one go
+            while len(batch) < 1000:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except (OSError, TypeError, ValueError):
+                self.write_errors += 1
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _write(self, batch):
+        self._maybe_rotate()
+        if self._file is None:
+            self._open()
+        lines = ''.join(json.dumps(event, ensure_ascii=False) + '\n' for event in batch)
+        self._file.write(lines)
+        self._file.flush()
+        self.written += len(batch)
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._opened_at = time.time()
+
+    def _maybe_rotate(self):
+        if self._file is None:
+            return
+        too_big = self.max_bytes and self._file.tell() >= self.max_bytes
+        too_old = self.max_age and time.time() - self._opened_at >= self.max_age
+        if too_big or too_old:
+            self.rotate()
+
+    def rotate(self):
+        """Close the active file, rename it with a timestamp and gzip it"""
+        if self._file is None:
+            return None
+        self._file.close()
+        self._file = None
+        if os.path.getsize(self.path) == 0:
+            os.remove(self.path)
+            return None
+        base, ext = os.path.splitext(self.path)
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.gmtime(self._opened_at))
+        rotated = f'{base}-{stamp}{ext}'
+        suffix = 1
+        while os.path.exists(rotated) or os.path.exists(rotated + '.gz'):
+            rotated = f'{base}-{stamp}-{suffix}{ext}'
+            suffix += 1
+        os.replace(self.path, rotated)
+        with open(rotated, 'rb') as src, gzip.open(rotated + '.gz', 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(rotated)
+        self.rotations += 1
+        return rotated + '.gz'
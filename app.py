@@ -1,32 +1,122 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, render_template, jsonify, request, g, stream_with_context
 import random
+import hashlib
 import json
 import os
+import threading
+import time
+
+from adaptive import AdaptiveSelector, valid_learner
+from analytics import DifficultyWeights
+from answer_log import AnswerLog
+from assets import AssetPipeline
+from bulk_grade import SheetError, SheetGrader, grade_rows, iter_csv, open_sheet, sheet_format
+from client_metrics import ClientMetrics
+from classroom import ClassroomError, ClassroomStore, UnknownClassroomError
+from question_pool import QuestionPool
+from question_types import Lexicon, QuestionRegistry, load_plugins, parse_weights
+from quiz_stream import QuizStreams
+from rate_limit import AdmissionController, retry_after_header
+from reference import LazyReferenceCache, ReferenceCache
+from search import SearchIndex
+from session_sampler import SessionSampler
+from state import create_backend
+from tracing import KIND_INTERNAL, NOOP_SPAN, Tracer, span, traced
+from traffic import CAPTURED_ROUTES, TrafficCapture
+from verb_bundle import BundleCache, build_bundle
+from verb_schema import PRONOUNS, TENSES, TENSE_NAMES
+from verb_store import StoreSearch, VerbStore
+from wire_format import COMPACT_MIMETYPE, CompactCodec, WireFormatError, is_compact_body, wants_compact
 
 app = Flask(__name__)
 
+# Structured answer-event log (disabled unless ANSWER_LOG_PATH is set)
+ANSWER_LOG = AnswerLog.from_env()
+
+# Sanitized /api/question and /api/check traffic for replay (disabled unless TRAFFIC_CAPTURE_PATH is set)
+TRAFFIC_CAPTURE = TrafficCapture.from_env()
+
+# Per-request tracing spans written as OTLP/JSON files (disabled unless TRACE_PATH is set)
+TRACER = Tracer.from_env()
+
+def trace_operation(name):
+    """Trace work done outside a request, such as loading the verb data (a child span inside one)"""
+    if TRACER is None:
+        return NOOP_SPAN
+    return TRACER.start(name, kind=KIND_INTERNAL, force=True)
+
+# Admission control for the API routes (limits are off unless RATE_LIMIT_* is set)
+ADMISSION = AdmissionController.from_env()
+RATE_LIMITED_ENDPOINTS = {'get_question', 'check_answer', 'check_answers', 'quiz_answer', 'get_questions',
+                          'sync_answers'}
+
+# Shared state for every worker: a SQLite file on this host unless STATE_BACKEND says otherwise
+STATE = create_backend(os.environ.get(
+    'STATE_BACKEND', 'sqlite:///' + os.path.join(os.path.dirname(os.path.abspath(__file__)), 'state.db')))
+
+# Server-sent-event quiz streams; answers may reach any worker
+QUIZ_STREAMS = QuizStreams(STATE)
+MAX_ROUND_SECONDS = 600
+
+# Classroom mode: scores shared by all workers through the state backend
+CLASSROOMS = ClassroomStore(STATE, snapshot_ttl=float(os.environ.get('LEADERBOARD_TTL', 2.0)))
+
+# Offline support: question stock size and batched answer sync limits
+QUESTION_STOCK_SIZE = 50
+MAX_QUESTION_BATCH = 100
+MAX_SYNC_BATCH = 500
+MAX_CHECK_BATCH = 100
+OFFLINE_ASSETS = ['manifest.json', 'icon.svg']
+
+# Browser-side timings posted by static/perf.js to /api/beacon
+CLIENT_METRICS = ClientMetrics()
+MAX_BEACON_BYTES = 16 * 1024
+
+# Teacher-uploaded answer sheets graded by /api/grade; longer sheets are cut off
+MAX_SHEET_ROWS = int(os.environ.get('GRADE_MAX_ROWS', 200000))
+
+# Minified, fingerprinted frontend bundles served from /assets/, built once at startup
+ASSETS = AssetPipeline()
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+# Rendered page shells keyed by template and context, cleared when the verb data changes
+PAGE_CACHE = {}
+
+VERBS_PATH = os.path.join(os.path.dirname(__file__), 'verbs.json')
+
+# Optional SQLite lexicon built by verb_store.py: verb tables are fetched on
+# demand into an LRU of VERBS_CACHE_SIZE hot verbs instead of loaded up front
+VERBS_DB = os.environ.get('VERBS_DB')
+VERBS_CACHE_SIZE = int(os.environ.get('VERBS_CACHE_SIZE', 256))
+
 # Load verbs from JSON file
+@traced('verbs.load')
 def load_verbs():
-    verbs_path = os.path.join(os.path.dirname(__file__), 'verbs.json')
-    with open(verbs_path, 'r', encoding='utf-8') as f:
+    with open(VERBS_PATH, 'r', encoding='utf-8') as f:
         return json.load(f)
 
-VERBS = load_verbs()
-
-PRONOUNS = ['yo', 'tú', 'él/ella', 'nosotros', 'vosotros', 'ellos']
-TENSES = ['presente', 'pretérito', 'imperfecto', 'futuro', 'condicional', 'perfecto', 'pluscuamperfecto', 'futuro perfecto', 'presente subjuntivo', 'imperfecto subjuntivo']
-TENSE_NAMES = {
-    'presente': 'Presente',
-    'pretérito': 'Pretérito',
-    'imperfecto': 'Imperfecto',
-    'futuro': 'Futuro',
-    'condicional': 'Condicional',
-    'perfecto': 'Pretérito Perfecto',
-    'pluscuamperfecto': 'Pluscuamperfecto',
-    'futuro perfecto': 'Futuro Perfecto',
-    'presente subjuntivo': 'Presente de Subjuntivo',
-    'imperfecto subjuntivo': 'Imperfecto de Subjuntivo'
-}
+_startup_trace = trace_operation('verbs.startup').begin()
+if VERBS_DB:
+    with span('verbs.load'):
+        VERBS = VerbStore(VERBS_DB, VERBS_CACHE_SIZE)
+    VERBS_MTIME = os.path.getmtime(VERBS_DB)
+else:
+    VERBS = load_verbs()
+    VERBS_MTIME = os.path.getmtime(VERBS_PATH)
+
+if VERBS_DB and (VERBS.tenses != TENSES or VERBS.pronouns != PRONOUNS):
+    raise ValueError(f'{VERBS_DB} was imported with different tenses or pronouns; re-run verb_store.py')
+
+# Optional difficulty artifact from analytics.py used to weight question selection
+DIFFICULTY_PATH = os.environ.get('DIFFICULTY_PATH')
+
+def build_difficulty(verbs):
+    if not DIFFICULTY_PATH:
+        return None
+    return DifficultyWeights.load(DIFFICULTY_PATH, list(verbs), TENSES, PRONOUNS)
+
+DIFFICULTY = build_difficulty(VERBS)
+
 TENSE_DESCRIPTIONS = {
     'presente': 'Used for current actions, habitual actions, and general truths.',
     'pretérito': 'Used for completed actions in the past with a specific time frame.',
@@ -140,173 +230,537 @@ TENSE_ID_HINTS = {
     'imperfecto subjuntivo': 'Imperfect Subjunctive: -ara/-iera endings (hablara, comiera). Often in "if" clauses'
 }
 
+# Question types: built-ins plus any QUESTION_TYPE_PLUGINS modules, picked by
+# QUESTION_TYPE_WEIGHTS (e.g. "conjugation=2,identify-tense=1"; default equal)
+QUESTION_TYPE_PLUGINS = [m for m in os.environ.get('QUESTION_TYPE_PLUGINS', '').split(',') if m.strip()]
+load_plugins(m.strip() for m in QUESTION_TYPE_PLUGINS)
+QUESTION_TYPE_WEIGHTS = parse_weights(os.environ.get('QUESTION_TYPE_WEIGHTS'))
+
+@traced('verbs.lexicon')
+def build_lexicon(verbs):
+    return Lexicon(verbs, TENSES, PRONOUNS, TENSE_NAMES, hints={
+        'conjugation': CONJUGATION_HINTS,
+        'irregular': IRREGULAR_HINTS,
+        'pronoun': PRONOUN_HINTS,
+        'tense_id': TENSE_ID_HINTS
+    })
+
+QUESTION_REGISTRY = QuestionRegistry(build_lexicon(VERBS), QUESTION_TYPE_WEIGHTS)
+QUESTION_TYPES = QUESTION_REGISTRY.names
+
+# No-repeat cell walks for ?session= ids, within the ?tense=/?pronoun=/?verb_type= filters
+@traced('verbs.sampler')
+def build_sampler(verbs):
+    if VERBS_DB:
+        verb_types = {verb: verb_type for verb, _, verb_type in verbs.summaries()}
+    else:
+        verb_types = {verb: verb_data['type'] for verb, verb_data in verbs.items()}
+    return SessionSampler(verb_types, TENSES, PRONOUNS, STATE)
+
+SAMPLER = build_sampler(VERBS)
+
+# Pre-built, pre-serialized questions per type, refilled in the background
+# (QUESTION_POOL_SIZE=0 turns the pool off)
+QUESTION_POOL = QuestionPool.from_env(
+    lambda question_type: build_question(question_type),
+    lambda question: encode_json(question),
+    QUESTION_TYPES,
+    choose=lambda: QUESTION_REGISTRY.choose(random)
+)
+
+# Per-learner Thompson-sampling over question types and tenses (ADAPTIVE_DIFFICULTY=1)
+ADAPTIVE = AdaptiveSelector.from_env(STATE, QUESTION_TYPES, TENSES)
+
+# Compact verb bundle for in-browser question generation. The browser port
+# only knows the built-in types at equal weights, and server-side difficulty
+# weighting needs server-generated questions, so each of those turns it off.
+@traced('verbs.bundle')
+def build_verb_bundle(verbs):
+    if VERBS_DB:
+        # The bundle holds every form of every verb, which a SQLite lexicon
+        # exists to keep out of memory: no in-browser generation, verbose JSON only
+        return None
+    return build_bundle(verbs, TENSES, PRONOUNS, TENSE_NAMES)
+
+def bundle_codecs(bundle):
+    """(BundleCache, CompactCodec) for a bundle, or (None, None) without one"""
+    if bundle is None:
+        return None, None
+    return BundleCache(bundle), CompactCodec(bundle)
+
+# Compact wire format keyed to the same string table the client caches
+VERB_BUNDLE, WIRE = bundle_codecs(build_verb_bundle(VERBS))
+CLIENT_GENERATION = (os.environ.get('CLIENT_GENERATION', '1') != '0' and VERB_BUNDLE is not None
+                     and DIFFICULTY is None and ADAPTIVE is None
+                     and not QUESTION_TYPE_PLUGINS and not QUESTION_TYPE_WEIGHTS)
+BUNDLE_MAX_AGE = 365 * 24 * 3600
+
+# The page sends ?session= ids unless difficulty weighting picks the cells. A session
+# draws a specific cell, so its questions are built inline rather than taken from the pool.
+SESSION_WALKS = DIFFICULTY is None
+
+# Pre-serialized conjugation tables, rebuilt only when the verb data changes
+# (serialized on first lookup, into an LRU, for a SQLite lexicon)
+@traced('verbs.reference')
+def build_reference(verbs):
+    if VERBS_DB:
+        return LazyReferenceCache(verbs, TENSES, PRONOUNS, TENSE_NAMES, IRREGULAR_HINTS, VERBS_CACHE_SIZE)
+    return ReferenceCache(verbs, TENSES, PRONOUNS, TENSE_NAMES, IRREGULAR_HINTS)
+
+REFERENCE = build_reference(VERBS)
+REFERENCE_MAX_AGE = 3600
+
+# Prefix search over infinitives, glosses and conjugated forms
+@traced('verbs.search')
+def build_search(verbs):
+    if VERBS_DB:
+        return StoreSearch(verbs)
+    return SearchIndex(verbs, TENSES, PRONOUNS)
+
+SEARCH = build_search(VERBS)
+_startup_trace.end()
+
+# How often (seconds) to check verbs.json for changes; 0 disables the check
+VERBS_RELOAD_INTERVAL = float(os.environ.get('VERBS_RELOAD_INTERVAL', 0))
+_next_reload_check = 0
+# Held for a whole reload, so only one runs at a time
+_reload_lock = threading.RLock()
+
+def reload_verbs(force=False):
+    """Reload verbs.json (or VERBS_DB) if it changed and rebuild everything derived from it
+
+    Everything is built from the new data first and then swapped in, so
+    requests keep using the old data, never a half-built copy.
+    """
+    global VERBS, VERBS_MTIME, VERB_BUNDLE, WIRE, REFERENCE, SEARCH, QUESTION_REGISTRY, SAMPLER, DIFFICULTY
+    with _reload_lock:
+        mtime = os.path.getmtime(VERBS_DB or VERBS_PATH)
+        if not force and mtime == VERBS_MTIME:
+            return False
+        with trace_operation('verbs.reload'):
+            if VERBS_DB:
+                with span('verbs.load'):
+                    VERBS.refresh()
+                verbs = VERBS
+            else:
+                verbs = load_verbs()
+            verb_bundle, wire = bundle_codecs(build_verb_bundle(verbs))
+            reference, search = build_reference(verbs), build_search(verbs)
+            registry = QuestionRegistry(build_lexicon(verbs), QUESTION_TYPE_WEIGHTS)
+            sampler, difficulty = build_sampler(verbs), build_difficulty(verbs)
+            (VERBS, VERBS_MTIME, VERB_BUNDLE, WIRE, REFERENCE, SEARCH, QUESTION_REGISTRY, SAMPLER,
+             DIFFICULTY) = (verbs, mtime, verb_bundle, wire, reference, search, registry, sampler, difficulty)
+            if QUESTION_POOL is not None:
+                QUESTION_POOL.clear()
+            PAGE_CACHE.clear()
+        return True
+
+# Registered before the other hooks so the root span covers them too
+@app.before_request
+def start_trace():
+    if TRACER is None:
+        return
+    rule = request.url_rule.rule if request.url_rule is not None else None
+    root = request_span(request.method, rule, request.path, request.headers.get('traceparent'))
+    if root.recording:
+        g.trace_span = root.begin()
+
+def request_span(method, route, path, traceparent=None):
+    """The root span for a request (NOOP_SPAN when it is not traced); also used by asgi.py"""
+    if TRACER is None:
+        return NOOP_SPAN
+    attributes = {'http.request.method': method, 'url.path': path}
+    if route:
+        attributes['http.route'] = route
+    return TRACER.start(f'{method} {route}' if route else method, attributes, traceparent)
+
+@app.after_request
+def trace_status(response):
+    root = g.get('trace_span')
+    if root is not None:
+        root.set('http.response.status_code', response.status_code)
+        if response.status_code >= 500:
+            root.fail(f'HTTP {response.status_code}')
+    return response
+
+@app.teardown_request
+def end_trace(exc=None):
+    root = g.pop('trace_span', None)
+    if root is not None:
+        root.end(exc)
+
+def verbs_check_due():
+    return bool(VERBS_RELOAD_INTERVAL) and time.monotonic() >= _next_reload_check
+
+@app.before_request
+def check_verbs_changed():
+    global _next_reload_check
+    # One thread checks; the others carry on with the current data meanwhile
+    if not verbs_check_due() or not _reload_lock.acquire(blocking=False):
+        return
+    try:
+        if verbs_check_due():
+            _next_reload_check = time.monotonic() + VERBS_RELOAD_INTERVAL
+            reload_verbs()
+    finally:
+        _reload_lock.release()
+
+def client_id(req=None):
+    """Identify the client for per-client rate limits"""
+    req = req or request
+    header = os.environ.get('RATE_LIMIT_CLIENT_HEADER')
+    if header and req.headers.get(header):
+        return req.headers[header].split(',')[0].strip()
+    return req.remote_addr or 'unknown'
+
+@app.before_request
+def admit_request():
+    """Shed load on the API routes before doing any work"""
+    if request.endpoint not in RATE_LIMITED_ENDPOINTS:
+        return None
+    rejection = ADMISSION.admit(client_id())
+    if rejection is None:
+        g.admitted = True
+        return None
+    return rejection_response(*rejection)
+
+def rejection_response(status, retry_after):
+    response = jsonify({
+        'error': 'Too many requests' if status == 429 else 'Server busy',
+        'retry_after': int(retry_after_header(retry_after))
+    })
+    response.status_code = status
+    response.headers['Retry-After'] = retry_after_header(retry_after)
+    return response
+
+@app.teardown_request
+def release_request(exc=None):
+    if g.pop('admitted', False):
+        ADMISSION.release()
+
+def bundle_url():
+    return f'/bundle/{VERB_BUNDLE.filename}' if VERB_BUNDLE is not None else ''
+
+def index_context():
+    return {'bundle_url': bundle_url() if CLIENT_GENERATION else '', 'strings_url': bundle_url(),
+            'session_walks': SESSION_WALKS}
+
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return cached_page('index.html', **index_context())
+
+@app.template_global()
+def asset_url(name):
+    return ASSETS.url(name)
+
+def page_cache_key(template, context):
+    return template, tuple(sorted(context.items()))
+
+def render_cached(template, **context):
+    """Render a template once per distinct context; returns (body, etag)"""
+    key = page_cache_key(template, context)
+    page = PAGE_CACHE.get(key)
+    if page is None:
+        body = render_template(template, **context).encode('utf-8')
+        page = PAGE_CACHE[key] = (body, '"' + hashlib.sha256(body).hexdigest()[:16] + '"')
+    return page
+
+def cached_page(template, mimetype='text/html', **context):
+    """Serve a template from the render cache, revalidated by ETag"""
+    body, etag = render_cached(template, **context)
+    if request.if_none_match.contains(etag.strip('"')):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype=mimetype)
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/assets/<filename>')
+def static_asset(filename):
+    """Serve a fingerprinted asset; its name changes with its content, so cache it forever"""
+    asset = ASSETS.get(filename)
+    if asset is None:
+        return jsonify({'error': 'Unknown asset'}), 404
+    status, body, headers = immutable_payload(asset, ASSET_MAX_AGE, request.if_none_match.contains(asset.version),
+                                              request.accept_encodings['gzip'])
+    return Response(body, status=status, mimetype=asset.mimetype, headers=headers)
+
+def immutable_payload(entry, max_age, not_modified, gzip_ok):
+    """(status, body, headers) for a content-addressed file with body, gzipped and etag"""
+    headers = {'ETag': entry.etag, 'Vary': 'Accept-Encoding',
+               'Cache-Control': f'public, max-age={max_age}, immutable'}
+    if not_modified:
+        return 304, b'', headers
+    if gzip_ok:
+        headers['Content-Encoding'] = 'gzip'
+        return 200, entry.gzipped, headers
+    return 200, entry.body, headers
+
+@app.route('/bundle/<filename>')
+def verb_bundle(filename):
+    """Serve the versioned verb bundle with a long cache lifetime"""
+    if VERB_BUNDLE is None or filename != VERB_BUNDLE.filename:
+        return jsonify({'error': 'Unknown bundle version', 'current': bundle_url()}), 404
+    status, body, headers = immutable_payload(VERB_BUNDLE, BUNDLE_MAX_AGE,
+                                              request.if_none_match.contains(VERB_BUNDLE.version),
+                                              request.accept_encodings['gzip'])
+    return Response(body, status=status, mimetype='application/json', headers=headers)
+
+def log_event(event, **fields):
+    """Hand an event to the answer log without touching the disk"""
+    if ANSWER_LOG is not None:
+        fields['event'] = event
+        fields['ts'] = time.time()
+        ANSWER_LOG.log(fields)
+
+def offline_cache_version():
+    """Hash of the precached shell so the service worker cache changes with it"""
+    digest = hashlib.sha256(render_cached('index.html', **index_context())[1].encode())
+    for name in OFFLINE_ASSETS:
+        with open(os.path.join(app.static_folder, name), 'rb') as f:
+            digest.update(f.read())
+    digest.update(bundle_url().encode())
+    return digest.hexdigest()[:12]
+
+@app.route('/sw.js')
+def service_worker():
+    """Serve the service worker from the root so it controls the whole app"""
+    precache_urls = ['/', asset_url('app.js'), asset_url('style.css')] + [f'/static/{name}' for name in OFFLINE_ASSETS]
+    if bundle_url():
+        precache_urls.append(bundle_url())
+    return cached_page(
+        'sw.js',
+        mimetype='application/javascript',
+        version=offline_cache_version(),
+        precache_urls=tuple(precache_urls),
+        question_stock_url=f'/api/questions?count={QUESTION_STOCK_SIZE}'
+    )
 
 @app.route('/api/question', methods=['GET'])
 def get_question():
-    """Generate a random verb conjugation question"""
-    verb_infinitive = random.choice(list(VERBS.keys()))
-    verb_data = VERBS[verb_infinitive]
-    tense = random.choice(TENSES)
-    pronoun = random.choice(PRONOUNS)
-    
-    correct_answer = verb_data[tense][pronoun]
-    
-    # Randomly select question type: 25% each
-    rand = random.random()
-    if rand < 0.25:
-        question_type = 'identify-tense'
-    elif rand < 0.50:
-        question_type = 'identify-pronoun'
-    elif rand < 0.75:
-        question_type = 'identify-infinitive'
-    else:
-        question_type = 'conjugation'
-    
-    if question_type == 'identify-tense':
-        # Show conjugated verb, ask for the tense
-        # Generate options with tense names
-        all_tense_names = list(TENSE_NAMES.values())
-        correct_tense_name = TENSE_NAMES[tense]
-        
-        # Get wrong tense names (we have 5 tenses, so get up to 3 others)
-        wrong_tenses = [t for t in all_tense_names if t != correct_tense_name]
-        # Since we have 5 tenses, we'll get 3 wrong ones for a total of 4 options
-        if len(wrong_tenses) > 3:
-            wrong_tenses = random.sample(wrong_tenses, 3)
-        
-        # Combine and shuffle
-        all_options = [correct_tense_name] + wrong_tenses
-        random.shuffle(all_options)
-        
-        # Ensure all options are unique
-        all_options = list(dict.fromkeys(all_options))
-        
-        return jsonify({
-            'question_type': 'identify-tense',
-            'verb': verb_infinitive,
-            'english': verb_data['english'],
-            'pronoun': pronoun,
-            'conjugated_form': correct_answer,
-            'tense': tense,
-            'options': all_options,
-            'correct_answer': correct_tense_name
-        })
-    elif question_type == 'identify-pronoun':
-        # Show conjugated verb, ask for the pronoun
-        correct_pronoun = pronoun
-        
-        # Find all pronouns that have the same conjugation (for ambiguous cases)
-        matching_pronouns = [p for p in PRONOUNS if verb_data[tense][p] == correct_answer]
-        
-        # Get wrong pronouns (ones with different conjugations)
-        wrong_pronouns = [p for p in PRONOUNS if verb_data[tense][p] != correct_answer]
-        wrong_pronouns = random.sample(wrong_pronouns, min(3, len(wrong_pronouns)))
-        
-        # Combine and shuffle - include all matching pronouns as options if possible
-        # Start with the correct one plus wrong ones
-        all_options = [correct_pronoun] + wrong_pronouns
-        
-        # If there are other matching pronouns and room in options, include them
-        other_matching = [p for p in matching_pronouns if p != correct_pronoun]
-        if other_matching and len(all_options) < 4:
-            all_options.extend(other_matching[:4 - len(all_options)])
-        
-        random.shuffle(all_options)
-        
-        # Ensure we have exactly 4 unique options
-        all_options = list(dict.fromkeys(all_options))[:4]
-        
-        return jsonify({
-            'question_type': 'identify-pronoun',
-            'verb': verb_infinitive,
-            'english': verb_data['english'],
-            'tense': tense,
-            'tense_name': TENSE_NAMES[tense],
-            'conjugated_form': correct_answer,
-            'pronoun': pronoun,
-            'options': all_options,
-            'correct_answer': correct_pronoun,
-            'all_correct_answers': matching_pronouns  # All valid answers
-        })
-    elif question_type == 'identify-infinitive':
-        # Show conjugated verb, ask for the infinitive
-        # Generate options with verb infinitives
-        correct_infinitive = verb_infinitive
-        
-        # Get 3 wrong infinitives
-        all_verbs = list(VERBS.keys())
-        wrong_infinitives = [v for v in all_verbs if v != correct_infinitive]
-        wrong_infinitives = random.sample(wrong_infinitives, min(3, len(wrong_infinitives)))
-        
-        # Combine and shuffle
-        all_options = [correct_infinitive] + wrong_infinitives
-        random.shuffle(all_options)
-        
-        # Ensure all options are unique
-        all_options = list(dict.fromkeys(all_options))
-        
-        return jsonify({
-            'question_type': 'identify-infinitive',
-            'verb': verb_infinitive,
-            'english': verb_data['english'],
-            'tense': tense,
-            'tense_name': TENSE_NAMES[tense],
-            'pronoun': pronoun,
-            'conjugated_form': correct_answer,
-            'options': all_options,
-            'correct_answer': correct_infinitive
-        })
+    """Serve a random verb conjugation question, from the pool when it is on"""
+    try:
+        with span('question.filters'):
+            space, session = question_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    body, question = next_question(request.args.get('learner'), session, space)
+    with span('question.encode'):
+        if body is None or compact_wanted():
+            return negotiated_response(question)
+        return Response(body, mimetype='application/json')
+
+def question_filters(args):
+    """(cell space or None, session id or None) from the query; ValueError if invalid"""
+    session = args.get('session') or None
+    if session is not None and not valid_learner(session):
+        raise ValueError('Invalid session id')
+    return SAMPLER.parse(args), session
+
+def next_question(learner=None, session=None, space=None):
+    """Pick and log the next question; returns (pre-encoded body or None, question)
+
+    A session id walks the (filtered) cell space without repeats; filters
+    alone draw random cells from it.
+    """
+    question_type = tense = None
+    if DIFFICULTY is not None:
+        # Difficulty weighting picks the cell; a session walk would override it
+        session = None
+    if ADAPTIVE is not None and valid_learner(learner):
+        with span('question.adaptive'):
+            question_type, tense = ADAPTIVE.choose(learner, random)
+    if session is not None or space is not None:
+        with span('question.sample', session=session is not None):
+            cell = SAMPLER.draw(SAMPLER.narrow(space, tense), session, random)
+        body, question = None, build_question(question_type, cell=cell)
+    elif question_type is not None:
+        body, question = None, build_question(question_type, tense)
+    elif QUESTION_POOL is None:
+        body, question = None, build_question()
     else:
-        # Standard conjugation question
-        # Generate 3 wrong answers from other conjugations
-        all_conjugations = []
-        for t in TENSES:
-            all_conjugations.extend(verb_data[t].values())
-        
-        # Get unique wrong answers
-        wrong_answers = [conj for conj in all_conjugations if conj != correct_answer]
-        # Remove duplicates
-        wrong_answers = list(set(wrong_answers))
-        wrong_answers = random.sample(wrong_answers, min(3, len(wrong_answers)))
-        
-        # Combine and shuffle
-        all_answers = [correct_answer] + wrong_answers
-        random.shuffle(all_answers)
-        
-        # Ensure all options are unique (should be, but double check)
-        all_answers = list(dict.fromkeys(all_answers))
-        
-        return jsonify({
-            'question_type': 'conjugation',
-            'verb': verb_infinitive,
-            'english': verb_data['english'],
-            'pronoun': pronoun,
-            'tense': tense,
-            'tense_english': TENSE_NAMES[tense],
-            'options': all_answers,
-            'correct_answer': correct_answer
-        })
+        with span('question.pool'):
+            body, question = QUESTION_POOL.get()
+    with span('question.log'):
+        log_question(question)
+    return body, question
+
+def negotiated_response(data):
+    """JSON response in the format the client negotiated"""
+    if compact_wanted():
+        return compact_response(data)
+    return jsonify(data)
+
+def compact_wanted(req=None):
+    """Whether the client negotiated the compact format and it is on (not with VERBS_DB)"""
+    return WIRE is not None and wants_compact(req or request)
+
+def decode_compact(compact):
+    if WIRE is None:
+        raise WireFormatError('The compact wire format is off')
+    return WIRE.decode(compact)
+
+def compact_response(data):
+    return Response(encode_compact(data), mimetype=COMPACT_MIMETYPE)
+
+def encode_compact(data):
+    return json.dumps(WIRE.encode(data), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+@app.before_request
+def start_capture_timer():
+    if TRAFFIC_CAPTURE is not None and request.endpoint in CAPTURED_ROUTES and TRAFFIC_CAPTURE.sampled():
+        g.capture_started = time.perf_counter()
+
+@app.after_request
+def capture_traffic(response):
+    started = g.pop('capture_started', None)
+    if started is not None:
+        TRAFFIC_CAPTURE.record(request.method, request.path, request.args, request.headers,
+                               request.get_data(), response.status_code, response.get_data(),
+                               time.perf_counter() - started)
+    return response
+
+@app.after_request
+def vary_on_accept(response):
+    """Caches must key negotiated payloads on Accept"""
+    if request.endpoint in ('get_question', 'get_questions', 'check_answer'):
+        response.vary.add('Accept')
+    return response
+
+def encode_json(data):
+    """Encode a payload with the same JSON settings as jsonify"""
+    return app.json.dumps(data).encode('utf-8')
+
+def log_question(question):
+    log_event('question',
+              question_type=question['question_type'],
+              verb=question['verb'],
+              tense=question['tense'],
+              pronoun=question['pronoun'])
+
+def build_question(question_type=None, tense=None, cell=None):
+    """Build a random question as a plain dict, optionally of a given type and tense or cell"""
+    if cell is None and tense is not None:
+        cell = (random.choice(QUESTION_REGISTRY.lexicon.verb_names), tense, random.choice(PRONOUNS))
+    elif cell is None and DIFFICULTY is not None:
+        with span('question.sample', weighted=True):
+            cell = DIFFICULTY.choose(random)
+    if question_type is None:
+        question_type = QUESTION_REGISTRY.choose(random)
+    # Generating a question includes drawing and shuffling its options
+    with span('question.build', question_type=question_type):
+        return QUESTION_REGISTRY.get(question_type).generate(random, cell)
 
 @app.route('/api/check', methods=['POST'])
 def check_answer():
     """Check if the submitted answer is correct"""
-    data = request.json
-    user_answer = data.get('answer', '').strip().lower()
-    correct_answer = data.get('correct_answer', '').strip().lower()
+    with span('check.decode'):
+        if is_compact_body(request):
+            try:
+                data = decode_compact(request.get_json(force=True, silent=True))
+            except WireFormatError as e:
+                return jsonify({'error': str(e), 'current': bundle_url()}), 400
+        else:
+            data = request.json
+    response = check_and_record(data)
+    with span('check.encode'):
+        return negotiated_response(response)
+
+def check_and_record(data):
+    """Grade an /api/check payload and record it in the log, classroom and adaptive model"""
+    with span('check.grade'):
+        response = grade_answer(data)
+    with span('check.record'):
+        log_check(data, response['correct'])
+        if data.get('classroom'):
+            record_classroom_answer(data['classroom'], data)
+        if ADAPTIVE is not None and valid_learner(data.get('learner')):
+            ADAPTIVE.record(data['learner'], [(data.get('question_type'), data.get('tense'), response['correct'])])
+    return response
+
+def check_and_record_batch(answers, offline=False):
+    """Grade and record a list of /api/check payloads in one pass.
+
+    Returns one response dict per answer, in order, with None for an answer
+    that could not be graded. Hints are looked up once per distinct question,
+    and each learner's outcomes reach the adaptive model in a single update.
+    """
+    hints = {}
+    outcomes = {}
+    results = []
+    for answer in answers:
+        if not isinstance(answer, dict):
+            results.append(None)
+            continue
+        try:
+            response = grade_answer(answer, hints)
+        except (AttributeError, TypeError):
+            results.append(None)
+            continue
+        if offline:
+            log_check(answer, response['correct'], offline=True, answered_at=answer.get('answered_at'))
+        else:
+            log_check(answer, response['correct'])
+        if answer.get('classroom'):
+            record_classroom_answer(answer['classroom'], answer)
+        if valid_learner(answer.get('learner')):
+            outcomes.setdefault(answer['learner'], []).append(
+                (answer.get('question_type'), answer.get('tense'), response['correct']))
+        results.append(response)
+    if ADAPTIVE is not None:
+        for learner, learner_outcomes in outcomes.items():
+            ADAPTIVE.record(learner, learner_outcomes)
+    return results
+
+def record_classroom_answer(classroom, data):
+    """Count an answer towards the student's class score, graded against the server's key"""
+    try:
+        CLASSROOMS.record_answer(classroom.get('code'), classroom.get('student_id'),
+                                 classroom.get('token'), key_grade(data))
+    except (ClassroomError, AttributeError, TypeError):
+        pass
+
+def key_grade(data):
+    """Whether an answer is right by the server's own answer key for its cell
+
+    The payload's correct_answer is the client's word, so points never rely
+    on it: the question is built again from (question_type, verb, tense,
+    pronoun), like bulk_grade.SheetGrader, and the answer graded against that.
+    An answer naming no known cell is wrong.
+    """
+    question_type = QUESTION_REGISTRY.get(data.get('question_type') or 'conjugation')
+    verb, tense, pronoun = data.get('verb'), data.get('tense'), data.get('pronoun')
+    lexicon = QUESTION_REGISTRY.lexicon
+    if (question_type is None or not isinstance(verb, str) or tense not in lexicon.tenses
+            or pronoun not in lexicon.pronouns or verb not in lexicon.verbs):
+        return False
+    # The options are random, but the fields grading reads are not
+    key = question_type.generate(random, (verb, tense, pronoun))
+    return question_type.grade(dict(key, answer=data.get('answer', '')))
+
+def log_check(data, is_correct, **extra):
+    log_event('check',
+              question_type=data.get('question_type', 'conjugation'),
+              verb=data.get('verb', ''),
+              tense=data.get('tense', ''),
+              pronoun=data.get('pronoun', ''),
+              answer=data.get('answer', ''),
+              correct_answer=data.get('correct_answer', ''),
+              correct=is_correct,
+              **extra)
+
+def grade_answer(data, hints=None):
+    """Grade an answer payload and build the feedback response dict
+
+    `hints` is an optional dict shared across a batch, so answers to the
+    same question reuse one hint lookup.
+    """
     tense = data.get('tense', '')
-    verb = data.get('verb', '')
-    pronoun = data.get('pronoun', '')
-    question_type = data.get('question_type', 'conjugation')
-    
-    # For identify-pronoun questions, check against all valid answers
-    all_correct_answers = data.get('all_correct_answers', [])
-    if question_type == 'identify-pronoun' and all_correct_answers:
-        is_correct = user_answer in [ans.strip().lower() for ans in all_correct_answers]
-    else:
-        is_correct = user_answer == correct_answer
+    question_type = QUESTION_REGISTRY.get(data.get('question_type', 'conjugation'))
+    if question_type is None:
+        question_type = QUESTION_REGISTRY.get('conjugation')
+    is_correct = question_type.grade(data)
     
     response = {
         'correct': is_correct,
@@ -320,59 +774,227 @@ def check_answer():
     
     # Add hints for wrong answers based on question type
     if not is_correct:
-        # Conjugation hints
-        if question_type == 'conjugation' and verb and tense and pronoun:
-            verb_data = VERBS.get(verb, {})
-            
-            # Regular verb hint
-            if verb_data.get('type') == 'regular' and tense in CONJUGATION_HINTS:
-                if verb.endswith('ar'):
-                    verb_ending = '-ar'
-                elif verb.endswith('er'):
-                    verb_ending = '-er'
-                elif verb.endswith('ir'):
-                    verb_ending = '-ir'
-                else:
-                    verb_ending = None
-                
-                if verb_ending and verb_ending in CONJUGATION_HINTS[tense]:
-                    ending = CONJUGATION_HINTS[tense][verb_ending].get(pronoun, '')
-                    if ending:
-                        stem = verb[:-2]
-                        if tense in ['futuro', 'condicional']:
-                            response['hint'] = f"💡 Hint: For regular {verb_ending} verbs in {TENSE_NAMES[tense]}, add '{ending}' to the infinitive: {verb} + {ending}"
-                        else:
-                            response['hint'] = f"💡 Hint: For regular {verb_ending} verbs in {TENSE_NAMES[tense]}, use stem '{stem}' + '{ending}'"
-            
-            # Irregular verb hint
-            elif verb_data.get('type') == 'irregular' and verb in IRREGULAR_HINTS:
-                response['hint'] = f"💡 {IRREGULAR_HINTS[verb]}"
-        
-        # Tense identification hints
-        elif question_type == 'identify-tense' and tense:
-            if tense in TENSE_ID_HINTS:
-                response['hint'] = f"💡 {TENSE_ID_HINTS[tense]}"
-        
-        # Pronoun identification hints
-        elif question_type == 'identify-pronoun' and pronoun:
-            if pronoun in PRONOUN_HINTS:
-                hint_text = PRONOUN_HINTS[pronoun]
-                # If there are multiple correct answers, mention it
-                if all_correct_answers and len(all_correct_answers) > 1:
-                    hint_text += f" Note: In this tense, these pronouns share the same form: {', '.join(all_correct_answers)}"
-                response['hint'] = f"💡 {hint_text}"
-        
-        # Infinitive identification hints
-        elif question_type == 'identify-infinitive' and verb:
-            verb_data = VERBS.get(verb, {})
-            if verb.endswith('ar'):
-                response['hint'] = f"💡 This is an -ar verb. Think about common -ar verbs like hablar, llamar, or estar."
-            elif verb.endswith('er'):
-                response['hint'] = f"💡 This is an -er verb. Think about common -er verbs like comer, tener, or hacer."
-            elif verb.endswith('ir'):
-                response['hint'] = f"💡 This is an -ir verb. Think about common -ir verbs like vivir, ir, or venir."
+        if hints is None:
+            with span('check.hint'):
+                hint = question_type.hint(data)
+        else:
+            key = (question_type.name,) + tuple(hashable(data.get(field)) for field in question_type.hint_fields)
+            if key not in hints:
+                with span('check.hint'):
+                    hints[key] = question_type.hint(data)
+            hint = hints[key]
+        if hint:
+            response['hint'] = hint
     
-    return jsonify(response)
+    return response
+
+def hashable(value):
+    return tuple(value) if isinstance(value, list) else value
+
+@app.route('/api/check/batch', methods=['POST'])
+def check_answers():
+    """Grade a list of answers, e.g. a whole session, and return the results in order"""
+    data = request.get_json(silent=True)
+    answers = data.get('answers') if isinstance(data, dict) else data
+    if not isinstance(answers, list):
+        return jsonify({'error': 'Expected a list of answers'}), 400
+    if len(answers) > MAX_CHECK_BATCH:
+        return jsonify({'error': f'At most {MAX_CHECK_BATCH} answers per batch'}), 413
+    # Admission took one request's worth; a batch costs as much as its answers checked one by one
+    rejection = ADMISSION.charge(client_id(), len(answers) - 1)
+    if rejection is not None:
+        return rejection_response(*rejection)
+    results = check_and_record_batch(answers)
+    graded = [result for result in results if result is not None]
+    return jsonify({
+        'results': [result if result is not None else {'error': 'Invalid answer'} for result in results],
+        'graded': len(graded),
+        'correct': sum(result['correct'] for result in graded),
+        'failed': [index for index, result in enumerate(results) if result is None]
+    })
+
+@app.route('/api/questions', methods=['GET'])
+def get_questions():
+    """Generate a batch of questions for the offline stock"""
+    count = request.args.get('count', QUESTION_STOCK_SIZE, type=int)
+    count = max(1, min(count, MAX_QUESTION_BATCH))
+    if QUESTION_POOL is None or compact_wanted():
+        if QUESTION_POOL is None:
+            questions = [build_question() for _ in range(count)]
+        else:
+            questions = [QUESTION_POOL.get()[1] for _ in range(count)]
+        return negotiated_response({'questions': questions})
+    bodies = [QUESTION_POOL.get()[0] for _ in range(count)]
+    return Response(b'{"questions":[' + b','.join(bodies) + b']}', mimetype='application/json')
+
+@app.route('/api/sync', methods=['POST'])
+def sync_answers():
+    """Grade and record answers that were made offline, in one batch"""
+    data = request.get_json(silent=True) or {}
+    answers = data.get('answers')
+    if not isinstance(answers, list):
+        return jsonify({'error': 'Expected a list of answers'}), 400
+    if len(answers) > MAX_SYNC_BATCH:
+        return jsonify({'error': f'At most {MAX_SYNC_BATCH} answers per sync'}), 413
+    graded = [result for result in check_and_record_batch(answers, offline=True) if result is not None]
+    correct = sum(result['correct'] for result in graded)
+    return jsonify({'synced': len(graded), 'correct': correct, 'skipped': len(answers) - len(graded)})
+
+@app.route('/api/quiz/stream', methods=['GET'])
+def quiz_stream():
+    """Open a server-sent-event quiz stream, optionally as a timed round"""
+    round_seconds = request.args.get('round', type=int)
+    if round_seconds is not None and not 0 < round_seconds <= MAX_ROUND_SECONDS:
+        return jsonify({'error': f'round must be between 1 and {MAX_ROUND_SECONDS} seconds'}), 400
+    stream = QUIZ_STREAMS.open(round_seconds)
+    question = build_question()
+    log_question(question)
+
+    def events():
+        try:
+            yield from stream.events(question)
+        finally:
+            QUIZ_STREAMS.close(stream.id)
+
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/quiz/<stream_id>/answer', methods=['POST'])
+def quiz_answer(stream_id):
+    """Grade an answer for a stream and push the result with the next question"""
+    stream = QUIZ_STREAMS.get(stream_id)
+    if stream is None:
+        return jsonify({'error': 'Unknown or closed stream'}), 404
+    if stream.expired():
+        return jsonify({'error': 'Round is over'}), 409
+    question = stream.question
+    if question is None:
+        return jsonify({'error': 'Unknown or closed stream'}), 404
+    data = {key: question.get(key) for key in (
+        'correct_answer', 'tense', 'verb', 'pronoun', 'question_type', 'all_correct_answers')}
+    data['answer'] = (request.get_json(silent=True) or {}).get('answer', '')
+    result = grade_answer(data)
+    log_check(data, result['correct'])
+
+    stream.record(result['correct'])
+    next_question = build_question()
+    log_question(next_question)
+    stream.question = next_question
+    stream.push('result', {
+        'result': result,
+        'question': next_question,
+        'stats': stream.stats()
+    })
+    return '', 204
+
+@app.route('/class')
+@app.route('/class/<code>')
+def classroom_page(code=None):
+    """Teacher page: create a class, then watch its leaderboard"""
+    return render_template('classroom.html', code=code or '')
+
+@app.route('/api/class', methods=['POST'])
+def create_class():
+    data = request.get_json(silent=True) or {}
+    return jsonify(CLASSROOMS.create_class(data.get('name'))), 201
+
+@app.route('/api/class/<code>/join', methods=['POST'])
+def join_class(code):
+    data = request.get_json(silent=True) or {}
+    try:
+        return jsonify(CLASSROOMS.join(code, data.get('name'))), 201
+    except UnknownClassroomError as e:
+        return jsonify({'error': str(e)}), 404
+    except ClassroomError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/class/<code>/leaderboard', methods=['GET'])
+def class_leaderboard(code):
+    try:
+        board = CLASSROOMS.leaderboard(code)
+    except UnknownClassroomError as e:
+        return jsonify({'error': str(e)}), 404
+    response = jsonify(board)
+    response.headers['Cache-Control'] = f'public, max-age={int(CLASSROOMS.snapshot_ttl)}'
+    return response
+
+@app.route('/api/grade', methods=['POST'])
+def grade_sheet():
+    """Grade an uploaded CSV or JSONL answer sheet, streaming the results back as CSV"""
+    upload = request.files.get('file')
+    if upload is not None:
+        stream, fmt = upload.stream, sheet_format(upload.filename, upload.mimetype)
+    else:
+        stream, fmt = request.stream, sheet_format(content_type=request.mimetype)
+    try:
+        columns, rows = open_sheet(stream, request.args.get('format', fmt))
+    except SheetError as e:
+        return jsonify({'error': str(e)}), 400
+    # Rows are read from the upload as the response is written, one chunk at a time;
+    # the request context (and so the uploaded file) stays open until the last one
+    graded = grade_rows(rows, SheetGrader(QUESTION_REGISTRY), limit=MAX_SHEET_ROWS)
+    body = stream_with_context(block.encode('utf-8') for block in iter_csv(columns, graded))
+    return Response(body, mimetype='text/csv', headers={'Content-Disposition': 'attachment; filename="graded.csv"'})
+
+def cached_json(payload):
+    """Serve a pre-serialized payload, answering 304 when the client's copy is current"""
+    if request.if_none_match.contains(payload.etag.strip('"')):
+        response = Response(status=304)
+    else:
+        response = Response(payload.body, mimetype='application/json')
+    response.headers['ETag'] = payload.etag
+    response.headers['Cache-Control'] = f'public, max-age={REFERENCE_MAX_AGE}'
+    return response
+
+@app.route('/api/verbs', methods=['GET'])
+def verb_index():
+    """Index of every verb, tense and pronoun"""
+    return cached_json(REFERENCE.index)
+
+@app.route('/api/verb/<infinitive>', methods=['GET'])
+def verb_reference(infinitive):
+    """Full conjugation table for one verb"""
+    payload = REFERENCE.table(infinitive)
+    if payload is None:
+        return jsonify({'error': f'Unknown verb: {infinitive}'}), 404
+    return cached_json(payload)
+
+@app.route('/api/search', methods=['GET'])
+def search():
+    """Accent-insensitive prefix search for autocomplete"""
+    query = request.args.get('q', '')
+    limit = request.args.get('limit', 10, type=int)
+    return jsonify({'query': query, 'results': SEARCH.search(query, limit)})
+
+@app.route('/api/beacon', methods=['POST'])
+def client_beacon():
+    """Fold a batch of client-side timings into the latency histograms"""
+    if (request.content_length or 0) > MAX_BEACON_BYTES:
+        return jsonify({'error': f'Beacons are limited to {MAX_BEACON_BYTES} bytes'}), 413
+    # sendBeacon may label the body text/plain, so parse it whatever the content type
+    try:
+        CLIENT_METRICS.record(request.get_json(force=True, silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return Response(status=204)
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Expose internal counters"""
+    return jsonify({
+        'answer_log': ANSWER_LOG.stats() if ANSWER_LOG is not None else None,
+        'admission': ADMISSION.stats(),
+        'quiz_streams': len(QUIZ_STREAMS),
+        'classroom': CLASSROOMS.stats(),
+        'question_pool': QUESTION_POOL.stats() if QUESTION_POOL is not None else None,
+        'adaptive': ADAPTIVE.stats() if ADAPTIVE is not None else None,
+        'traffic_capture': TRAFFIC_CAPTURE.stats() if TRAFFIC_CAPTURE is not None else None,
+        'tracing': TRACER.stats() if TRACER is not None else None,
+        'lexicon': VERBS.stats() if VERBS_DB else None,
+        'client': CLIENT_METRICS.stats()
+    })
 
 if __name__ == '__main__':
     app.run(debug=False, port=10000)
@@ -0,0 +1,673 @@
+#!/usr/bin/env python
+"""
+ASGI entry point for PractiVerbo.
+
+The hot routes run as async handlers on the event loop: ``/api/question``,
+``/api/check``, the page shell, fingerprinted assets, the verb bundle,
+``/static/`` files and the quiz event stream. An open quiz stream sleeps on
+the loop between checks of its outbox instead of holding a thread, so
+thousands of idle streams fit in a handful of processes. Work that may block
+on the state backend (classroom scores, adaptive updates) goes to a bounded
+thread pool. Every other route is handed to the Flask app in that pool, so
+responses have the same shape under either server.
+
+Run it under any ASGI server:
+    uvicorn asgi:application --port 10000 --workers 4
+
+or, where uvicorn is not installed, under the small built-in HTTP/1.1 server:
+    python asgi.py --port 10000 --workers 4
+"""
+import argparse
+import asyncio
+import contextvars
+import io
+import json
+import mimetypes
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qsl
+
+from werkzeug.datastructures import Headers, MultiDict
+from werkzeug.http import parse_accept_header, parse_etags
+from werkzeug.utils import get_content_type
+
+import app as app_module
+from app import app
+from tracing import NOOP_SPAN
+from traffic import CAPTURED_ROUTES
+from wire_format import COMPACT_MIMETYPE, WireFormatError, is_compact_body
+
+# Threads for blocking state-backend calls and for routes served by Flask
+BLOCKING_THREADS = int(os.environ.get('ASGI_THREADS', 32))
+MAX_BODY_BYTES = int(os.environ.get('ASGI_MAX_BODY_BYTES', 16 * 1024 * 1024))
+STATIC_MAX_AGE = 3600
+STREAM_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+class AsgiRequest:
+    """Just enough of a request for the handlers and the wire-format helpers"""
+
+    __slots__ = ('method', 'path', 'args', 'headers', 'mimetype', 'remote_addr', 'body')
+
+    def __init__(self, scope, body=b''):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.args = MultiDict(parse_qsl(scope.get('query_string', b'').decode('latin-1'), keep_blank_values=True))
+        self.headers = Headers([(k.decode('latin-1'), v.decode('latin-1')) for k, v in scope.get('headers', ())])
+        self.mimetype = self.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        client = scope.get('client')
+        self.remote_addr = client[0] if client else None
+        self.body = body
+
+    def not_modified(self, version):
+        return parse_etags(self.headers.get('If-None-Match')).contains(version)
+
+    def accepts_gzip(self):
+        return bool(parse_accept_header(self.headers.get('Accept-Encoding'))['gzip'])
+
+
+async def read_body(receive, limit=MAX_BODY_BYTES):
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise ClientDisconnected()
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > limit:
+            raise BodyTooLarge()
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+async def respond(send, status, body=b'', headers=None, mimetype=None):
+    raw = [(b'content-length', str(len(body)).encode())]
+    if mimetype:
+        raw.append((b'content-type', get_content_type(mimetype, 'utf-8').encode()))
+    for name, value in (headers or {}).items():
+        raw.append((name.lower().encode('latin-1'), str(value).encode('latin-1')))
+    await send({'type': 'http.response.start', 'status': status, 'headers': raw})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def json_body(data):
+    """Bytes identical to what jsonify sends"""
+    return app.json.response(data).get_data()
+
+
+async def respond_json(send, data, status=200, headers=None):
+    await respond(send, status, json_body(data), headers, 'application/json')
+
+
+async def respond_negotiated(send, request, data, body=None):
+    """Answer in the format the client asked for, like app.negotiated_response"""
+    headers = {'Vary': 'Accept'}
+    if app_module.compact_wanted(request):
+        await respond(send, 200, app_module.encode_compact(data), headers, COMPACT_MIMETYPE)
+    else:
+        await respond(send, 200, json_body(data) if body is None else body, headers, 'application/json')
+
+
+async def blocking(func, *args):
+    # Run in a copy of this task's context, so spans opened in the thread join the request's trace
+    return await run_in(contextvars.copy_context(), func, *args)
+
+
+async def run_in(context, func, *args):
+    """Run func in the thread pool inside `context`, which successive calls may share"""
+    return await asyncio.get_running_loop().run_in_executor(None, partial(context.run, func, *args))
+
+
+async def question_handler(request, receive, send):
+    try:
+        space, session = app_module.question_filters(request.args)
+    except ValueError as e:
+        await respond_json(send, {'error': str(e)}, 400)
+        return
+    if app_module.ADAPTIVE is not None or session is not None:
+        # The adaptive model and session cursors live in the state backend
+        body, question = await blocking(app_module.next_question, request.args.get('learner'), session, space)
+    else:
+        body, question = app_module.next_question(request.args.get('learner'), session, space)
+    await respond_negotiated(send, request, question, body)
+
+
+async def check_handler(request, receive, send):
+    if is_compact_body(request):
+        try:
+            data = app_module.decode_compact(json.loads(request.body or b'null'))
+        except (ValueError, WireFormatError) as e:
+            await respond_json(send, {'error': str(e), 'current': app_module.bundle_url()}, 400,
+                               {'Vary': 'Accept'})
+            return
+    elif request.mimetype != 'application/json':
+        await respond_json(send, {'error': 'Expected application/json'}, 415)
+        return
+    else:
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            await respond_json(send, {'error': 'Expected a JSON object'}, 400)
+            return
+    if data.get('classroom') or app_module.ADAPTIVE is not None:
+        response = await blocking(app_module.check_and_record, data)
+    else:
+        response = app_module.check_and_record(data)
+    await respond_negotiated(send, request, response)
+
+
+async def index_handler(request, receive, send):
+    """Serve the page shell from the render cache; the first render goes through Flask"""
+    page = app_module.PAGE_CACHE.get(app_module.page_cache_key('index.html', app_module.index_context()))
+    if page is None:
+        return False
+    body, etag = page
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if request.not_modified(etag.strip('"')):
+        await respond(send, 304, b'', headers)
+    else:
+        await respond(send, 200, body, headers, 'text/html')
+
+
+async def asset_handler(request, receive, send, filename):
+    asset = app_module.ASSETS.get(filename)
+    if asset is None:
+        await respond_json(send, {'error': 'Unknown asset'}, 404)
+        return
+    status, body, headers = app_module.immutable_payload(
+        asset, app_module.ASSET_MAX_AGE, request.not_modified(asset.version), request.accepts_gzip())
+    await respond(send, status, body, headers, asset.mimetype)
+
+
+async def bundle_handler(request, receive, send, filename):
+    bundle = app_module.VERB_BUNDLE
+    if bundle is None or filename != bundle.filename:
+        await respond_json(send, {'error': 'Unknown bundle version', 'current': app_module.bundle_url()}, 404)
+        return
+    status, body, headers = app_module.immutable_payload(
+        bundle, app_module.BUNDLE_MAX_AGE, request.not_modified(bundle.version), request.accepts_gzip())
+    await respond(send, status, body, headers, 'application/json')
+
+
+STATIC_FILES = {}
+
+
+def load_static(filename):
+    """(body, etag) for a file under static/, cached until its mtime changes"""
+    root = os.path.realpath(app.static_folder)
+    path = os.path.realpath(os.path.join(root, filename))
+    if not path.startswith(root + os.sep) or not os.path.isfile(path):
+        return None
+    mtime = os.stat(path).st_mtime_ns
+    entry = STATIC_FILES.get(path)
+    if entry is None or entry[0] != mtime:
+        with open(path, 'rb') as f:
+            body = f.read()
+        entry = STATIC_FILES[path] = (mtime, body, f'"{mtime:x}-{len(body):x}"')
+    return entry[1], entry[2]
+
+
+async def static_handler(request, receive, send, filename):
+    found = await blocking(load_static, filename)
+    if found is None:
+        await respond(send, 404, b'Not Found', mimetype='text/plain')
+        return
+    body, etag = found
+    headers = {'ETag': etag, 'Cache-Control': f'public, max-age={STATIC_MAX_AGE}'}
+    if request.not_modified(etag.strip('"')):
+        await respond(send, 304, b'', headers)
+        return
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    await respond(send, 200, body, headers, mimetype)
+
+
+async def quiz_stream_handler(request, receive, send):
+    round_seconds = request.args.get('round', type=int)
+    if round_seconds is not None and not 0 < round_seconds <= app_module.MAX_ROUND_SECONDS:
+        await respond_json(send, {'error': f'round must be between 1 and {app_module.MAX_ROUND_SECONDS} seconds'},
+                           400)
+        return
+    streams = app_module.QUIZ_STREAMS
+    stream = await blocking(streams.open, round_seconds)
+    question = app_module.build_question()
+    app_module.log_question(question)
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        stream.closed = True
+        streams.notify(stream.id)
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    headers = [(b'content-type', b'text/event-stream; charset=utf-8')]
+    headers += [(k.lower().encode(), v.encode()) for k, v in STREAM_HEADERS.items()]
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+        async for message in stream.async_events(question, run=blocking):
+            await send({'type': 'http.response.body', 'body': message.encode('utf-8'), 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    except (ClientDisconnected, ConnectionError):
+        pass
+    finally:
+        watcher.cancel()
+        await blocking(streams.close, stream.id)
+
+
+# (method, path, handler, whether the path is a prefix whose rest is the argument, rate-limited endpoint)
+ROUTES = [
+    ('GET', '/api/question', question_handler, False, 'get_question'),
+    ('POST', '/api/check', check_handler, False, 'check_answer'),
+    ('GET', '/api/quiz/stream', quiz_stream_handler, False, None),
+    ('GET', '/', index_handler, False, None),
+    ('GET', '/assets/', asset_handler, True, None),
+    ('GET', '/bundle/', bundle_handler, True, None),
+    ('GET', '/static/', static_handler, True, None),
+]
+
+
+def match(method, path):
+    """(handler, args, rate-limited endpoint name) for an async route, or None"""
+    for route_method, route_path, handler, prefix, endpoint in ROUTES:
+        if method != route_method and not (method == 'HEAD' and route_method == 'GET'):
+            continue
+        if prefix and path.startswith(route_path) and len(path) > len(route_path):
+            return handler, (path[len(route_path):],), endpoint
+        if not prefix and path == route_path:
+            return handler, (), endpoint
+    return None
+
+
+def wsgi_environ(scope, body):
+    """WSGI environ for an ASGI HTTP scope"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+            continue
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = 'HTTP_' + name
+        environ[key] = environ[key] + ',' + value if key in environ else value
+    return environ
+
+
+def run_wsgi(environ):
+    """Run the Flask app for one request; returns (status, headers, body, rest)
+
+    A response with a Content-Length is read whole and `rest` is None. A
+    streamed response has no Content-Length: `body` is its first chunk and
+    `rest` is (WSGI result, chunk iterator), for the caller to read and close.
+    """
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'] = int(status.split(' ', 1)[0])
+        started['headers'] = headers
+
+    result = app(environ, start_response)
+    streamed = False
+    try:
+        chunks = iter(result)
+        body = next(chunks, b'')
+        streamed = not any(name.lower() == 'content-length' for name, _ in started['headers'])
+        if not streamed:
+            body += b''.join(chunks)
+    finally:
+        if not streamed and hasattr(result, 'close'):
+            result.close()
+    return started['status'], started['headers'], body, (result, chunks) if streamed else None
+
+
+async def wsgi_handler(scope, body, send):
+    # One context for the whole response: a streamed Flask response keeps its
+    # request context in context variables while it is read from pool threads
+    context = contextvars.copy_context()
+    status, headers, body, rest = await run_in(context, run_wsgi, wsgi_environ(scope, body))
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]})
+    if rest is None:
+        await send({'type': 'http.response.body', 'body': body})
+        return
+    result, chunks = rest
+    try:
+        while body is not None:
+            if body:
+                await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+            body = await run_in(context, next, chunks, None)
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        if hasattr(result, 'close'):
+            await run_in(context, result.close)
+
+
+def capturing_send(send, request, capture):
+    """Wrap `send` so the finished exchange is handed to the traffic capture"""
+    started = time.perf_counter()
+    response = {'status': None, 'body': []}
+
+    async def wrapped(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+        else:
+            response['body'].append(message.get('body', b''))
+            if not message.get('more_body', False):
+                capture.record(request.method, request.path, request.args, request.headers, request.body,
+                               response['status'], b''.join(response['body']), time.perf_counter() - started)
+        await send(message)
+
+    return wrapped
+
+
+def tracing_send(send, span):
+    """Wrap `send` so the response status is recorded on the request's root span"""
+    async def wrapped(message):
+        if message['type'] == 'http.response.start':
+            span.set('http.response.status_code', message['status'])
+            if message['status'] >= 500:
+                span.fail(f"HTTP {message['status']}")
+        await send(message)
+
+    return wrapped
+
+
+def admit(request, endpoint):
+    """Apply the Flask app's admission control to an async route; returns a rejection body or None"""
+    if endpoint not in app_module.RATE_LIMITED_ENDPOINTS:
+        return None
+    rejection = app_module.ADMISSION.admit(app_module.client_id(request))
+    if rejection is None:
+        return None
+    status, retry_after = rejection
+    header = app_module.retry_after_header(retry_after)
+    return status, {'error': 'Too many requests' if status == 429 else 'Server busy',
+                    'retry_after': int(header)}, {'Retry-After': header}
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            asyncio.get_running_loop().set_default_executor(
+                ThreadPoolExecutor(BLOCKING_THREADS, thread_name_prefix='asgi-blocking'))
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if app_module.QUESTION_POOL is not None:
+                app_module.QUESTION_POOL.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    """The ASGI 3 application"""
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+    if app_module.verbs_check_due():
+        # Stats the file and may reload it, so not on the event loop
+        await blocking(app_module.check_verbs_changed)
+    route = match(scope['method'], scope['path'])
+    try:
+        body = b'' if route and scope['method'] == 'GET' else await read_body(receive)
+    except BodyTooLarge:
+        await respond_json(send, {'error': 'Request body too large'}, 413)
+        return
+    except ClientDisconnected:
+        return
+    if route is None:
+        await wsgi_handler(scope, body, send)
+        return
+    handler, args, endpoint = route
+    request = AsgiRequest(scope, body)
+    rejection = admit(request, endpoint)
+    if rejection is not None:
+        status, data, headers = rejection
+        await respond_json(send, data, status, headers)
+        return
+    capture = app_module.TRAFFIC_CAPTURE
+    if capture is not None and endpoint in CAPTURED_ROUTES and capture.sampled():
+        send = capturing_send(send, request, capture)
+    root = NOOP_SPAN
+    if endpoint in CAPTURED_ROUTES:
+        root = app_module.request_span(request.method, CAPTURED_ROUTES[endpoint], request.path,
+                                       request.headers.get('traceparent'))
+        if root.recording:
+            send = tracing_send(send, root)
+    try:
+        with root:
+            if await handler(request, receive, send, *args) is False:
+                await wsgi_handler(scope, body, send)
+    finally:
+        if endpoint in app_module.RATE_LIMITED_ENDPOINTS:
+            app_module.ADMISSION.release()
+
+
+# A small HTTP/1.1 server for running the ASGI app where uvicorn is not installed
+
+MAX_HEADER_LINES = 100
+
+
+async def serve_connection(app_callable, reader, writer):
+    """Serve keep-alive HTTP/1.1 requests on one connection"""
+    peer = writer.get_extra_info('peername') or ('', 0)
+    local = writer.get_extra_info('sockname') or ('', 0)
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line.strip():
+                return
+            try:
+                method, target, version = request_line.decode('latin-1').split()
+            except ValueError:
+                writer.write(b'HTTP/1.1 400 Bad Request\r\ncontent-length: 0\r\nconnection: close\r\n\r\n')
+                return
+            headers = []
+            for _ in range(MAX_HEADER_LINES):
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers.append((name.strip().lower().encode('latin-1'), value.strip().encode('latin-1')))
+            fields = {name: value for name, value in headers}
+            if b'transfer-encoding' in fields:
+                writer.write(b'HTTP/1.1 501 Not Implemented\r\ncontent-length: 0\r\nconnection: close\r\n\r\n')
+                return
+            length = int(fields.get(b'content-length', b'0') or 0)
+            if length > MAX_BODY_BYTES:
+                writer.write(b'HTTP/1.1 413 Payload Too Large\r\ncontent-length: 0\r\nconnection: close\r\n\r\n')
+                return
+            body = await reader.readexactly(length) if length else b''
+            connection = fields.get(b'connection', b'').lower()
+            http_version = version.split('/', 1)[-1]
+            keep_alive = connection != b'close' if http_version == '1.1' else connection == b'keep-alive'
+            path, _, query = target.partition('?')
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': http_version,
+                'method': method.upper(), 'scheme': 'http', 'root_path': '',
+                'path': bytes(path, 'latin-1').decode('utf-8', 'replace'),
+                'raw_path': path.encode('latin-1'), 'query_string': query.encode('latin-1'),
+                'headers': headers, 'client': peer[:2], 'server': local[:2],
+            }
+            keep_alive = await run_request(app_callable, scope, body, reader, writer, keep_alive)
+            if not keep_alive:
+                return
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def run_request(app_callable, scope, body, reader, writer, keep_alive):
+    """Run the app for one request; returns whether the connection stays open"""
+    state = {'received': False, 'started': False, 'chunked': False, 'done': False}
+
+    async def receive():
+        if not state['received']:
+            state['received'] = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        # Nothing more is read once the request is in, so any byte here (or EOF)
+        # means the client went away or is pipelining, which this server does not do
+        await reader.read(1)
+        state['done'] = True
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if state['done']:
+            raise ClientDisconnected()
+        if message['type'] == 'http.response.start':
+            state['status'] = message['status']
+            state['headers'] = list(message.get('headers', ()))
+            return
+        chunk = message.get('body', b'')
+        more = message.get('more_body', False)
+        if not state['started']:
+            state['started'] = True
+            headers = state['headers']
+            names = {name.lower() for name, _ in headers}
+            if b'content-length' not in names:
+                if more:
+                    state['chunked'] = True
+                    headers.append((b'transfer-encoding', b'chunked'))
+                else:
+                    headers.append((b'content-length', str(len(chunk)).encode()))
+            if not keep_alive:
+                headers.append((b'connection', b'close'))
+            head = [f"HTTP/1.1 {state['status']} {status_reason(state['status'])}\r\n".encode('latin-1')]
+            head += [name + b': ' + value + b'\r\n' for name, value in headers]
+            writer.write(b''.join(head) + b'\r\n')
+        if scope['method'] != 'HEAD':
+            if state['chunked']:
+                if chunk:
+                    writer.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+                if not more:
+                    writer.write(b'0\r\n\r\n')
+            else:
+                writer.write(chunk)
+        await writer.drain()
+
+    try:
+        await app_callable(scope, receive, send)
+    except ClientDisconnected:
+        return False
+    if not state['started']:
+        writer.write(b'HTTP/1.1 500 Internal Server Error\r\ncontent-length: 0\r\nconnection: close\r\n\r\n')
+        return False
+    return keep_alive and not state['done']
+
+
+def status_reason(status):
+    try:
+        return HTTPStatus(status).phrase
+    except ValueError:
+        return ''
+
+
+async def serve(app_callable, sock):
+    """Serve the app on a bound socket until cancelled"""
+    messages = asyncio.Queue()
+    done = {'lifespan.startup.complete': asyncio.Event(), 'lifespan.shutdown.complete': asyncio.Event()}
+
+    async def send(message):
+        done[message['type']].set()
+
+    lifespan_task = asyncio.ensure_future(
+        app_callable({'type': 'lifespan', 'asgi': {'version': '3.0'}}, messages.get, send))
+    await messages.put({'type': 'lifespan.startup'})
+    await done['lifespan.startup.complete'].wait()
+    server = await asyncio.start_server(lambda r, w: serve_connection(app_callable, r, w), sock=sock,
+                                        limit=64 * 1024)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await messages.put({'type': 'lifespan.shutdown'})
+        await lifespan_task
+
+
+def bind(host, port, reuse_port=False):
+    sock = socket.create_server((host, port), backlog=4096, reuse_port=reuse_port)
+    sock.setblocking(False)
+    return sock
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve PractiVerbo over ASGI')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=10000)
+    parser.add_argument('--workers', type=int, default=1, help='Processes sharing the port')
+    parser.add_argument('--builtin', action='store_true', help='Use the built-in server even if uvicorn is installed')
+    args = parser.parse_args(argv)
+
+    if not args.builtin:
+        try:
+            import uvicorn
+        except ImportError:
+            pass
+        else:
+            uvicorn.run('asgi:application', host=args.host, port=args.port, workers=args.workers)
+            return 0
+
+    # Each worker is a fresh process binding the same port with SO_REUSEPORT;
+    # the extra ones are started with --workers 0
+    children = []
+    if args.workers > 1:
+        command = [sys.executable, os.path.abspath(__file__), '--builtin', '--host', args.host,
+                   '--port', str(args.port), '--workers', '0']
+        children = [subprocess.Popen(command) for _ in range(args.workers - 1)]
+    if args.workers:
+        print(f'Serving on http://{args.host}:{args.port} ({args.workers} workers)')
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        asyncio.run(serve(application, bind(args.host, args.port, reuse_port=args.workers != 1)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for child in children:
+            child.terminate()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
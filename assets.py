@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+"""
+Frontend asset pipeline for PractiVerbo.
+
+The page's scripts are concatenated into one bundle. The bundle and the
+stylesheet are minified and named after a hash of their content. A manifest
+maps each logical name (``app.js``, ``style.css``) to its fingerprinted
+URL. The app builds all of this in memory at startup and serves the files
+from ``/assets/`` with a year-long ``immutable`` cache. Templates ask
+``asset_url()`` for URLs.
+
+The minifiers are deliberately conservative. They drop comments, indentation
+and blank lines and collapse runs of spaces. They never touch string,
+template or regex literals, and they keep line breaks, so automatic
+semicolon insertion behaves as in the source.
+
+Usage:
+    python assets.py -o static/dist
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+# Logical asset name -> source files, concatenated in order
+BUNDLES = {
+    'app.js': ['offline.js', 'generator.js', 'wire.js', 'perf.js', 'script.js'],
+    'style.css': ['style.css'],
+}
+
+# A '/' after one of these (or at the start) begins a regex literal, not a division
+REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+REGEX_KEYWORD = re.compile(r'(?:^|[^\w$])(?:return|typeof|case|do|else|in|of|void|yield|await)$')
+
+
+def minify_js(source):
+    """Strip comments and redundant whitespace from JavaScript"""
+    out = []
+    code = []  # pending code text outside literals
+    # Stack of open template literals; each entry is the brace depth of its ${...}
+    templates = []
+    i = 0
+    n = len(source)
+
+    def flush_code():
+        if code:
+            text = ''.join(code)
+            text = re.sub(r'[ \t]+', ' ', text)
+            text = re.sub(r' ?\n[ \n]*', '\n', text)
+            out.append(text)
+            code.clear()
+
+    def last_significant():
+        for chunk in (''.join(code), *reversed(out)):
+            stripped = chunk.rstrip()
+            if stripped:
+                return stripped
+        return ''
+
+    def read_literal(start, quote):
+        j = start + 1
+        while j < n:
+            c = source[j]
+            if c == '\\':
+                j += 2
+                continue
+            if c == quote:
+                return j + 1
+            j += 1
+        return n
+
+    while i < n:
+        c = source[i]
+        nxt = source[i + 1] if i + 1 < n else ''
+        if templates and templates[-1] is None:
+            # Inside the text part of a template literal
+            j = i
+            while j < n:
+                if source[j] == '\\':
+                    j += 2
+                    continue
+                if source[j] == '`' or source.startswith('${', j):
+                    break
+                j += 1
+            out.append(source[i:j])
+            if j >= n:
+                break
+            if source[j] == '`':
+                out.append('`')
+                templates.pop()
+                i = j + 1
+            else:
+                out.append('${')
+                templates[-1] = 0
+                i = j + 2
+            continue
+        if c == '/' and nxt == '/':
+            end = source.find('\n', i)
+            i = n if end < 0 else end
+            continue
+        if c == '/' and nxt == '*':
+            end = source.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+            code.append(' ')
+            continue
+        if c in '\'"':
+            end = read_literal(i, c)
+            flush_code()
+            out.append(source[i:end])
+            i = end
+            continue
+        if c == '`':
+            flush_code()
+            out.append('`')
+            templates.append(None)
+            i += 1
+            continue
+        if c == '/':
+            previous = last_significant()
+            if not previous or previous[-1] in REGEX_PRECEDERS or REGEX_KEYWORD.search(previous):
+                j = i + 1
+                in_class = False
+                while j < n and source[j] != '\n':
+                    if source[j] == '\\':
+                        j += 2
+                        continue
+                    if source[j] == '[':
+                        in_class = True
+                    elif source[j] == ']':
+                        in_class = False
+                    elif source[j] == '/' and not in_class:
+                        break
+                    j += 1
+                j += 1
+                while j < n and (source[j].isalpha()):
+                    j += 1
+                flush_code()
+                out.append(source[i:j])
+                i = j
+                continue
+        if templates:
+            if c == '{':
+                templates[-1] += 1
+            elif c == '}':
+                if templates[-1] == 0:
+                    flush_code()
+                    out.append('}')
+                    templates[-1] = None
+                    i += 1
+                    continue
+                templates[-1] -= 1
+        code.append(c)
+        i += 1
+    flush_code()
+    return ''.join(out).strip() + '\n'
+
+
+def minify_css(source):
+    """Strip comments and redundant whitespace from CSS"""
+    parts = re.split(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')', source)
+    out = []
+    for index, part in enumerate(parts):
+        if index % 2:
+            # Quoted string: keep as is
+            out.append(part)
+            continue
+        part = re.sub(r'/\*.*?\*/', '', part, flags=re.S)
+        part = re.sub(r'\s+', ' ', part)
+        part = re.sub(r' ?([{};,>]) ?', r'\1', part)
+        part = re.sub(r': ', ':', part)
+        part = part.replace(';}', '}')
+        out.append(part)
+    return ''.join(out).strip() + '\n'
+
+
+MINIFIERS = {'.js': minify_js, '.css': minify_css}
+
+
+class Asset:
+    """One built asset: minified bytes under a content-hashed name"""
+
+    __slots__ = ('name', 'filename', 'body', 'gzipped', 'version', 'etag', 'mimetype')
+
+    def __init__(self, name, body):
+        stem, ext = os.path.splitext(name)
+        digest = hashlib.sha256(body).hexdigest()[:12]
+        self.name = name
+        self.filename = f'{stem}.{digest}{ext}'
+        self.body = body
+        self.gzipped = gzip.compress(body, mtime=0)
+        self.version = digest
+        self.etag = f'"{digest}"'
+        self.mimetype = 'application/javascript' if ext == '.js' else 'text/css'
+
+
+class AssetPipeline:
+    """Every fingerprinted asset, plus the manifest mapping logical names to URLs"""
+
+    def __init__(self, static_dir=STATIC_DIR, bundles=None, url_prefix='/assets/', minify=True):
+        self.url_prefix = url_prefix
+        self.assets = {}
+        for name, sources in (bundles or BUNDLES).items():
+            texts = []
+            for source in sources:
+                with open(os.path.join(static_dir, source), 'r', encoding='utf-8') as f:
+                    texts.append(f.read())
+            # A newline and semicolon between scripts stop one file's last statement running into the next
+            text = (';\n' if name.endswith('.js') else '\n').join(texts)
+            if minify:
+                text = MINIFIERS[os.path.splitext(name)[1]](text)
+            self.assets[name] = Asset(name, text.encode('utf-8'))
+        self.by_filename = {asset.filename: asset for asset in self.assets.values()}
+        self.version = hashlib.sha256(''.join(sorted(self.by_filename)).encode()).hexdigest()[:12]
+
+    def url(self, name):
+        return self.url_prefix + self.assets[name].filename
+
+    def get(self, filename):
+        return self.by_filename.get(filename)
+
+    def manifest(self):
+        return {name: self.url(name) for name in self.assets}
+
+
+def write_assets(pipeline, directory):
+    """Write the fingerprinted files and asset-manifest.json for a web server or CDN"""
+    os.makedirs(directory, exist_ok=True)
+    for asset in pipeline.assets.values():
+        with open(os.path.join(directory, asset.filename), 'wb') as f:
+            f.write(asset.body)
+        with open(os.path.join(directory, asset.filename + '.gz'), 'wb') as f:
+            f.write(asset.gzipped)
+    path = os.path.join(directory, 'asset-manifest.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(pipeline.manifest(), f, indent=2)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build minified, fingerprinted frontend assets')
+    parser.add_argument('-o', '--output', default=os.path.join(STATIC_DIR, 'dist'), help='Output directory')
+    parser.add_argument('--no-minify', action='store_true', help='Bundle and fingerprint only')
+    args = parser.parse_args(argv)
+
+    pipeline = AssetPipeline(minify=not args.no_minify)
+    path = write_assets(pipeline, args.output)
+    for name, asset in pipeline.assets.items():
+        print(f'{name} -> {asset.filename} ({len(asset.body)} bytes, {len(asset.gzipped)} gzipped)')
+    print(f'Wrote {path}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
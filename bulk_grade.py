@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+"""
+Grade uploaded answer sheets (paper or spreadsheet quizzes) against the verb data.
+
+A sheet is CSV with a header row, or JSON lines, with one answer per row:
+``verb``, ``tense``, ``pronoun`` and ``answer``. An optional
+``question_type`` column selects another question type; the default is
+conjugation. Other columns, such as a student name, are copied to the output
+unchanged. Verb, tense and pronoun are matched leniently: case and accents
+are ignored, a tense may be given by its name, and a single pronoun of
+``él/ella`` is accepted. The answer is graded exactly like ``/api/check``
+grades it, so accents count and syncretic pronouns are all accepted.
+
+Rows are read as a stream and graded in chunks, so memory does not grow with
+the sheet. A row that cannot be read (bytes that are not UTF-8, or broken
+CSV quoting) is reported as an error row instead of ending the sheet.
+Results are written as CSV: the input columns plus ``correct``,
+``correct_answer`` and ``error``. The CLI spreads the chunks over a process
+pool, and ``POST /api/grade`` streams results back while the upload is still
+being read.
+
+Usage:
+    python bulk_grade.py answers.csv -o results.csv --workers 4
+    curl --data-binary @answers.csv -H 'Content-Type: text/csv' http://127.0.0.1:10000/api/grade
+"""
+import argparse
+import csv
+import io
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from multiprocessing import Pool
+from random import Random
+
+from question_types import Lexicon, QuestionRegistry
+from search import normalize
+from verb_schema import PRONOUNS, TENSES, TENSE_NAMES
+
+REQUIRED_COLUMNS = ('verb', 'tense', 'pronoun', 'answer')
+RESULT_COLUMNS = ('correct', 'correct_answer', 'error')
+FORMATS = ('csv', 'jsonl')
+CHUNK_ROWS = 2000
+# Distinct (type, verb, tense, pronoun) spellings remembered per grader
+MAX_MEMO = 100000
+
+
+# What a byte that is not UTF-8 decodes to
+UNREADABLE = '\ufffd'
+_END = object()
+
+
+class SheetError(ValueError):
+    """The sheet cannot be read at all (as opposed to a bad row)"""
+
+
+def sheet_format(name=None, content_type=None):
+    """Guess 'csv' or 'jsonl' from a file name or content type"""
+    name = (name or '').lower()
+    content_type = (content_type or '').lower()
+    if name.endswith(('.jsonl', '.ndjson')) or 'ndjson' in content_type or 'jsonl' in content_type:
+        return 'jsonl'
+    return 'csv'
+
+
+def open_sheet(stream, fmt='csv'):
+    """Start reading a binary stream; returns (columns, iterator of row dicts, None for unreadable rows)"""
+    if fmt not in FORMATS:
+        raise SheetError(f'Unknown sheet format: {fmt}')
+    if not isinstance(stream, io.BufferedIOBase):
+        stream = io.BufferedReader(stream)
+    # Bad bytes become U+FFFD so one row cannot end the stream; grading flags those rows
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+    try:
+        if fmt == 'csv':
+            reader = csv.reader(text)
+            header = next(reader, None)
+            if header is None:
+                raise SheetError('The sheet is empty')
+            columns = [column.strip().lower() for column in header]
+            if any(UNREADABLE in column for column in columns):
+                raise SheetError('Unreadable sheet: the header is not UTF-8')
+            rows = csv_rows(reader, columns)
+        else:
+            lines = (line for line in text if line.strip())
+            first = parse_json_row(next(lines, ''))
+            if first is None:
+                raise SheetError('The first line is not a JSON object')
+            columns = list(first)
+            rows = itertools.chain([first], map(parse_json_row, lines))
+    except csv.Error as e:
+        raise SheetError(f'Unreadable sheet: {e}')
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing:
+        raise SheetError(f'Missing columns: {", ".join(missing)}')
+    return columns, rows
+
+
+def csv_rows(reader, columns):
+    """Row dicts from a csv.reader, skipping blank lines; None for a row with broken quoting"""
+    while True:
+        try:
+            values = next(reader)
+        except StopIteration:
+            return
+        except csv.Error:
+            yield None
+            continue
+        if any(value.strip() for value in values):
+            yield dict(zip(columns, values))
+
+
+def parse_json_row(line):
+    try:
+        row = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(row, dict):
+        return None
+    return {str(key).lower(): '' if value is None else str(value) for key, value in row.items()}
+
+
+class SheetGrader:
+    """Grades sheet rows with the question types /api/check uses"""
+
+    def __init__(self, registry):
+        lexicon = registry.lexicon
+        self.registry = registry
+        self.verbs = {normalize(verb): verb for verb in lexicon.verb_names}
+        self.tenses = {}
+        for tense in lexicon.tenses:
+            self.tenses[normalize(lexicon.tense_names[tense])] = tense
+            self.tenses[normalize(tense)] = tense
+        self.pronouns = {}
+        for pronoun in lexicon.pronouns:
+            for part in pronoun.split('/'):
+                self.pronouns.setdefault(normalize(part), pronoun)
+            self.pronouns[normalize(pronoun)] = pronoun
+        # Answer keys per spelling of (type, verb, tense, pronoun); a key is the
+        # question dict /api/check would have been sent, or an error message
+        self.keys = {}
+        self.rng = Random(0)
+
+    @classmethod
+    def from_verbs(cls, verbs, tenses, pronouns, tense_names):
+        return cls(QuestionRegistry(Lexicon(verbs, tenses, pronouns, tense_names)))
+
+    def answer_key(self, question_type, verb, tense, pronoun):
+        spelling = (question_type, verb, tense, pronoun)
+        key = self.keys.get(spelling)
+        if key is not None:
+            return key
+        grader = self.registry.get(question_type.strip() or 'conjugation')
+        cell = (self.verbs.get(normalize(verb)), self.tenses.get(normalize(tense)),
+                self.pronouns.get(normalize(pronoun)))
+        if grader is None:
+            key = f'Unknown question type: {question_type}'
+        elif cell[0] is None:
+            key = f'Unknown verb: {verb}'
+        elif cell[1] is None:
+            key = f'Unknown tense: {tense}'
+        elif cell[2] is None:
+            key = f'Unknown pronoun: {pronoun}'
+        else:
+            # The options are random, but the fields grading reads are not
+            key = (grader, grader.generate(self.rng, cell))
+        if len(self.keys) < MAX_MEMO:
+            self.keys[spelling] = key
+        return key
+
+    def grade(self, row):
+        """(correct, correct_answer, error) for one row dict"""
+        if row is None:
+            return '', '', 'Unreadable row'
+        if any(UNREADABLE in value for value in row.values() if isinstance(value, str)):
+            return '', '', 'Unreadable row: not UTF-8'
+        key = self.answer_key(row.get('question_type', ''), row.get('verb', ''), row.get('tense', ''),
+                              row.get('pronoun', ''))
+        if isinstance(key, str):
+            return '', '', key
+        grader, question = key
+        is_correct = grader.grade(dict(question, answer=row.get('answer', '')))
+        return ('true' if is_correct else 'false'), question['correct_answer'], ''
+
+    def grade_chunk(self, rows):
+        return [self.grade(row) for row in rows]
+
+
+def iter_chunks(rows, chunk_rows=CHUNK_ROWS):
+    while True:
+        chunk = list(itertools.islice(rows, chunk_rows))
+        if not chunk:
+            return
+        yield chunk
+
+
+_worker_grader = None
+
+
+def _init_worker(grader):
+    global _worker_grader
+    _worker_grader = grader
+
+
+def _grade_chunk(rows):
+    return _worker_grader.grade_chunk(rows)
+
+
+def grade_rows(rows, grader, workers=1, chunk_rows=CHUNK_ROWS, limit=None):
+    """Yield (row, result) in input order; with workers > 1, chunks are graded in a process pool
+
+    With a `limit`, rows past it are not graded, and one trailing error row
+    says so.
+    """
+    if limit is not None:
+        rows = iter(rows)
+        yield from grade_rows(itertools.islice(rows, limit), grader, workers, chunk_rows)
+        if next(rows, _END) is not _END:
+            yield {}, ('', '', f'Row limit of {limit} reached: the remaining rows were not graded')
+        return
+    chunks = iter_chunks(rows, chunk_rows)
+    if workers == 1:
+        for chunk in chunks:
+            yield from zip(chunk, grader.grade_chunk(chunk))
+        return
+    with Pool(workers, initializer=_init_worker, initargs=(grader,)) as pool:
+        # A bounded window of chunks in flight, so a huge sheet is never read ahead
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk, pool.apply_async(_grade_chunk, (chunk,))))
+            if len(pending) >= workers * 2:
+                chunk, result = pending.popleft()
+                yield from zip(chunk, result.get())
+        while pending:
+            chunk, result = pending.popleft()
+            yield from zip(chunk, result.get())
+
+
+def iter_csv(columns, graded, chunk_rows=CHUNK_ROWS, stats=None):
+    """Encode graded rows as CSV text, one block per `chunk_rows` rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(list(columns) + list(RESULT_COLUMNS))
+    for count, (row, result) in enumerate(graded, 1):
+        row = row or {}
+        writer.writerow([row.get(column, '') for column in columns] + list(result))
+        if stats is not None:
+            stats['rows'] += 1
+            stats['correct'] += result[0] == 'true'
+            stats['errors'] += bool(result[2])
+        if count % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Grade an answer sheet against the verb data')
+    parser.add_argument('sheet', help='CSV or JSONL answer sheet, or - for stdin')
+    parser.add_argument('-o', '--output', help='Results CSV (default: stdout)')
+    parser.add_argument('--format', choices=FORMATS, help='Sheet format (default: from the file name)')
+    parser.add_argument('--verbs', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'verbs.json'),
+                        help='Verb table in the verbs.json layout')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help='Worker processes (default: one per CPU)')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help='Rows graded per task')
+    args = parser.parse_args(argv)
+
+    with open(args.verbs, 'r', encoding='utf-8') as f:
+        grader = SheetGrader.from_verbs(json.load(f), TENSES, PRONOUNS, TENSE_NAMES)
+    fmt = args.format or sheet_format(args.sheet)
+    source = sys.stdin.buffer if args.sheet == '-' else open(args.sheet, 'rb')
+    output = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    stats = {'rows': 0, 'correct': 0, 'errors': 0}
+    started = time.monotonic()
+    try:
+        columns, rows = open_sheet(source, fmt)
+        graded = grade_rows(rows, grader, max(1, args.workers), args.chunk_rows)
+        for block in iter_csv(columns, graded, args.chunk_rows, stats):
+            output.write(block)
+    except SheetError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if source is not sys.stdin.buffer:
+            source.close()
+    print(f"Graded {stats['rows']} rows ({stats['correct']} correct, {stats['errors']} errors) "
+          f'in {time.monotonic() - started:.2f}s', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Classroom mode: class codes, students and a live leaderboard.
+
+Classes and scores live in the shared state backend (see ``state.py``), so
+every worker, on one host or many, sees the same numbers. Each class keeps a
+sorted set ranking its students, so the leaderboard's top-k is one ranged
+read. Reads are served from a short-TTL snapshot per worker, and only one
+thread per worker refreshes an expired snapshot, so hundreds of students
+polling cost about one top-k read per TTL window. Refreshes are serialized
+by a fixed table of striped locks, so polling made-up codes allocates
+nothing.
+"""
+import secrets
+import threading
+import time
+
+CODE_ALPHABET = 'ABCDEFGHJKLMNPQRSTUVWXYZ23456789'
+CODE_LENGTH = 6
+POINTS_PER_CORRECT = 10
+MAX_NAME_LENGTH = 40
+# Ranking value = points * RANK_SCALE - student id, so ties go to whoever joined first
+RANK_SCALE = 1000000
+# Locks shared by class codes for snapshot refreshes; codes that hash alike share one
+REFRESH_LOCK_STRIPES = 64
+
+
+class ClassroomError(Exception):
+    """Raised for invalid classroom input"""
+
+
+class UnknownClassroomError(ClassroomError):
+    """Raised for class codes or students that do not exist"""
+
+
+class ClassroomStore:
+    """Classes and scores in a state backend with a TTL-cached leaderboard"""
+
+    def __init__(self, backend, snapshot_ttl=2.0, top_k=10):
+        self.backend = backend
+        self.snapshot_ttl = snapshot_ttl
+        self.top_k = top_k
+        self._snapshots = {}
+        self._refresh_locks = [threading.Lock() for _ in range(REFRESH_LOCK_STRIPES)]
+        self.snapshot_hits = 0
+        self.snapshot_misses = 0
+
+    def create_class(self, name):
+        name = clean_name(name) or 'My class'
+        for _ in range(10):
+            code = ''.join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+            if self.backend.set_json(f'class:{code}', {'name': name, 'created_at': time.time()}, nx=True):
+                return {'code': code, 'name': name}
+        raise ClassroomError('Could not allocate a class code')
+
+    def get_class(self, code):
+        code = normalize_code(code)
+        classroom = self.backend.get_json(f'class:{code}') if code else None
+        if classroom is None:
+            raise UnknownClassroomError('Unknown class code')
+        return {'code': code, 'name': classroom['name']}
+
+    def join(self, code, name):
+        classroom = self.get_class(code)
+        name = clean_name(name)
+        if not name:
+            raise ClassroomError('A name is required')
+        code = classroom['code']
+        token = secrets.token_urlsafe(16)
+        student_id = self.backend.incr(f'class:{code}:next_student')
+        self.backend.set_json(f'class:{code}:student:{student_id}', {
+            'name': name, 'token': token, 'joined_at': time.time()})
+        self.backend.zincrby(f'class:{code}:ranking', student_id, -student_id)
+        return {'code': code, 'class_name': classroom['name'],
+                'student_id': student_id, 'name': name, 'token': token}
+
+    def record_answer(self, code, student_id, token, correct):
+        """Add one graded answer to a student's totals"""
+        code = normalize_code(code)
+        student = self.backend.get_json(f'class:{code}:student:{student_id}')
+        if student is None or not secrets.compare_digest(str(student['token']), str(token or '')):
+            raise UnknownClassroomError('Unknown student')
+        self.backend.zincrby(f'class:{code}:answered', student_id, 1)
+        if correct:
+            self.backend.zincrby(f'class:{code}:correct', student_id, 1)
+            self.backend.zincrby(f'class:{code}:ranking', student_id, POINTS_PER_CORRECT * RANK_SCALE)
+
+    def leaderboard(self, code):
+        """Top-k standings, served from a snapshot no older than `snapshot_ttl`"""
+        code = normalize_code(code)
+        snapshot = self._snapshots.get(code)
+        if snapshot is not None and snapshot[0] > time.monotonic():
+            self.snapshot_hits += 1
+            return snapshot[1]
+        with self._refresh_lock(code):
+            # Another thread may have refreshed while we waited
+            snapshot = self._snapshots.get(code)
+            if snapshot is not None and snapshot[0] > time.monotonic():
+                self.snapshot_hits += 1
+                return snapshot[1]
+            self.snapshot_misses += 1
+            board = self._read_leaderboard(code)
+            self._snapshots[code] = (time.monotonic() + self.snapshot_ttl, board)
+            return board
+
+    def _refresh_lock(self, code):
+        return self._refresh_locks[hash(code) % len(self._refresh_locks)]
+
+    def _read_leaderboard(self, code):
+        classroom = self.get_class(code)
+        backend = self.backend
+        leaders = []
+        for rank, (student_id, value) in enumerate(backend.ztop(f'class:{code}:ranking', self.top_k), start=1):
+            student = backend.get_json(f'class:{code}:student:{student_id}') or {'name': ''}
+            leaders.append({
+                'rank': rank,
+                'name': student['name'],
+                'score': int(round(value + int(student_id))) // RANK_SCALE,
+                'answered': int(backend.zscore(f'class:{code}:answered', student_id) or 0),
+                'correct': int(backend.zscore(f'class:{code}:correct', student_id) or 0),
+            })
+        return {
+            'code': classroom['code'],
+            'name': classroom['name'],
+            'students': backend.zcard(f'class:{code}:ranking'),
+            'generated_at': time.time(),
+            'leaders': leaders,
+        }
+
+    def stats(self):
+        return {'snapshot_hits': self.snapshot_hits, 'snapshot_misses': self.snapshot_misses}
+
+
+def normalize_code(code):
+    return (code or '').strip().upper()
+
+
+def clean_name(name):
+    return ' '.join(str(name or '').split())[:MAX_NAME_LENGTH]
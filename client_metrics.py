@@ -0,0 +1,114 @@
+"""
+Latency as learners' browsers see it.
+
+``static/perf.js`` times the ``/api/question`` and ``/api/check`` fetches,
+question rendering, and the time from navigation to the first question.
+It posts batches of ``[metric, milliseconds]`` samples to ``/api/beacon``
+with ``navigator.sendBeacon``. ``ClientMetrics`` folds them into
+fixed-bucket histograms, overall and per effective connection type, so
+memory does not grow with traffic. ``/api/metrics`` reports the bucket counts
+with percentiles read off the buckets, for the worker that answers.
+"""
+import bisect
+from threading import Lock
+
+METRICS = ('question_fetch', 'check_fetch', 'render', 'first_question')
+NETWORKS = ('slow-2g', '2g', '3g', '4g')
+# Upper bounds in milliseconds; one more bucket counts everything slower
+BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+MAX_SAMPLES = 100
+MAX_MS = 10 * 60 * 1000
+
+
+class Histogram:
+    """Counts per latency bucket"""
+
+    __slots__ = ('counts', 'count', 'total')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the percentile; None past the last bound"""
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def snapshot(self):
+        buckets = {str(bound): count for bound, count in zip(BUCKETS_MS, self.counts)}
+        buckets['+Inf'] = self.counts[-1]
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count, 1) if self.count else None,
+            'p50_ms': self.percentile(0.5) if self.count else None,
+            'p95_ms': self.percentile(0.95) if self.count else None,
+            'p99_ms': self.percentile(0.99) if self.count else None,
+            'buckets': buckets,
+        }
+
+
+class ClientMetrics:
+    """Histograms of client-reported timings per metric, and per metric and network"""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.histograms = {}
+        self.beacons = 0
+        self.samples = 0
+        self.rejected = 0
+
+    def record(self, beacon):
+        """Fold one beacon in; returns how many samples were accepted. ValueError if malformed."""
+        if not isinstance(beacon, dict) or not isinstance(beacon.get('samples'), list):
+            raise ValueError('Expected {"samples": [[metric, ms], ...]}')
+        samples = beacon['samples']
+        if len(samples) > MAX_SAMPLES:
+            raise ValueError(f'At most {MAX_SAMPLES} samples per beacon')
+        network = beacon.get('network') if beacon.get('network') in NETWORKS else None
+        accepted = []
+        for sample in samples:
+            if (isinstance(sample, list) and len(sample) == 2 and sample[0] in METRICS
+                    and isinstance(sample[1], (int, float)) and not isinstance(sample[1], bool)
+                    and 0 <= sample[1] <= MAX_MS):
+                accepted.append(sample)
+        with self.lock:
+            self.beacons += 1
+            self.samples += len(accepted)
+            self.rejected += len(samples) - len(accepted)
+            for metric, ms in accepted:
+                self._histogram(metric, None).observe(ms)
+                if network is not None:
+                    self._histogram(metric, network).observe(ms)
+        return len(accepted)
+
+    def _histogram(self, metric, network):
+        histogram = self.histograms.get((metric, network))
+        if histogram is None:
+            histogram = self.histograms[(metric, network)] = Histogram()
+        return histogram
+
+    def stats(self):
+        with self.lock:
+            by_network = {}
+            for (metric, network), histogram in sorted(self.histograms.items(), key=lambda item: str(item[0])):
+                if network is not None:
+                    by_network.setdefault(network, {})[metric] = histogram.snapshot()
+            return {
+                'beacons': self.beacons,
+                'samples': self.samples,
+                'rejected': self.rejected,
+                'histograms': {metric: self.histograms[(metric, None)].snapshot()
+                               for metric in METRICS if (metric, None) in self.histograms},
+                'by_network': by_network,
+            }
@@ -0,0 +1,4 @@
+"""Keep the test suite off the app's real state file"""
+import os
+
+os.environ.setdefault('STATE_BACKEND', 'memory://')
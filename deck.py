@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+"""
+Generate printable worksheets and importable drill decks.
+
+Questions come from the same question types and filters as
+``/api/question``. Each chunk of ``CHUNK_SIZE`` questions has its own RNG
+stream, seeded from ``--seed`` and the chunk number. Chunks are generated in
+a process pool, at most a few ahead of the writer, and written to disk in
+order. Memory therefore stays bounded for any deck size, and a given seed
+gives the same deck whatever the number of workers. With ``--no-repeat``
+the cells come from the session sampler's permutation walk, so no cell
+repeats until every cell allowed by the filters has been used.
+
+Formats:
+
+- ``jsonl``: one question object per line, as ``/api/question`` returns it
+- ``csv``: id, type, prompt, options and answer columns, for worksheets
+- ``tsv``: Anki-importable notes (front, back, tags) with header lines
+
+With ``--answer-key`` the answers are left out of the deck and written to a
+separate ``id,answer`` CSV.
+
+Usage:
+    python deck.py -n 5000 --format tsv -o presente.txt --tense presente --seed 7
+    python deck.py -n 200 --format csv -o quiz.csv --answer-key key.csv --no-repeat --workers 4
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import secrets
+import sys
+import time
+from collections import deque
+from multiprocessing import Pool
+from random import Random
+
+from question_types import QUESTION_TYPE_CLASSES, Lexicon, QuestionRegistry, parse_weights
+from session_sampler import SessionSampler
+from verb_schema import PRONOUNS, TENSES, TENSE_NAMES
+
+FORMATS = ('jsonl', 'csv', 'tsv')
+CHUNK_SIZE = 1000
+CSV_COLUMNS = ('id', 'question_type', 'prompt', 'options', 'answer', 'verb', 'tense', 'pronoun')
+ANKI_HEADER = '#separator:tab\n#html:true\n#tags column:3\n'
+
+# Worksheet prompts, worded like the headings in static/script.js
+PROMPTS = {
+    'conjugation': 'Conjugate {verb} ({english}) for {pronoun} in the {tense_english}',
+    'identify-tense': 'What tense is "{conjugated_form}" ({pronoun}, {verb})?',
+    'identify-pronoun': 'Which pronoun is "{conjugated_form}" ({verb}, {tense_name}) for?',
+    'identify-infinitive': 'What is the infinitive of "{conjugated_form}" ({tense_name})?',
+}
+
+
+def prompt(question):
+    template = PROMPTS.get(question['question_type'])
+    if template is None:
+        return f"{question['question_type']}: {question['verb']}, {question['tense']}, {question['pronoun']}"
+    return template.format_map(question)
+
+
+def answer_text(question):
+    """Every accepted answer, e.g. both pronouns that share a form"""
+    return ' / '.join(question.get('all_correct_answers') or [question['correct_answer']])
+
+
+class DeckBuilder:
+    """Generates and formats one chunk of a deck at a time"""
+
+    def __init__(self, registry, space, seed, fmt, answers=True, no_repeat=False):
+        self.registry = registry
+        self.space = space
+        self.seed = seed
+        self.fmt = fmt
+        self.answers = answers
+        self.no_repeat = no_repeat
+
+    def questions(self, chunk, start, count):
+        """Questions start..start+count-1 of the deck, from chunk `chunk`'s own RNG stream"""
+        rng = Random(f'{self.seed}:{chunk}')
+        for number in range(start, start + count):
+            if self.no_repeat:
+                cell = self.space.cell(number, self.seed)
+            else:
+                cell = self.space.random_cell(rng)
+            question = self.registry.get(self.registry.choose(rng)).generate(rng, cell)
+            question['id'] = number + 1
+            yield question
+
+    def render(self, chunk, start, count):
+        """(deck text, answer key text) for one chunk"""
+        deck = io.StringIO()
+        key = io.StringIO()
+        writer = csv.writer(deck)
+        key_writer = csv.writer(key)
+        for question in self.questions(chunk, start, count):
+            if not self.answers:
+                key_writer.writerow([question['id'], answer_text(question)])
+            if self.fmt == 'jsonl':
+                if not self.answers:
+                    question = {k: v for k, v in question.items() if k not in ('correct_answer', 'all_correct_answers')}
+                deck.write(json.dumps(question, ensure_ascii=False) + '\n')
+            elif self.fmt == 'csv':
+                writer.writerow([question['id'], question['question_type'], prompt(question),
+                                 ' | '.join(question['options']), answer_text(question) if self.answers else '',
+                                 question['verb'], question['tense'], question['pronoun']])
+            else:
+                front = prompt(question) + '<br>' + ' · '.join(question['options'])
+                back = answer_text(question) if self.answers else ''
+                tags = ' '.join(tag.replace(' ', '_') for tag in (question['question_type'], question['tense']))
+                deck.write('\t'.join(field.replace('\t', ' ').replace('\n', '<br>') for field in (front, back, tags)) + '\n')
+        return deck.getvalue(), key.getvalue()
+
+
+def chunk_plan(count, chunk_size=CHUNK_SIZE):
+    for chunk, start in enumerate(range(0, count, chunk_size)):
+        yield chunk, start, min(chunk_size, count - start)
+
+
+_worker_builder = None
+
+
+def _init_worker(builder):
+    global _worker_builder
+    _worker_builder = builder
+
+
+def _render_chunk(plan):
+    return _worker_builder.render(*plan)
+
+
+def render_deck(builder, count, workers=1, chunk_size=CHUNK_SIZE):
+    """Yield (deck text, answer key text) per chunk, in order"""
+    plans = chunk_plan(count, chunk_size)
+    if workers == 1:
+        for plan in plans:
+            yield builder.render(*plan)
+        return
+    with Pool(workers, initializer=_init_worker, initargs=(builder,)) as pool:
+        # A bounded window of chunks in flight, so memory does not grow with the deck
+        pending = deque()
+        for plan in plans:
+            pending.append(pool.apply_async(_render_chunk, (plan,)))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def build_registry(verbs, tenses, pronouns, tense_names, weights, types=None):
+    weights = dict(weights)
+    if types:
+        unknown = [name for name in types if name not in QUESTION_TYPE_CLASSES]
+        if unknown:
+            raise ValueError(f'Unknown question type: {", ".join(unknown)}')
+        weights = {name: weights.get(name, 1.0) if name in types else 0 for name in QUESTION_TYPE_CLASSES}
+    return QuestionRegistry(Lexicon(verbs, tenses, pronouns, tense_names), weights)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a worksheet or drill deck')
+    parser.add_argument('-n', '--count', type=int, default=100, help='Number of questions')
+    parser.add_argument('-o', '--output', help='Deck file (default: stdout)')
+    parser.add_argument('--format', choices=FORMATS, default='jsonl', help='Output format')
+    parser.add_argument('--answer-key', help='Write answers here (id,answer CSV) instead of into the deck')
+    parser.add_argument('--seed', help='Seed for a reproducible deck (default: random, printed)')
+    parser.add_argument('--tense', help='Comma-separated tenses to draw from')
+    parser.add_argument('--pronoun', help='Comma-separated pronouns to draw from')
+    parser.add_argument('--verb-type', choices=('regular', 'irregular'), help='Only regular or irregular verbs')
+    parser.add_argument('--types', help='Comma-separated question types (default: every generated type)')
+    parser.add_argument('--weights', default=os.environ.get('QUESTION_TYPE_WEIGHTS'),
+                        help='Question type weights, as in QUESTION_TYPE_WEIGHTS')
+    parser.add_argument('--no-repeat', action='store_true', help='Use each allowed cell once before any repeats')
+    parser.add_argument('--verbs', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'verbs.json'),
+                        help='Verb table in the verbs.json layout')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help='Worker processes (default: one per CPU)')
+    args = parser.parse_args(argv)
+
+    with open(args.verbs, 'r', encoding='utf-8') as f:
+        verbs = json.load(f)
+    seed = args.seed or secrets.token_hex(4)
+    try:
+        types = [name.strip() for name in args.types.split(',') if name.strip()] if args.types else None
+        registry = build_registry(verbs, TENSES, PRONOUNS, TENSE_NAMES, parse_weights(args.weights), types)
+        sampler = SessionSampler({verb: verb_data['type'] for verb, verb_data in verbs.items()},
+                                 TENSES, PRONOUNS, state=None)
+        space = sampler.parse({'tense': args.tense, 'pronoun': args.pronoun, 'verb_type': args.verb_type})
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    builder = DeckBuilder(registry, space or sampler.full, seed, args.format, answers=not args.answer_key,
+                          no_repeat=args.no_repeat)
+
+    output = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    key = open(args.answer_key, 'w', encoding='utf-8', newline='') if args.answer_key else None
+    started = time.monotonic()
+    try:
+        if args.format == 'csv':
+            csv.writer(output).writerow(CSV_COLUMNS)
+        elif args.format == 'tsv':
+            output.write(ANKI_HEADER)
+        if key is not None:
+            csv.writer(key).writerow(('id', 'answer'))
+        for deck_text, key_text in render_deck(builder, args.count, max(1, args.workers)):
+            output.write(deck_text)
+            if key is not None:
+                key.write(key_text)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if key is not None:
+            key.close()
+    print(f'Wrote {args.count} questions (seed {seed}) in {time.monotonic() - started:.2f}s', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
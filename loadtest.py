@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+"""
+Load generator: concurrent virtual learners against a running PractiVerbo server.
+
+Each virtual learner follows the flow in ``static/script.js``. It asks
+``/api/question`` for a question, thinks for a while, posts its answer to
+``/api/check`` and repeats this ``SESSION_LENGTH`` times per session. Then it
+starts a new session. Each learner keeps one keep-alive connection, like a
+browser tab.
+
+Concurrency ramps through stages (``--learners 10,50,200``). Learners from a
+stage keep running into the next stage, and each stage is measured on its
+own. The JSON report gives, per stage, the throughput, the p50/p95/p99
+latency and the error rate for each route. The tool only uses the standard
+library, so it runs offline on the same box as the server.
+
+Usage:
+    python asgi.py --port 10000 --workers 4 &
+    python loadtest.py http://127.0.0.1:10000 --learners 10,50,200 --stage-seconds 30 -o load.json
+"""
+import argparse
+import http.client
+import json
+import random
+import secrets
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Questions per session, as in static/script.js
+SESSION_LENGTH = 20
+ROUTES = ('/api/question', '/api/check')
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[min(len(sorted_values), int(rank)) - 1]
+
+
+def summarize(latencies, errors, seconds):
+    """Report entry for one route in one stage; latencies in seconds"""
+    latencies = sorted(latencies)
+    count = len(latencies) + errors
+
+    def ms(value):
+        return None if value is None else round(value * 1000, 2)
+
+    return {
+        'requests': count,
+        'errors': errors,
+        'error_rate': round(errors / count, 4) if count else 0.0,
+        'throughput': round(count / seconds, 2) if seconds else 0.0,
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p95_ms': ms(percentile(latencies, 95)),
+        'p99_ms': ms(percentile(latencies, 99)),
+        'max_ms': ms(latencies[-1] if latencies else None),
+    }
+
+
+class Recorder:
+    """Latencies and errors per stage and route, shared by every learner thread"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stage = None
+        self.stages = []
+
+    def start_stage(self, learners):
+        with self.lock:
+            self.stage = {'learners': learners, 'started': time.monotonic(), 'sessions': 0,
+                          'latencies': {route: [] for route in ROUTES},
+                          'errors': {route: 0 for route in ROUTES}, 'statuses': {}}
+            self.stages.append(self.stage)
+
+    def end_stage(self):
+        with self.lock:
+            self.stage['seconds'] = time.monotonic() - self.stage['started']
+
+    def record(self, route, latency, status):
+        with self.lock:
+            stage = self.stage
+            key = str(status)
+            stage['statuses'][key] = stage['statuses'].get(key, 0) + 1
+            if isinstance(status, int) and status < 400:
+                stage['latencies'][route].append(latency)
+            else:
+                stage['errors'][route] += 1
+
+    def session_done(self):
+        with self.lock:
+            self.stage['sessions'] += 1
+
+    def report(self):
+        stages = []
+        for stage in self.stages:
+            seconds = stage['seconds']
+            routes = {route: summarize(stage['latencies'][route], stage['errors'][route], seconds)
+                      for route in ROUTES}
+            total = sum(route['requests'] for route in routes.values())
+            errors = sum(route['errors'] for route in routes.values())
+            stages.append({
+                'learners': stage['learners'],
+                'seconds': round(seconds, 2),
+                'sessions_completed': stage['sessions'],
+                'requests': total,
+                'throughput': round(total / seconds, 2) if seconds else 0.0,
+                'error_rate': round(errors / total, 4) if total else 0.0,
+                'statuses': stage['statuses'],
+                'routes': routes,
+            })
+        return {'stages': stages}
+
+
+class VirtualLearner(threading.Thread):
+    """One learner running back-to-back sessions over a keep-alive connection"""
+
+    def __init__(self, url, recorder, stop, think=2.0, accuracy=0.7, session_length=SESSION_LENGTH,
+                 timeout=30, seed=None):
+        super().__init__(daemon=True)
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.recorder = recorder
+        self.stop = stop
+        self.think = think
+        self.accuracy = accuracy
+        self.session_length = session_length
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.learner = secrets.token_hex(8)
+        self.conn = None
+
+    def request(self, method, path, body=None):
+        """Send one request; returns (status or error name, parsed JSON or None)"""
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        started = time.perf_counter()
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException) as e:
+            self.recorder.record(path.split('?')[0], time.perf_counter() - started, type(e).__name__)
+            self.conn.close()
+            self.conn = None
+            return type(e).__name__, None
+        self.recorder.record(path.split('?')[0], time.perf_counter() - started, status)
+        if status >= 400:
+            return status, None
+        try:
+            return status, json.loads(data)
+        except ValueError:
+            return status, None
+
+    def answer_for(self, question):
+        """Pick an option the way a learner with the configured accuracy would"""
+        correct = question.get('correct_answer')
+        wrong = [option for option in question.get('options', []) if option != correct]
+        if wrong and self.rng.random() >= self.accuracy:
+            return self.rng.choice(wrong)
+        return correct
+
+    def think_time(self):
+        return self.rng.expovariate(1 / self.think) if self.think > 0 else 0
+
+    def run(self):
+        try:
+            while not self.stop.is_set():
+                session = secrets.token_hex(8)
+                for _ in range(self.session_length):
+                    _, question = self.request('GET', f'/api/question?learner={self.learner}&session={session}')
+                    if self.stop.wait(self.think_time()):
+                        return
+                    if question is None:
+                        continue
+                    # The same payload script.js sends
+                    payload = {
+                        'answer': self.answer_for(question),
+                        'correct_answer': question.get('correct_answer'),
+                        'tense': question.get('tense'),
+                        'verb': question.get('verb'),
+                        'pronoun': question.get('pronoun'),
+                        'question_type': question.get('question_type'),
+                        'all_correct_answers': question.get('all_correct_answers') or [],
+                        'learner': self.learner,
+                    }
+                    self.request('POST', '/api/check', json.dumps(payload))
+                    if self.stop.is_set():
+                        return
+                self.recorder.session_done()
+        finally:
+            if self.conn is not None:
+                self.conn.close()
+
+
+def run_load(url, stages, stage_seconds, think=2.0, accuracy=0.7, session_length=SESSION_LENGTH, seed=None):
+    """Ramp through the learner counts in `stages`; returns the report dict"""
+    recorder = Recorder()
+    stop = threading.Event()
+    learners = []
+    rng = random.Random(seed)
+    try:
+        for count in stages:
+            recorder.start_stage(count)
+            while len(learners) < count:
+                learner = VirtualLearner(url, recorder, stop, think, accuracy, session_length,
+                                         seed=rng.random())
+                learner.start()
+                learners.append(learner)
+            time.sleep(stage_seconds)
+            recorder.end_stage()
+    finally:
+        stop.set()
+        for learner in learners:
+            learner.join(5)
+    report = recorder.report()
+    report['config'] = {'url': url, 'stage_seconds': stage_seconds, 'think_seconds': think,
+                        'accuracy': accuracy, 'session_length': session_length}
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Simulate concurrent learners against a local server')
+    parser.add_argument('url', nargs='?', default='http://127.0.0.1:10000', help='Server base URL')
+    parser.add_argument('--learners', default='10,50,100', help='Comma-separated concurrency stages')
+    parser.add_argument('--stage-seconds', type=float, default=30, help='Measured time per stage')
+    parser.add_argument('--think', type=float, default=2.0, help='Mean think time between question and answer')
+    parser.add_argument('--accuracy', type=float, default=0.7, help='Share of answers that are correct')
+    parser.add_argument('--session-length', type=int, default=SESSION_LENGTH, help='Questions per session')
+    parser.add_argument('--seed', type=int, help='Seed for reproducible learner behaviour')
+    parser.add_argument('-o', '--output', help='Write the JSON report here instead of stdout')
+    args = parser.parse_args(argv)
+
+    stages = [int(n) for n in args.learners.split(',') if n.strip()]
+    report = run_load(args.url, stages, args.stage_seconds, args.think, args.accuracy,
+                      args.session_length, args.seed)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        for stage in report['stages']:
+            print(f"{stage['learners']:>5} learners: {stage['throughput']} req/s, "
+                  f"error rate {stage['error_rate']}, "
+                  f"check p95 {stage['routes']['/api/check']['p95_ms']} ms", file=sys.stderr)
+    else:
+        print(text)
+    return 1 if any(stage['error_rate'] for stage in report['stages']) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
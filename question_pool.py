@@ -0,0 +1,139 @@
+"""
+Background-refilled pool of ready-to-send questions for PractiVerbo.
+
+Each question type has its own deque of (encoded body, question) pairs. A
+background thread keeps every deque topped up to a watermark, so serving a
+question is a type pick and a ``popleft``. The type is picked by ``choose``,
+so configured type weights apply to pooled questions too. If a deque runs dry the request
+builds its question inline, which is counted as a miss.
+
+The refill thread starts on first use rather than at import, so it is
+created in each gunicorn worker after the fork.
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+
+
+class QuestionPool:
+    """Pre-built, pre-serialized questions per question type"""
+
+    def __init__(self, build, serialize, question_types, watermark=64, refill_rate=0,
+                 idle_interval=0.05, choose=None):
+        self.build = build
+        self.serialize = serialize
+        self.question_types = list(question_types)
+        self.choose = choose or (lambda: random.choice(self.question_types))
+        self.watermark = watermark
+        self.refill_rate = refill_rate
+        self.idle_interval = idle_interval
+        self.pools = {question_type: deque() for question_type in self.question_types}
+        self.hits = 0
+        self.misses = 0
+        self.refilled = 0
+        self.build_errors = 0
+        self.generation = 0
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, build, serialize, question_types, environ=None, choose=None):
+        """Create a pool from QUESTION_POOL_* variables, or None if the size is 0"""
+        environ = os.environ if environ is None else environ
+        watermark = int(environ.get('QUESTION_POOL_SIZE', 64))
+        if watermark <= 0:
+            return None
+        return cls(build, serialize, question_types, watermark=watermark,
+                   refill_rate=float(environ.get('QUESTION_POOL_REFILL_RATE', 0)), choose=choose)
+
+    def get(self, question_type=None):
+        """An (encoded body, question) pair, from the pool if possible"""
+        self._ensure_started()
+        if question_type is None:
+            question_type = self.choose()
+        try:
+            entry = self.pools[question_type].popleft()
+        except (IndexError, KeyError):
+            self.misses += 1
+            question = self.build(question_type)
+            entry = (self.serialize(question), question)
+        else:
+            self.hits += 1
+        self._wake.set()
+        return entry
+
+    def refill(self, limit=None):
+        """Top every type up to the watermark, building at most `limit` questions"""
+        generation = self.generation
+        made = 0
+        while limit is None or made < limit:
+            short = [t for t in self.question_types if len(self.pools[t]) < self.watermark]
+            if not short:
+                break
+            for question_type in short:
+                try:
+                    question = self.build(question_type)
+                    entry = (self.serialize(question), question)
+                except Exception:
+                    self.build_errors += 1
+                    return made
+                # A clear() while building means the question may use stale data
+                if generation != self.generation:
+                    return made
+                self.pools[question_type].append(entry)
+                made += 1
+                self.refilled += 1
+                if limit is not None and made >= limit:
+                    break
+        return made
+
+    def clear(self):
+        """Drop every pooled question, e.g. after the verb data changes"""
+        self.generation += 1
+        for pool in self.pools.values():
+            pool.clear()
+        self._wake.set()
+
+    def stats(self):
+        """Counters for the metrics endpoint"""
+        return {
+            'watermark': self.watermark,
+            'refill_rate': self.refill_rate,
+            'sizes': {question_type: len(pool) for question_type, pool in self.pools.items()},
+            'hits': self.hits,
+            'misses': self.misses,
+            'refilled': self.refilled,
+            'build_errors': self.build_errors,
+        }
+
+    def close(self):
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='question-pool-refill', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            if self.refill_rate:
+                # Build in small batches and sleep them off to hold the configured rate
+                batch = max(1, int(self.refill_rate * self.idle_interval))
+                made = self.refill(limit=batch)
+                if made:
+                    self._stopping.wait(made / self.refill_rate)
+                    continue
+            elif self.refill():
+                continue
+            self._wake.wait(self.idle_interval)
+            self._wake.clear()
@@ -0,0 +1,293 @@
+"""
+Question types for PractiVerbo.
+
+Each question type is a small ``__slots__`` class with ``generate`` and
+``grade``. The types share one ``Lexicon``: the verb data, unpacked once
+into the lists and lookup tables the generators need. A request only does
+the sampling, not that per-verb setup.
+
+New types register themselves with ``@register``. They can live in plugin
+modules listed in ``QUESTION_TYPE_PLUGINS``. ``QuestionRegistry`` picks a
+type by weight, so adding one does not slow down the others.
+"""
+import bisect
+import importlib
+import itertools
+
+QUESTION_TYPE_CLASSES = {}
+
+
+def register(cls):
+    """Class decorator adding a question type to the registry"""
+    QUESTION_TYPE_CLASSES[cls.name] = cls
+    return cls
+
+
+def load_plugins(modules):
+    """Import plugin modules so their @register calls run"""
+    for module in modules:
+        importlib.import_module(module)
+
+
+class Lexicon:
+    """Verb data unpacked once for question generation"""
+
+    __slots__ = ('verbs', 'verb_names', 'tenses', 'pronouns', 'tense_names', 'other_tense_names',
+                 'unique_forms', 'hints')
+
+    def __init__(self, verbs, tenses, pronouns, tense_names, hints=None):
+        self.verbs = verbs
+        self.verb_names = list(verbs)
+        self.tenses = list(tenses)
+        self.pronouns = list(pronouns)
+        self.tense_names = tense_names
+        all_names = list(tense_names.values())
+        # Wrong options for identify-tense, per correct tense
+        self.other_tense_names = {tense: [name for name in all_names if name != tense_names[tense]]
+                                  for tense in self.tenses}
+        # Distinct forms of each verb across every tense, for conjugation distractors.
+        # A lazily loaded lexicon (verb_store.VerbStore) gets them per verb instead.
+        self.unique_forms = {}
+        if isinstance(verbs, dict):
+            self.unique_forms = {verb: self._distinct_forms(verb_data) for verb, verb_data in verbs.items()}
+        self.hints = hints or {}
+
+    def _distinct_forms(self, verb_data):
+        return list(dict.fromkeys(verb_data[tense][pronoun] for tense in self.tenses for pronoun in self.pronouns))
+
+    def distinct_forms(self, verb):
+        forms = self.unique_forms.get(verb)
+        if forms is None:
+            forms = self._distinct_forms(self.verbs[verb])
+        return forms
+
+    def random_cell(self, rng):
+        return rng.choice(self.verb_names), rng.choice(self.tenses), rng.choice(self.pronouns)
+
+
+class QuestionType:
+    """Base class: a question type bound to a lexicon"""
+
+    __slots__ = ('lexicon',)
+    name = None
+    # Payload fields hint() reads; answers agreeing on them share one hint
+    hint_fields = ('verb', 'tense', 'pronoun')
+
+    def __init__(self, lexicon):
+        self.lexicon = lexicon
+
+    def generate(self, rng, cell=None):
+        """Build a question dict for `cell` = (verb, tense, pronoun), or a random cell"""
+        raise NotImplementedError
+
+    def grade(self, data):
+        """Whether the answer in an /api/check payload is correct"""
+        return data.get('answer', '').strip().lower() == data.get('correct_answer', '').strip().lower()
+
+    def hint(self, data):
+        """A hint for a wrong answer, or None"""
+        return None
+
+
+@register
+class IdentifyTenseQuestion(QuestionType):
+    """Show a conjugated form; ask for its tense"""
+
+    __slots__ = ()
+    name = 'identify-tense'
+
+    def generate(self, rng, cell=None):
+        lexicon = self.lexicon
+        verb, tense, pronoun = cell or lexicon.random_cell(rng)
+        verb_data = lexicon.verbs[verb]
+        correct_tense_name = lexicon.tense_names[tense]
+        wrong_tenses = lexicon.other_tense_names[tense]
+        if len(wrong_tenses) > 3:
+            wrong_tenses = rng.sample(wrong_tenses, 3)
+        options = [correct_tense_name] + wrong_tenses
+        rng.shuffle(options)
+        return {
+            'question_type': self.name,
+            'verb': verb,
+            'english': verb_data['english'],
+            'pronoun': pronoun,
+            'conjugated_form': verb_data[tense][pronoun],
+            'tense': tense,
+            'options': list(dict.fromkeys(options)),
+            'correct_answer': correct_tense_name
+        }
+
+    def hint(self, data):
+        hint = self.lexicon.hints.get('tense_id', {}).get(data.get('tense', ''))
+        return f'💡 {hint}' if hint else None
+
+
+@register
+class IdentifyPronounQuestion(QuestionType):
+    """Show a conjugated form; ask for its pronoun (any pronoun sharing the form counts)"""
+
+    __slots__ = ()
+    name = 'identify-pronoun'
+    hint_fields = ('pronoun', 'all_correct_answers')
+
+    def generate(self, rng, cell=None):
+        lexicon = self.lexicon
+        verb, tense, pronoun = cell or lexicon.random_cell(rng)
+        verb_data = lexicon.verbs[verb]
+        forms = verb_data[tense]
+        correct_answer = forms[pronoun]
+        matching = [p for p in lexicon.pronouns if forms[p] == correct_answer]
+        wrong = [p for p in lexicon.pronouns if forms[p] != correct_answer]
+        options = [pronoun] + rng.sample(wrong, min(3, len(wrong)))
+        # If there are other matching pronouns and room in options, include them
+        other_matching = [p for p in matching if p != pronoun]
+        if other_matching and len(options) < 4:
+            options.extend(other_matching[:4 - len(options)])
+        rng.shuffle(options)
+        return {
+            'question_type': self.name,
+            'verb': verb,
+            'english': verb_data['english'],
+            'tense': tense,
+            'tense_name': lexicon.tense_names[tense],
+            'conjugated_form': correct_answer,
+            'pronoun': pronoun,
+            'options': list(dict.fromkeys(options))[:4],
+            'correct_answer': pronoun,
+            'all_correct_answers': matching
+        }
+
+    def grade(self, data):
+        all_correct_answers = data.get('all_correct_answers', [])
+        if not all_correct_answers:
+            return super().grade(data)
+        return data.get('answer', '').strip().lower() in [a.strip().lower() for a in all_correct_answers]
+
+    def hint(self, data):
+        hint = self.lexicon.hints.get('pronoun', {}).get(data.get('pronoun', ''))
+        if not hint:
+            return None
+        all_correct_answers = data.get('all_correct_answers', [])
+        if all_correct_answers and len(all_correct_answers) > 1:
+            hint += f" Note: In this tense, these pronouns share the same form: {', '.join(all_correct_answers)}"
+        return f'💡 {hint}'
+
+
+@register
+class IdentifyInfinitiveQuestion(QuestionType):
+    """Show a conjugated form; ask which verb it comes from"""
+
+    __slots__ = ()
+    name = 'identify-infinitive'
+
+    ENDING_HINTS = {
+        'ar': '💡 This is an -ar verb. Think about common -ar verbs like hablar, llamar, or estar.',
+        'er': '💡 This is an -er verb. Think about common -er verbs like comer, tener, or hacer.',
+        'ir': '💡 This is an -ir verb. Think about common -ir verbs like vivir, ir, or venir.',
+    }
+
+    def generate(self, rng, cell=None):
+        lexicon = self.lexicon
+        verb, tense, pronoun = cell or lexicon.random_cell(rng)
+        verb_data = lexicon.verbs[verb]
+        # Sample four and drop the answer if drawn, rather than copying the whole verb list
+        names = lexicon.verb_names
+        wrong = [v for v in rng.sample(names, min(4, len(names))) if v != verb][:3]
+        options = [verb] + wrong
+        rng.shuffle(options)
+        return {
+            'question_type': self.name,
+            'verb': verb,
+            'english': verb_data['english'],
+            'tense': tense,
+            'tense_name': lexicon.tense_names[tense],
+            'pronoun': pronoun,
+            'conjugated_form': verb_data[tense][pronoun],
+            'options': list(dict.fromkeys(options)),
+            'correct_answer': verb
+        }
+
+    def hint(self, data):
+        return self.ENDING_HINTS.get(data.get('verb', '')[-2:])
+
+
+@register
+class ConjugationQuestion(QuestionType):
+    """Show a verb, tense and pronoun; ask for the conjugated form"""
+
+    __slots__ = ()
+    name = 'conjugation'
+
+    def generate(self, rng, cell=None):
+        lexicon = self.lexicon
+        verb, tense, pronoun = cell or lexicon.random_cell(rng)
+        verb_data = lexicon.verbs[verb]
+        correct_answer = verb_data[tense][pronoun]
+        forms = lexicon.distinct_forms(verb)
+        wrong = [f for f in rng.sample(forms, min(4, len(forms))) if f != correct_answer][:3]
+        options = [correct_answer] + wrong
+        rng.shuffle(options)
+        return {
+            'question_type': self.name,
+            'verb': verb,
+            'english': verb_data['english'],
+            'pronoun': pronoun,
+            'tense': tense,
+            'tense_english': lexicon.tense_names[tense],
+            'options': list(dict.fromkeys(options)),
+            'correct_answer': correct_answer
+        }
+
+    def hint(self, data):
+        verb, tense, pronoun = data.get('verb', ''), data.get('tense', ''), data.get('pronoun', '')
+        if not (verb and tense and pronoun):
+            return None
+        hints = self.lexicon.hints
+        verb_data = self.lexicon.verbs.get(verb, {})
+        if verb_data.get('type') == 'regular' and tense in hints.get('conjugation', {}):
+            verb_ending = '-' + verb[-2:] if verb[-2:] in ('ar', 'er', 'ir') else None
+            ending = hints['conjugation'][tense].get(verb_ending, {}).get(pronoun, '')
+            if not ending:
+                return None
+            tense_name = self.lexicon.tense_names[tense]
+            if tense in ('futuro', 'condicional'):
+                return f"💡 Hint: For regular {verb_ending} verbs in {tense_name}, add '{ending}' to the infinitive: {verb} + {ending}"
+            return f"💡 Hint: For regular {verb_ending} verbs in {tense_name}, use stem '{verb[:-2]}' + '{ending}'"
+        if verb_data.get('type') == 'irregular' and verb in hints.get('irregular', {}):
+            return f"💡 {hints['irregular'][verb]}"
+        return None
+
+
+class QuestionRegistry:
+    """Every registered question type, and the weights of the ones that are generated"""
+
+    __slots__ = ('lexicon', 'types', 'names', 'cum_weights', 'total')
+
+    def __init__(self, lexicon, weights=None):
+        weights = weights or {}
+        self.lexicon = lexicon
+        # Types weighted 0 are never generated but can still grade answers
+        self.types = {name: cls(lexicon) for name, cls in QUESTION_TYPE_CLASSES.items()}
+        self.names = [name for name in self.types if weights.get(name, 1.0) > 0]
+        if not self.names:
+            raise ValueError('Every question type has weight 0')
+        self.cum_weights = list(itertools.accumulate(weights.get(name, 1.0) for name in self.names))
+        self.total = self.cum_weights[-1]
+
+    def choose(self, rng):
+        """Pick a question type name by weight"""
+        index = bisect.bisect_right(self.cum_weights, rng.random() * self.total)
+        return self.names[min(index, len(self.names) - 1)]
+
+    def get(self, name):
+        return self.types.get(name)
+
+
+def parse_weights(text):
+    """Parse 'conjugation=2,identify-tense=0.5' into a dict"""
+    weights = {}
+    for item in (text or '').split(','):
+        if '=' in item:
+            name, value = item.split('=', 1)
+            weights[name.strip()] = float(value)
+    return weights
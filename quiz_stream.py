@@ -0,0 +1,227 @@
+"""
+Server-sent-events quiz streams for PractiVerbo.
+
+A learner opens one long-lived ``text/event-stream`` connection. Each answer
+is posted to the stream, and the grading result plus the next question are
+pushed back as a single ``result`` event. Streams can optionally run a
+server-paced timed round that ends with a ``round-end`` event.
+
+A stream's question, counters and outbox live in the shared state backend,
+so an answer can be posted to any worker, not just the one holding the
+connection. Deadlines are wall-clock times for the same reason.
+
+An async stream sleeps between outbox checks. A result pushed on the worker
+that holds the connection wakes it at once; results from other workers are
+found by polling, which backs off while the stream is idle.
+"""
+import asyncio
+import json
+import secrets
+import threading
+import time
+
+KEEPALIVE_SECONDS = 15
+# How often an async stream checks its outbox; it waits on the event loop, not a thread,
+# and only the state-backend calls themselves go to the thread pool. The interval
+# doubles each idle check up to MAX_POLL_INTERVAL, and a message resets it.
+POLL_INTERVAL = 0.25
+MAX_POLL_INTERVAL = 2.0
+# Idle streams are forgotten after this long, even if no worker closed them
+STREAM_TTL = 3600
+
+
+async def in_thread(func, *args):
+    """Run a blocking state-backend call in the event loop's default thread pool"""
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+def format_event(event, data):
+    """Encode one SSE message"""
+    return f'event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+
+class QuizStream:
+    """One learner's quiz stream, as seen from any worker"""
+
+    def __init__(self, backend, stream_id, round_seconds=None, started=None, streams=None):
+        self.backend = backend
+        self.streams = streams
+        self.id = stream_id
+        self.round_seconds = round_seconds
+        self.started = time.time() if started is None else started
+        self.deadline = self.started + round_seconds if round_seconds else None
+        self.closed = False
+        self.key = f'quiz:{stream_id}'
+
+    def expired(self, now=None):
+        now = time.time() if now is None else now
+        return self.deadline is not None and now >= self.deadline
+
+    @property
+    def question(self):
+        return self.backend.get_json(self.key + ':question')
+
+    @question.setter
+    def question(self, question):
+        self.backend.set_json(self.key + ':question', question, ttl=STREAM_TTL)
+
+    def record(self, correct):
+        """Count one graded answer"""
+        self.backend.incr(self.key + ':answered')
+        if correct:
+            self.backend.incr(self.key + ':correct')
+
+    def stats(self):
+        return {'answered': int(self.backend.get(self.key + ':answered') or 0),
+                'correct': int(self.backend.get(self.key + ':correct') or 0)}
+
+    def push(self, event, data):
+        self.backend.push(self.key + ':outbox', format_event(event, data))
+        if self.streams is not None:
+            self.streams.notify(self.id)
+
+    def touch(self):
+        """Keep an open stream's keys from expiring"""
+        for suffix in ('', ':question', ':answered', ':correct', ':outbox'):
+            self.backend.expire(self.key + suffix, STREAM_TTL)
+
+    def events(self, first_question):
+        """Generator of SSE messages for the response body"""
+        self.question = first_question
+        yield format_event('ready', {
+            'stream_id': self.id,
+            'round_seconds': self.round_seconds,
+            'question': first_question
+        })
+        try:
+            while not self.closed:
+                timeout = KEEPALIVE_SECONDS
+                if self.deadline is not None:
+                    timeout = max(0, min(timeout, self.deadline - time.time()))
+                message = self.backend.pop(self.key + ':outbox', timeout=timeout)
+                if message is not None:
+                    yield message
+                    continue
+                if self.expired():
+                    self.closed = True
+                    summary = self.stats()
+                    summary['seconds'] = self.round_seconds
+                    yield format_event('round-end', summary)
+                    break
+                self.touch()
+                # Comment line keeps proxies from timing the connection out
+                yield ': keepalive\n\n'
+        finally:
+            self.closed = True
+
+    async def async_events(self, first_question, poll_interval=POLL_INTERVAL, run=in_thread,
+                           max_poll_interval=MAX_POLL_INTERVAL):
+        """Async twin of events() for the ASGI server: polls the outbox between sleeps
+
+        Every state-backend call goes through `run`, which keeps the blocking
+        SQLite or Redis I/O off the event loop. A push on this worker ends
+        the sleep early; otherwise the sleeps grow while nothing arrives.
+        """
+        wakeup = self.streams.register(self.id) if self.streams is not None else None
+        await run(setattr, self, 'question', first_question)
+        yield format_event('ready', {
+            'stream_id': self.id,
+            'round_seconds': self.round_seconds,
+            'question': first_question
+        })
+        next_keepalive = time.monotonic() + KEEPALIVE_SECONDS
+        interval = poll_interval
+        try:
+            while not self.closed:
+                if wakeup is not None:
+                    # Cleared before the check, so a push during it still ends the sleep
+                    wakeup.clear()
+                message = await run(self.backend.pop, self.key + ':outbox')
+                if message is not None:
+                    interval = poll_interval
+                    yield message
+                    continue
+                if self.expired():
+                    self.closed = True
+                    summary = await run(self.stats)
+                    summary['seconds'] = self.round_seconds
+                    yield format_event('round-end', summary)
+                    break
+                if time.monotonic() >= next_keepalive:
+                    next_keepalive = time.monotonic() + KEEPALIVE_SECONDS
+                    await run(self.touch)
+                    yield ': keepalive\n\n'
+                delay = interval
+                if self.deadline is not None:
+                    delay = max(0, min(delay, self.deadline - time.time()))
+                if wakeup is None:
+                    await asyncio.sleep(delay)
+                else:
+                    try:
+                        await asyncio.wait_for(wakeup.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                interval = min(interval * 2, max_poll_interval)
+        finally:
+            self.closed = True
+            if wakeup is not None:
+                self.streams.unregister(self.id, wakeup)
+
+
+class QuizStreams:
+    """Registry of streams in the state backend; also counts this worker's open connections"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.open_here = set()
+        # stream id -> (event loop, asyncio.Event) for async streams held here
+        self._wakeups = {}
+        self._wakeups_lock = threading.Lock()
+
+    def open(self, round_seconds=None):
+        stream = QuizStream(self.backend, secrets.token_urlsafe(12), round_seconds, streams=self)
+        for suffix in (':answered', ':correct'):
+            self.backend.set(stream.key + suffix, 0, ttl=STREAM_TTL)
+        self.backend.set_json(stream.key, {'round_seconds': round_seconds, 'started': stream.started},
+                              ttl=STREAM_TTL)
+        self.open_here.add(stream.id)
+        return stream
+
+    def get(self, stream_id):
+        meta = self.backend.get_json(f'quiz:{stream_id}')
+        if meta is None:
+            return None
+        return QuizStream(self.backend, stream_id, meta['round_seconds'], meta['started'], streams=self)
+
+    def register(self, stream_id):
+        """An asyncio.Event, set whenever a message is pushed to the stream on this worker"""
+        event = asyncio.Event()
+        with self._wakeups_lock:
+            self._wakeups[stream_id] = (asyncio.get_running_loop(), event)
+        return event
+
+    def unregister(self, stream_id, event):
+        with self._wakeups_lock:
+            if self._wakeups.get(stream_id, (None, None))[1] is event:
+                del self._wakeups[stream_id]
+
+    def notify(self, stream_id):
+        """Wake the async stream held here, if any; safe from any thread"""
+        with self._wakeups_lock:
+            entry = self._wakeups.get(stream_id)
+        if entry is None:
+            return
+        loop, event = entry
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            # The loop has closed; the stream is going away
+            pass
+
+    def close(self, stream_id):
+        self.open_here.discard(stream_id)
+        for suffix in ('', ':question', ':answered', ':correct', ':outbox'):
+            self.backend.delete(f'quiz:{stream_id}{suffix}')
+
+    def __len__(self):
+        return len(self.open_here)
@@ -0,0 +1,165 @@
+"""
+Admission control and load shedding for the PractiVerbo API.
+
+``AdmissionController`` combines a concurrency cap with a global token bucket
+and per-client token buckets. Requests over a limit are rejected straight
+away with a status code and a Retry-After value, so overload turns into fast
+429/503 responses instead of a growing queue. All state lives in process
+memory; each bucket holds its own small lock so clients never contend with
+each other.
+"""
+import math
+import os
+import threading
+import time
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `rate` tokens per second"""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated', 'lock')
+
+    def __init__(self, rate, burst, now=None):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic() if now is None else now
+        self.lock = threading.Lock()
+
+    def take(self, now=None, cost=1):
+        """Take `cost` tokens, at most a burst. Returns 0 on success, or seconds until they are available."""
+        now = time.monotonic() if now is None else now
+        cost = min(cost, self.burst)
+        with self.lock:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= cost:
+                self.tokens -= cost
+                return 0
+            return (cost - self.tokens) / self.rate
+
+    def refund(self, cost=1):
+        """Give back tokens taken for a request that was rejected elsewhere"""
+        with self.lock:
+            self.tokens = min(self.burst, self.tokens + min(cost, self.burst))
+
+
+class AdmissionController:
+    """Concurrency cap plus global and per-client token buckets"""
+
+    def __init__(self, client_rate=0, client_burst=0, global_rate=0, global_burst=0,
+                 max_in_flight=0, max_clients=10000):
+        self.client_rate = client_rate
+        self.client_burst = max(1.0, client_burst or client_rate)
+        self.max_in_flight = max_in_flight
+        self.max_clients = max_clients
+        self.global_bucket = None
+        if global_rate:
+            self.global_bucket = TokenBucket(global_rate, max(1.0, global_burst or global_rate))
+        self.clients = {}
+        self.in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self.counters = {
+            'admitted': 0,
+            'rejected_concurrency': 0,
+            'rejected_global': 0,
+            'rejected_client': 0,
+        }
+
+    @classmethod
+    def from_env(cls, environ=None):
+        """Build a controller from RATE_LIMIT_* variables; unset limits are disabled"""
+        environ = os.environ if environ is None else environ
+        return cls(
+            client_rate=float(environ.get('RATE_LIMIT_CLIENT_RATE', 0)),
+            client_burst=float(environ.get('RATE_LIMIT_CLIENT_BURST', 0)),
+            global_rate=float(environ.get('RATE_LIMIT_GLOBAL_RATE', 0)),
+            global_burst=float(environ.get('RATE_LIMIT_GLOBAL_BURST', 0)),
+            max_in_flight=int(environ.get('RATE_LIMIT_MAX_IN_FLIGHT', 0)),
+        )
+
+    def admit(self, client):
+        """
+        Try to admit a request from `client`.
+
+        Returns None when admitted (the caller must call `release()` when the
+        request finishes), otherwise a (status, retry_after_seconds) tuple.
+        """
+        with self._in_flight_lock:
+            if self.max_in_flight and self.in_flight >= self.max_in_flight:
+                self.counters['rejected_concurrency'] += 1
+                return 503, 1
+            self.in_flight += 1
+
+        rejection = self._take(client, 1)
+        if rejection is not None:
+            self.release()
+            return rejection
+
+        self.counters['admitted'] += 1
+        return None
+
+    def charge(self, client, cost):
+        """
+        Charge an admitted request for `cost` more requests' worth of tokens,
+        e.g. the extra answers in a batch. Returns None or (status, retry_after).
+        """
+        if cost <= 0:
+            return None
+        return self._take(client, cost)
+
+    def _take(self, client, cost):
+        # The client's own bucket goes first: a throttled client must not
+        # spend global capacity that well-behaved clients need
+        now = time.monotonic()
+        bucket = None
+        if self.client_rate:
+            bucket = self.clients.get(client)
+            if bucket is None:
+                if len(self.clients) >= self.max_clients:
+                    self._evict_idle(now)
+                bucket = self.clients.setdefault(client, TokenBucket(self.client_rate, self.client_burst, now))
+            wait = bucket.take(now, cost)
+            if wait:
+                self.counters['rejected_client'] += 1
+                return 429, wait
+        if self.global_bucket is not None:
+            wait = self.global_bucket.take(now, cost)
+            if wait:
+                # Shed by the server, not the client: keep the client's tokens
+                if bucket is not None:
+                    bucket.refund(cost)
+                self.counters['rejected_global'] += 1
+                return 503, wait
+        return None
+
+    def release(self):
+        """Mark an admitted request as finished"""
+        with self._in_flight_lock:
+            self.in_flight -= 1
+
+    def _evict_idle(self, now):
+        # Buckets that have been idle long enough to refill completely carry
+        # no state worth keeping
+        full_after = self.client_burst / self.client_rate
+        for client, bucket in list(self.clients.items()):
+            if now - bucket.updated >= full_after:
+                self.clients.pop(client, None)
+        # Still full of active clients: forget the oldest one
+        while len(self.clients) >= self.max_clients:
+            try:
+                self.clients.pop(next(iter(self.clients)), None)
+            except (StopIteration, RuntimeError):
+                break
+
+    def stats(self):
+        """Counters for the metrics endpoint"""
+        stats = dict(self.counters)
+        stats['in_flight'] = self.in_flight
+        stats['tracked_clients'] = len(self.clients)
+        return stats
+
+
+def retry_after_header(seconds):
+    """Format a Retry-After value (whole seconds, at least 1)"""
+    return str(max(1, math.ceil(seconds)))
@@ -0,0 +1,104 @@
+"""
+Pre-serialized conjugation reference tables.
+
+Every ``/api/verb/<infinitive>`` body and the ``/api/verbs`` index are encoded
+once when the verb data is loaded, each with a strong ETag derived from its
+bytes. Serving a lookup is then a dict access plus an ETag comparison, and
+the cache only changes when the verb data does.
+"""
+import hashlib
+import json
+from collections import OrderedDict
+from threading import Lock
+
+
+class CachedPayload:
+    """Encoded JSON body with a strong ETag"""
+
+    __slots__ = ('body', 'etag')
+
+    def __init__(self, data):
+        self.body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:16] + '"'
+
+
+def verb_table(infinitive, verb_data, tenses, pronouns, tense_names, hint=None):
+    """The full tense-by-pronoun table for one verb"""
+    return {
+        'infinitive': infinitive,
+        'english': verb_data['english'],
+        'type': verb_data['type'],
+        'hint': hint,
+        'pronouns': pronouns,
+        'tenses': [
+            {
+                'tense': tense,
+                'name': tense_names[tense],
+                'forms': [verb_data[tense][pronoun] for pronoun in pronouns]
+            }
+            for tense in tenses
+        ]
+    }
+
+
+class ReferenceCache:
+    """All reference payloads for one version of the verb data"""
+
+    def __init__(self, verbs, tenses, pronouns, tense_names, irregular_hints):
+        self.tables = {
+            infinitive: CachedPayload(verb_table(infinitive, verb_data, tenses, pronouns,
+                                                 tense_names, irregular_hints.get(infinitive)))
+            for infinitive, verb_data in verbs.items()
+        }
+        self.index = CachedPayload({
+            'verbs': [
+                {
+                    'infinitive': infinitive,
+                    'english': verb_data['english'],
+                    'type': verb_data['type']
+                }
+                for infinitive, verb_data in sorted(verbs.items())
+            ],
+            'tenses': [{'tense': tense, 'name': tense_names[tense]} for tense in tenses],
+            'pronouns': pronouns
+        })
+
+    def table(self, infinitive):
+        return self.tables.get(infinitive.strip().lower())
+
+
+class LazyReferenceCache:
+    """Reference payloads for a VerbStore: the index up front, tables on demand in an LRU"""
+
+    def __init__(self, store, tenses, pronouns, tense_names, irregular_hints, cache_size=256):
+        self.store = store
+        self.tenses = tenses
+        self.pronouns = pronouns
+        self.tense_names = tense_names
+        self.irregular_hints = irregular_hints
+        self.cache_size = cache_size
+        self.tables = OrderedDict()
+        self.lock = Lock()
+        self.index = CachedPayload({
+            'verbs': [{'infinitive': infinitive, 'english': english, 'type': verb_type}
+                      for infinitive, english, verb_type in store.summaries()],
+            'tenses': [{'tense': tense, 'name': tense_names[tense]} for tense in tenses],
+            'pronouns': pronouns
+        })
+
+    def table(self, infinitive):
+        infinitive = infinitive.strip().lower()
+        with self.lock:
+            payload = self.tables.get(infinitive)
+            if payload is not None:
+                self.tables.move_to_end(infinitive)
+                return payload
+        if infinitive not in self.store:
+            return None
+        payload = CachedPayload(verb_table(infinitive, self.store[infinitive], self.tenses, self.pronouns,
+                                           self.tense_names, self.irregular_hints.get(infinitive)))
+        with self.lock:
+            self.tables[infinitive] = payload
+            if len(self.tables) > self.cache_size:
+                self.tables.popitem(last=False)
+        return payload
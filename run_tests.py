@@ -3,9 +3,13 @@
 Test runner script for Spanish Verb Conjugation App
 Runs all tests and provides a summary
 """
+import os
 import unittest
 import sys
 
+# Keep the tests off the app's real state file
+os.environ.setdefault('STATE_BACKEND', 'memory://')
+
 def run_tests():
     """Run all tests and return results"""
     # Discover and run all tests
@@ -0,0 +1,126 @@
+"""
+Prefix search over infinitives, English glosses and every conjugated form.
+
+All searchable strings are normalized (lowercased, accents stripped) and kept
+in sorted arrays searched with ``bisect``. Results rank exact matches first,
+then infinitives, glosses and forms, then shorter strings. Entries are bucketed
+by (kind, length) in that same order, so a lookup bisects each bucket in turn
+and stops once it has enough results instead of scanning every match. The
+one- and two-letter prefixes are memoized, which keeps every keystroke under a
+millisecond even for a lexicon of thousands of verbs.
+"""
+import bisect
+import re
+import unicodedata
+from functools import lru_cache
+
+# Match kinds, in ranking order
+INFINITIVE = 0
+ENGLISH = 1
+FORM = 2
+KIND_NAMES = ('infinitive', 'english', 'form')
+
+MEMOIZED_PREFIX_LENGTH = 2
+MAX_LIMIT = 50
+
+
+def normalize(text):
+    """Lowercase and strip accents so 'habló' and 'hablo' compare equal"""
+    decomposed = unicodedata.normalize('NFD', text.strip().lower())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def search_keys(text):
+    """Normalized keys for a string: the whole string plus each later word"""
+    key = normalize(text)
+    keys = [key]
+    words = [w for w in re.split(r'[\s/()\-]+', key) if w]
+    keys.extend(w for w in words[1:] if w not in ('to',))
+    return keys
+
+
+class SearchIndex:
+    """Sorted array of (key, kind, text, verb, tense, pronoun) entries"""
+
+    def __init__(self, verbs, tenses, pronouns):
+        self.verbs = verbs
+        entries = set()
+        for verb, verb_data in verbs.items():
+            for key in search_keys(verb):
+                entries.add((key, INFINITIVE, verb, verb, '', ''))
+            gloss = verb_data['english']
+            for key in search_keys(gloss):
+                entries.add((key, ENGLISH, gloss, verb, '', ''))
+            seen_forms = set()
+            for tense in tenses:
+                for pronoun in pronouns:
+                    form = verb_data[tense][pronoun]
+                    # Report a syncretic form once, at its first cell
+                    if form in seen_forms:
+                        continue
+                    seen_forms.add(form)
+                    for key in search_keys(form):
+                        entries.add((key, FORM, form, verb, tense, pronoun))
+        self.entries = sorted(entries)
+        self.keys = [entry[0] for entry in self.entries]
+        buckets = {}
+        for entry in self.entries:
+            buckets.setdefault((entry[1], len(entry[2])), []).append(entry)
+        self.buckets = [([entry[0] for entry in bucket], bucket)
+                        for _, bucket in sorted(buckets.items())]
+        self._cached_search = lru_cache(maxsize=4096)(self._search)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def search(self, query, limit=10):
+        """Ranked matches for a prefix query"""
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        limit = max(1, min(limit, MAX_LIMIT))
+        if len(prefix) <= MEMOIZED_PREFIX_LENGTH:
+            return self._cached_search(prefix, limit)
+        return self._search(prefix, limit)
+
+    def _search(self, prefix, limit):
+        results = []
+        seen = set()
+
+        def take(matches):
+            for _, kind, text, verb, tense, pronoun in matches:
+                identity = (verb, kind, text)
+                if identity in seen:
+                    continue
+                seen.add(identity)
+                results.append(self._result(kind, text, verb, tense, pronoun))
+                if len(results) >= limit:
+                    return True
+            return False
+
+        # Exact matches rank first
+        start = bisect.bisect_left(self.keys, prefix)
+        end = bisect.bisect_right(self.keys, prefix, lo=start)
+        if take(sorted(self.entries[start:end], key=lambda e: (e[1], len(e[2]), e[2]))):
+            return results
+
+        # Then prefix matches, bucket by bucket in rank order
+        upper = prefix + '\uffff'
+        for keys, bucket in self.buckets:
+            start = bisect.bisect_left(keys, prefix)
+            end = bisect.bisect_left(keys, upper, lo=start)
+            if start < end and take(sorted(bucket[start:end], key=lambda e: e[2])):
+                break
+        return results
+
+    def _result(self, kind, text, verb, tense, pronoun):
+        result = {
+            'match': text,
+            'kind': KIND_NAMES[kind],
+            'verb': verb,
+            'english': self.verbs[verb]['english'],
+        }
+        if kind == FORM:
+            result['tense'] = tense
+            result['pronoun'] = pronoun
+        return result
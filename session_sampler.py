@@ -0,0 +1,162 @@
+"""
+No-repeat question cells for a practice session.
+
+Random draws repeat cells (and verbs) within a 20-question session. A
+session here walks a pseudo-random permutation of the (verb, tense,
+pronoun) cell space instead. Draw number ``n`` is simply the ``n``-th
+element of the permutation, computed on demand. The only per-session state
+is the cursor ``n``, an atomic counter in the shared state backend, so
+every worker continues the same walk. No cell repeats until the whole
+space has been drawn. Then the walk starts again in a new order.
+
+The permutation is built so that verbs spread out too. The space is walked
+in rounds of one draw per verb, in a fresh verb order each round, and each
+verb steps to a different (tense, pronoun) pair every round. A verb
+therefore never comes back within a round. Both orders come from
+``Permutation``, a small Feistel cipher over the next power of four with
+cycle-walking, so each draw takes O(1) time and no list is ever shuffled.
+
+Filters (tenses, pronouns, regular or irregular verbs) select a smaller
+product space. Each filter combination gets its own cursor, so the
+guarantee holds within whatever the learner has asked for.
+"""
+import hashlib
+from functools import lru_cache
+
+SESSION_TTL = 6 * 3600
+VERB_TYPES = ('regular', 'irregular')
+ROUNDS = 4
+MASK64 = (1 << 64) - 1
+
+
+def derive_key(*parts):
+    digest = hashlib.blake2b(':'.join(str(part) for part in parts).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class Permutation:
+    """Keyed pseudo-random bijection on range(size)"""
+
+    __slots__ = ('size', 'half_bits', 'mask', 'keys')
+
+    def __init__(self, size, key):
+        self.size = size
+        # A balanced Feistel network permutes 2 * half_bits bits; values that
+        # land outside range(size) are encrypted again until they fall inside
+        self.half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+        self.mask = (1 << self.half_bits) - 1
+        self.keys = [derive_key(key, round_number) for round_number in range(ROUNDS)]
+
+    def _encrypt(self, value):
+        left, right = value >> self.half_bits, value & self.mask
+        for key in self.keys:
+            mixed = ((right ^ key) * 0x9E3779B97F4A7C15) & MASK64
+            left, right = right, left ^ ((mixed ^ (mixed >> 29)) & self.mask)
+        return (left << self.half_bits) | right
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        value = self._encrypt(index)
+        while value >= self.size:
+            value = self._encrypt(value)
+        return value
+
+
+@lru_cache(maxsize=1024)
+def permutation(size, key):
+    # Consecutive draws of a walk share their permutations, so keep the round keys
+    return Permutation(size, key)
+
+
+class CellSpace:
+    """The cells allowed by one combination of filters"""
+
+    __slots__ = ('verbs', 'tenses', 'pronouns', 'verb_type', 'size', 'signature')
+
+    def __init__(self, verbs, tenses, pronouns, verb_type=None):
+        self.verbs = verbs
+        self.tenses = tenses
+        self.pronouns = pronouns
+        self.verb_type = verb_type
+        self.size = len(verbs) * len(tenses) * len(pronouns)
+        self.signature = '|'.join([verb_type or '', ','.join(tenses), ','.join(pronouns)])
+
+    def cell(self, cursor, seed):
+        """The cursor-th cell of the walk for `seed`"""
+        verb_count = len(self.verbs)
+        pair_count = len(self.tenses) * len(self.pronouns)
+        epoch, position = divmod(cursor, self.size)
+        round_number, slot = divmod(position, verb_count)
+        verb = permutation(verb_count, (seed, epoch, 'verbs', round_number))[slot]
+        # Over the rounds each verb visits every (tense, pronoun) pair once
+        offset = derive_key(seed, epoch, 'offset', verb) % pair_count
+        pair = permutation(pair_count, (seed, epoch, 'pairs'))[(round_number + offset) % pair_count]
+        tense, pronoun = divmod(pair, len(self.pronouns))
+        return self.verbs[verb], self.tenses[tense], self.pronouns[pronoun]
+
+    def random_cell(self, rng):
+        return rng.choice(self.verbs), rng.choice(self.tenses), rng.choice(self.pronouns)
+
+
+class SessionSampler:
+    """Filtered cell spaces for one version of the verb data, and per-session cursors"""
+
+    def __init__(self, verb_types, tenses, pronouns, state, ttl=SESSION_TTL):
+        self.tenses = tuple(tenses)
+        self.pronouns = tuple(pronouns)
+        self.state = state
+        self.ttl = ttl
+        self.verbs = {None: tuple(verb_types)}
+        for verb_type in VERB_TYPES:
+            self.verbs[verb_type] = tuple(verb for verb, kind in verb_types.items() if kind == verb_type)
+        self.space = lru_cache(maxsize=256)(self._space)
+        self.full = self.space()
+
+    def _space(self, tenses=None, pronouns=None, verb_type=None):
+        # Keep the canonical order so equal filters share a signature, and a cursor
+        tenses = tuple(t for t in self.tenses if t in tenses) if tenses else self.tenses
+        pronouns = tuple(p for p in self.pronouns if p in pronouns) if pronouns else self.pronouns
+        return CellSpace(self.verbs[verb_type], tenses, pronouns, verb_type)
+
+    def parse(self, args):
+        """The space selected by ?tense=, ?pronoun= and ?verb_type= (comma lists), or None without filters"""
+        tenses = split_list(args.get('tense'))
+        pronouns = split_list(args.get('pronoun'))
+        verb_type = args.get('verb_type') or None
+        for tense in tenses:
+            if tense not in self.tenses:
+                raise ValueError(f'Unknown tense: {tense}')
+        for pronoun in pronouns:
+            if pronoun not in self.pronouns:
+                raise ValueError(f'Unknown pronoun: {pronoun}')
+        if verb_type is not None and verb_type not in VERB_TYPES:
+            raise ValueError(f'verb_type must be one of: {", ".join(VERB_TYPES)}')
+        if not (tenses or pronouns or verb_type):
+            return None
+        space = self.space(tuple(tenses), tuple(pronouns), verb_type)
+        if not space.size:
+            raise ValueError('No verbs match these filters')
+        return space
+
+    def narrow(self, space, tense):
+        """`space` restricted to one tense (the adaptive choice), if it allows that tense"""
+        space = space or self.full
+        if tense is None or tense not in space.tenses or space.tenses == (tense,):
+            return space
+        return self.space((tense,), space.pronouns, space.verb_type)
+
+    def draw(self, space, session, rng):
+        """Next cell of the session's walk through `space`; a random cell without a session"""
+        space = space or self.full
+        if session is None:
+            return space.random_cell(rng)
+        key = f'session:{session}:{space.signature}'
+        cursor = self.state.incr(key) - 1
+        if cursor == 0:
+            self.state.expire(key, self.ttl)
+        return space.cell(cursor, session)
+
+
+def split_list(value):
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
@@ -0,0 +1,611 @@
+"""
+Shared state backends for PractiVerbo.
+
+Anything the app remembers between requests (classrooms, quiz streams, ...)
+goes through one small key-value interface so it can live wherever the
+deployment needs it:
+
+- ``MemoryBackend``: in-process, for a single worker and for tests
+- ``SQLiteBackend``: a local file shared by every worker on one host
+- ``RedisBackend``: any Redis-protocol server, shared across hosts
+
+``create_backend`` picks one from a URL such as ``memory://``,
+``sqlite:///state.db`` or ``redis://localhost:6379/0``.
+
+Values are strings; ``get_json``/``set_json`` wrap them for structured data.
+Besides plain keys the interface has counters, FIFO lists with a blocking
+pop (used as per-stream outboxes) and sorted sets (used for leaderboards).
+Any key can be given a TTL. Redis drops expired keys itself. The other
+backends hide an expired plain key from reads, and ``sweep`` deletes expired
+keys of every type; they run it every ``SWEEP_INTERVAL`` seconds as they are
+written to.
+"""
+import heapq
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+# A waiting SQLite pop re-checks after SQLITE_POLL_INTERVAL, doubling up to
+# SQLITE_MAX_POLL_INTERVAL; a push from the same process wakes it at once
+SQLITE_POLL_INTERVAL = 0.02
+SQLITE_MAX_POLL_INTERVAL = 0.5
+SQLITE_BUSY_TIMEOUT = 10.0
+SWEEP_INTERVAL = 60.0
+
+
+class StateBackend:
+    """Interface shared by every backend"""
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None, nx=False):
+        """Store `value`; with nx=True only if the key is missing. Returns True if stored."""
+        raise NotImplementedError
+
+    def compare_and_set(self, key, expected, value, ttl=None):
+        """Store `value` only if the key still holds `expected` (None: missing). Returns True if stored."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def incr(self, key, amount=1):
+        """Add `amount` to an integer counter and return the new value"""
+        raise NotImplementedError
+
+    def expire(self, key, ttl):
+        """Delete the key, whatever its type, after `ttl` seconds"""
+        raise NotImplementedError
+
+    def push(self, key, value):
+        """Append to the end of a list"""
+        raise NotImplementedError
+
+    def pop(self, key, timeout=0):
+        """Remove and return the head of a list, waiting up to `timeout` seconds"""
+        raise NotImplementedError
+
+    def zincrby(self, key, member, amount):
+        """Add `amount` to a member's score in a sorted set and return the new score"""
+        raise NotImplementedError
+
+    def zscore(self, key, member):
+        raise NotImplementedError
+
+    def ztop(self, key, count):
+        """Highest-scoring (member, score) pairs, best first"""
+        raise NotImplementedError
+
+    def zcard(self, key):
+        raise NotImplementedError
+
+    def get_json(self, key):
+        value = self.get(key)
+        return None if value is None else json.loads(value)
+
+    def set_json(self, key, value, ttl=None, nx=False):
+        return self.set(key, json.dumps(value, ensure_ascii=False), ttl=ttl, nx=nx)
+
+    def sweep(self):
+        """Delete every expired key now"""
+
+    def close(self):
+        pass
+
+
+class MemoryBackend(StateBackend):
+    """In-process state; one worker only"""
+
+    def __init__(self, sweep_interval=SWEEP_INTERVAL):
+        self.values = {}
+        self.expires = {}
+        self.lists = {}
+        self.zsets = {}
+        self.lock = threading.Condition()
+        self.sweep_interval = sweep_interval
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def _purge(self, key, now=None):
+        """Drop the key if its TTL has passed"""
+        expires = self.expires.get(key)
+        if expires is not None and expires <= (time.time() if now is None else now):
+            self.values.pop(key, None)
+            self.lists.pop(key, None)
+            self.zsets.pop(key, None)
+            del self.expires[key]
+
+    def _live(self, key):
+        self._purge(key)
+        return key in self.values
+
+    def _maybe_sweep(self):
+        if time.monotonic() >= self._next_sweep:
+            self._next_sweep = time.monotonic() + self.sweep_interval
+            self.sweep()
+
+    def sweep(self):
+        with self.lock:
+            now = time.time()
+            for key in [key for key, expires in self.expires.items() if expires <= now]:
+                self._purge(key, now)
+
+    def get(self, key):
+        with self.lock:
+            return self.values[key] if self._live(key) else None
+
+    def set(self, key, value, ttl=None, nx=False):
+        self._maybe_sweep()
+        with self.lock:
+            if nx and self._live(key):
+                return False
+            self.values[key] = str(value)
+            if ttl:
+                self.expires[key] = time.time() + ttl
+            else:
+                self.expires.pop(key, None)
+            return True
+
+    def compare_and_set(self, key, expected, value, ttl=None):
+        with self.lock:
+            current = self.values[key] if self._live(key) else None
+            return current == expected and self.set(key, value, ttl=ttl)
+
+    def delete(self, key):
+        with self.lock:
+            self.values.pop(key, None)
+            self.expires.pop(key, None)
+            self.lists.pop(key, None)
+            self.zsets.pop(key, None)
+
+    def incr(self, key, amount=1):
+        self._maybe_sweep()
+        with self.lock:
+            value = int(self.values[key]) + amount if self._live(key) else amount
+            self.values[key] = str(value)
+            return value
+
+    def expire(self, key, ttl):
+        with self.lock:
+            if self._live(key) or key in self.lists or key in self.zsets:
+                self.expires[key] = time.time() + ttl
+
+    def push(self, key, value):
+        self._maybe_sweep()
+        with self.lock:
+            self._purge(key)
+            self.lists.setdefault(key, []).append(str(value))
+            self.lock.notify_all()
+
+    def pop(self, key, timeout=0):
+        deadline = time.monotonic() + timeout
+        with self.lock:
+            self._purge(key)
+            while not self.lists.get(key):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self.lock.wait(remaining)
+            items = self.lists[key]
+            value = items.pop(0)
+            if not items:
+                del self.lists[key]
+            return value
+
+    def zincrby(self, key, member, amount):
+        self._maybe_sweep()
+        with self.lock:
+            self._purge(key)
+            zset = self.zsets.setdefault(key, {})
+            member = str(member)
+            zset[member] = zset.get(member, 0.0) + amount
+            return zset[member]
+
+    def zscore(self, key, member):
+        with self.lock:
+            self._purge(key)
+            return self.zsets.get(key, {}).get(str(member))
+
+    def ztop(self, key, count):
+        with self.lock:
+            self._purge(key)
+            items = list(self.zsets.get(key, {}).items())
+        return heapq.nlargest(count, items, key=lambda item: item[1])
+
+    def zcard(self, key):
+        with self.lock:
+            self._purge(key)
+            return len(self.zsets.get(key, {}))
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL
+);
+CREATE TABLE IF NOT EXISTS lists (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lists_key ON lists (key, id);
+CREATE TABLE IF NOT EXISTS zsets (
+    key TEXT NOT NULL,
+    member TEXT NOT NULL,
+    score REAL NOT NULL,
+    PRIMARY KEY (key, member)
+);
+CREATE INDEX IF NOT EXISTS zsets_rank ON zsets (key, score DESC);
+CREATE INDEX IF NOT EXISTS kv_expires ON kv (expires_at) WHERE expires_at IS NOT NULL;
+CREATE TABLE IF NOT EXISTS expiry (
+    key TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+class SQLiteBackend(StateBackend):
+    """State in a local SQLite file, shared by every worker process on the host"""
+
+    def __init__(self, path, sweep_interval=SWEEP_INTERVAL):
+        self.path = path
+        self.sweep_interval = sweep_interval
+        self._local = threading.local()
+        self._setup_lock = threading.Lock()
+        self._ready = False
+        self._next_sweep = time.monotonic() + sweep_interval
+        # Pushes made through this backend object, for waiters in pop()
+        self._pushed = threading.Condition()
+        self._push_count = 0
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            with self._setup_lock:
+                if not self._ready:
+                    directory = os.path.dirname(self.path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                conn = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT, isolation_level=None)
+                # Wait out other writers before anything else touches the file
+                conn.execute(f'PRAGMA busy_timeout = {int(SQLITE_BUSY_TIMEOUT * 1000)}')
+                conn.execute('PRAGMA synchronous=NORMAL')
+                if not self._ready:
+                    self._setup(conn)
+                    self._ready = True
+            self._local.conn = conn
+        return conn
+
+    def _setup(self, conn):
+        """Switch the file to WAL and create the schema; once per backend, not per thread"""
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for statement in SQLITE_SCHEMA.split(';'):
+                if statement.strip():
+                    conn.execute(statement)
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _transaction(self, work):
+        conn = self._conn()
+        sweep = time.monotonic() >= self._next_sweep
+        if sweep:
+            self._next_sweep = time.monotonic() + self.sweep_interval
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if sweep:
+                self._sweep(conn)
+            result = work(conn)
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        return result
+
+    def get(self, key):
+        row = self._conn().execute('SELECT value, expires_at FROM kv WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] is not None and row[1] <= time.time():
+            self._conn().execute('DELETE FROM kv WHERE key = ? AND expires_at <= ?', (key, time.time()))
+            return None
+        return row[0]
+
+    def set(self, key, value, ttl=None, nx=False):
+        expires_at = time.time() + ttl if ttl else None
+
+        def work(conn):
+            if nx:
+                row = conn.execute('SELECT expires_at FROM kv WHERE key = ?', (key,)).fetchone()
+                if row is not None and (row[0] is None or row[0] > time.time()):
+                    return False
+            conn.execute('INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)',
+                         (key, str(value), expires_at))
+            return True
+        return self._transaction(work)
+
+    def compare_and_set(self, key, expected, value, ttl=None):
+        expires_at = time.time() + ttl if ttl else None
+
+        def work(conn):
+            row = conn.execute('SELECT value, expires_at FROM kv WHERE key = ?', (key,)).fetchone()
+            live = row is not None and (row[1] is None or row[1] > time.time())
+            if (row[0] if live else None) != expected:
+                return False
+            conn.execute('INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)',
+                         (key, str(value), expires_at))
+            return True
+        return self._transaction(work)
+
+    def delete(self, key):
+        def work(conn):
+            conn.execute('DELETE FROM kv WHERE key = ?', (key,))
+            conn.execute('DELETE FROM lists WHERE key = ?', (key,))
+            conn.execute('DELETE FROM zsets WHERE key = ?', (key,))
+            conn.execute('DELETE FROM expiry WHERE key = ?', (key,))
+        self._transaction(work)
+
+    def incr(self, key, amount=1):
+        def work(conn):
+            row = conn.execute('SELECT value, expires_at FROM kv WHERE key = ?', (key,)).fetchone()
+            live = row is not None and (row[1] is None or row[1] > time.time())
+            value = int(row[0]) + amount if live else amount
+            conn.execute('INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)',
+                         (key, str(value), row[1] if live else None))
+            return value
+        return self._transaction(work)
+
+    def expire(self, key, ttl):
+        expires_at = time.time() + ttl
+
+        def work(conn):
+            if conn.execute('UPDATE kv SET expires_at = ? WHERE key = ?', (expires_at, key)).rowcount:
+                return
+            # Lists and sorted sets keep their TTL apart; only sweep() acts on it
+            if (conn.execute('SELECT 1 FROM lists WHERE key = ? LIMIT 1', (key,)).fetchone()
+                    or conn.execute('SELECT 1 FROM zsets WHERE key = ? LIMIT 1', (key,)).fetchone()):
+                conn.execute('INSERT OR REPLACE INTO expiry (key, expires_at) VALUES (?, ?)', (key, expires_at))
+        self._transaction(work)
+
+    def _purge(self, conn, key):
+        """Drop an expired list or sorted set before it is written to again"""
+        if conn.execute('DELETE FROM expiry WHERE key = ? AND expires_at <= ?', (key, time.time())).rowcount:
+            conn.execute('DELETE FROM lists WHERE key = ?', (key,))
+            conn.execute('DELETE FROM zsets WHERE key = ?', (key,))
+
+    def push(self, key, value):
+        def work(conn):
+            self._purge(conn, key)
+            conn.execute('INSERT INTO lists (key, value) VALUES (?, ?)', (key, str(value)))
+        self._transaction(work)
+        with self._pushed:
+            self._push_count += 1
+            self._pushed.notify_all()
+
+    def pop(self, key, timeout=0):
+        deadline = time.monotonic() + timeout
+        interval = SQLITE_POLL_INTERVAL
+
+        def work(conn):
+            row = conn.execute('SELECT id, value FROM lists WHERE key = ? ORDER BY id LIMIT 1',
+                               (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute('DELETE FROM lists WHERE id = ?', (row[0],))
+            return row[1]
+
+        while True:
+            seen = self._push_count
+            # A plain read first keeps idle waiters from taking the write lock
+            value = None
+            if self._conn().execute('SELECT 1 FROM lists WHERE key = ? LIMIT 1', (key,)).fetchone():
+                value = self._transaction(work)
+            if value is not None or time.monotonic() >= deadline:
+                return value
+            # Other processes' pushes are only seen by polling, less often the longer it stays empty
+            with self._pushed:
+                self._pushed.wait_for(lambda: self._push_count != seen,
+                                      min(interval, max(0, deadline - time.monotonic())))
+            interval = min(interval * 2, SQLITE_MAX_POLL_INTERVAL)
+
+    def zincrby(self, key, member, amount):
+        def work(conn):
+            self._purge(conn, key)
+            conn.execute('INSERT INTO zsets (key, member, score) VALUES (?, ?, ?) '
+                         'ON CONFLICT (key, member) DO UPDATE SET score = score + excluded.score',
+                         (key, str(member), amount))
+            return conn.execute('SELECT score FROM zsets WHERE key = ? AND member = ?',
+                                (key, str(member))).fetchone()[0]
+        return self._transaction(work)
+
+    def zscore(self, key, member):
+        row = self._conn().execute('SELECT score FROM zsets WHERE key = ? AND member = ?',
+                                   (key, str(member))).fetchone()
+        return None if row is None else row[0]
+
+    def ztop(self, key, count):
+        return [tuple(row) for row in self._conn().execute(
+            'SELECT member, score FROM zsets WHERE key = ? ORDER BY score DESC LIMIT ?',
+            (key, count))]
+
+    def zcard(self, key):
+        return self._conn().execute('SELECT COUNT(*) FROM zsets WHERE key = ?', (key,)).fetchone()[0]
+
+    def _sweep(self, conn):
+        now = time.time()
+        expired = 'SELECT key FROM expiry WHERE expires_at <= ?'
+        conn.execute('DELETE FROM kv WHERE expires_at <= ?', (now,))
+        conn.execute(f'DELETE FROM lists WHERE key IN ({expired})', (now,))
+        conn.execute(f'DELETE FROM zsets WHERE key IN ({expired})', (now,))
+        conn.execute('DELETE FROM expiry WHERE expires_at <= ?', (now,))
+
+    def sweep(self):
+        self._transaction(self._sweep)
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class RedisError(Exception):
+    """Error reply from a Redis-protocol server"""
+
+
+class RedisBackend(StateBackend):
+    """Minimal Redis (RESP2) client; one connection per thread"""
+
+    def __init__(self, host='localhost', port=6379, db=0, password=None, timeout=5.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            conn = (sock, sock.makefile('rb'))
+            self._local.conn = conn
+            if self.password:
+                self._call(conn, 'AUTH', self.password)
+            if self.db:
+                self._call(conn, 'SELECT', self.db)
+        return conn
+
+    def execute(self, *args, timeout=None):
+        """Send one command and return its decoded reply"""
+        conn = self._connection()
+        try:
+            if timeout is not None:
+                conn[0].settimeout(timeout + self.timeout)
+            return self._call(conn, *args)
+        except (OSError, EOFError):
+            self.close()
+            raise
+        finally:
+            if timeout is not None and getattr(self._local, 'conn', None) is conn:
+                conn[0].settimeout(self.timeout)
+
+    def _call(self, conn, *args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(data), data))
+        conn[0].sendall(b''.join(parts))
+        return self._read(conn[1])
+
+    def _read(self, reader):
+        line = reader.readline()
+        if not line:
+            raise EOFError('Connection closed by server')
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload.decode('utf-8')
+        if kind == b'-':
+            raise RedisError(payload.decode('utf-8'))
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)[:-2]
+            return data.decode('utf-8')
+        if kind == b'*':
+            length = int(payload)
+            if length < 0:
+                return None
+            return [self._read(reader) for _ in range(length)]
+        raise RedisError(f'Unexpected reply: {line!r}')
+
+    def get(self, key):
+        return self.execute('GET', key)
+
+    def set(self, key, value, ttl=None, nx=False):
+        args = ['SET', key, value]
+        if ttl:
+            args += ['PX', int(ttl * 1000)]
+        if nx:
+            args.append('NX')
+        return self.execute(*args) == 'OK'
+
+    def compare_and_set(self, key, expected, value, ttl=None):
+        # EXEC returns nil if the watched key changed after WATCH
+        self.execute('WATCH', key)
+        if self.execute('GET', key) != expected:
+            self.execute('UNWATCH')
+            return False
+        self.execute('MULTI')
+        self.set(key, value, ttl=ttl)
+        return self.execute('EXEC') is not None
+
+    def delete(self, key):
+        self.execute('DEL', key)
+
+    def incr(self, key, amount=1):
+        return self.execute('INCRBY', key, amount)
+
+    def expire(self, key, ttl):
+        self.execute('PEXPIRE', key, int(ttl * 1000))
+
+    def push(self, key, value):
+        self.execute('RPUSH', key, value)
+
+    def pop(self, key, timeout=0):
+        if timeout <= 0:
+            return self.execute('LPOP', key)
+        reply = self.execute('BLPOP', key, timeout, timeout=timeout)
+        return None if reply is None else reply[1]
+
+    def zincrby(self, key, member, amount):
+        return float(self.execute('ZINCRBY', key, amount, member))
+
+    def zscore(self, key, member):
+        score = self.execute('ZSCORE', key, member)
+        return None if score is None else float(score)
+
+    def ztop(self, key, count):
+        reply = self.execute('ZREVRANGE', key, 0, count - 1, 'WITHSCORES')
+        return [(reply[i], float(reply[i + 1])) for i in range(0, len(reply), 2)]
+
+    def zcard(self, key):
+        return self.execute('ZCARD', key)
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            try:
+                conn[1].close()
+                conn[0].close()
+            except OSError:
+                pass
+            self._local.conn = None
+
+
+def create_backend(url):
+    """Build a backend from a URL: memory://, sqlite:///path or redis://host:port/db"""
+    parsed = urlparse(url or 'memory://')
+    if parsed.scheme == 'memory':
+        return MemoryBackend()
+    if parsed.scheme == 'sqlite':
+        # sqlite:///relative.db or sqlite:////absolute/path.db, as in SQLAlchemy
+        path = parsed.netloc + parsed.path[1:]
+        if not path:
+            raise ValueError('sqlite:// backend needs a file path')
+        return SQLiteBackend(path)
+    if parsed.scheme == 'redis':
+        db = int(parsed.path.lstrip('/') or 0)
+        return RedisBackend(parsed.hostname or 'localhost', parsed.port or 6379, db, parsed.password)
+    raise ValueError(f'Unknown state backend: {url}')
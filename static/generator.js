@@ -0,0 +1,208 @@
+// In-browser question generator: a port of app.build_question that runs on
+// the compact verb bundle built by verb_bundle.py
+(function (root) {
+    const BUNDLE_FORMAT = 1;
+
+    // random.sample: pick k distinct items, order randomized
+    function sample(items, k, rng) {
+        const pool = items.slice();
+        const picked = [];
+        for (let i = 0; i < k && pool.length; i++) {
+            const j = Math.floor(rng() * pool.length);
+            picked.push(pool[j]);
+            pool[j] = pool[pool.length - 1];
+            pool.pop();
+        }
+        return picked;
+    }
+
+    // random.shuffle (Fisher-Yates, in place)
+    function shuffle(items, rng) {
+        for (let i = items.length - 1; i > 0; i--) {
+            const j = Math.floor(rng() * (i + 1));
+            const tmp = items[i];
+            items[i] = items[j];
+            items[j] = tmp;
+        }
+        return items;
+    }
+
+    // list(dict.fromkeys(items))
+    function unique(items) {
+        return Array.from(new Set(items));
+    }
+
+    function choice(items, rng) {
+        return items[Math.floor(rng() * items.length)];
+    }
+
+    class QuestionGenerator {
+        constructor(bundle) {
+            if (bundle.format !== BUNDLE_FORMAT) {
+                throw new Error(`Unsupported bundle format: ${bundle.format}`);
+            }
+            const s = bundle.strings;
+            this.version = bundle.version;
+            this.tenses = bundle.tenses.map(i => s[i]);
+            this.tenseNames = bundle.tense_names.map(i => s[i]);
+            this.pronouns = bundle.pronouns.map(i => s[i]);
+            this.verbs = bundle.verbs.map(i => s[i]);
+            this.english = bundle.english.map(i => s[i]);
+            this.strings = s;
+            this.forms = bundle.forms;
+            this.cells = this.tenses.length * this.pronouns.length;
+        }
+
+        form(verbIndex, tenseIndex, pronounIndex) {
+            const offset = verbIndex * this.cells + tenseIndex * this.pronouns.length + pronounIndex;
+            return this.strings[this.forms[offset]];
+        }
+
+        // Build one question with the same shape and rules as /api/question,
+        // for a random cell or the [verb, tense, pronoun] indices of a walk
+        generate(rng = Math.random, cell = null) {
+            const [v, t, p] = cell || [
+                Math.floor(rng() * this.verbs.length),
+                Math.floor(rng() * this.tenses.length),
+                Math.floor(rng() * this.pronouns.length)
+            ];
+            const verb = this.verbs[v];
+            const tense = this.tenses[t];
+            const pronoun = this.pronouns[p];
+            const correctAnswer = this.form(v, t, p);
+
+            const rand = rng();
+            if (rand < 0.25) {
+                const correctTenseName = this.tenseNames[t];
+                let wrongTenses = this.tenseNames.filter(name => name !== correctTenseName);
+                if (wrongTenses.length > 3) {
+                    wrongTenses = sample(wrongTenses, 3, rng);
+                }
+                const options = unique(shuffle([correctTenseName].concat(wrongTenses), rng));
+                return {
+                    question_type: 'identify-tense',
+                    verb: verb,
+                    english: this.english[v],
+                    pronoun: pronoun,
+                    conjugated_form: correctAnswer,
+                    tense: tense,
+                    options: options,
+                    correct_answer: correctTenseName
+                };
+            } else if (rand < 0.50) {
+                const matching = this.pronouns.filter((_, i) => this.form(v, t, i) === correctAnswer);
+                let wrong = this.pronouns.filter((_, i) => this.form(v, t, i) !== correctAnswer);
+                wrong = sample(wrong, Math.min(3, wrong.length), rng);
+                const options = [pronoun].concat(wrong);
+                const otherMatching = matching.filter(name => name !== pronoun);
+                if (otherMatching.length && options.length < 4) {
+                    options.push(...otherMatching.slice(0, 4 - options.length));
+                }
+                return {
+                    question_type: 'identify-pronoun',
+                    verb: verb,
+                    english: this.english[v],
+                    tense: tense,
+                    tense_name: this.tenseNames[t],
+                    conjugated_form: correctAnswer,
+                    pronoun: pronoun,
+                    options: unique(shuffle(options, rng)).slice(0, 4),
+                    correct_answer: pronoun,
+                    all_correct_answers: matching
+                };
+            } else if (rand < 0.75) {
+                let wrong = this.verbs.filter(name => name !== verb);
+                wrong = sample(wrong, Math.min(3, wrong.length), rng);
+                return {
+                    question_type: 'identify-infinitive',
+                    verb: verb,
+                    english: this.english[v],
+                    tense: tense,
+                    tense_name: this.tenseNames[t],
+                    pronoun: pronoun,
+                    conjugated_form: correctAnswer,
+                    options: unique(shuffle([verb].concat(wrong), rng)),
+                    correct_answer: verb
+                };
+            }
+            const allForms = [];
+            for (let ti = 0; ti < this.tenses.length; ti++) {
+                for (let pi = 0; pi < this.pronouns.length; pi++) {
+                    allForms.push(this.form(v, ti, pi));
+                }
+            }
+            let wrong = unique(allForms.filter(form => form !== correctAnswer));
+            wrong = sample(wrong, Math.min(3, wrong.length), rng);
+            return {
+                question_type: 'conjugation',
+                verb: verb,
+                english: this.english[v],
+                pronoun: pronoun,
+                tense: tense,
+                tense_english: this.tenseNames[t],
+                options: unique(shuffle([correctAnswer].concat(wrong), rng)),
+                correct_answer: correctAnswer
+            };
+        }
+    }
+
+    // A no-repeat walk through the cells, like session_sampler.CellSpace: rounds
+    // of one draw per verb in a fresh verb order, each verb stepping to another
+    // (tense, pronoun) pair every round. The verb order is a lazy Fisher-Yates
+    // shuffle, so a draw is O(1) and no array of the verbs is copied.
+    class SessionWalk {
+        constructor(generator, rng = Math.random) {
+            this.verbCount = generator.verbs.length;
+            this.pronounCount = generator.pronouns.length;
+            this.pairCount = generator.cells;
+            this.rng = rng;
+            this.startEpoch();
+        }
+
+        startEpoch() {
+            this.pairs = shuffle(Array.from({ length: this.pairCount }, (_, i) => i), this.rng);
+            this.offsets = new Map();
+            this.round = 0;
+            this.startRound();
+        }
+
+        startRound() {
+            this.swaps = new Map();
+            this.slot = 0;
+        }
+
+        // [verb, tense, pronoun] indices of the next cell
+        next() {
+            if (this.slot === this.verbCount) {
+                this.round++;
+                if (this.round === this.pairCount) {
+                    this.startEpoch();
+                } else {
+                    this.startRound();
+                }
+            }
+            const j = this.slot + Math.floor(this.rng() * (this.verbCount - this.slot));
+            const verb = this.swaps.has(j) ? this.swaps.get(j) : j;
+            this.swaps.set(j, this.swaps.has(this.slot) ? this.swaps.get(this.slot) : this.slot);
+            this.slot++;
+            if (!this.offsets.has(verb)) {
+                this.offsets.set(verb, Math.floor(this.rng() * this.pairCount));
+            }
+            const pair = this.pairs[(this.round + this.offsets.get(verb)) % this.pairCount];
+            return [verb, Math.floor(pair / this.pronounCount), pair % this.pronounCount];
+        }
+    }
+
+    function load(url) {
+        return fetch(url)
+            .then(response => response.json())
+            .then(bundle => new QuestionGenerator(bundle));
+    }
+
+    const api = { QuestionGenerator: QuestionGenerator, SessionWalk: SessionWalk, load: load };
+    if (typeof module !== 'undefined' && module.exports) {
+        module.exports = api;
+    } else {
+        root.VerbGenerator = api;
+    }
+})(typeof window !== 'undefined' ? window : this);
@@ -0,0 +1,136 @@
+// Offline support: a stock of pre-generated questions and a queue of
+// answers made offline, both kept in IndexedDB
+const OFFLINE_DB_NAME = 'practiverbo';
+const OFFLINE_DB_VERSION = 1;
+const QUESTION_STOCK_SIZE = 50;
+const QUESTION_STOCK_LOW_WATER = 10;
+
+let offlineDb = null;
+
+function openOfflineDb() {
+    if (offlineDb) return Promise.resolve(offlineDb);
+    return new Promise((resolve, reject) => {
+        if (!window.indexedDB) {
+            reject(new Error('IndexedDB not available'));
+            return;
+        }
+        const request = indexedDB.open(OFFLINE_DB_NAME, OFFLINE_DB_VERSION);
+        request.onupgradeneeded = () => {
+            const db = request.result;
+            db.createObjectStore('questions', { autoIncrement: true });
+            db.createObjectStore('answers', { autoIncrement: true });
+        };
+        request.onsuccess = () => {
+            offlineDb = request.result;
+            resolve(offlineDb);
+        };
+        request.onerror = () => reject(request.error);
+    });
+}
+
+// Run `work(store)` in a transaction and resolve with its request's result
+function withStore(storeName, mode, work) {
+    return openOfflineDb().then(db => new Promise((resolve, reject) => {
+        const tx = db.transaction(storeName, mode);
+        const request = work(tx.objectStore(storeName));
+        tx.oncomplete = () => resolve(request ? request.result : undefined);
+        tx.onerror = () => reject(tx.error);
+    }));
+}
+
+// Top up the question stock from the server (or the service worker's cache)
+async function refillQuestionStock() {
+    try {
+        const count = await withStore('questions', 'readonly', store => store.count());
+        if (count >= QUESTION_STOCK_LOW_WATER) return;
+        const response = await fetch(`/api/questions?count=${QUESTION_STOCK_SIZE}`);
+        const data = await response.json();
+        await withStore('questions', 'readwrite', store => {
+            data.questions.forEach(question => store.add(question));
+        });
+    } catch (error) {
+        console.warn('Could not refill question stock:', error);
+    }
+}
+
+// Take one question out of the stock, or null when it is empty
+async function takeStockedQuestion() {
+    try {
+        const db = await openOfflineDb();
+        return await new Promise((resolve, reject) => {
+            const tx = db.transaction('questions', 'readwrite');
+            const cursorRequest = tx.objectStore('questions').openCursor();
+            let question = null;
+            cursorRequest.onsuccess = () => {
+                const cursor = cursorRequest.result;
+                if (cursor) {
+                    question = cursor.value;
+                    cursor.delete();
+                }
+            };
+            tx.oncomplete = () => {
+                if (question) refillQuestionStock();
+                resolve(question);
+            };
+            tx.onerror = () => reject(tx.error);
+        });
+    } catch (error) {
+        return null;
+    }
+}
+
+// Remember an answer that could not be checked online
+function queueAnswer(payload) {
+    payload.answered_at = Date.now() / 1000;
+    return withStore('answers', 'readwrite', store => store.add(payload))
+        .catch(error => console.warn('Could not queue answer:', error));
+}
+
+// Every queued answer with its key, read in one transaction
+function readQueuedAnswers() {
+    return openOfflineDb().then(db => new Promise((resolve, reject) => {
+        const tx = db.transaction('answers', 'readonly');
+        const store = tx.objectStore('answers');
+        const keys = store.getAllKeys();
+        const answers = store.getAll();
+        tx.oncomplete = () => resolve({ keys: keys.result, answers: answers.result });
+        tx.onerror = () => reject(tx.error);
+    }));
+}
+
+// Upload every queued answer in one batch once we are back online
+async function syncQueuedAnswers() {
+    if (!navigator.onLine) return;
+    try {
+        const { keys, answers } = await readQueuedAnswers();
+        if (!answers || answers.length === 0) return;
+        const response = await fetch('/api/sync', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ answers: answers })
+        });
+        if (response.ok) {
+            // Answers queued while the upload was in flight stay for the next sync
+            await withStore('answers', 'readwrite', store => {
+                keys.forEach(key => store.delete(key));
+            });
+        }
+    } catch (error) {
+        console.warn('Could not sync queued answers:', error);
+    }
+}
+
+window.addEventListener('online', () => {
+    syncQueuedAnswers();
+    refillQuestionStock();
+});
+
+if ('serviceWorker' in navigator) {
+    window.addEventListener('load', () => {
+        navigator.serviceWorker.register('/sw.js').catch(error => {
+            console.warn('Service worker registration failed:', error);
+        });
+    });
+}
@@ -0,0 +1,66 @@
+// Client-side timings: samples are batched and posted to /api/beacon with
+// navigator.sendBeacon, which still delivers while the page is being closed
+(function (root) {
+    const BEACON_URL = '/api/beacon';
+    const BATCH_SIZE = 20;
+    const FLUSH_MS = 30000;
+
+    function networkType() {
+        const connection = root.navigator && root.navigator.connection;
+        return connection && connection.effectiveType ? connection.effectiveType : undefined;
+    }
+
+    class PerfRecorder {
+        constructor(url, batchSize) {
+            this.url = url || BEACON_URL;
+            this.batchSize = batchSize || BATCH_SIZE;
+            this.samples = [];
+            this.timer = null;
+        }
+
+        record(metric, ms) {
+            if (!(ms >= 0) || !isFinite(ms)) return;
+            this.samples.push([metric, Math.round(ms * 10) / 10]);
+            if (this.samples.length >= this.batchSize) {
+                this.flush();
+            } else if (!this.timer) {
+                this.timer = setTimeout(() => this.flush(), FLUSH_MS);
+            }
+        }
+
+        // Resolve like `promise`, recording how long it took
+        time(metric, promise) {
+            const started = performance.now();
+            return promise.then(value => {
+                this.record(metric, performance.now() - started);
+                return value;
+            });
+        }
+
+        flush() {
+            clearTimeout(this.timer);
+            this.timer = null;
+            if (!this.samples.length) return false;
+            const body = JSON.stringify({ samples: this.samples, network: networkType() });
+            this.samples = [];
+            const nav = root.navigator;
+            if (nav && nav.sendBeacon && nav.sendBeacon(this.url, new Blob([body], { type: 'application/json' }))) {
+                return true;
+            }
+            fetch(this.url, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: body,
+                keepalive: true
+            }).catch(() => {});
+            return true;
+        }
+    }
+
+    const api = { PerfRecorder: PerfRecorder, BEACON_URL: BEACON_URL };
+    if (typeof module !== 'undefined' && module.exports) {
+        module.exports = api;
+    } else {
+        root.VerbPerf = api;
+    }
+})(typeof window !== 'undefined' ? window : globalThis);
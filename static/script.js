@@ -18,6 +18,40 @@ let sessionData = {
     verbErrors: {}
 };
 
+// Timed round (streaming) state
+const ROUND_SECONDS = 60;
+const ROUND_ADVANCE_MS = 1000;
+let quizStream = null;
+
+// In-browser question generation from the compact verb bundle
+let localGenerator = null;
+let localWalk = null;
+let wireCodec = null;
+
+// Classroom membership (join with ?class=CODE)
+let classroom = JSON.parse(localStorage.getItem('classroom') || 'null');
+
+function newId() {
+    return (crypto.randomUUID ? crypto.randomUUID() : Math.random().toString(36).slice(2) + Date.now().toString(36))
+        .replace(/[^A-Za-z0-9_-]/g, '');
+}
+
+// Anonymous learner id so the server can adapt question difficulty
+const learnerId = localStorage.getItem('learnerId') || (() => {
+    const id = newId();
+    localStorage.setItem('learnerId', id);
+    return id;
+})();
+
+// Session id so the server deals questions without repeats; renewed per session.
+// Only sent when the server says a walk would not bypass its difficulty weighting.
+let sessionId = newId();
+const sessionWalks = document.body.dataset.sessionWalks === '1';
+
+// Fetch and render timings, sent to the server in batches
+const perf = new VerbPerf.PerfRecorder();
+let firstQuestionShown = false;
+
 // DOM elements
 const infinitiveEl = document.getElementById('infinitive');
 const englishEl = document.getElementById('english');
@@ -39,147 +73,171 @@ async function loadQuestion() {
         return; // Don't load more questions
     }
     
+    // In streaming mode the next question arrived with the last result
+    if (quizStream) {
+        if (quizStream.nextQuestion) {
+            renderQuestion(quizStream.nextQuestion);
+            quizStream.nextQuestion = null;
+        }
+        return;
+    }
+    
+    // Generate locally once the verb bundle has loaded, walking the cells without repeats
+    if (localGenerator) {
+        renderQuestion(localGenerator.generate(Math.random, localWalk.next()));
+        return;
+    }
+    
+    // Offline: answer instantly from the stock of pre-generated questions
+    if (!navigator.onLine) {
+        const stocked = await takeStockedQuestion();
+        if (stocked) {
+            renderQuestion(stocked);
+            return;
+        }
+    }
+    
     try {
-        const response = await fetch('/api/question');
-        currentQuestion = await response.json();
-        
-        // Update UI based on question type
-        // For identify-infinitive, hide the verb name (that's the answer!)
-        if (currentQuestion.question_type === 'identify-infinitive') {
-            infinitiveEl.textContent = '???';
-            englishEl.textContent = '';
-        } else {
-            infinitiveEl.textContent = currentQuestion.verb;
-            englishEl.textContent = currentQuestion.english;
+        renderQuestion(await perf.time('question_fetch', fetchQuestion()));
+    } catch (error) {
+        const stocked = await takeStockedQuestion();
+        if (stocked) {
+            renderQuestion(stocked);
+            return;
         }
-        
-        if (currentQuestion.question_type === 'identify-tense') {
-            // Identify tense question
-            tenseBadgeEl.textContent = '❓ Identify the Tense';
-            tenseBadgeEl.style.background = 'linear-gradient(135deg, #f093fb 0%, #f5576c 100%)';
-            
-            pronounEl.textContent = currentQuestion.pronoun;
-            
-            // Show conjugated form in question
-            document.querySelector('.question h2').textContent = 'What tense is this conjugation?';
-            
-            // Create a special display for the conjugated form
-            const conjugatedDisplay = document.createElement('div');
-            conjugatedDisplay.className = 'conjugated-display';
-            conjugatedDisplay.style.fontSize = '2rem';
-            conjugatedDisplay.style.fontWeight = 'bold';
-            conjugatedDisplay.style.color = '#667eea';
-            conjugatedDisplay.style.padding = '20px';
-            conjugatedDisplay.style.background = '#f8f9ff';
-            conjugatedDisplay.style.borderRadius = '10px';
-            conjugatedDisplay.style.marginTop = '15px';
-            conjugatedDisplay.textContent = currentQuestion.conjugated_form;
-            
-            // Clear pronoun element and add conjugated form there
-            const questionSection = document.querySelector('.question');
-            const existingConjugated = questionSection.querySelector('.conjugated-display');
-            if (existingConjugated) {
-                existingConjugated.remove();
-            }
-            questionSection.appendChild(conjugatedDisplay);
-        } else if (currentQuestion.question_type === 'identify-pronoun') {
-            // Identify pronoun question
-            tenseBadgeEl.textContent = currentQuestion.tense_name;
-            tenseBadgeEl.style.background = 'linear-gradient(135deg, #4facfe 0%, #00f2fe 100%)';
-            
-            // Show conjugated form in question
-            document.querySelector('.question h2').textContent = 'Which pronoun is this conjugation for?';
-            
-            // Create a special display for the conjugated form
-            const conjugatedDisplay = document.createElement('div');
-            conjugatedDisplay.className = 'conjugated-display';
-            conjugatedDisplay.style.fontSize = '2rem';
-            conjugatedDisplay.style.fontWeight = 'bold';
-            conjugatedDisplay.style.color = '#00a8cc';
-            conjugatedDisplay.style.padding = '20px';
-            conjugatedDisplay.style.background = '#f0faff';
-            conjugatedDisplay.style.borderRadius = '10px';
-            conjugatedDisplay.style.marginTop = '15px';
-            conjugatedDisplay.textContent = currentQuestion.conjugated_form;
-            
-            // Clear pronoun element and add conjugated form there
-            const questionSection = document.querySelector('.question');
-            const existingConjugated = questionSection.querySelector('.conjugated-display');
-            if (existingConjugated) {
-                existingConjugated.remove();
-            }
-            questionSection.appendChild(conjugatedDisplay);
-            
-            // Hide pronoun display since that's what they're guessing
-            pronounEl.textContent = '?';
-        } else if (currentQuestion.question_type === 'identify-infinitive') {
-            // Identify infinitive question
-            tenseBadgeEl.textContent = currentQuestion.tense_name;
-            tenseBadgeEl.style.background = 'linear-gradient(135deg, #fa709a 0%, #fee140 100%)';
-            
-            // Show conjugated form in question
-            document.querySelector('.question h2').textContent = 'What is the infinitive of this verb?';
-            
-            // Create a special display for the conjugated form
-            const conjugatedDisplay = document.createElement('div');
-            conjugatedDisplay.className = 'conjugated-display';
-            conjugatedDisplay.style.fontSize = '2rem';
-            conjugatedDisplay.style.fontWeight = 'bold';
-            conjugatedDisplay.style.color = '#d83f87';
-            conjugatedDisplay.style.padding = '20px';
-            conjugatedDisplay.style.background = '#fff5f8';
-            conjugatedDisplay.style.borderRadius = '10px';
-            conjugatedDisplay.style.marginTop = '15px';
-            conjugatedDisplay.textContent = currentQuestion.conjugated_form;
-            
-            // Clear pronoun element and add conjugated form there
-            const questionSection = document.querySelector('.question');
-            const existingConjugated = questionSection.querySelector('.conjugated-display');
-            if (existingConjugated) {
-                existingConjugated.remove();
-            }
-            questionSection.appendChild(conjugatedDisplay);
-            
-            // Show pronoun for context
-            pronounEl.textContent = currentQuestion.pronoun;
-        } else {
-            // Standard conjugation question
-            tenseBadgeEl.textContent = currentQuestion.tense_english;
-            tenseBadgeEl.style.background = 'linear-gradient(135deg, #667eea 0%, #764ba2 100%)';
-            
-            document.querySelector('.question h2').textContent = 'Conjugate for:';
-            pronounEl.textContent = currentQuestion.pronoun;
-            
-            // Remove conjugated display if it exists
-            const existingConjugated = document.querySelector('.conjugated-display');
-            if (existingConjugated) {
-                existingConjugated.remove();
-            }
+        console.error('Error loading question:', error);
+        infinitiveEl.textContent = 'Error loading question';
+    }
+}
+
+// Ask the server for a question, compact when the string table is loaded
+async function fetchQuestion() {
+    let url = `/api/question?learner=${encodeURIComponent(learnerId)}`;
+    if (sessionWalks) url += `&session=${sessionId}`;
+    if (wireCodec) {
+        const response = await fetch(url + '&fmt=compact');
+        try {
+            return wireCodec.decode(await response.json());
+        } catch (error) {
+            // The verb data changed under us: use verbose until the page reloads
+            wireCodec = null;
         }
+    }
+    const response = await fetch(url);
+    return response.json();
+}
+
+// Show a question on the card
+function renderQuestion(question) {
+    const renderStarted = performance.now();
+    currentQuestion = question;
+    
+    // Update UI based on question type
+    // For identify-infinitive, hide the verb name (that's the answer!)
+    if (currentQuestion.question_type === 'identify-infinitive') {
+        infinitiveEl.textContent = '???';
+        englishEl.textContent = '';
+    } else {
+        infinitiveEl.textContent = currentQuestion.verb;
+        englishEl.textContent = currentQuestion.english;
+    }
+    
+    if (currentQuestion.question_type === 'identify-tense') {
+        // Identify tense question
+        tenseBadgeEl.textContent = '❓ Identify the Tense';
+        tenseBadgeEl.style.background = 'linear-gradient(135deg, #f093fb 0%, #f5576c 100%)';
         
-        // Create option buttons
-        optionsEl.innerHTML = '';
-        currentQuestion.options.forEach(option => {
-            const btn = document.createElement('button');
-            btn.className = 'option-btn';
-            btn.textContent = option;
-            btn.addEventListener('click', () => selectAnswer(option, btn));
-            optionsEl.appendChild(btn);
-        });
+        pronounEl.textContent = currentQuestion.pronoun;
         
-        // Reset state
-        feedbackEl.classList.remove('show', 'correct', 'incorrect');
-        feedbackEl.textContent = '';
-        nextBtnEl.style.display = 'none';
-        isAnswered = false;
+        // Show conjugated form in question
+        document.querySelector('.question h2').textContent = 'What tense is this conjugation?';
+        showConjugatedForm('#667eea', '#f8f9ff');
+    } else if (currentQuestion.question_type === 'identify-pronoun') {
+        // Identify pronoun question
+        tenseBadgeEl.textContent = currentQuestion.tense_name;
+        tenseBadgeEl.style.background = 'linear-gradient(135deg, #4facfe 0%, #00f2fe 100%)';
         
-        // Update progress bar
-        updateProgressBar();
+        // Show conjugated form in question
+        document.querySelector('.question h2').textContent = 'Which pronoun is this conjugation for?';
+        showConjugatedForm('#00a8cc', '#f0faff');
         
-    } catch (error) {
-        console.error('Error loading question:', error);
-        infinitiveEl.textContent = 'Error loading question';
+        // Hide pronoun display since that's what they're guessing
+        pronounEl.textContent = '?';
+    } else if (currentQuestion.question_type === 'identify-infinitive') {
+        // Identify infinitive question
+        tenseBadgeEl.textContent = currentQuestion.tense_name;
+        tenseBadgeEl.style.background = 'linear-gradient(135deg, #fa709a 0%, #fee140 100%)';
+        
+        // Show conjugated form in question
+        document.querySelector('.question h2').textContent = 'What is the infinitive of this verb?';
+        showConjugatedForm('#d83f87', '#fff5f8');
+        
+        // Show pronoun for context
+        pronounEl.textContent = currentQuestion.pronoun;
+    } else {
+        // Standard conjugation question
+        tenseBadgeEl.textContent = currentQuestion.tense_english;
+        tenseBadgeEl.style.background = 'linear-gradient(135deg, #667eea 0%, #764ba2 100%)';
+        
+        document.querySelector('.question h2').textContent = 'Conjugate for:';
+        pronounEl.textContent = currentQuestion.pronoun;
+        
+        // Remove conjugated display if it exists
+        const existingConjugated = document.querySelector('.conjugated-display');
+        if (existingConjugated) {
+            existingConjugated.remove();
+        }
+    }
+    
+    // Create option buttons
+    optionsEl.innerHTML = '';
+    currentQuestion.options.forEach(option => {
+        const btn = document.createElement('button');
+        btn.className = 'option-btn';
+        btn.textContent = option;
+        btn.addEventListener('click', () => selectAnswer(option, btn));
+        optionsEl.appendChild(btn);
+    });
+    
+    // Reset state
+    feedbackEl.classList.remove('show', 'correct', 'incorrect');
+    feedbackEl.textContent = '';
+    nextBtnEl.style.display = 'none';
+    isAnswered = false;
+    
+    // Update progress bar
+    updateProgressBar();
+    
+    // Time until the next frame, when the card has been laid out and painted
+    requestAnimationFrame(() => {
+        perf.record('render', performance.now() - renderStarted);
+        if (!firstQuestionShown) {
+            firstQuestionShown = true;
+            perf.record('first_question', performance.now());
+        }
+    });
+}
+
+// Create a special display for the conjugated form
+function showConjugatedForm(color, background) {
+    const conjugatedDisplay = document.createElement('div');
+    conjugatedDisplay.className = 'conjugated-display';
+    conjugatedDisplay.style.fontSize = '2rem';
+    conjugatedDisplay.style.fontWeight = 'bold';
+    conjugatedDisplay.style.color = color;
+    conjugatedDisplay.style.padding = '20px';
+    conjugatedDisplay.style.background = background;
+    conjugatedDisplay.style.borderRadius = '10px';
+    conjugatedDisplay.style.marginTop = '15px';
+    conjugatedDisplay.textContent = currentQuestion.conjugated_form;
+    
+    // Clear pronoun element and add conjugated form there
+    const questionSection = document.querySelector('.question');
+    const existingConjugated = questionSection.querySelector('.conjugated-display');
+    if (existingConjugated) {
+        existingConjugated.remove();
     }
+    questionSection.appendChild(conjugatedDisplay);
 }
 
 // Handle answer selection
@@ -194,101 +252,108 @@ async function selectAnswer(answer, button) {
     // Check answer
     const isCorrect = answer === currentQuestion.correct_answer;
     
+    // In streaming mode the result arrives as a server-sent event
+    if (quizStream) {
+        quizStream.pending = { isCorrect, button };
+        sendStreamAnswer(answer);
+        return;
+    }
+    
+    const payload = {
+        answer: answer,
+        correct_answer: currentQuestion.correct_answer,
+        tense: currentQuestion.tense,
+        verb: currentQuestion.verb,
+        pronoun: currentQuestion.pronoun,
+        question_type: currentQuestion.question_type,
+        all_correct_answers: currentQuestion.all_correct_answers || [],
+        learner: learnerId,
+        classroom: classroom ? { code: classroom.code, student_id: classroom.student_id, token: classroom.token } : undefined
+    };
+    
+    // Offline: grade locally and sync the answer later
+    if (!navigator.onLine) {
+        queueAnswer(payload);
+        showResult(isCorrect, button, {});
+        return;
+    }
+    
     // Send answer to server for validation and get tense description
     try {
+        showResult(isCorrect, button, await perf.time('check_fetch', postCheck(payload)));
+    } catch (error) {
+        console.error('Error checking answer:', error);
+        // Fallback to local check
+        queueAnswer(payload);
+        showResult(isCorrect, button, {});
+    }
+}
+
+// Send an answer for grading, compact when the string table is loaded
+async function postCheck(payload) {
+    if (wireCodec) {
         const response = await fetch('/api/check', {
             method: 'POST',
             headers: {
-                'Content-Type': 'application/json'
+                'Content-Type': VerbWire.MIMETYPE,
+                'Accept': VerbWire.MIMETYPE
             },
-            body: JSON.stringify({
-                answer: answer,
-                correct_answer: currentQuestion.correct_answer,
-                tense: currentQuestion.tense,
-                verb: currentQuestion.verb,
-                pronoun: currentQuestion.pronoun,
-                question_type: currentQuestion.question_type,
-                all_correct_answers: currentQuestion.all_correct_answers || []
-            })
+            body: JSON.stringify(wireCodec.encode(payload))
         });
-        const result = await response.json();
-        
-        // Update button styling
-        if (isCorrect) {
-            button.classList.add('correct');
-            
-            // For identify-infinitive, reveal the verb name and English after answering
-            if (currentQuestion.question_type === 'identify-infinitive') {
-                document.querySelector('.infinitive').textContent = currentQuestion.correct_answer;
-                document.querySelector('.english').textContent = currentQuestion.english;
-            }
-            
-            showFeedback(true, result);
-            updateScore(true);
-            updateMascot('happy');
-            playSound('correct');
-        } else {
-            button.classList.add('incorrect');
-            
-            // For identify-infinitive, reveal the verb name and English after answering
-            if (currentQuestion.question_type === 'identify-infinitive') {
-                document.querySelector('.infinitive').textContent = currentQuestion.correct_answer;
-                document.querySelector('.english').textContent = currentQuestion.english;
+        if (response.ok) {
+            try {
+                return wireCodec.decode(await response.json());
+            } catch (error) {
+                // Fall through to the verbose request below
             }
-            
-            showFeedback(false, result);
-            updateScore(false);
-            updateMascot('sad');
-            playSound('incorrect');
-            
-            // Highlight correct answer(s)
-            allButtons.forEach(btn => {
-                // For identify-pronoun, highlight all correct answers
-                if (currentQuestion.question_type === 'identify-pronoun' && 
-                    currentQuestion.all_correct_answers && 
-                    currentQuestion.all_correct_answers.includes(btn.textContent)) {
-                    btn.classList.add('correct');
-                } else if (btn.textContent === currentQuestion.correct_answer) {
-                    btn.classList.add('correct');
-                }
-            });
         }
-    } catch (error) {
-        console.error('Error checking answer:', error);
-        // Fallback to local check
-        if (isCorrect) {
-            button.classList.add('correct');
-            
-            // For identify-infinitive, reveal the verb name and English after answering
-            if (currentQuestion.question_type === 'identify-infinitive') {
-                document.querySelector('.infinitive').textContent = currentQuestion.correct_answer;
-                document.querySelector('.english').textContent = currentQuestion.english;
-            }
-            
-            showFeedback(true, {});
-            updateScore(true);
-            updateMascot('happy');
-            playSound('correct');
-        } else {
-            button.classList.add('incorrect');
-            
-            // For identify-infinitive, reveal the verb name and English after answering
-            if (currentQuestion.question_type === 'identify-infinitive') {
-                document.querySelector('.infinitive').textContent = currentQuestion.correct_answer;
-                document.querySelector('.english').textContent = currentQuestion.english;
+        wireCodec = null;
+    }
+    const response = await fetch('/api/check', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify(payload)
+    });
+    return response.json();
+}
+
+// Show the grading result for the current question
+function showResult(isCorrect, button, result) {
+    const allButtons = document.querySelectorAll('.option-btn');
+    
+    // For identify-infinitive, reveal the verb name and English after answering
+    if (currentQuestion.question_type === 'identify-infinitive') {
+        document.querySelector('.infinitive').textContent = currentQuestion.correct_answer;
+        document.querySelector('.english').textContent = currentQuestion.english;
+    }
+    
+    // Update button styling
+    if (isCorrect) {
+        button.classList.add('correct');
+        showFeedback(true, result);
+        updateScore(true);
+        updateMascot('happy');
+        playSound('correct');
+    } else {
+        button.classList.add('incorrect');
+        showFeedback(false, result);
+        updateScore(false);
+        updateMascot('sad');
+        playSound('incorrect');
+        
+        // Highlight correct answer(s)
+        allButtons.forEach(btn => {
+            // For identify-pronoun, highlight all correct answers
+            if (currentQuestion.question_type === 'identify-pronoun' && 
+                currentQuestion.all_correct_answers && 
+                currentQuestion.all_correct_answers.includes(btn.textContent)) {
+                btn.classList.add('correct');
+            } else if (btn.textContent === currentQuestion.correct_answer) {
+                btn.classList.add('correct');
             }
-            
-            showFeedback(false, {});
-            updateScore(false);
-            updateMascot('sad');
-            playSound('incorrect');
-            
-            allButtons.forEach(btn => {
-                if (btn.textContent === currentQuestion.correct_answer) {
-                    btn.classList.add('correct');
-                }
-            });
-        }
+        });
     }
     
     // Show next button
@@ -317,6 +382,74 @@ async function selectAnswer(answer, button) {
     }
 }
 
+// Streaming mode: one server-sent-event connection carries grading and the next question
+function startTimedRound() {
+    if (quizStream || !window.EventSource) return;
+    
+    const source = new EventSource(`/api/quiz/stream?round=${ROUND_SECONDS}`);
+    quizStream = { source: source, id: null, pending: null, nextQuestion: null };
+    document.getElementById('session-panel').style.display = 'none';
+    
+    source.addEventListener('ready', (e) => {
+        const data = JSON.parse(e.data);
+        quizStream.id = data.stream_id;
+        renderQuestion(data.question);
+    });
+    
+    source.addEventListener('result', (e) => {
+        const data = JSON.parse(e.data);
+        const pending = quizStream.pending || { isCorrect: data.result.correct, button: null };
+        quizStream.pending = null;
+        quizStream.nextQuestion = data.question;
+        showResult(data.result.correct, pending.button || document.createElement('button'), data.result);
+        
+        // Timed rounds keep moving on their own
+        setTimeout(loadQuestion, ROUND_ADVANCE_MS);
+    });
+    
+    source.addEventListener('round-end', (e) => {
+        const data = JSON.parse(e.data);
+        stopTimedRound();
+        feedbackEl.innerHTML = `⏱️ Time's up! ${data.correct}/${data.answered} correct in ${data.seconds} seconds`;
+        feedbackEl.classList.remove('correct', 'incorrect');
+        feedbackEl.classList.add('show');
+        nextBtnEl.style.display = 'block';
+        document.querySelectorAll('.option-btn').forEach(btn => btn.disabled = true);
+    });
+    
+    source.onerror = () => {
+        // Fall back to the request/response flow
+        if (quizStream && quizStream.source === source) {
+            stopTimedRound();
+            loadQuestion();
+        }
+    };
+}
+
+function stopTimedRound() {
+    if (!quizStream) return;
+    quizStream.source.close();
+    quizStream = null;
+    document.getElementById('session-panel').style.display = 'block';
+}
+
+function sendStreamAnswer(answer) {
+    fetch(`/api/quiz/${quizStream.id}/answer`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({ answer: answer })
+    }).then(response => {
+        if (!response.ok) {
+            stopTimedRound();
+        }
+    }).catch(error => {
+        console.error('Error sending answer:', error);
+        stopTimedRound();
+    });
+}
+
 // Show feedback message
 function showFeedback(isCorrect, result = {}) {
     const correctMessages = [
@@ -440,6 +573,7 @@ function loadBestStreak() {
 // Event listeners
 nextBtnEl.addEventListener('click', loadQuestion);
 document.getElementById('start-session-btn').addEventListener('click', startSession);
+document.getElementById('timed-round-btn').addEventListener('click', startTimedRound);
 document.getElementById('close-summary-btn').addEventListener('click', closeSessionSummary);
 document.getElementById('restart-session-btn').addEventListener('click', restartSession);
 
@@ -447,6 +581,8 @@ document.getElementById('restart-session-btn').addEventListener('click', restart
 function startSession() {
     sessionActive = true;
     sessionQuestions = 0;
+    sessionId = newId();
+    if (localGenerator) localWalk = new VerbGenerator.SessionWalk(localGenerator);
     sessionCorrect = 0;
     sessionIncorrect = 0;
     sessionData = {
@@ -590,9 +726,64 @@ function restartSession() {
 // Event listeners
 nextBtnEl.addEventListener('click', loadQuestion);
 
+// Load the verb bundle so later questions need no request
+function loadGenerator() {
+    const url = document.body.dataset.bundleUrl;
+    if (!url || !window.VerbGenerator) return;
+    VerbGenerator.load(url)
+        .then(generator => {
+            localWalk = new VerbGenerator.SessionWalk(generator);
+            localGenerator = generator;
+        })
+        .catch(error => console.warn('Falling back to server questions:', error));
+}
+
+// Load the bundle string table so questions and answers can use the compact wire format
+function loadWireCodec() {
+    const url = document.body.dataset.stringsUrl;
+    if (!url || !window.VerbWire) return;
+    VerbWire.load(url)
+        .then(codec => { wireCodec = codec; })
+        .catch(error => console.warn('Using the verbose wire format:', error));
+}
+
+// Join the class from a ?class=CODE link so answers count on its leaderboard
+async function joinClassFromUrl() {
+    const code = new URLSearchParams(location.search).get('class');
+    if (!code || (classroom && classroom.code === code.toUpperCase())) return;
+    const name = prompt('Your name for the class leaderboard:');
+    if (!name) return;
+    try {
+        const response = await fetch(`/api/class/${encodeURIComponent(code)}/join`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ name: name })
+        });
+        if (response.ok) {
+            classroom = await response.json();
+            localStorage.setItem('classroom', JSON.stringify(classroom));
+        }
+    } catch (error) {
+        console.error('Error joining class:', error);
+    }
+}
+
 // Initialize
 loadBestStreak();
+joinClassFromUrl();
+loadGenerator();
+loadWireCodec();
 loadQuestion();
+refillQuestionStock();
+syncQueuedAnswers();
+
+// Send pending timings before the page goes away
+document.addEventListener('visibilitychange', () => {
+    if (document.visibilityState === 'hidden') perf.flush();
+});
+window.addEventListener('pagehide', () => perf.flush());
 
 // Add keyboard support
 document.addEventListener('keydown', (e) => {
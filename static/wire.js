@@ -0,0 +1,80 @@
+// Compact wire format: a port of wire_format.CompactCodec that decodes
+// /api/question payloads and encodes /api/check bodies against the string
+// table of the verb bundle the page already caches
+(function (root) {
+    const FORMAT_VERSION = 1;
+    const MIMETYPE = 'application/vnd.practiverbo.compact+json';
+    const KEYS = {
+        question_type: 't', verb: 'v', english: 'e', tense: 'n', tense_name: 'tn',
+        tense_english: 'te', pronoun: 'p', conjugated_form: 'f', options: 'o',
+        correct_answer: 'a', all_correct_answers: 'm', answer: 'x', correct: 'c',
+        tense_description: 'd', hint: 'h', questions: 'qs', learner: 'l', classroom: 'k'
+    };
+    const LONG_KEYS = {};
+    Object.keys(KEYS).forEach(key => { LONG_KEYS[KEYS[key]] = key; });
+    const STRING_FIELDS = new Set(['verb', 'english', 'tense', 'tense_name', 'tense_english', 'pronoun',
+        'conjugated_form', 'options', 'correct_answer', 'all_correct_answers', 'answer']);
+
+    class WireCodec {
+        constructor(bundle) {
+            this.version = bundle.version;
+            this.strings = bundle.strings;
+            this.index = new Map(bundle.strings.map((value, i) => [value, i]));
+        }
+
+        ref(value) {
+            if (Array.isArray(value)) return value.map(item => this.ref(item));
+            if (typeof value === 'string' && this.index.has(value)) return this.index.get(value);
+            return value;
+        }
+
+        deref(value) {
+            if (Array.isArray(value)) return value.map(item => this.deref(item));
+            if (typeof value === 'number') {
+                if (value < 0 || value >= this.strings.length) throw new Error(`String index out of range: ${value}`);
+                return this.strings[value];
+            }
+            return value;
+        }
+
+        encode(data) {
+            const compact = { w: FORMAT_VERSION, s: this.version };
+            Object.keys(data).forEach(key => {
+                if (data[key] === undefined) return;
+                compact[KEYS[key] || key] = STRING_FIELDS.has(key) ? this.ref(data[key]) : data[key];
+            });
+            return compact;
+        }
+
+        // Throws on a payload from another format or bundle version
+        decode(compact) {
+            if (compact.w !== FORMAT_VERSION) throw new Error(`Unsupported wire format: ${compact.w}`);
+            if (compact.s !== this.version) throw new Error('Stale string table');
+            const data = {};
+            Object.keys(compact).forEach(short => {
+                if (short === 'w' || short === 's') return;
+                const key = LONG_KEYS[short] || short;
+                if (key === 'questions') {
+                    data[key] = compact[short].map(question => this.decode(
+                        Object.assign({ w: compact.w, s: compact.s }, question)));
+                } else {
+                    data[key] = STRING_FIELDS.has(key) ? this.deref(compact[short]) : compact[short];
+                }
+            });
+            return data;
+        }
+    }
+
+    function load(url) {
+        return fetch(url)
+            .then(response => response.json())
+            .then(bundle => new WireCodec(bundle));
+    }
+
+    const api = { WireCodec: WireCodec, load: load, MIMETYPE: MIMETYPE };
+    if (typeof module !== 'undefined' && module.exports) {
+        module.exports = api;
+    } else {
+        root.VerbWire = api;
+    }
+})(typeof window !== 'undefined' ? window : this);
@@ -0,0 +1,53 @@
+// PractiVerbo service worker: precaches the app shell and a stock of questions
+const CACHE_NAME = 'practiverbo-{{ version }}';
+const PRECACHE_URLS = {{ precache_urls | tojson }};
+const QUESTION_STOCK_URL = {{ question_stock_url | tojson }};
+
+self.addEventListener('install', (event) => {
+    event.waitUntil(
+        caches.open(CACHE_NAME)
+            .then(cache => cache.addAll(PRECACHE_URLS.concat([QUESTION_STOCK_URL])))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', (event) => {
+    // Drop caches from older versions
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(
+                keys.filter(key => key.startsWith('practiverbo-') && key !== CACHE_NAME)
+                    .map(key => caches.delete(key))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+self.addEventListener('fetch', (event) => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+    const url = new URL(request.url);
+    if (url.origin !== self.location.origin) return;
+
+    if (url.pathname === '/api/questions') {
+        // Network first so the stock stays fresh, cached stock when offline
+        event.respondWith(
+            fetch(request)
+                .then(response => {
+                    const copy = response.clone();
+                    caches.open(CACHE_NAME).then(cache => cache.put(QUESTION_STOCK_URL, copy));
+                    return response;
+                })
+                .catch(() => caches.match(QUESTION_STOCK_URL))
+        );
+        return;
+    }
+
+    if (url.pathname.startsWith('/api/')) return;
+
+    // App shell: serve from cache instantly, fall back to the network
+    event.respondWith(
+        caches.match(request, { ignoreSearch: url.pathname === '/' })
+            .then(cached => cached || fetch(request))
+    );
+});
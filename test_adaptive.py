@@ -0,0 +1,116 @@
+import unittest
+import random
+import threading
+import time
+from collections import Counter
+import app as app_module
+from app import app, QUESTION_TYPES, TENSES, VERBS
+from adaptive import AdaptiveSelector, valid_learner
+from state import MemoryBackend
+
+LEARNER = 'learner-0001'
+
+
+class TestAdaptiveSelector(unittest.TestCase):
+    """Test the per-learner bandits"""
+
+    def setUp(self):
+        self.backend = MemoryBackend()
+        self.selector = AdaptiveSelector(self.backend, ['easy', 'hard'], ['t1', 't2'], target=0.7)
+
+    def test_new_learner_gets_prior(self):
+        """Test that an unseen learner starts from the uniform prior"""
+        self.assertEqual(set(self.selector.posterior(LEARNER).values()), {0.5})
+        self.assertIn(self.selector.choose(LEARNER, random.Random(1)), [
+            (t, tense) for t in ('easy', 'hard') for tense in ('t1', 't2')])
+
+    def test_steers_towards_target(self):
+        """Test that selection favours the arm nearest the target success rate"""
+        self.selector.record(LEARNER, [('easy', 't1', True)] * 40 + [('hard', 't2', False)] * 20
+                             + [('hard', 't2', True)] * 30 + [('easy', 't1', False)] * 1)
+        rng = random.Random(7)
+        picks = Counter(self.selector.choose(LEARNER, rng)[0] for _ in range(300))
+        # easy ~98% correct, hard ~60%: hard is much closer to 70%
+        self.assertGreater(picks['hard'], 250)
+
+    def test_batch_is_one_write(self):
+        """Test that a batch of outcomes costs one read and one write"""
+        writes = []
+        original = self.backend.compare_and_set
+        self.backend.compare_and_set = lambda *args, **kwargs: writes.append(args) or original(*args, **kwargs)
+        self.selector.record(LEARNER, [('easy', 't1', True), ('hard', 't2', False), ('easy', 't2', True)])
+        self.assertEqual(len(writes), 1)
+        posterior = self.selector.posterior(LEARNER)
+        self.assertAlmostEqual(posterior['easy'], 3 / 4)
+        self.assertAlmostEqual(posterior['t2'], 2 / 4)
+
+    def test_concurrent_batches_all_count(self):
+        """Test that workers recording for one learner at once lose no outcomes"""
+        selector = AdaptiveSelector(self.backend, ['a'], ['t'], window=10000)
+        get = self.backend.get
+
+        def slow_get(key):
+            value = get(key)
+            time.sleep(0.001)  # widen the gap between the read and the write
+            return value
+
+        self.backend.get = slow_get
+        threads = [threading.Thread(target=selector.record, args=(LEARNER, [('a', 't', True)] * 5))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        params = selector.load(LEARNER)
+        self.assertEqual((params[0], params[1]), (41, 1))
+        self.assertEqual(selector.stats()['updates'], 40)
+        self.assertEqual(selector.stats()['lost_batches'], 0)
+
+    def test_window_caps_history(self):
+        """Test that old outcomes fade so the bandit keeps adapting"""
+        selector = AdaptiveSelector(self.backend, ['a'], ['t'], window=10)
+        selector.record(LEARNER, [('a', 't', False)] * 100 + [('a', 't', True)] * 10)
+        self.assertGreater(selector.posterior(LEARNER)['a'], 0.5)
+
+    def test_unknown_arms_ignored(self):
+        """Test that outcomes for unknown types or tenses do not write"""
+        self.selector.record(LEARNER, [('nope', 'never', True)])
+        self.assertIsNone(self.backend.get(f'adaptive:{LEARNER}'))
+
+    def test_valid_learner(self):
+        """Test learner id validation"""
+        self.assertTrue(valid_learner(LEARNER))
+        self.assertFalse(valid_learner('short'))
+        self.assertFalse(valid_learner('bad id with spaces'))
+        self.assertFalse(valid_learner(None))
+
+
+class TestAdaptiveRoutes(unittest.TestCase):
+    """Test adaptive selection through the API"""
+
+    def setUp(self):
+        self.original = app_module.ADAPTIVE
+        app_module.ADAPTIVE = AdaptiveSelector(MemoryBackend(), QUESTION_TYPES, TENSES)
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def tearDown(self):
+        app_module.ADAPTIVE = self.original
+
+    def test_check_and_sync_update_learner(self):
+        """Test that /api/check and /api/sync feed the learner's bandits"""
+        question = self.client.get(f'/api/question?learner={LEARNER}').get_json()
+        self.assertIn(question['verb'], VERBS)
+        self.client.post('/api/check', json={
+            'answer': 'x', 'correct_answer': 'x', 'tense': 'futuro',
+            'question_type': 'conjugation', 'learner': LEARNER})
+        self.client.post('/api/sync', json={'answers': [
+            {'answer': 'x', 'correct_answer': 'y', 'tense': 'futuro',
+             'question_type': 'conjugation', 'learner': LEARNER}] * 3})
+        posterior = app_module.ADAPTIVE.posterior(LEARNER)
+        self.assertAlmostEqual(posterior['futuro'], 2 / 6)
+        self.assertEqual(self.client.get('/api/metrics').get_json()['adaptive']['updates'], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+import gzip
+import json
+import os
+import random
+import shutil
+import tempfile
+import app as app_module
+from app import app, VERBS, TENSES, PRONOUNS
+from analytics import analyze, iter_chunks, iter_lines, main, DifficultyWeights, cell_key
+
+
+def check_event(verb, tense, pronoun, correct, answer='x'):
+    return {'event': 'check', 'verb': verb, 'tense': tense, 'pronoun': pronoun,
+            'question_type': 'conjugation', 'answer': answer, 'correct': correct}
+
+
+class TestAnalytics(unittest.TestCase):
+    """Test the offline difficulty analytics job"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        events = [
+            check_event('ser', 'presente', 'yo', True, 'soy'),
+            check_event('ser', 'presente', 'yo', False, 'eres'),
+            check_event('ser', 'presente', 'yo', False, 'eres'),
+            check_event('ir', 'pretérito', 'tú', False, 'fue'),
+            {'event': 'question', 'verb': 'ser', 'tense': 'presente', 'pronoun': 'yo'},
+        ]
+        with open(os.path.join(self.tmpdir, 'requests.jsonl'), 'w', encoding='utf-8') as f:
+            for event in events[:3]:
+                f.write(json.dumps(event, ensure_ascii=False) + '\n')
+            f.write('not json\n')
+        with gzip.open(os.path.join(self.tmpdir, 'requests-20240101-000000.jsonl.gz'), 'wt', encoding='utf-8') as f:
+            for event in events[3:]:
+                f.write(json.dumps(event, ensure_ascii=False) + '\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_analyze_counts_cells_and_confusions(self):
+        """Test attempts, errors and confusions per cell across plain and gzip logs"""
+        artifact = analyze([self.tmpdir], workers=1)
+        self.assertEqual(artifact['events'], 4)
+        self.assertEqual(artifact['cells'][cell_key('ser', 'presente', 'yo')], [3, 2])
+        self.assertEqual(artifact['cells'][cell_key('ir', 'pretérito', 'tú')], [1, 1])
+        self.assertEqual(artifact['confusions'][cell_key('ser', 'presente', 'yo')], [['eres', 2]])
+
+    def test_process_pool_matches_serial(self):
+        """Test that small chunks across a process pool give the same result"""
+        serial = analyze([self.tmpdir], workers=1)
+        parallel = analyze([self.tmpdir], workers=2, chunk_bytes=64)
+        self.assertEqual(serial['cells'], parallel['cells'])
+        self.assertEqual(serial['confusions'], parallel['confusions'])
+
+    def test_chunks_cover_every_line_once(self):
+        """Test that byte-range chunks neither lose nor duplicate lines"""
+        path = os.path.join(self.tmpdir, 'requests.jsonl')
+        expected = list(iter_lines(path))
+        for chunk_bytes in (1, 7, 64, 10 ** 6):
+            with self.subTest(chunk_bytes=chunk_bytes):
+                lines = []
+                for chunk in iter_chunks([path], chunk_bytes):
+                    lines.extend(iter_lines(*chunk))
+                self.assertEqual(lines, expected)
+
+    def test_cli_writes_artifact(self):
+        """Test the command-line entry point"""
+        output = os.path.join(self.tmpdir, 'difficulty.json')
+        self.assertEqual(main([self.tmpdir, '-o', output, '-w', '1']), 0)
+        with open(output, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['events'], 4)
+
+
+class TestDifficultyWeights(unittest.TestCase):
+    """Test weighted question selection from a difficulty artifact"""
+
+    def test_hard_cells_are_chosen_more(self):
+        """Test that cells with many errors are sampled more often"""
+        verbs = ['ser', 'ir']
+        artifact = {'version': 1, 'cells': {
+            cell_key('ser', 'presente', 'yo'): [100, 100],
+            cell_key('ir', 'presente', 'yo'): [100, 0],
+        }}
+        weights = DifficultyWeights(artifact, verbs, ['presente'], ['yo'])
+        rng = random.Random(1)
+        picks = [weights.choose(rng)[0] for _ in range(500)]
+        self.assertGreater(picks.count('ser'), picks.count('ir') * 10)
+
+    def test_rejects_unknown_version(self):
+        """Test that an incompatible artifact is refused"""
+        with self.assertRaises(ValueError):
+            DifficultyWeights({'version': 99}, ['ser'], TENSES, PRONOUNS)
+
+    def test_app_uses_weights(self):
+        """Test that /api/question draws from the loaded weights"""
+        artifact = {'version': 1, 'cells': {
+            cell_key(verb, tense, pronoun): [100000, 0]
+            for verb in VERBS for tense in TENSES for pronoun in PRONOUNS
+        }}
+        artifact['cells'][cell_key('ser', 'presente', 'yo')] = [1000, 1000]
+        original, original_pool = app_module.DIFFICULTY, app_module.QUESTION_POOL
+        app_module.DIFFICULTY = DifficultyWeights(artifact, list(VERBS), TENSES, PRONOUNS)
+        # Pooled questions were built before the weights were swapped in
+        app_module.QUESTION_POOL = None
+        try:
+            client = app.test_client()
+            verbs = [client.get('/api/question').get_json()['verb'] for _ in range(30)]
+        finally:
+            app_module.DIFFICULTY, app_module.QUESTION_POOL = original, original_pool
+        self.assertGreater(verbs.count('ser'), 15)
+
+
+if __name__ == '__main__':
+    unittest.main()
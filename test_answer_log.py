@@ -0,0 +1,154 @@
+import unittest
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import time
+import app as app_module
+from app import app
+from answer_log import AnswerLog
+
+
+class TestAnswerLog(unittest.TestCase):
+    """Test the buffered, rotating answer-event log"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'requests.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def read_lines(self, path):
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def test_events_written_as_jsonl(self):
+        """Test that queued events end up as JSON lines"""
+        log = AnswerLog(self.path, flush_interval=0.05)
+        log.log({'event': 'question', 'verb': 'ser'})
+        log.log({'event': 'check', 'verb': 'estar', 'answer': 'está'})
+        self.assertTrue(log.flush())
+        log.close()
+
+        lines = self.read_lines(self.path)
+        self.assertEqual([e['verb'] for e in lines], ['ser', 'estar'])
+        self.assertEqual(lines[1]['answer'], 'está')
+        self.assertEqual(log.stats()['written'], 2)
+
+    def test_rotation_by_size_gzips(self):
+        """Test that the log rotates by size and compresses rotated files"""
+        log = AnswerLog(self.path, max_bytes=200, flush_interval=0.05)
+        for i in range(20):
+            log.log({'event': 'check', 'n': i, 'padding': 'x' * 50})
+            log.flush()
+        log.close()
+
+        rotated = [f for f in os.listdir(self.tmpdir) if f.endswith('.jsonl.gz')]
+        self.assertGreater(len(rotated), 0)
+        self.assertGreater(log.stats()['rotations'], 0)
+
+        # Every event is kept across the rotated files and the active one
+        seen = []
+        for name in os.listdir(self.tmpdir):
+            seen.extend(e['n'] for e in self.read_lines(os.path.join(self.tmpdir, name)))
+        self.assertEqual(sorted(seen), list(range(20)))
+
+    def test_rotation_by_age(self):
+        """Test that an old file is rotated on the next write"""
+        log = AnswerLog(self.path, max_age=0.01, flush_interval=0.05)
+        log.log({'event': 'question'})
+        log.flush()
+        log.log({'event': 'question'})
+        log.flush()
+        log.close()
+        rotated = [f for f in os.listdir(self.tmpdir) if f.endswith('.gz')]
+        self.assertGreaterEqual(len(rotated), 1)
+
+    def test_idle_errors_keep_the_writer(self):
+        """Test that a failed rotation while idle is counted and the writer carries on"""
+        log = AnswerLog(self.path, flush_interval=0.02)
+        log.log({'event': 'question'})
+        log.flush()
+
+        def fail():
+            raise OSError('disk full')
+
+        log._maybe_rotate = fail
+        time.sleep(0.1)
+        self.assertTrue(log._thread.is_alive())
+        self.assertGreaterEqual(log.stats()['write_errors'], 1)
+        del log._maybe_rotate
+        log.log({'event': 'check'})
+        log.flush()
+        log.close()
+        self.assertEqual([e['event'] for e in self.read_lines(self.path)], ['question', 'check'])
+
+    def test_overflow_drops_and_counts(self):
+        """Test that a full buffer drops events instead of blocking"""
+        log = AnswerLog(self.path, buffer_size=1, flush_interval=0.05)
+        log._stopping.set()
+        log._thread.join()  # stop the writer so the buffer cannot drain
+
+        self.assertTrue(log.log({'event': 'question'}))
+        self.assertFalse(log.log({'event': 'question'}))
+        self.assertFalse(log.log({'event': 'question'}))
+        self.assertEqual(log.stats()['dropped'], 2)
+        self.assertEqual(log.stats()['logged'], 1)
+
+    def test_from_env_disabled_by_default(self):
+        """Test that logging is off unless a path is configured"""
+        self.assertIsNone(AnswerLog.from_env({}))
+        log = AnswerLog.from_env({'ANSWER_LOG_PATH': self.path, 'ANSWER_LOG_MAX_BYTES': '1234'})
+        self.assertEqual(log.max_bytes, 1234)
+        log.close()
+
+
+class TestAnswerLogRoutes(unittest.TestCase):
+    """Test that the API routes feed the answer log"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.log = AnswerLog(os.path.join(self.tmpdir, 'requests.jsonl'), flush_interval=0.05)
+        self.original_log = app_module.ANSWER_LOG
+        app_module.ANSWER_LOG = self.log
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def tearDown(self):
+        app_module.ANSWER_LOG = self.original_log
+        self.log.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_question_and_check_are_logged(self):
+        """Test that both API routes append an event"""
+        question = self.client.get('/api/question').get_json()
+        self.client.post('/api/check', json={
+            'answer': question['correct_answer'],
+            'correct_answer': question['correct_answer'],
+            'verb': question['verb'],
+            'tense': question['tense'],
+            'pronoun': question['pronoun'],
+            'question_type': question['question_type'],
+        })
+        self.log.flush()
+
+        with open(self.log.path, encoding='utf-8') as f:
+            events = [json.loads(line) for line in f]
+        self.assertEqual([e['event'] for e in events], ['question', 'check'])
+        self.assertEqual(events[0]['verb'], question['verb'])
+        self.assertTrue(events[1]['correct'])
+        self.assertIn('ts', events[1])
+
+    def test_metrics_expose_log_counters(self):
+        """Test that /api/metrics reports the log counters"""
+        self.client.get('/api/question')
+        data = self.client.get('/api/metrics').get_json()
+        self.assertEqual(data['answer_log']['logged'], 1)
+        self.assertEqual(data['answer_log']['dropped'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 import json
 import os
+import app as app_module
 from app import app, load_verbs, VERBS, PRONOUNS, TENSES
 
 class TestVerbDatabase(unittest.TestCase):
@@ -287,6 +288,40 @@ class TestFlaskRoutes(unittest.TestCase):
         check_data = json.loads(check_response.data)
         self.assertTrue(check_data['correct'])
 
+    def test_check_batch_matches_single_checks(self):
+        """Test that a batch returns, in order, what one check per answer would"""
+        answers = []
+        for _ in range(20):
+            question = json.loads(self.client.get('/api/question').data)
+            answers.append(dict(question, answer=question['options'][0]))
+        response = self.client.post('/api/check/batch', json={'answers': answers})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        expected = [json.loads(self.client.post('/api/check', json=answer).data) for answer in answers]
+        self.assertEqual(data['results'], expected)
+        self.assertEqual(data['graded'], 20)
+        self.assertEqual(data['correct'], sum(result['correct'] for result in expected))
+        self.assertEqual(data['failed'], [])
+
+    def test_check_batch_reports_partial_failures(self):
+        """Test that invalid entries fail on their own and the rest are graded"""
+        wrong = {'answer': 'eres', 'correct_answer': 'soy', 'verb': 'ser', 'tense': 'presente',
+                 'pronoun': 'yo', 'question_type': 'conjugation'}
+        response = self.client.post('/api/check/batch', json=[wrong, 'garbage', {'answer': 5}, wrong])
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['failed'], [1, 2])
+        self.assertEqual(data['graded'], 2)
+        self.assertIn('error', data['results'][1])
+        self.assertEqual(data['results'][0], data['results'][3])
+        self.assertIn('hint', data['results'][0])
+
+    def test_check_batch_rejects_bad_payloads(self):
+        """Test batch validation"""
+        self.assertEqual(self.client.post('/api/check/batch', json={'answers': 'x'}).status_code, 400)
+        too_many = [{'answer': 'a', 'correct_answer': 'a'}] * (app_module.MAX_CHECK_BATCH + 1)
+        self.assertEqual(self.client.post('/api/check/batch', json=too_many).status_code, 413)
+
 
 class TestTenseNames(unittest.TestCase):
     """Test tense name mappings"""
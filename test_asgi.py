@@ -0,0 +1,186 @@
+import unittest
+import asyncio
+import gzip
+import json
+import socket
+import threading
+import time
+import app as app_module
+import asgi
+from app import app
+from wire_format import COMPACT_MIMETYPE
+
+
+def call(method, path, body=b'', headers=(), query=b''):
+    """Run one request through the ASGI app; returns (status, headers dict, body)"""
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method,
+             'scheme': 'http', 'path': path, 'root_path': '', 'query_string': query,
+             'headers': [(k.lower().encode(), v.encode()) for k, v in headers],
+             'client': ('127.0.0.1', 5000), 'server': ('localhost', 80)}
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi.application(scope, receive, send))
+    start = sent[0]
+    response_headers = {k.decode(): v.decode() for k, v in start['headers']}
+    return start['status'], response_headers, b''.join(m.get('body', b'') for m in sent[1:])
+
+
+class TestAsgiRoutes(unittest.TestCase):
+    """Test that the async handlers answer like the Flask routes"""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def test_question_shape(self):
+        """Test verbose and compact questions"""
+        status, headers, body = call('GET', '/api/question')
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['content-type'], 'application/json')
+        question = json.loads(body)
+        self.assertIn(question['correct_answer'], question['options'])
+        self.assertEqual(headers['vary'], 'Accept')
+        status, headers, body = call('GET', '/api/question', query=b'fmt=compact')
+        self.assertEqual(headers['content-type'], COMPACT_MIMETYPE)
+        self.assertIn('options', app_module.WIRE.decode(json.loads(body)))
+
+    def test_check_matches_flask(self):
+        """Test that grading returns byte-identical bodies"""
+        payload = {'answer': 'hablo', 'correct_answer': 'hablo', 'tense': 'presente', 'verb': 'hablar',
+                   'pronoun': 'yo', 'question_type': 'conjugation'}
+        for answer in ('hablo', 'hablas'):
+            data = json.dumps(dict(payload, answer=answer))
+            status, headers, body = call('POST', '/api/check', data.encode(),
+                                         [('Content-Type', 'application/json')])
+            self.assertEqual(status, 200)
+            self.assertEqual(body, self.client.post('/api/check', data=data,
+                                                    content_type='application/json').data)
+        status, _, _ = call('POST', '/api/check', b'{not json', [('Content-Type', 'application/json')])
+        self.assertEqual(status, 400)
+
+    def test_static_routes(self):
+        """Test assets, the bundle, static files and the page shell"""
+        url = app_module.asset_url('app.js')
+        status, headers, body = call('GET', url, headers=[('Accept-Encoding', 'gzip')])
+        self.assertEqual(status, 200)
+        self.assertIn('immutable', headers['cache-control'])
+        self.assertEqual(gzip.decompress(body), app_module.ASSETS.assets['app.js'].body)
+        self.assertEqual(call('GET', url, headers=[('If-None-Match', headers['etag'])])[0], 304)
+
+        status, _, body = call('GET', app_module.bundle_url())
+        self.assertEqual(body, app_module.VERB_BUNDLE.body)
+        self.assertEqual(call('GET', '/bundle/verbs-old.json')[0], 404)
+
+        status, headers, body = call('GET', '/static/icon.svg')
+        self.assertEqual(status, 200)
+        self.assertTrue(headers['content-type'].startswith('image/svg+xml'))
+        self.assertEqual(call('GET', '/static/../app.py')[0], 404)
+
+        app_module.PAGE_CACHE.clear()
+        first = call('GET', '/')
+        second = call('GET', '/')
+        self.assertEqual(first[2], second[2])
+        self.assertEqual(first[1]['etag'], second[1]['etag'])
+
+    def test_other_routes_go_to_flask(self):
+        """Test that routes without an async handler are served by the Flask app"""
+        status, headers, body = call('GET', '/api/metrics')
+        self.assertEqual(status, 200)
+        self.assertIn('quiz_streams', json.loads(body))
+        status, _, body = call('POST', '/api/sync', json.dumps({'answers': []}).encode(),
+                               [('Content-Type', 'application/json')])
+        self.assertEqual(json.loads(body)['synced'], 0)
+
+
+class TestBuiltinServer(unittest.TestCase):
+    """Test many idle quiz streams alongside request traffic on the built-in server"""
+
+    def setUp(self):
+        self.sock = asgi.bind('127.0.0.1', 0)
+        self.port = self.sock.getsockname()[1]
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        self.connections = []
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.task = self.loop.create_task(asgi.serve(asgi.application, self.sock))
+        try:
+            self.loop.run_until_complete(self.task)
+        except asyncio.CancelledError:
+            pass
+        # Finish connection handlers still waiting on the thread pool, so none
+        # is collected after the loop is gone
+        pending = asyncio.all_tasks(self.loop)
+        for task in pending:
+            task.cancel()
+        self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        self.loop.run_until_complete(self.loop.shutdown_default_executor())
+        self.loop.close()
+
+    def tearDown(self):
+        for conn in self.connections:
+            conn.close()
+        self.loop.call_soon_threadsafe(self.task.cancel)
+        self.thread.join(5)
+
+    def request(self, method, path, body=b'', headers=''):
+        conn = socket.create_connection(('127.0.0.1', self.port), timeout=5)
+        self.connections.append(conn)
+        conn.sendall(f'{method} {path} HTTP/1.1\r\nHost: test\r\nConnection: close\r\n'
+                     f'Content-Length: {len(body)}\r\n{headers}\r\n'.encode() + body)
+        data = b''
+        while True:
+            chunk = conn.recv(65536)
+            if not chunk:
+                return data
+            data += chunk
+
+    def open_stream(self):
+        conn = socket.create_connection(('127.0.0.1', self.port), timeout=5)
+        self.connections.append(conn)
+        conn.sendall(b'GET /api/quiz/stream HTTP/1.1\r\nHost: test\r\n\r\n')
+        data = b''
+        while b'event: ready' not in data or not data.endswith(b'\r\n'):
+            data += conn.recv(65536)
+        return conn, data
+
+    def test_idle_streams_and_requests(self):
+        """Test that open streams do not block requests and results reach the right stream"""
+        streams = [self.open_stream() for _ in range(200)]
+        self.assertIn(b'Transfer-Encoding: chunked'.lower(), streams[0][1].lower())
+        self.assertEqual(len(app_module.QUIZ_STREAMS), 200)
+
+        started = time.monotonic()
+        for _ in range(20):
+            self.assertIn(b'200 OK', self.request('GET', '/api/question'))
+        self.assertLess(time.monotonic() - started, 5)
+
+        conn, data = streams[-1]
+        stream_id = json.loads(data.split(b'data: ', 1)[1].split(b'\n', 1)[0])['stream_id']
+        response = self.request('POST', f'/api/quiz/{stream_id}/answer', b'{"answer": "x"}',
+                                'Content-Type: application/json\r\n')
+        self.assertIn(b'204', response.split(b'\r\n', 1)[0])
+        pushed = b''
+        while b'event: result' not in pushed:
+            pushed += conn.recv(65536)
+
+        # Closing the connections closes their streams
+        for conn, _ in streams:
+            conn.close()
+        deadline = time.monotonic() + 5
+        while len(app_module.QUIZ_STREAMS) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(len(app_module.QUIZ_STREAMS), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
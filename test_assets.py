@@ -0,0 +1,159 @@
+import unittest
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import app as app_module
+from app import app
+from assets import AssetPipeline, minify_css, minify_js, write_assets
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+# Run the original and the minified generator on the same seeded stream
+NODE_COMPARE_SCRIPT = """
+const fs = require('fs');
+function run(source) {
+    const module = { exports: {} };
+    new Function('module', source)(module);
+    let seed = 99;
+    const rng = () => { seed = (seed * 16807) % 2147483647; return seed / 2147483647; };
+    const bundle = JSON.parse(fs.readFileSync(process.argv[3], 'utf8'));
+    const generator = new module.exports.QuestionGenerator(bundle);
+    return JSON.stringify(Array.from({ length: 300 }, () => generator.generate(rng)));
+}
+const original = run(fs.readFileSync(process.argv[1], 'utf8'));
+const minified = run(fs.readFileSync(process.argv[2], 'utf8'));
+process.stdout.write(original === minified ? 'same' : 'different');
+"""
+
+
+def node_available():
+    return shutil.which('node') is not None
+
+
+class TestMinifiers(unittest.TestCase):
+    """Test the JS and CSS minifiers"""
+
+    def test_js_keeps_literals(self):
+        """Test that comments go but strings, templates and regexes survive"""
+        source = (
+            "// header comment\n"
+            "const url = 'http://example.com/a'; /* block */\n"
+            "    const re = /[/]\\/x/g;  // trailing\n"
+            "const t = `keep  //  this\n   ${ a ? `inner ${b}` : '/*no*/' } end`;\n"
+            "\n\n"
+            "const half = total / 2 / count;\n"
+        )
+        minified = minify_js(source)
+        self.assertNotIn('header comment', minified)
+        self.assertNotIn('block', minified)
+        self.assertNotIn('trailing', minified)
+        self.assertIn("'http://example.com/a'", minified)
+        self.assertIn('/[/]\\/x/g', minified)
+        self.assertIn("`keep  //  this\n   ${ a ? `inner ${b}` : '/*no*/' } end`", minified)
+        self.assertIn('total / 2 / count', minified)
+        self.assertNotIn('\n\n', minified)
+
+    def test_css(self):
+        """Test CSS comment and whitespace removal"""
+        source = "/* c */\n.a  >  .b ,\n.c {\n    color: red;\n    content: 'x  /* y */';\n}\n"
+        self.assertEqual(minify_css(source), ".a>.b,.c{color:red;content:'x  /* y */'}\n")
+
+    @unittest.skipUnless(node_available(), 'node is not installed')
+    def test_minified_bundle_parses(self):
+        """Test that node accepts the minified app bundle"""
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'app.js')
+            with open(path, 'wb') as f:
+                f.write(app_module.ASSETS.assets['app.js'].body)
+            subprocess.run(['node', '--check', path], check=True)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    @unittest.skipUnless(node_available(), 'node is not installed')
+    def test_minified_generator_behaves_the_same(self):
+        """Test that minifying generator.js does not change its output"""
+        tmpdir = tempfile.mkdtemp()
+        try:
+            original = os.path.join(STATIC_DIR, 'generator.js')
+            minified = os.path.join(tmpdir, 'generator.min.js')
+            bundle = os.path.join(tmpdir, 'bundle.json')
+            with open(original, encoding='utf-8') as f, open(minified, 'w', encoding='utf-8') as out:
+                out.write(minify_js(f.read()))
+            with open(bundle, 'wb') as f:
+                f.write(app_module.VERB_BUNDLE.body)
+            result = subprocess.run(['node', '-e', NODE_COMPARE_SCRIPT, original, minified, bundle],
+                                    check=True, capture_output=True, text=True)
+            self.assertEqual(result.stdout, 'same')
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+class TestAssetPipeline(unittest.TestCase):
+    """Test fingerprinting, the manifest and the CLI output"""
+
+    def test_fingerprints_follow_content(self):
+        """Test that names change with content and nothing else"""
+        tmpdir = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(tmpdir, 'a.css'), 'w') as f:
+                f.write('.a { color: red; }')
+            bundles = {'site.css': ['a.css']}
+            first = AssetPipeline(tmpdir, bundles)
+            self.assertEqual(AssetPipeline(tmpdir, bundles).url('site.css'), first.url('site.css'))
+            with open(os.path.join(tmpdir, 'a.css'), 'w') as f:
+                f.write('.a { color: blue; }')
+            second = AssetPipeline(tmpdir, bundles)
+            self.assertNotEqual(second.url('site.css'), first.url('site.css'))
+            self.assertRegex(second.url('site.css'), r'^/assets/site\.[0-9a-f]{12}\.css$')
+
+            path = write_assets(second, os.path.join(tmpdir, 'dist'))
+            with open(path) as f:
+                self.assertEqual(json.load(f), second.manifest())
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_bundle_contains_every_script(self):
+        """Test that the app bundle carries all three page scripts"""
+        body = app_module.ASSETS.assets['app.js'].body.decode('utf-8')
+        for marker in ('QuestionGenerator', 'takeStockedQuestion', 'loadQuestion'):
+            self.assertIn(marker, body)
+
+
+class TestAssetRoutes(unittest.TestCase):
+    """Test serving assets and the cached page shell"""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def test_asset_served_immutable(self):
+        """Test long-lived caching, gzip and revalidation for a fingerprinted asset"""
+        url = app_module.asset_url('style.css')
+        response = self.client.get(url, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/css')
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        self.assertEqual(gzip.decompress(response.data), app_module.ASSETS.assets['style.css'].body)
+        etag = response.headers['ETag']
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+        self.assertEqual(self.client.get('/assets/app.0000.js').status_code, 404)
+
+    def test_index_rendered_once(self):
+        """Test that the page shell is rendered once and revalidated by ETag"""
+        app_module.PAGE_CACHE.clear()
+        first = self.client.get('/')
+        self.assertIn(app_module.asset_url('style.css').encode(), first.data)
+        self.assertEqual(len(app_module.PAGE_CACHE), 1)
+        second = self.client.get('/')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(len(app_module.PAGE_CACHE), 1)
+        cached = self.client.get('/', headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(cached.status_code, 304)
+
+
+if __name__ == '__main__':
+    unittest.main()
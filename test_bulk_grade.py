@@ -0,0 +1,169 @@
+import unittest
+import asyncio
+import csv
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import app as app_module
+import asgi
+from app import app, QUESTION_REGISTRY, build_question, grade_answer
+from bulk_grade import SheetError, SheetGrader, grade_rows, iter_csv, main, open_sheet
+
+SHEET = ('Student,Verb,Tense,Pronoun,Answer\n'
+         'ana,ser,presente,yo,soy\n'
+         'ben,SER,Presente de Subjuntivo,ella,sea\n'
+         'cat,hablar,preterito,yo,hable\n'
+         ',,,,\n'
+         'dan,xyzzy,presente,yo,a\n')
+
+
+def parse(text):
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+class TestBulkGrade(unittest.TestCase):
+    """Test grading uploaded answer sheets"""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.grader = SheetGrader(QUESTION_REGISTRY)
+
+    def grade(self, sheet, fmt='csv', workers=1, chunk_rows=2):
+        columns, rows = open_sheet(io.BytesIO(sheet.encode('utf-8')), fmt)
+        return parse(''.join(iter_csv(columns, grade_rows(rows, self.grader, workers, chunk_rows), chunk_rows)))
+
+    def test_csv_sheet(self):
+        """Test lenient matching of the cell, strict grading of the answer, and passthrough"""
+        results = self.grade(SHEET)
+        self.assertEqual([r['student'] for r in results], ['ana', 'ben', 'cat', 'dan'])
+        self.assertEqual([r['correct'] for r in results], ['true', 'true', 'false', ''])
+        self.assertEqual(results[2]['correct_answer'], 'hablé')
+        self.assertEqual(results[3]['error'], 'Unknown verb: xyzzy')
+
+    def test_jsonl_sheet(self):
+        """Test JSON lines, syncretic pronouns and unreadable rows"""
+        sheet = '\n'.join([
+            json.dumps({'verb': 'hablar', 'tense': 'imperfecto', 'pronoun': 'él/ella', 'answer': 'yo',
+                        'question_type': 'identify-pronoun'}),
+            'not json',
+            json.dumps({'verb': 'hablar', 'tense': 'imperfecto', 'pronoun': 'tú', 'answer': 'hablabas'}),
+        ])
+        results = self.grade(sheet, 'jsonl')
+        self.assertEqual([r['correct'] for r in results], ['true', '', 'true'])
+        self.assertEqual(results[1]['error'], 'Unreadable row')
+
+    def test_matches_check_answer(self):
+        """Test that every question type is graded exactly as /api/check grades it"""
+        rows = ['verb,tense,pronoun,answer,question_type']
+        expected = []
+        for name in QUESTION_REGISTRY.names:
+            for _ in range(50):
+                question = build_question(name)
+                for answer in question['options']:
+                    rows.append(','.join(f'"{value}"' for value in (
+                        question['verb'], question['tense'], question['pronoun'], answer, name)))
+                    expected.append('true' if grade_answer(dict(question, answer=answer))['correct'] else 'false')
+        results = self.grade('\n'.join(rows), chunk_rows=500)
+        self.assertEqual([r['correct'] for r in results], expected)
+
+    def test_process_pool(self):
+        """Test that a worker pool returns the same rows in the same order"""
+        sheet = SHEET + SHEET.split('\n', 1)[1] * 20
+        self.assertEqual(self.grade(sheet, workers=2, chunk_rows=7), self.grade(sheet))
+
+    def test_bad_sheets(self):
+        """Test that unreadable sheets are rejected up front"""
+        for sheet, fmt in (('', 'csv'), ('verb,answer\nser,soy\n', 'csv'), ('[1]\n', 'jsonl'), ('a', 'xls')):
+            with self.assertRaises(SheetError):
+                open_sheet(io.BytesIO(sheet.encode('utf-8')), fmt)
+
+    def test_unreadable_rows(self):
+        """Test that bad bytes or broken quoting mid-sheet give error rows and grading goes on"""
+        good = b'fay,ser,presente,yo,soy\n'
+        sheet = (SHEET.encode('utf-8') + b'eve,ser,presente,yo,so\xff\n' + good
+                 + b'gil,ser,presente,yo,"' + b'x' * (csv.field_size_limit() + 1) + b'"\n' + good)
+        columns, rows = open_sheet(io.BytesIO(sheet), 'csv')
+        results = parse(''.join(iter_csv(columns, grade_rows(rows, self.grader))))
+        self.assertEqual([r['error'] for r in results[-4:]],
+                         ['Unreadable row: not UTF-8', '', 'Unreadable row', ''])
+        self.assertEqual(results[-1]['correct'], 'true')
+        jsonl = b'{"verb": "ser", "tense": "presente", "pronoun": "yo", "answer": "s\xffy"}\n' + json.dumps(
+            {'verb': 'ser', 'tense': 'presente', 'pronoun': 'yo', 'answer': 'soy'}).encode('utf-8')
+        columns, rows = open_sheet(io.BytesIO(jsonl), 'jsonl')
+        self.assertEqual([result[2] for _, result in grade_rows(rows, self.grader)],
+                         ['Unreadable row: not UTF-8', ''])
+
+    def test_row_limit(self):
+        """Test that rows past the limit are reported in a trailing error row"""
+        original = app_module.MAX_SHEET_ROWS
+        app_module.MAX_SHEET_ROWS = 2
+        try:
+            results = parse(self.client.post('/api/grade', data=SHEET, content_type='text/csv').get_data(as_text=True))
+            exact = parse(self.client.post('/api/grade', data=SHEET.rsplit('\n', 4)[0],
+                                           content_type='text/csv').get_data(as_text=True))
+        finally:
+            app_module.MAX_SHEET_ROWS = original
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[-1]['error'], 'Row limit of 2 reached: the remaining rows were not graded')
+        self.assertEqual(len(exact), 2)
+
+    def test_asgi_streams_results(self):
+        """Test that asgi.py passes the graded CSV on in chunks"""
+        sheet = (SHEET + SHEET.split('\n', 1)[1] * 2000).encode('utf-8')
+        scope = {'type': 'http', 'method': 'POST', 'path': '/api/grade', 'query_string': b'',
+                 'headers': [(b'content-type', b'text/csv')], 'client': ('127.0.0.1', 5000)}
+        messages = [{'type': 'http.request', 'body': sheet, 'more_body': False}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(asgi.application(scope, receive, send))
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertGreater(len(sent), 3)
+        body = b''.join(message.get('body', b'') for message in sent[1:]).decode('utf-8')
+        self.assertEqual(parse(body), self.grade(sheet.decode('utf-8'), chunk_rows=2000))
+
+    def test_upload_endpoint(self):
+        """Test raw and multipart uploads and the error response"""
+        response = self.client.post('/api/grade', data=SHEET, content_type='text/csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/csv')
+        self.assertEqual(parse(response.get_data(as_text=True)), self.grade(SHEET))
+        response = self.client.post('/api/grade', content_type='multipart/form-data',
+                                    data={'file': (io.BytesIO(SHEET.encode('utf-8')), 'quiz.csv')})
+        self.assertEqual(parse(response.get_data(as_text=True)), self.grade(SHEET))
+        response = self.client.post('/api/grade', data='verb,answer\n', content_type='text/csv')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Missing columns', response.get_json()['error'])
+
+    def test_cli(self):
+        """Test the command line grader"""
+        tmpdir = tempfile.mkdtemp()
+        try:
+            source = os.path.join(tmpdir, 'quiz.csv')
+            output = os.path.join(tmpdir, 'graded.csv')
+            with open(source, 'w', encoding='utf-8') as f:
+                f.write(SHEET)
+            self.assertEqual(main([source, '-o', output, '--workers', '1']), 0)
+            with open(output, encoding='utf-8', newline='') as f:
+                self.assertEqual(parse(f.read()), self.grade(SHEET))
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_cli_does_not_start_app(self):
+        """Test that the command line grader gets the table layout without importing the app"""
+        check = 'import sys, bulk_grade; sys.exit("app" in sys.modules or "flask" in sys.modules)'
+        subprocess.run([sys.executable, '-c', check], cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,186 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import app as app_module
+from app import app
+from classroom import ClassroomStore, ClassroomError, UnknownClassroomError
+from state import MemoryBackend, SQLiteBackend
+
+
+class ClassroomTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'state.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+
+class TestClassroomStore(ClassroomTestCase):
+    """Test classes, students and leaderboard snapshots"""
+
+    def test_create_join_and_score(self):
+        """Test the full classroom flow"""
+        store = ClassroomStore(SQLiteBackend(self.path), snapshot_ttl=0)
+        code = store.create_class('Español 1')['code']
+        ana = store.join(code.lower(), 'Ana')
+        ben = store.join(code, '  Ben  ')
+        self.assertEqual(ben['name'], 'Ben')
+
+        store.record_answer(code, ana['student_id'], ana['token'], True)
+        store.record_answer(code, ben['student_id'], ben['token'], True)
+        store.record_answer(code, ben['student_id'], ben['token'], True)
+        store.record_answer(code, ben['student_id'], ben['token'], False)
+
+        board = store.leaderboard(code)
+        self.assertEqual(board['name'], 'Español 1')
+        self.assertEqual(board['students'], 2)
+        self.assertEqual([(l['rank'], l['name'], l['score']) for l in board['leaders']],
+                         [(1, 'Ben', 20), (2, 'Ana', 10)])
+        self.assertEqual(board['leaders'][0]['answered'], 3)
+
+    def test_top_k(self):
+        """Test that only the top k students are returned"""
+        store = ClassroomStore(SQLiteBackend(self.path), snapshot_ttl=0, top_k=3)
+        code = store.create_class('Big class')['code']
+        for i in range(10):
+            student = store.join(code, f'S{i}')
+            for _ in range(i):
+                store.record_answer(code, student['student_id'], student['token'], True)
+        board = store.leaderboard(code)
+        self.assertEqual([l['name'] for l in board['leaders']], ['S9', 'S8', 'S7'])
+        self.assertEqual(board['students'], 10)
+
+    def test_ties_rank_by_join_order(self):
+        """Test that equal scores rank the student who joined first higher"""
+        store = ClassroomStore(MemoryBackend(), snapshot_ttl=0)
+        code = store.create_class('Ties')['code']
+        students = [store.join(code, name) for name in ('Ana', 'Ben', 'Cruz')]
+        for student in students[1:]:
+            store.record_answer(code, student['student_id'], student['token'], True)
+        board = store.leaderboard(code)
+        self.assertEqual([(l['name'], l['score']) for l in board['leaders']],
+                         [('Ben', 10), ('Cruz', 10), ('Ana', 0)])
+
+    def test_snapshot_ttl_limits_reads(self):
+        """Test that many polls inside one TTL window cost one read"""
+        store = ClassroomStore(SQLiteBackend(self.path), snapshot_ttl=60)
+        code = store.create_class('Polling')['code']
+        threads = [threading.Thread(target=store.leaderboard, args=(code,)) for _ in range(50)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for _ in range(200):
+            store.leaderboard(code)
+        self.assertEqual(store.stats()['snapshot_misses'], 1)
+        self.assertEqual(store.stats()['snapshot_hits'], 249)
+
+    def test_shared_across_workers(self):
+        """Test that two stores on the same file (two workers) agree"""
+        worker_a = ClassroomStore(SQLiteBackend(self.path), snapshot_ttl=0)
+        worker_b = ClassroomStore(SQLiteBackend(self.path), snapshot_ttl=0)
+        code = worker_a.create_class('Shared')['code']
+        student = worker_b.join(code, 'Ana')
+        worker_a.record_answer(code, student['student_id'], student['token'], True)
+        self.assertEqual(worker_b.leaderboard(code)['leaders'][0]['score'], 10)
+
+    def test_errors(self):
+        """Test unknown classes, bad names and forged tokens"""
+        store = ClassroomStore(SQLiteBackend(self.path))
+        with self.assertRaises(UnknownClassroomError):
+            store.join('NOPE00', 'Ana')
+        code = store.create_class('x')['code']
+        with self.assertRaises(ClassroomError):
+            store.join(code, '   ')
+        student = store.join(code, 'Ana')
+        with self.assertRaises(UnknownClassroomError):
+            store.record_answer(code, student['student_id'], 'forged', True)
+
+    def test_unknown_codes_allocate_nothing(self):
+        """Test that polling made-up class codes leaves no per-code state behind"""
+        store = ClassroomStore(SQLiteBackend(self.path))
+        locks = list(store._refresh_locks)
+        for i in range(200):
+            with self.assertRaises(UnknownClassroomError):
+                store.leaderboard(f'FAKE{i:03d}')
+        self.assertEqual(store._refresh_locks, locks)
+        self.assertEqual(store._snapshots, {})
+
+
+class TestClassroomRoutes(ClassroomTestCase):
+    """Test the classroom API"""
+
+    def setUp(self):
+        super().setUp()
+        self.original = app_module.CLASSROOMS
+        app_module.CLASSROOMS = ClassroomStore(SQLiteBackend(self.path), snapshot_ttl=0)
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def tearDown(self):
+        app_module.CLASSROOMS = self.original
+        super().tearDown()
+
+    def test_checked_answers_update_leaderboard(self):
+        """Test that answers sent with classroom credentials count for the class"""
+        code = self.client.post('/api/class', json={'name': 'Clase'}).get_json()['code']
+        student = self.client.post(f'/api/class/{code}/join', json={'name': 'Ana'}).get_json()
+        credentials = {'code': code, 'student_id': student['student_id'], 'token': student['token']}
+
+        cell = {'verb': 'ser', 'tense': 'presente', 'pronoun': 'yo', 'question_type': 'conjugation'}
+        self.client.post('/api/check', json=dict(cell, answer='soy', correct_answer='soy', classroom=credentials))
+        self.client.post('/api/check', json=dict(cell, answer='eres', correct_answer='soy', classroom=credentials))
+
+        board = self.client.get(f'/api/class/{code}/leaderboard')
+        self.assertIn('max-age', board.headers['Cache-Control'])
+        leader = board.get_json()['leaders'][0]
+        self.assertEqual((leader['name'], leader['score'], leader['answered']), ('Ana', 10, 2))
+
+    def test_forged_answers_score_nothing(self):
+        """Test that points come from the server's answer key, not the client's correct_answer"""
+        code = self.client.post('/api/class', json={'name': 'Clase'}).get_json()['code']
+        student = self.client.post(f'/api/class/{code}/join', json={'name': 'Ana'}).get_json()
+        credentials = {'code': code, 'student_id': student['student_id'], 'token': student['token']}
+        forged = [
+            {'verb': 'ser', 'tense': 'presente', 'pronoun': 'yo', 'answer': 'x', 'correct_answer': 'x'},
+            {'verb': 'ser', 'tense': 'presente', 'pronoun': 'yo', 'question_type': 'identify-pronoun',
+             'answer': 'ellos', 'correct_answer': 'ellos', 'all_correct_answers': ['ellos']},
+            {'verb': 'nope', 'tense': 'presente', 'pronoun': 'yo', 'answer': 'x', 'correct_answer': 'x'},
+            {'answer': 'x', 'correct_answer': 'x'},
+        ]
+        for payload in forged:
+            response = self.client.post('/api/check', json=dict(payload, classroom=credentials))
+            self.assertEqual(response.status_code, 200)
+        self.client.post('/api/check/batch', json=[dict(payload, classroom=credentials) for payload in forged])
+        honest = {'verb': 'ser', 'tense': 'presente', 'pronoun': 'yo', 'question_type': 'identify-pronoun',
+                  'answer': 'yo', 'correct_answer': 'ellos', 'all_correct_answers': ['ellos']}
+        self.client.post('/api/check', json=dict(honest, classroom=credentials))
+
+        leader = self.client.get(f'/api/class/{code}/leaderboard').get_json()['leaders'][0]
+        self.assertEqual((leader['score'], leader['answered']), (10, 9))
+
+    def test_bad_credentials_do_not_break_check(self):
+        """Test that a stale classroom token still gets graded"""
+        response = self.client.post('/api/check', json={
+            'answer': 'soy', 'correct_answer': 'soy', 'classroom': {'code': 'X', 'token': 'y'}})
+        self.assertTrue(response.get_json()['correct'])
+
+    def test_route_errors(self):
+        """Test unknown class codes and missing names"""
+        self.assertEqual(self.client.post('/api/class/NOPE00/join', json={'name': 'A'}).status_code, 404)
+        self.assertEqual(self.client.get('/api/class/NOPE00/leaderboard').status_code, 404)
+        code = self.client.post('/api/class', json={}).get_json()['code']
+        self.assertEqual(self.client.post(f'/api/class/{code}/join', json={}).status_code, 400)
+
+    def test_teacher_page(self):
+        """Test that the classroom page renders"""
+        self.assertEqual(self.client.get('/class').status_code, 200)
+        self.assertIn(b'ABC123', self.client.get('/class/ABC123').data)
+
+
+if __name__ == '__main__':
+    unittest.main()
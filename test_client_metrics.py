@@ -0,0 +1,104 @@
+import unittest
+import json
+import os
+import shutil
+import subprocess
+import app as app_module
+from app import app
+from client_metrics import BUCKETS_MS, MAX_SAMPLES, ClientMetrics, Histogram
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+# Record a few timings with perf.js against a stub sendBeacon and print what was sent
+NODE_BEACON_SCRIPT = """
+const sent = [];
+Object.defineProperty(globalThis, 'navigator', {
+    value: { connection: { effectiveType: '3g' }, sendBeacon: (url, blob) => { sent.push([url, blob]); return true; } },
+    configurable: true
+});
+const perf = require(process.argv[1]);
+const recorder = new perf.PerfRecorder(undefined, 3);
+recorder.record('render', 12.345);
+recorder.record('render', -1);
+recorder.time('question_fetch', Promise.resolve('q')).then(async value => {
+    recorder.record('check_fetch', 40);
+    const beacons = await Promise.all(sent.map(([url, blob]) => blob.text().then(text => [url, JSON.parse(text)])));
+    process.stdout.write(JSON.stringify({ value: value, beacons: beacons, pending: recorder.samples.length }));
+});
+"""
+
+
+class TestClientMetrics(unittest.TestCase):
+    """Test client-side timing beacons and their histograms"""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.original = app_module.CLIENT_METRICS
+        app_module.CLIENT_METRICS = ClientMetrics()
+
+    def tearDown(self):
+        app_module.CLIENT_METRICS = self.original
+
+    def test_histogram(self):
+        """Test bucketing and percentiles read off the buckets"""
+        histogram = Histogram()
+        for ms in [5] * 50 + [80] * 45 + [400] * 4 + [60000]:
+            histogram.observe(ms)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['count'], 100)
+        self.assertEqual(snapshot['buckets']['10'], 50)
+        self.assertEqual(snapshot['buckets']['100'], 45)
+        self.assertEqual(snapshot['buckets']['+Inf'], 1)
+        self.assertEqual(len(snapshot['buckets']), len(BUCKETS_MS) + 1)
+        self.assertEqual((snapshot['p50_ms'], snapshot['p95_ms'], snapshot['p99_ms']), (10, 100, 500))
+        self.assertIsNone(Histogram().snapshot()['p50_ms'])
+
+    def test_record_validates_samples(self):
+        """Test that bad samples are counted but not folded in, and networks are split out"""
+        metrics = ClientMetrics()
+        accepted = metrics.record({'network': '3g', 'samples': [
+            ['question_fetch', 120], ['render', 8.5], ['nope', 1], ['render', -3], ['render', True], 'x']})
+        self.assertEqual(accepted, 2)
+        metrics.record({'network': 'fiber', 'samples': [['question_fetch', 30]]})
+        stats = metrics.stats()
+        self.assertEqual((stats['beacons'], stats['samples'], stats['rejected']), (2, 3, 4))
+        self.assertEqual(stats['histograms']['question_fetch']['count'], 2)
+        self.assertEqual(list(stats['by_network']), ['3g'])
+        self.assertEqual(stats['by_network']['3g']['question_fetch']['count'], 1)
+        for beacon in (None, {'samples': 'x'}, {'samples': [['render', 1]] * (MAX_SAMPLES + 1)}):
+            with self.assertRaises(ValueError):
+                metrics.record(beacon)
+
+    def test_beacon_endpoint(self):
+        """Test that beacons, even labelled text/plain, show up in /api/metrics"""
+        body = json.dumps({'samples': [['check_fetch', 250], ['first_question', 900]], 'network': '4g'})
+        response = self.client.post('/api/beacon', data=body, content_type='text/plain;charset=UTF-8')
+        self.assertEqual(response.status_code, 204)
+        client = self.client.get('/api/metrics').get_json()['client']
+        self.assertEqual(client['samples'], 2)
+        self.assertEqual(client['histograms']['first_question']['buckets']['1000'], 1)
+        self.assertEqual(self.client.post('/api/beacon', data='nope').status_code, 400)
+        too_big = json.dumps({'samples': [], 'pad': 'x' * app_module.MAX_BEACON_BYTES})
+        self.assertEqual(self.client.post('/api/beacon', data=too_big).status_code, 413)
+
+    @unittest.skipUnless(shutil.which('node'), 'node is not installed')
+    def test_perf_js_batches(self):
+        """Test that perf.js batches samples into one beacon the endpoint accepts"""
+        result = subprocess.run(['node', '-e', NODE_BEACON_SCRIPT, os.path.join(STATIC_DIR, 'perf.js')],
+                                check=True, capture_output=True, text=True)
+        output = json.loads(result.stdout)
+        self.assertEqual(output['value'], 'q')
+        self.assertEqual(output['pending'], 0)
+        [(url, beacon)] = output['beacons']
+        self.assertEqual(url, '/api/beacon')
+        self.assertEqual(beacon['network'], '3g')
+        self.assertEqual([sample[0] for sample in beacon['samples']], ['render', 'question_fetch', 'check_fetch'])
+        self.assertEqual(beacon['samples'][0][1], 12.3)
+        response = self.client.post(url, data=json.dumps(beacon), content_type='application/json')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(app_module.CLIENT_METRICS.stats()['samples'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
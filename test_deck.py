@@ -0,0 +1,83 @@
+import unittest
+import csv
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from app import VERBS, TENSES, PRONOUNS, TENSE_NAMES
+from deck import ANKI_HEADER, DeckBuilder, build_registry, main, render_deck
+from session_sampler import SessionSampler
+
+
+class TestDeck(unittest.TestCase):
+    """Test the worksheet and drill deck generator"""
+
+    def setUp(self):
+        self.registry = build_registry(VERBS, TENSES, PRONOUNS, TENSE_NAMES, {})
+        self.sampler = SessionSampler({verb: data['type'] for verb, data in VERBS.items()}, TENSES, PRONOUNS, None)
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def deck(self, count, fmt='jsonl', workers=1, space=None, **options):
+        builder = DeckBuilder(self.registry, space or self.sampler.full, 'seed-1', fmt, **options)
+        return list(render_deck(builder, count, workers, chunk_size=7))
+
+    def test_seeded_and_parallel(self):
+        """Test that a seed gives the same deck with any number of workers"""
+        deck = self.deck(50)
+        self.assertEqual(self.deck(50, workers=3), deck)
+        questions = [json.loads(line) for text, _ in deck for line in text.splitlines()]
+        self.assertEqual([question['id'] for question in questions], list(range(1, 51)))
+        for question in questions:
+            self.assertIn(question['correct_answer'], question['options'])
+
+    def test_filters_and_no_repeat(self):
+        """Test that a filtered no-repeat deck uses every allowed cell once"""
+        space = self.sampler.parse({'tense': 'presente', 'verb_type': 'irregular'})
+        deck = self.deck(space.size, space=space, no_repeat=True)
+        questions = [json.loads(line) for text, _ in deck for line in text.splitlines()]
+        cells = {(q['verb'], q['tense'], q['pronoun']) for q in questions}
+        self.assertEqual(len(cells), space.size)
+        self.assertTrue(all(VERBS[verb]['type'] == 'irregular' and tense == 'presente' for verb, tense, _ in cells))
+
+    def test_answer_key(self):
+        """Test that an answer key takes the answers out of the deck"""
+        deck = self.deck(10, 'csv', answers=False)
+        rows = list(csv.reader(io.StringIO(''.join(text for text, _ in deck))))
+        keys = list(csv.reader(io.StringIO(''.join(key for _, key in deck))))
+        self.assertEqual(len(rows), 10)
+        self.assertTrue(all(row[4] == '' for row in rows))
+        self.assertEqual([key[0] for key in keys], [row[0] for row in rows])
+        jsonl = self.deck(3, answers=False)
+        self.assertNotIn('correct_answer', jsonl[0][0])
+
+    def test_cli(self):
+        """Test writing an Anki deck and rejecting unknown types"""
+        output = os.path.join(self.tmpdir, 'deck.txt')
+        self.assertEqual(main(['-n', '25', '--format', 'tsv', '-o', output, '--seed', '3', '-w', '1',
+                               '--types', 'conjugation', '--pronoun', 'yo']), 0)
+        with open(output, encoding='utf-8') as f:
+            text = f.read()
+        self.assertTrue(text.startswith(ANKI_HEADER))
+        notes = text[len(ANKI_HEADER):].splitlines()
+        self.assertEqual(len(notes), 25)
+        for note in notes:
+            front, back, tags = note.split('\t')
+            self.assertIn(' for yo ', front)
+            self.assertTrue(tags.startswith('conjugation '))
+        self.assertEqual(main(['-n', '1', '--types', 'bogus', '-o', output]), 1)
+
+    def test_tools_do_not_start_app(self):
+        """Test that the deck, lexicon and bundle tools get the table layout without importing the app"""
+        check = ('import sys, deck, verb_store, verb_bundle; '
+                 'sys.exit("app" in sys.modules or "flask" in sys.modules)')
+        subprocess.run([sys.executable, '-c', check], cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
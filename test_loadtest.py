@@ -0,0 +1,54 @@
+import unittest
+import threading
+from werkzeug.serving import make_server
+from app import app
+from loadtest import percentile, run_load
+
+
+class TestLoadTest(unittest.TestCase):
+    """Test the load generator against the app on a local port"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = make_server('127.0.0.1', 0, app, threaded=True)
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}'
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.thread.join(5)
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles"""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+        self.assertIsNone(percentile([], 50))
+
+    def test_ramped_sessions(self):
+        """Test that each stage reports both routes with no errors"""
+        report = run_load(self.url, [2, 4], stage_seconds=0.5, think=0.01, session_length=3, seed=1)
+        self.assertEqual([stage['learners'] for stage in report['stages']], [2, 4])
+        for stage in report['stages']:
+            self.assertEqual(stage['error_rate'], 0.0)
+            self.assertGreater(stage['sessions_completed'], 0)
+            for name in ('/api/question', '/api/check'):
+                route = stage['routes'][name]
+                self.assertGreater(route['requests'], 0)
+                self.assertLessEqual(route['p50_ms'], route['p95_ms'])
+                self.assertLessEqual(route['p95_ms'], route['p99_ms'])
+            questions = stage['routes']['/api/question']['requests']
+            checks = stage['routes']['/api/check']['requests']
+            self.assertLessEqual(abs(questions - checks), stage['learners'])
+
+    def test_errors_counted(self):
+        """Test that an unreachable server shows up as errors, not a crash"""
+        report = run_load('http://127.0.0.1:9', [1], stage_seconds=0.2, think=0.01, session_length=2)
+        self.assertEqual(report['stages'][0]['error_rate'], 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+import unittest
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import app as app_module
+from app import app, VERBS
+from answer_log import AnswerLog
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+# Sync queued answers through offline.js against an in-memory IndexedDB stub,
+# queueing another answer while each upload is in flight
+NODE_SYNC_SCRIPT = """
+const fs = require('fs');
+const vm = require('vm');
+const stores = { questions: new Map(), answers: new Map() };
+let nextKey = 1;
+const db = {
+    transaction(name) {
+        const map = stores[name];
+        const pending = [];
+        const request = compute => {
+            const req = {};
+            pending.push(() => { req.result = compute(); });
+            return req;
+        };
+        const tx = {
+            objectStore: () => ({
+                add: value => request(() => { map.set(nextKey, value); return nextKey++; }),
+                delete: key => request(() => map.delete(key)),
+                clear: () => request(() => map.clear()),
+                count: () => request(() => map.size),
+                getAll: () => request(() => [...map.values()]),
+                getAllKeys: () => request(() => [...map.keys()]),
+            })
+        };
+        setTimeout(() => { pending.forEach(run => run()); tx.oncomplete(); });
+        return tx;
+    }
+};
+const indexedDB = {
+    open() {
+        const req = {};
+        setTimeout(() => { req.result = db; req.onsuccess(); });
+        return req;
+    }
+};
+globalThis.indexedDB = indexedDB;
+globalThis.window = { indexedDB: indexedDB, addEventListener() {} };
+Object.defineProperty(globalThis, 'navigator', { value: { onLine: true }, configurable: true });
+const uploads = [];
+globalThis.fetch = async (url, options) => {
+    uploads.push(JSON.parse(options.body).answers.map(answer => answer.answer));
+    await queueAnswer({ answer: 'late' + uploads.length });
+    return { ok: true };
+};
+vm.runInThisContext(fs.readFileSync(process.argv[1], 'utf8'));
+const queued = () => [...stores.answers.values()].map(answer => answer.answer);
+(async () => {
+    await queueAnswer({ answer: 'uno' });
+    await queueAnswer({ answer: 'dos' });
+    await syncQueuedAnswers();
+    const left = queued();
+    await syncQueuedAnswers();
+    process.stdout.write(JSON.stringify({ uploads: uploads, left: left, after: queued() }));
+})();
+"""
+
+
+class TestOfflineSupport(unittest.TestCase):
+    """Test the service worker, question stock and batched answer sync"""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def test_service_worker_served_from_root(self):
+        """Test that /sw.js lists the precached shell and question stock"""
+        response = self.client.get('/sw.js')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/javascript')
+        body = response.get_data(as_text=True)
+        for url in ('"/"', app_module.asset_url('app.js'), app_module.asset_url('style.css'),
+                    '/static/manifest.json', '/api/questions?count=50'):
+            self.assertIn(url, body)
+        self.assertRegex(body, r"practiverbo-[0-9a-f]{12}")
+
+    def test_index_links_manifest(self):
+        """Test that the page links the web app manifest and the script bundle"""
+        response = self.client.get('/')
+        self.assertIn(b'manifest.json', response.data)
+        self.assertIn(app_module.asset_url('app.js').encode(), response.data)
+        manifest = self.client.get('/static/manifest.json')
+        self.assertEqual(json.loads(manifest.data)['start_url'], '/')
+        manifest.close()
+
+    def test_question_stock(self):
+        """Test that /api/questions returns a batch of full questions"""
+        data = self.client.get('/api/questions?count=7').get_json()
+        self.assertEqual(len(data['questions']), 7)
+        for question in data['questions']:
+            self.assertIn(question['verb'], VERBS)
+            self.assertIn(question['correct_answer'], question['options'])
+
+    def test_question_stock_is_capped(self):
+        """Test that the stock size is bounded"""
+        data = self.client.get('/api/questions?count=100000').get_json()
+        self.assertEqual(len(data['questions']), app_module.MAX_QUESTION_BATCH)
+
+    def test_sync_grades_batch(self):
+        """Test that queued offline answers are graded in one request"""
+        answers = [
+            {'answer': 'soy', 'correct_answer': 'soy', 'verb': 'ser', 'tense': 'presente',
+             'pronoun': 'yo', 'question_type': 'conjugation', 'answered_at': 1700000000},
+            {'answer': 'eres', 'correct_answer': 'soy', 'verb': 'ser', 'tense': 'presente',
+             'pronoun': 'yo', 'question_type': 'conjugation'},
+            'garbage',
+            {'answer': 5, 'correct_answer': 'soy'},
+        ]
+        response = self.client.post('/api/sync', json={'answers': answers})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {'synced': 2, 'correct': 1, 'skipped': 2})
+
+    def test_sync_rejects_bad_payloads(self):
+        """Test sync validation"""
+        self.assertEqual(self.client.post('/api/sync', json={'answers': 'x'}).status_code, 400)
+        too_many = [{'answer': 'a', 'correct_answer': 'a'}] * (app_module.MAX_SYNC_BATCH + 1)
+        self.assertEqual(self.client.post('/api/sync', json={'answers': too_many}).status_code, 413)
+
+    def test_sync_logs_offline_answers(self):
+        """Test that synced answers reach the answer log marked as offline"""
+        tmpdir = tempfile.mkdtemp()
+        log = AnswerLog(os.path.join(tmpdir, 'requests.jsonl'), flush_interval=0.05)
+        original = app_module.ANSWER_LOG
+        app_module.ANSWER_LOG = log
+        try:
+            self.client.post('/api/sync', json={'answers': [
+                {'answer': 'soy', 'correct_answer': 'soy', 'answered_at': 123}
+            ]})
+            log.flush()
+            with open(log.path, encoding='utf-8') as f:
+                event = json.loads(f.readline())
+        finally:
+            app_module.ANSWER_LOG = original
+            log.close()
+            shutil.rmtree(tmpdir)
+        self.assertTrue(event['offline'])
+        self.assertEqual(event['answered_at'], 123)
+
+    @unittest.skipUnless(shutil.which('node'), 'node is not installed')
+    def test_sync_keeps_answers_queued_in_flight(self):
+        """Test that a sync deletes only the answers it uploaded"""
+        result = subprocess.run(['node', '-e', NODE_SYNC_SCRIPT, os.path.join(STATIC_DIR, 'offline.js')],
+                                check=True, capture_output=True, text=True)
+        output = json.loads(result.stdout)
+        self.assertEqual(output['uploads'], [['uno', 'dos'], ['late1']])
+        self.assertEqual(output['left'], ['late1'])
+        self.assertEqual(output['after'], ['late2'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+import json
+import time
+from collections import Counter
+import app as app_module
+from app import app, VERBS
+from question_pool import QuestionPool
+from question_types import QuestionRegistry
+
+
+def make_pool(**kwargs):
+    counter = iter(range(1000000))
+    return QuestionPool(lambda question_type: {'type': question_type, 'n': next(counter)},
+                        lambda question: json.dumps(question).encode('utf-8'),
+                        ['a', 'b'], **kwargs)
+
+
+class TestQuestionPool(unittest.TestCase):
+    """Test pooling, refill and fallback"""
+
+    def test_refill_to_watermark(self):
+        """Test that refill tops every type up to the watermark and no further"""
+        pool = make_pool(watermark=3)
+        self.assertEqual(pool.refill(), 6)
+        self.assertEqual(pool.refill(), 0)
+        self.assertEqual(pool.stats()['sizes'], {'a': 3, 'b': 3})
+
+    def test_get_pops_encoded_question(self):
+        """Test that a pooled entry is the encoded body plus the question"""
+        pool = make_pool(watermark=2)
+        pool.refill()
+        body, question = pool.get('b')
+        self.assertEqual(json.loads(body), question)
+        self.assertEqual(question['type'], 'b')
+        self.assertEqual(pool.stats()['hits'], 1)
+        pool.close()
+
+    def test_dry_pool_builds_inline(self):
+        """Test the inline fallback when a type has run out"""
+        pool = make_pool(watermark=1)
+        pool._thread = object()  # keep the refill thread out of this test
+        body, question = pool.get('a')
+        self.assertEqual(question['type'], 'a')
+        self.assertEqual(pool.stats()['misses'], 1)
+
+    def test_refill_limit(self):
+        """Test that a limited refill builds at most `limit` questions"""
+        pool = make_pool(watermark=10)
+        self.assertEqual(pool.refill(limit=3), 3)
+
+    def test_clear(self):
+        """Test that clear drops pooled questions"""
+        pool = make_pool(watermark=2)
+        pool.refill()
+        pool.clear()
+        self.assertEqual(pool.stats()['sizes'], {'a': 0, 'b': 0})
+
+    def test_background_refill(self):
+        """Test that the refill thread tops the pool back up after pops"""
+        pool = make_pool(watermark=5)
+        for _ in range(5):
+            pool.get()
+        deadline = time.monotonic() + 5
+        while pool.stats()['sizes'] != {'a': 5, 'b': 5} and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(pool.stats()['sizes'], {'a': 5, 'b': 5})
+        pool.close()
+
+    def test_from_env(self):
+        """Test that a size of 0 disables the pool"""
+        self.assertIsNone(QuestionPool.from_env(None, None, ['a'], {'QUESTION_POOL_SIZE': '0'}))
+        pool = QuestionPool.from_env(None, None, ['a'], {'QUESTION_POOL_SIZE': '8',
+                                                         'QUESTION_POOL_REFILL_RATE': '100'})
+        self.assertEqual((pool.watermark, pool.refill_rate), (8, 100))
+
+
+class TestPooledRoutes(unittest.TestCase):
+    """Test the question routes with the pool on"""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def test_pooled_questions_are_valid(self):
+        """Test that pooled single and batch responses carry complete questions"""
+        self.assertIsNotNone(app_module.QUESTION_POOL)
+        question = self.client.get('/api/question').get_json()
+        self.assertIn(question['verb'], VERBS)
+        self.assertIn(question['question_type'], app_module.QUESTION_TYPES)
+        questions = self.client.get('/api/questions?count=20').get_json()['questions']
+        self.assertEqual(len(questions), 20)
+        for question in questions:
+            self.assertIn(question['correct_answer'], question['options'])
+
+    def test_type_weights_apply(self):
+        """Test that QUESTION_TYPE_WEIGHTS sets the mix of pooled questions"""
+        original = app_module.QUESTION_REGISTRY
+        app_module.QUESTION_REGISTRY = QuestionRegistry(app_module.build_lexicon(app_module.VERBS), {
+            'conjugation': 8, 'identify-tense': 1, 'identify-pronoun': 1, 'identify-infinitive': 0})
+        try:
+            counts = Counter(self.client.get('/api/question').get_json()['question_type'] for _ in range(500))
+            counts.update(question['question_type'] for question in
+                          self.client.get('/api/questions?count=100').get_json()['questions'])
+        finally:
+            app_module.QUESTION_REGISTRY = original
+        self.assertEqual(set(counts), {'conjugation', 'identify-tense', 'identify-pronoun'})
+        self.assertGreater(counts['conjugation'], 400)
+        self.assertLess(counts['identify-tense'], 120)
+
+    def test_metrics(self):
+        """Test that pool counters are exposed"""
+        self.client.get('/api/question')
+        stats = self.client.get('/api/metrics').get_json()['question_pool']
+        self.assertEqual(set(stats['sizes']), set(app_module.QUESTION_TYPES))
+        self.assertGreaterEqual(stats['hits'] + stats['misses'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
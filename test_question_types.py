@@ -0,0 +1,89 @@
+import unittest
+import random
+from collections import Counter
+from app import VERBS, TENSES, PRONOUNS, TENSE_NAMES, QUESTION_REGISTRY
+from question_types import (QUESTION_TYPE_CLASSES, Lexicon, QuestionRegistry, QuestionType,
+                            parse_weights, register)
+
+
+class TestQuestionTypes(unittest.TestCase):
+    """Test the question type classes and registry"""
+
+    def setUp(self):
+        self.lexicon = Lexicon(VERBS, TENSES, PRONOUNS, TENSE_NAMES)
+        self.rng = random.Random(3)
+
+    def test_slots(self):
+        """Test that question types carry no per-instance dict"""
+        for question_type in QUESTION_REGISTRY.types.values():
+            self.assertFalse(hasattr(question_type, '__dict__'))
+
+    def test_generate_for_cell(self):
+        """Test that every type honours a given cell and offers its answer"""
+        registry = QuestionRegistry(self.lexicon)
+        for name in registry.names:
+            for _ in range(50):
+                question = registry.get(name).generate(self.rng, ('ser', 'presente', 'yo'))
+                self.assertEqual((question['question_type'], question['verb'], question['tense']),
+                                 (name, 'ser', 'presente'))
+                self.assertIn(question['correct_answer'], question['options'])
+                self.assertEqual(len(question['options']), len(set(question['options'])))
+                self.assertLessEqual(len(question['options']), 4)
+
+    def test_distractors_are_wrong(self):
+        """Test that conjugation and infinitive distractors never repeat the answer"""
+        registry = QuestionRegistry(self.lexicon)
+        for name in ('conjugation', 'identify-infinitive'):
+            for _ in range(200):
+                question = registry.get(name).generate(self.rng)
+                self.assertEqual(question['options'].count(question['correct_answer']), 1)
+                self.assertEqual(len(question['options']), 4)
+
+    def test_weights(self):
+        """Test weighted selection and disabled types"""
+        registry = QuestionRegistry(self.lexicon, parse_weights('conjugation=3, identify-tense=1,'
+                                                                'identify-pronoun=0,identify-infinitive=0'))
+        self.assertEqual(registry.names, ['identify-tense', 'conjugation'])
+        counts = Counter(registry.choose(self.rng) for _ in range(4000))
+        self.assertAlmostEqual(counts['conjugation'] / 4000, 0.75, delta=0.03)
+        # A disabled type still grades answers to questions issued before
+        self.assertIsNotNone(registry.get('identify-pronoun'))
+        with self.assertRaises(ValueError):
+            QuestionRegistry(self.lexicon, {name: 0 for name in QUESTION_TYPE_CLASSES})
+
+    def test_grade_and_hint(self):
+        """Test grading with shared forms and type-specific hints"""
+        pronoun = QUESTION_REGISTRY.get('identify-pronoun')
+        data = {'answer': 'Él/ella', 'correct_answer': 'yo', 'pronoun': 'yo',
+                'all_correct_answers': ['yo', 'él/ella']}
+        self.assertTrue(pronoun.grade(data))
+        self.assertIn('share the same form', pronoun.hint(data))
+        conjugation = QUESTION_REGISTRY.get('conjugation')
+        self.assertFalse(conjugation.grade({'answer': 'hablo', 'correct_answer': 'habla'}))
+        self.assertIn("'habl'", conjugation.hint({'verb': 'hablar', 'tense': 'presente', 'pronoun': 'yo'}))
+        self.assertIsNone(conjugation.hint({'verb': 'hablar'}))
+
+    def test_plugin_type(self):
+        """Test that a registered plugin type is generated alongside the built-ins"""
+
+        @register
+        class EchoQuestion(QuestionType):
+            __slots__ = ()
+            name = 'echo'
+
+            def generate(self, rng, cell=None):
+                verb, tense, pronoun = cell or self.lexicon.random_cell(rng)
+                form = self.lexicon.verbs[verb][tense][pronoun]
+                return {'question_type': self.name, 'verb': verb, 'tense': tense, 'pronoun': pronoun,
+                        'options': [form], 'correct_answer': form}
+
+        try:
+            registry = QuestionRegistry(self.lexicon, {'echo': 10})
+            self.assertIn('echo', registry.names)
+            self.assertEqual(registry.get(registry.choose(random.Random(0))).name, 'echo')
+        finally:
+            del QUESTION_TYPE_CLASSES['echo']
+
+
+if __name__ == '__main__':
+    unittest.main()
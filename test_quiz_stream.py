@@ -0,0 +1,197 @@
+import unittest
+import asyncio
+import json
+import threading
+import app as app_module
+from app import app, VERBS
+from quiz_stream import QuizStream, QuizStreams, format_event
+from state import MemoryBackend
+
+
+def read_event(response):
+    """Read the next non-keepalive SSE message from a streamed response"""
+    for chunk in response.response:
+        text = chunk.decode('utf-8') if isinstance(chunk, bytes) else chunk
+        if text.startswith(':'):
+            continue
+        lines = text.strip().split('\n')
+        event = lines[0][len('event: '):]
+        data = json.loads(lines[1][len('data: '):])
+        return event, data
+    return None, None
+
+
+class TestQuizStream(unittest.TestCase):
+    """Test the server-sent-event stream object"""
+
+    def test_format_event(self):
+        """Test SSE message encoding"""
+        self.assertEqual(format_event('result', {'a': 'é'}), 'event: result\ndata: {"a": "é"}\n\n')
+
+    def test_round_expiry(self):
+        """Test that a timed round expires and an open-ended one does not"""
+        backend = MemoryBackend()
+        self.assertFalse(QuizStream(backend, 'a').expired())
+        stream = QuizStream(backend, 'b', round_seconds=5)
+        self.assertFalse(stream.expired())
+        self.assertTrue(stream.expired(now=stream.started + 5))
+
+    def test_async_events_keep_state_calls_off_the_loop(self):
+        """Test that the async stream only touches the state backend from worker threads"""
+        class Backend(MemoryBackend):
+            def pop(self, *args, **kwargs):
+                callers.add(threading.get_ident())
+                return super().pop(*args, **kwargs)
+
+            def get(self, *args, **kwargs):
+                callers.add(threading.get_ident())
+                return super().get(*args, **kwargs)
+
+            def set_json(self, *args, **kwargs):
+                callers.add(threading.get_ident())
+                return super().set_json(*args, **kwargs)
+
+        callers = set()
+
+        async def run_round():
+            loop_thread = threading.get_ident()
+            stream = QuizStream(Backend(), 'c', round_seconds=0.3)
+            stream.push('result', {'n': 1})
+            messages = [message async for message in stream.async_events({'q': 1}, poll_interval=0.05)]
+            return loop_thread, messages
+
+        loop_thread, messages = asyncio.run(run_round())
+        self.assertEqual([message.split('\n')[0] for message in messages],
+                         ['event: ready', 'event: result', 'event: round-end'])
+        self.assertTrue(callers)
+        self.assertNotIn(loop_thread, callers)
+
+    def test_push_on_this_worker_wakes_stream(self):
+        """Test that a local push wakes an idle async stream without waiting for a poll"""
+        class Backend(MemoryBackend):
+            def pop(self, *args, **kwargs):
+                pops.append(1)
+                return super().pop(*args, **kwargs)
+
+        pops = []
+        streams = QuizStreams(Backend())
+
+        async def answer_later():
+            stream = streams.open()
+            events = stream.async_events({'q': 1}, poll_interval=5, max_poll_interval=5)
+            await events.__anext__()
+            loop = asyncio.get_running_loop()
+            loop.call_later(0.1, lambda: threading.Thread(
+                target=streams.get(stream.id).push, args=('result', {'n': 1})).start())
+            started = loop.time()
+            message = await asyncio.wait_for(events.__anext__(), 2)
+            waited = loop.time() - started
+            stream.closed = True
+            streams.notify(stream.id)
+            await events.aclose()
+            return message, waited
+
+        message, waited = asyncio.run(answer_later())
+        self.assertEqual(message, format_event('result', {'n': 1}))
+        self.assertLess(waited, 1)
+        self.assertEqual(len(pops), 2)
+        self.assertEqual(streams._wakeups, {})
+
+    def test_idle_stream_backs_off(self):
+        """Test that an idle async stream polls less and less often"""
+        class Backend(MemoryBackend):
+            def pop(self, *args, **kwargs):
+                pops.append(1)
+                return super().pop(*args, **kwargs)
+
+        pops = []
+
+        async def idle_round():
+            stream = QuizStream(Backend(), 'd', round_seconds=1)
+            return [message async for message in stream.async_events(
+                {'q': 1}, poll_interval=0.05, max_poll_interval=0.4)]
+
+        messages = asyncio.run(idle_round())
+        self.assertEqual(messages[-1].split('\n')[0], 'event: round-end')
+        # 0.05 + 0.1 + 0.2 + 0.4 + 0.4 ... rather than twenty checks at 0.05
+        self.assertLessEqual(len(pops), 8)
+
+    def test_answer_from_another_worker(self):
+        """Test that a result pushed by one worker reaches the stream held by another"""
+        backend = MemoryBackend()
+        held = QuizStreams(backend).open()
+        events = held.events({'verb': 'ser'})
+        self.assertTrue(next(events).startswith('event: ready'))
+
+        other = QuizStreams(backend).get(held.id)
+        self.assertEqual(other.question, {'verb': 'ser'})
+        other.record(True)
+        other.push('result', other.stats())
+        self.assertEqual(next(events), format_event('result', {'answered': 1, 'correct': 1}))
+
+        QuizStreams(backend).close(held.id)
+        self.assertIsNone(QuizStreams(backend).get(held.id))
+
+
+class TestQuizStreamRoutes(unittest.TestCase):
+    """Test the streaming quiz routes"""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def test_answer_pushes_result_and_next_question(self):
+        """Test that one answer yields grading plus the next question in one event"""
+        response = self.client.get('/api/quiz/stream', buffered=False)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        event, ready = read_event(response)
+        self.assertEqual(event, 'ready')
+        question = ready['question']
+        self.assertIn(question['verb'], VERBS)
+
+        answer = self.client.post(f"/api/quiz/{ready['stream_id']}/answer",
+                                  json={'answer': question['correct_answer']})
+        self.assertEqual(answer.status_code, 204)
+        self.assertEqual(answer.data, b'')
+
+        event, data = read_event(response)
+        self.assertEqual(event, 'result')
+        self.assertTrue(data['result']['correct'])
+        self.assertIn('tense_description', data['result'])
+        self.assertIn(data['question']['verb'], VERBS)
+        self.assertEqual(data['stats'], {'answered': 1, 'correct': 1})
+
+        # A wrong answer is graded against the question the server issued
+        self.client.post(f"/api/quiz/{ready['stream_id']}/answer", json={'answer': 'nope'})
+        event, data = read_event(response)
+        self.assertFalse(data['result']['correct'])
+        self.assertEqual(data['stats'], {'answered': 2, 'correct': 1})
+        response.close()
+
+    def test_timed_round_ends(self):
+        """Test that a timed round is closed by the server with a summary"""
+        response = self.client.get('/api/quiz/stream?round=1', buffered=False)
+        event, ready = read_event(response)
+        self.assertEqual(ready['round_seconds'], 1)
+        event, data = read_event(response)
+        self.assertEqual(event, 'round-end')
+        self.assertEqual(data, {'answered': 0, 'correct': 0, 'seconds': 1})
+        self.assertEqual(read_event(response), (None, None))
+        self.assertIsNone(app_module.QUIZ_STREAMS.get(ready['stream_id']))
+
+        late = self.client.post(f"/api/quiz/{ready['stream_id']}/answer", json={'answer': 'x'})
+        self.assertEqual(late.status_code, 404)
+
+    def test_unknown_stream(self):
+        """Test answering an unknown stream"""
+        response = self.client.post('/api/quiz/nope/answer', json={'answer': 'x'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_invalid_round_length(self):
+        """Test that absurd round lengths are rejected"""
+        self.assertEqual(self.client.get('/api/quiz/stream?round=0').status_code, 400)
+        self.assertEqual(self.client.get('/api/quiz/stream?round=100000').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,203 @@
+import unittest
+import app as app_module
+from app import app
+from rate_limit import TokenBucket, AdmissionController, retry_after_header
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Test the token bucket"""
+
+    def test_burst_then_refill(self):
+        """Test that a bucket allows a burst and then refills at its rate"""
+        bucket = TokenBucket(rate=2, burst=3, now=0.0)
+        self.assertEqual([bucket.take(now=0.0) for _ in range(3)], [0, 0, 0])
+        self.assertAlmostEqual(bucket.take(now=0.0), 0.5)
+        self.assertEqual(bucket.take(now=0.5), 0)
+
+    def test_never_exceeds_burst(self):
+        """Test that an idle bucket caps at its burst size"""
+        bucket = TokenBucket(rate=10, burst=2, now=0.0)
+        bucket.take(now=100.0)
+        bucket.take(now=100.0)
+        self.assertGreater(bucket.take(now=100.0), 0)
+
+
+class TestAdmissionController(unittest.TestCase):
+    """Test admission decisions and counters"""
+
+    def test_unlimited_by_default(self):
+        """Test that a controller without limits admits everything"""
+        controller = AdmissionController()
+        for _ in range(100):
+            self.assertIsNone(controller.admit('a'))
+            controller.release()
+        self.assertEqual(controller.stats()['admitted'], 100)
+
+    def test_per_client_limit(self):
+        """Test that one client is limited without affecting others"""
+        controller = AdmissionController(client_rate=1, client_burst=2)
+        self.assertIsNone(controller.admit('a'))
+        self.assertIsNone(controller.admit('a'))
+        status, retry_after = controller.admit('a')
+        self.assertEqual(status, 429)
+        self.assertGreater(retry_after, 0)
+        self.assertIsNone(controller.admit('b'))
+        self.assertEqual(controller.stats()['rejected_client'], 1)
+
+    def test_global_limit(self):
+        """Test that the global bucket sheds load with 503"""
+        controller = AdmissionController(global_rate=1, global_burst=1)
+        self.assertIsNone(controller.admit('a'))
+        self.assertEqual(controller.admit('b')[0], 503)
+        self.assertEqual(controller.stats()['rejected_global'], 1)
+
+    def test_fractional_rate(self):
+        """Test that a rate below one per second without a burst still admits requests"""
+        controller = AdmissionController(client_rate=0.5, global_rate=0.25)
+        self.assertIsNone(controller.admit('a'))
+        status, retry_after = controller.admit('b')
+        self.assertEqual(status, 503)
+        self.assertAlmostEqual(retry_after, 4, places=2)
+        controller.global_bucket.updated -= 4
+        self.assertIsNone(controller.admit('b'))
+        controller.global_bucket.updated -= 4
+        status, retry_after = controller.admit('a')
+        self.assertEqual(status, 429)
+        self.assertAlmostEqual(retry_after, 2, places=2)
+        controller.clients['a'].updated -= 2
+        self.assertIsNone(controller.admit('a'))
+
+    def test_throttled_client_spares_global_capacity(self):
+        """Test that a client hammering past its own limit does not starve other clients"""
+        controller = AdmissionController(client_rate=0.001, client_burst=5, global_rate=0.001, global_burst=20)
+        for i in range(15):
+            for _ in range(100):
+                if controller.admit('greedy') is None:
+                    controller.release()
+            self.assertIsNone(controller.admit(f'client-{i}'))
+            controller.release()
+        stats = controller.stats()
+        self.assertEqual(stats['admitted'], 20)
+        self.assertEqual(stats['rejected_global'], 0)
+        self.assertEqual(stats['rejected_client'], 1495)
+
+    def test_global_rejection_keeps_client_token(self):
+        """Test that a request shed by the global bucket does not count against its client"""
+        controller = AdmissionController(client_rate=0.001, client_burst=1, global_rate=0.001, global_burst=1)
+        self.assertIsNone(controller.admit('a'))
+        self.assertEqual(controller.admit('b')[0], 503)
+        controller.global_bucket.tokens = 1
+        self.assertIsNone(controller.admit('b'))
+
+    def test_charge_extra_cost(self):
+        """Test that a batch is charged per item, at most one burst"""
+        controller = AdmissionController(client_rate=0.001, client_burst=10)
+        self.assertIsNone(controller.admit('a'))
+        self.assertIsNone(controller.charge('a', 4))
+        status, retry_after = controller.charge('a', 6)
+        self.assertEqual(status, 429)
+        self.assertGreater(retry_after, 0)
+        self.assertIsNone(controller.charge('a', 5))
+        self.assertEqual(controller.admit('a')[0], 429)
+        controller.clients['b'] = TokenBucket(0.001, 10)
+        self.assertIsNone(controller.charge('b', 100))
+        self.assertIsNone(controller.charge('a', 0))
+
+    def test_concurrency_cap(self):
+        """Test that in-flight requests over the cap are rejected until released"""
+        controller = AdmissionController(max_in_flight=2)
+        self.assertIsNone(controller.admit('a'))
+        self.assertIsNone(controller.admit('b'))
+        self.assertEqual(controller.admit('c'), (503, 1))
+        controller.release()
+        self.assertIsNone(controller.admit('c'))
+        self.assertEqual(controller.stats()['in_flight'], 2)
+
+    def test_rejections_release_in_flight(self):
+        """Test that rejected requests do not leak concurrency slots"""
+        controller = AdmissionController(client_rate=1, client_burst=1, max_in_flight=5)
+        controller.admit('a')
+        for _ in range(10):
+            controller.admit('a')
+        self.assertEqual(controller.stats()['in_flight'], 1)
+
+    def test_idle_clients_evicted(self):
+        """Test that the client table stays bounded"""
+        controller = AdmissionController(client_rate=1000, client_burst=1, max_clients=10)
+        for i in range(50):
+            controller.admit(f'client-{i}')
+            controller.release()
+        self.assertLessEqual(controller.stats()['tracked_clients'], 11)
+
+    def test_retry_after_header(self):
+        """Test Retry-After formatting"""
+        self.assertEqual(retry_after_header(0.01), '1')
+        self.assertEqual(retry_after_header(2.2), '3')
+
+
+class TestAdmissionRoutes(unittest.TestCase):
+    """Test load shedding on the API routes"""
+
+    def setUp(self):
+        self.original = app_module.ADMISSION
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def tearDown(self):
+        app_module.ADMISSION = self.original
+
+    def test_rate_limited_question_returns_429(self):
+        """Test that /api/question answers 429 with Retry-After over the limit"""
+        app_module.ADMISSION = AdmissionController(client_rate=0.5, client_burst=1)
+        self.assertEqual(self.client.get('/api/question').status_code, 200)
+        response = self.client.get('/api/question')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response.headers)
+        self.assertGreaterEqual(int(response.headers['Retry-After']), 1)
+
+    def test_overload_check_returns_503(self):
+        """Test that /api/check is shed with 503 under global overload"""
+        app_module.ADMISSION = AdmissionController(global_rate=0.5, global_burst=1)
+        payload = {'answer': 'soy', 'correct_answer': 'soy'}
+        self.assertEqual(self.client.post('/api/check', json=payload).status_code, 200)
+        response = self.client.post('/api/check', json=payload)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.get_json()['error'], 'Server busy')
+
+    def test_check_batch_charged_per_answer(self):
+        """Test that /api/check/batch is limited and costs one request per answer"""
+        app_module.ADMISSION = AdmissionController(client_rate=0.001, client_burst=5)
+        answers = [{'answer': 'soy', 'correct_answer': 'soy'}] * 3
+        self.assertEqual(self.client.post('/api/check/batch', json=answers).status_code, 200)
+        response = self.client.post('/api/check/batch', json=answers)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response.headers)
+        self.assertEqual(self.client.post('/api/check', json=answers[0]).status_code, 200)
+        self.assertEqual(self.client.post('/api/check', json=answers[0]).status_code, 429)
+        self.assertEqual(app_module.ADMISSION.stats()['in_flight'], 0)
+
+    def test_in_flight_released_after_request(self):
+        """Test that finished requests give back their concurrency slot"""
+        app_module.ADMISSION = AdmissionController(max_in_flight=1)
+        for _ in range(5):
+            self.assertEqual(self.client.get('/api/question').status_code, 200)
+        self.assertEqual(app_module.ADMISSION.stats()['in_flight'], 0)
+
+    def test_index_not_limited(self):
+        """Test that only the API routes are limited"""
+        app_module.ADMISSION = AdmissionController(global_rate=0.001, global_burst=1)
+        self.client.get('/api/question')
+        self.assertEqual(self.client.get('/').status_code, 200)
+
+    def test_metrics_expose_admission_counters(self):
+        """Test that limiter counters appear in /api/metrics"""
+        app_module.ADMISSION = AdmissionController(client_rate=0.5, client_burst=1)
+        self.client.get('/api/question')
+        self.client.get('/api/question')
+        data = self.client.get('/api/metrics').get_json()
+        self.assertEqual(data['admission']['admitted'], 1)
+        self.assertEqual(data['admission']['rejected_client'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import app as app_module
+from analytics import ARTIFACT_VERSION
+from app import app, VERBS, TENSES, PRONOUNS, IRREGULAR_HINTS
+
+
+class TestReferenceRoutes(unittest.TestCase):
+    """Test the cached conjugation reference endpoints"""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def test_verb_table(self):
+        """Test the full 10x6 table with gloss, type and hint"""
+        response = self.client.get('/api/verb/ser')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['english'], VERBS['ser']['english'])
+        self.assertEqual(data['type'], 'irregular')
+        self.assertEqual(data['hint'], IRREGULAR_HINTS['ser'])
+        self.assertEqual(data['pronouns'], PRONOUNS)
+        self.assertEqual([t['tense'] for t in data['tenses']], TENSES)
+        for tense in data['tenses']:
+            self.assertEqual(tense['forms'], [VERBS['ser'][tense['tense']][p] for p in PRONOUNS])
+
+    def test_every_verb_has_a_table(self):
+        """Test that every verb is served, with no hint for regular verbs"""
+        for verb, verb_data in VERBS.items():
+            with self.subTest(verb=verb):
+                data = json.loads(self.client.get(f'/api/verb/{verb}').data)
+                self.assertEqual(data['infinitive'], verb)
+                if verb not in IRREGULAR_HINTS:
+                    self.assertIsNone(data['hint'])
+
+    def test_lookup_is_case_insensitive(self):
+        """Test that infinitives are normalized"""
+        self.assertEqual(self.client.get('/api/verb/SER').status_code, 200)
+
+    def test_unknown_verb(self):
+        """Test a 404 for verbs we do not have"""
+        self.assertEqual(self.client.get('/api/verb/blorp').status_code, 404)
+
+    def test_index(self):
+        """Test the verb index"""
+        data = json.loads(self.client.get('/api/verbs').data)
+        self.assertEqual(len(data['verbs']), len(VERBS))
+        self.assertEqual([t['tense'] for t in data['tenses']], TENSES)
+        self.assertEqual(data['pronouns'], PRONOUNS)
+
+    def test_etag_and_not_modified(self):
+        """Test strong ETags and 304 responses"""
+        for url in ('/api/verbs', '/api/verb/hablar'):
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                etag = first.headers['ETag']
+                self.assertTrue(etag.startswith('"'))
+                self.assertIn('max-age', first.headers['Cache-Control'])
+                second = self.client.get(url, headers={'If-None-Match': etag})
+                self.assertEqual(second.status_code, 304)
+                self.assertEqual(second.data, b'')
+                self.assertEqual(second.headers['ETag'], etag)
+                self.assertEqual(self.client.get(url, headers={'If-None-Match': '"stale"'}).status_code, 200)
+
+    def test_payloads_are_preserialized(self):
+        """Test that repeated requests serve the same bytes object"""
+        first = app_module.REFERENCE.table('ser')
+        self.client.get('/api/verb/ser')
+        self.assertIs(app_module.REFERENCE.table('ser'), first)
+
+
+class TestVerbReload(unittest.TestCase):
+    """Test that derived caches are invalidated only when the data changes"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.original_path = app_module.VERBS_PATH
+        app_module.VERBS_PATH = os.path.join(self.tmpdir, 'verbs.json')
+        shutil.copy(self.original_path, app_module.VERBS_PATH)
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def tearDown(self):
+        app_module.VERBS_PATH = self.original_path
+        app_module.reload_verbs(force=True)
+        shutil.rmtree(self.tmpdir)
+
+    def test_reload_only_on_change(self):
+        """Test that an unchanged file keeps the cache and a changed one rebuilds it"""
+        app_module.reload_verbs(force=True)
+        reference = app_module.REFERENCE
+        self.assertFalse(app_module.reload_verbs())
+        self.assertIs(app_module.REFERENCE, reference)
+
+        etag = self.client.get('/api/verb/ser').headers['ETag']
+        with open(app_module.VERBS_PATH, encoding='utf-8') as f:
+            verbs = json.load(f)
+        verbs['ser']['english'] = 'to exist'
+        with open(app_module.VERBS_PATH, 'w', encoding='utf-8') as f:
+            json.dump(verbs, f, ensure_ascii=False)
+        os.utime(app_module.VERBS_PATH, (0, app_module.VERBS_MTIME + 10))
+
+        self.assertTrue(app_module.reload_verbs())
+        response = self.client.get('/api/verb/ser', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['english'], 'to exist')
+        self.assertEqual(app_module.VERBS['ser']['english'], 'to exist')
+
+    def write_verbs(self, verbs):
+        with open(app_module.VERBS_PATH, 'w', encoding='utf-8') as f:
+            json.dump(verbs, f, ensure_ascii=False)
+        os.utime(app_module.VERBS_PATH, (0, app_module.VERBS_MTIME + 10))
+
+    def test_removed_verb_leaves_difficulty(self):
+        """Test that difficulty weighting is rebuilt without a verb removed on reload"""
+        artifact = os.path.join(self.tmpdir, 'difficulty.json')
+        with open(artifact, 'w', encoding='utf-8') as f:
+            json.dump({'version': ARTIFACT_VERSION, 'cells': {}}, f)
+        original = app_module.DIFFICULTY_PATH, app_module.DIFFICULTY
+        app_module.DIFFICULTY_PATH = artifact
+        try:
+            app_module.reload_verbs(force=True)
+            verbs = dict(app_module.VERBS)
+            del verbs['ser']
+            self.write_verbs(verbs)
+            self.assertTrue(app_module.reload_verbs())
+            self.assertNotIn('ser', {verb for verb, _, _ in app_module.DIFFICULTY.cells})
+            for _ in range(50):
+                self.assertEqual(self.client.get('/api/question').status_code, 200)
+        finally:
+            app_module.DIFFICULTY_PATH, app_module.DIFFICULTY = original
+
+    def test_readers_never_see_a_partial_reload(self):
+        """Test that the verbs are swapped whole and concurrent checks reload once"""
+        sizes = set()
+        done = threading.Event()
+
+        def read():
+            while not done.is_set():
+                sizes.add(len(app_module.VERBS))
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        try:
+            for _ in range(5):
+                app_module.reload_verbs(force=True)
+        finally:
+            done.set()
+            reader.join()
+        self.assertEqual(sizes, {len(VERBS)})
+
+        reloads = []
+        original = app_module.reload_verbs, app_module.VERBS_RELOAD_INTERVAL, app_module._next_reload_check
+        app_module.reload_verbs = lambda: reloads.append(threading.current_thread()) or time.sleep(0.05)
+        app_module.VERBS_RELOAD_INTERVAL, app_module._next_reload_check = 60, 0
+        try:
+            threads = [threading.Thread(target=app_module.check_verbs_changed) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            app_module.reload_verbs, app_module.VERBS_RELOAD_INTERVAL, app_module._next_reload_check = original
+        self.assertEqual(len(reloads), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+import time
+from app import app, VERBS, TENSES, PRONOUNS
+from search import SearchIndex, normalize
+
+
+class TestSearchIndex(unittest.TestCase):
+    """Test the prefix search index"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.index = SearchIndex(VERBS, TENSES, PRONOUNS)
+
+    def test_normalize(self):
+        """Test case and accent folding"""
+        self.assertEqual(normalize('  HABLÓ '), 'hablo')
+        self.assertEqual(normalize('Él'), 'el')
+
+    def test_infinitive_prefix_ranked_first(self):
+        """Test that infinitives outrank conjugated forms"""
+        results = self.index.search('habl')
+        self.assertEqual(results[0], {'match': 'hablar', 'kind': 'infinitive',
+                                      'verb': 'hablar', 'english': VERBS['hablar']['english']})
+        self.assertTrue(all(r['kind'] == 'form' for r in results[1:]))
+
+    def test_accent_insensitive(self):
+        """Test that accented and unaccented queries find the same forms"""
+        self.assertEqual(self.index.search('hablo'), self.index.search('habló'))
+        matches = {r['match'] for r in self.index.search('hablo')}
+        self.assertIn('habló', matches)
+        self.assertIn('hablo', matches)
+
+    def test_form_results_carry_cell(self):
+        """Test that form matches report their tense and pronoun"""
+        result = next(r for r in self.index.search('hablé') if r['match'] == 'hablé')
+        self.assertEqual(result['verb'], 'hablar')
+        self.assertEqual(VERBS['hablar'][result['tense']][result['pronoun']], 'hablé')
+
+    def test_english_gloss(self):
+        """Test gloss matches, including later words of the gloss"""
+        self.assertIn('ir', [r['verb'] for r in self.index.search('to go')])
+        self.assertIn('estar', [r['verb'] for r in self.index.search('location')])
+
+    def test_compound_forms_by_participle(self):
+        """Test that compound forms are found by their participle"""
+        matches = [r['match'] for r in self.index.search('hablado')]
+        self.assertIn('he hablado', matches)
+
+    def test_exact_match_first(self):
+        """Test that an exact match beats longer prefix matches"""
+        self.assertEqual(self.index.search('ser')[0]['match'], 'ser')
+
+    def test_limit_and_empty(self):
+        """Test the result limit and empty queries"""
+        self.assertEqual(len(self.index.search('h', limit=3)), 3)
+        self.assertEqual(self.index.search('   '), [])
+        self.assertEqual(self.index.search('zzzz'), [])
+
+    def test_matches_brute_force_ranking(self):
+        """Test that the bucketed lookup ranks exactly like a full scan"""
+        def brute_force(prefix, limit):
+            best = {}
+            for key, kind, text, verb, tense, pronoun in self.index.entries:
+                if key.startswith(prefix):
+                    rank = (key != prefix, kind, len(text), text)
+                    identity = (verb, kind, text)
+                    if identity not in best or rank < best[identity][0]:
+                        best[identity] = (rank, text, verb)
+            return [(text, verb) for _, text, verb in sorted(best.values())[:limit]]
+
+        for query in ('h', 'ha', 'hab', 'fu', 'to', 'ser', 'hablado', 'com', 'v'):
+            with self.subTest(query=query):
+                got = [(r['match'], r['verb']) for r in self.index.search(query, 20)]
+                self.assertEqual(got, brute_force(normalize(query), 20))
+
+    def test_fast_on_large_lexicon(self):
+        """Test per-keystroke latency with thousands of verbs and a quarter million keys"""
+        large = {f'{verb}{i}': data for i in range(60) for verb, data in VERBS.items()}
+        index = SearchIndex(large, TENSES, PRONOUNS)
+        queries = ['h', 'ha', 'hab', 'habl', 'hablar1', 'com', 'est', 'to b', 'fui', 'hablado']
+        index.search('warm-up')
+        start = time.perf_counter()
+        for _ in range(20):
+            for query in queries:
+                index.search(query)
+        per_query = (time.perf_counter() - start) / (20 * len(queries))
+        self.assertLess(per_query, 0.001)
+
+
+class TestSearchRoute(unittest.TestCase):
+    """Test the /api/search endpoint"""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def test_search_route(self):
+        """Test the search response shape"""
+        data = self.client.get('/api/search?q=tien&limit=3').get_json()
+        self.assertEqual(data['query'], 'tien')
+        self.assertLessEqual(len(data['results']), 3)
+        self.assertTrue(all(r['verb'] == 'tener' for r in data['results']))
+
+    def test_empty_query(self):
+        """Test that an empty query returns no results"""
+        self.assertEqual(self.client.get('/api/search').get_json()['results'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+import random
+import secrets
+import app as app_module
+from app import app, VERBS, TENSES, PRONOUNS
+from session_sampler import Permutation, SessionSampler
+from state import MemoryBackend
+
+
+class TestSessionSampler(unittest.TestCase):
+    """Test no-repeat session walks over the cell space"""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.verb_types = {verb: verb_data['type'] for verb, verb_data in VERBS.items()}
+        self.sampler = SessionSampler(self.verb_types, TENSES, PRONOUNS, MemoryBackend())
+
+    def test_permutation_is_bijection(self):
+        """Test that every size and key gives a permutation of range(size)"""
+        for size in (1, 2, 3, 4, 5, 17, 64, 65, 1000):
+            for key in ('a', 'b'):
+                permutation = Permutation(size, key)
+                self.assertEqual(sorted(permutation[i] for i in range(size)), list(range(size)))
+        self.assertNotEqual([Permutation(100, 'a')[i] for i in range(100)],
+                            [Permutation(100, 'b')[i] for i in range(100)])
+
+    def test_walk_covers_space_without_repeats(self):
+        """Test that a session draws every cell once, spreading verbs out"""
+        space = self.sampler.full
+        cells = [self.sampler.draw(None, 'session-1', random) for _ in range(space.size)]
+        self.assertEqual(len(set(cells)), space.size)
+        for start in range(0, space.size, len(VERBS)):
+            self.assertEqual(len({cell[0] for cell in cells[start:start + len(VERBS)]}), len(VERBS))
+        # The next pass is a new order
+        self.assertNotEqual(self.sampler.draw(None, 'session-1', random), cells[0])
+
+    def test_filters(self):
+        """Test that filtered walks stay inside the filters, with their own cursor"""
+        space = self.sampler.parse({'tense': 'futuro, presente', 'verb_type': 'irregular', 'pronoun': 'yo'})
+        cells = [self.sampler.draw(space, 'session-1', random) for _ in range(space.size)]
+        self.assertEqual(len(set(cells)), space.size)
+        for verb, tense, pronoun in cells:
+            self.assertEqual(self.verb_types[verb], 'irregular')
+            self.assertIn(tense, ('presente', 'futuro'))
+            self.assertEqual(pronoun, 'yo')
+        self.assertIsNone(self.sampler.parse({}))
+        for args in ({'tense': 'nope'}, {'pronoun': 'usted'}, {'verb_type': 'weird'}):
+            with self.assertRaises(ValueError):
+                self.sampler.parse(args)
+
+    def test_workers_share_cursor(self):
+        """Test that samplers over one state backend continue the same walk"""
+        state = MemoryBackend()
+        workers = [SessionSampler(self.verb_types, TENSES, PRONOUNS, state) for _ in range(2)]
+        cells = [workers[i % 2].draw(None, 'session-1', random) for i in range(200)]
+        alone = SessionSampler(self.verb_types, TENSES, PRONOUNS, MemoryBackend())
+        self.assertEqual(cells, [alone.draw(None, 'session-1', random) for _ in range(200)])
+
+    def test_question_endpoint(self):
+        """Test that a 20-question session repeats no verb and honours filters"""
+        session = secrets.token_hex(8)
+        cells = set()
+        for _ in range(20):
+            question = self.client.get(f'/api/question?session={session}').get_json()
+            cells.add((question['verb'], question['tense'], question['pronoun']))
+        self.assertEqual(len({cell[0] for cell in cells}), 20)
+        for _ in range(10):
+            question = self.client.get(f'/api/question?tense=futuro&verb_type=regular&session={session}').get_json()
+            self.assertEqual(question['tense'], 'futuro')
+            self.assertEqual(VERBS[question['verb']]['type'], 'regular')
+        for query in ('tense=nope', 'session=bad%20id', 'verb_type=weird'):
+            self.assertEqual(self.client.get(f'/api/question?{query}').status_code, 400)
+
+    def test_difficulty_weighting_wins(self):
+        """Test that difficulty weighting still picks cells for session requests"""
+        class Difficulty:
+            calls = 0
+
+            def choose(self, rng):
+                self.calls += 1
+                return 'hablar', 'presente', 'yo'
+
+        original = app_module.DIFFICULTY, app_module.QUESTION_POOL
+        app_module.DIFFICULTY, app_module.QUESTION_POOL = Difficulty(), None
+        try:
+            session = secrets.token_hex(8)
+            for _ in range(5):
+                question = self.client.get(f'/api/question?session={session}').get_json()
+                self.assertEqual(question['verb'], 'hablar')
+            self.assertEqual(app_module.DIFFICULTY.calls, 5)
+        finally:
+            app_module.DIFFICULTY, app_module.QUESTION_POOL = original
+        expected = b'data-session-walks="1"' if app_module.SESSION_WALKS else b'data-session-walks=""'
+        self.assertIn(expected, self.client.get('/').data)
+
+    def test_default_config_session_has_no_repeats(self):
+        """Test that with the shipped defaults (pool on) the page walks sessions without repeats"""
+        self.assertIsNotNone(app_module.QUESTION_POOL)
+        self.assertIn(b'data-session-walks="1"', self.client.get('/').data)
+        session = secrets.token_hex(8)
+        cells = set()
+        for _ in range(20):
+            question = self.client.get(f'/api/question?session={session}').get_json()
+            cells.add((question['verb'], question['tense'], question['pronoun']))
+        self.assertEqual(len(cells), 20)
+
+    def test_adaptive_tense_narrows_filters(self):
+        """Test that the adaptive tense choice is kept inside the filters"""
+        narrowed = self.sampler.narrow(self.sampler.parse({'tense': 'futuro,presente'}), 'futuro')
+        self.assertEqual(narrowed.tenses, ('futuro',))
+        outside = self.sampler.narrow(self.sampler.parse({'tense': 'presente'}), 'futuro')
+        self.assertEqual(outside.tenses, ('presente',))
+        self.assertIs(app_module.SAMPLER.narrow(None, None), app_module.SAMPLER.full)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,397 @@
+import unittest
+import os
+import shutil
+import socketserver
+import tempfile
+import threading
+import time
+from classroom import ClassroomStore
+from state import MemoryBackend, RedisBackend, RedisError, SQLiteBackend, SQLITE_MAX_POLL_INTERVAL, create_backend
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    """Speaks enough RESP2 to serve RedisBackend, storing data in a MemoryBackend"""
+
+    def handle(self):
+        self.watched = {}
+        self.queued = None
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = [self.read_bulk() for _ in range(int(line[1:]))]
+            try:
+                reply = self.transaction(args[0].upper(), args[1:])
+            except Exception as exc:
+                self.wfile.write(b'-ERR %s\r\n' % str(exc).encode())
+                continue
+            self.wfile.write(encode(reply))
+
+    def transaction(self, command, args):
+        """WATCH/MULTI/EXEC for this connection; other commands go to the server"""
+        data = self.server.data
+        if command == 'WATCH':
+            self.watched[args[0]] = data.get(args[0])
+            return True
+        if command == 'UNWATCH':
+            self.watched = {}
+            return True
+        if command == 'MULTI':
+            self.queued = []
+            return True
+        if command == 'EXEC':
+            queued, watched, self.queued, self.watched = self.queued, self.watched, None, {}
+            with data.lock:
+                if any(data.get(key) != value for key, value in watched.items()):
+                    return None
+                return [self.server.dispatch(*item) for item in queued]
+        if self.queued is not None:
+            self.queued.append((command, args))
+            return 'QUEUED'
+        return self.server.dispatch(command, args)
+
+    def read_bulk(self):
+        length = int(self.rfile.readline()[1:])
+        return self.rfile.read(length + 2)[:-2].decode('utf-8')
+
+
+def encode(reply):
+    if reply is True:
+        return b'+OK\r\n'
+    if reply is None:
+        return b'$-1\r\n'
+    if isinstance(reply, int):
+        return b':%d\r\n' % reply
+    if isinstance(reply, list):
+        return b'*%d\r\n' % len(reply) + b''.join(encode(item) for item in reply)
+    data = str(reply).encode('utf-8')
+    return b'$%d\r\n%s\r\n' % (len(data), data)
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeRedisHandler)
+        self.data = MemoryBackend()
+
+    def dispatch(self, command, args):
+        data = self.data
+        if command == 'GET':
+            return data.get(args[0])
+        if command == 'SET':
+            options = [arg.upper() for arg in args[2:]]
+            ttl = int(options[options.index('PX') + 1]) / 1000 if 'PX' in options else None
+            return True if data.set(args[0], args[1], ttl=ttl, nx='NX' in options) else None
+        if command == 'DEL':
+            data.delete(args[0])
+            return 1
+        if command == 'INCRBY':
+            return data.incr(args[0], int(args[1]))
+        if command == 'PEXPIRE':
+            data.expire(args[0], int(args[1]) / 1000)
+            return 1
+        if command == 'RPUSH':
+            data.push(args[0], args[1])
+            return 1
+        if command == 'LPOP':
+            return data.pop(args[0])
+        if command == 'BLPOP':
+            value = data.pop(args[0], timeout=float(args[1]))
+            return None if value is None else [args[0], value]
+        if command == 'ZINCRBY':
+            return repr(data.zincrby(args[0], args[2], float(args[1])))
+        if command == 'ZSCORE':
+            score = data.zscore(args[0], args[1])
+            return None if score is None else repr(score)
+        if command == 'ZREVRANGE':
+            top = data.ztop(args[0], int(args[2]) + 1)
+            return [item for member, score in top for item in (member, repr(score))]
+        if command == 'ZCARD':
+            return data.zcard(args[0])
+        raise ValueError(f'unknown command {command}')
+
+
+class BackendContract:
+    """Behaviour every state backend must share"""
+
+    def make_backend(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.backend = self.make_backend()
+
+    def tearDown(self):
+        self.backend.close()
+
+    def test_get_set_delete(self):
+        """Test plain keys and JSON values"""
+        backend = self.backend
+        self.assertIsNone(backend.get('missing'))
+        self.assertTrue(backend.set('a', 'uno'))
+        self.assertEqual(backend.get('a'), 'uno')
+        backend.set_json('j', {'verbo': 'comer', 'n': [1, 2]})
+        self.assertEqual(backend.get_json('j'), {'verbo': 'comer', 'n': [1, 2]})
+        backend.delete('a')
+        self.assertIsNone(backend.get('a'))
+
+    def test_set_nx(self):
+        """Test that nx only stores a missing key"""
+        self.assertTrue(self.backend.set('k', 'first', nx=True))
+        self.assertFalse(self.backend.set('k', 'second', nx=True))
+        self.assertEqual(self.backend.get('k'), 'first')
+
+    def test_ttl(self):
+        """Test that keys expire and can be refreshed"""
+        backend = self.backend
+        backend.set('short', 'x', ttl=0.05)
+        backend.set('kept', 'y', ttl=0.05)
+        backend.expire('kept', 60)
+        time.sleep(0.1)
+        self.assertIsNone(backend.get('short'))
+        self.assertEqual(backend.get('kept'), 'y')
+        self.assertTrue(backend.set('short', 'again', nx=True))
+
+    def test_sweep(self):
+        """Test that lists and sorted sets expire too, and a new write starts afresh"""
+        backend = self.backend
+        backend.set('kv', 'x', ttl=0.05)
+        backend.push('q', 'a')
+        backend.zincrby('z', 'ana', 1)
+        backend.zincrby('kept', 'ben', 1)
+        backend.expire('q', 0.05)
+        backend.expire('z', 0.05)
+        time.sleep(0.1)
+        backend.sweep()
+        self.assertIsNone(backend.get('kv'))
+        self.assertIsNone(backend.pop('q'))
+        self.assertEqual(backend.zcard('z'), 0)
+        self.assertEqual(backend.zcard('kept'), 1)
+        backend.push('q', 'b')
+        backend.sweep()
+        self.assertEqual(backend.pop('q'), 'b')
+
+    def test_compare_and_set(self):
+        """Test that a write only lands on the value it was computed from"""
+        backend = self.backend
+        self.assertTrue(backend.compare_and_set('c', None, 'one'))
+        self.assertFalse(backend.compare_and_set('c', None, 'two'))
+        self.assertFalse(backend.compare_and_set('c', 'stale', 'two'))
+        self.assertTrue(backend.compare_and_set('c', 'one', 'two', ttl=0.05))
+        self.assertEqual(backend.get('c'), 'two')
+        time.sleep(0.1)
+        self.assertTrue(backend.compare_and_set('c', None, 'three'))
+        self.assertEqual(backend.get('c'), 'three')
+
+    def test_incr(self):
+        """Test counters"""
+        self.assertEqual(self.backend.incr('n'), 1)
+        self.assertEqual(self.backend.incr('n', 5), 6)
+        self.assertEqual(self.backend.get('n'), '6')
+
+    def test_list_is_fifo(self):
+        """Test push/pop order and the empty case"""
+        backend = self.backend
+        self.assertIsNone(backend.pop('q'))
+        for value in ('a', 'b', 'c'):
+            backend.push('q', value)
+        self.assertEqual([backend.pop('q') for _ in range(3)], ['a', 'b', 'c'])
+        self.assertIsNone(backend.pop('q'))
+
+    def test_blocking_pop(self):
+        """Test that pop waits for a push from another thread"""
+        backend = self.backend
+        timer = threading.Timer(0.05, backend.push, args=('wait', 'hola'))
+        timer.start()
+        started = time.monotonic()
+        self.assertEqual(backend.pop('wait', timeout=5), 'hola')
+        self.assertLess(time.monotonic() - started, 2)
+        timer.join()
+        started = time.monotonic()
+        self.assertIsNone(backend.pop('wait', timeout=0.1))
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+
+    def test_sorted_set(self):
+        """Test scores, ranking and cardinality"""
+        backend = self.backend
+        self.assertEqual(backend.zincrby('z', 'ana', 10), 10)
+        backend.zincrby('z', 'ben', 30)
+        backend.zincrby('z', 'cruz', 20)
+        self.assertEqual(backend.zincrby('z', 'ana', 25), 35)
+        self.assertEqual(backend.ztop('z', 2), [('ana', 35), ('ben', 30)])
+        self.assertEqual(backend.zscore('z', 'cruz'), 20)
+        self.assertIsNone(backend.zscore('z', 'nadie'))
+        self.assertEqual(backend.zcard('z'), 3)
+        self.assertEqual(backend.ztop('empty', 5), [])
+
+    def test_concurrent_incr(self):
+        """Test that counters do not lose updates under threads"""
+        backend = self.backend
+
+        def work():
+            for _ in range(50):
+                backend.incr('shared')
+                backend.zincrby('zshared', 'm', 1)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(backend.get('shared'), '200')
+        self.assertEqual(backend.zscore('zshared', 'm'), 200)
+
+
+class TestMemoryBackend(BackendContract, unittest.TestCase):
+
+    def make_backend(self):
+        return MemoryBackend()
+
+
+class TestSQLiteBackend(BackendContract, unittest.TestCase):
+
+    def make_backend(self):
+        self.tmpdir = tempfile.mkdtemp()
+        return SQLiteBackend(os.path.join(self.tmpdir, 'state.db'))
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.tmpdir)
+
+    def test_first_use_from_many_threads(self):
+        """Test that threads opening connections to a new file at once all succeed"""
+        backend = SQLiteBackend(os.path.join(self.tmpdir, 'fresh', 'state.db'))
+        barrier = threading.Barrier(8)
+        errors = []
+
+        def work():
+            barrier.wait()
+            try:
+                backend.incr('n')
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                backend.close()
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(backend.get('n'), '8')
+        backend.close()
+
+    def test_periodic_sweep(self):
+        """Test that writes sweep expired rows that are never read again"""
+        backend = SQLiteBackend(self.backend.path, sweep_interval=0)
+        backend.set('gone', 'x', ttl=0.01)
+        backend.push('outbox', 'x')
+        backend.expire('outbox', 0.01)
+        time.sleep(0.05)
+        backend.set('other', 'y')
+        conn = backend._conn()
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM kv').fetchone()[0], 1)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM lists').fetchone()[0], 0)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM expiry').fetchone()[0], 0)
+        backend.close()
+
+    def test_idle_pop_backs_off(self):
+        """Test that a waiting pop checks less and less often, and a local push still wakes it at once"""
+        checks = []
+
+        class Counting(SQLiteBackend):
+            def _conn(self):
+                checks.append(1)
+                return super()._conn()
+
+        backend = Counting(self.backend.path)
+        self.assertIsNone(backend.pop('idle', timeout=1))
+        # 0.02, 0.04, ... up to 0.5 s apart, not fifty checks at 0.02
+        self.assertLessEqual(len(checks), 10)
+
+        timer = threading.Timer(0.35, backend.push, args=('idle', 'hola'))
+        timer.start()
+        started = time.monotonic()
+        self.assertEqual(backend.pop('idle', timeout=5), 'hola')
+        # Without the wakeup the next check would come at about 0.62 s
+        self.assertLess(time.monotonic() - started, 0.5)
+        timer.join()
+        backend.close()
+
+    def test_pop_sees_other_process_push(self):
+        """Test that a push through another backend on the file is found by polling"""
+        other = SQLiteBackend(self.backend.path)
+        timer = threading.Timer(0.3, other.push, args=('shared', 'x'))
+        timer.start()
+        started = time.monotonic()
+        self.assertEqual(self.backend.pop('shared', timeout=5), 'x')
+        self.assertLess(time.monotonic() - started, 0.3 + SQLITE_MAX_POLL_INTERVAL + 0.2)
+        timer.join()
+        other.close()
+
+    def test_shared_between_processes(self):
+        """Test that two backends on one file (two workers) see the same data"""
+        other = SQLiteBackend(self.backend.path)
+        self.backend.set('k', 'v')
+        self.backend.push('q', 'x')
+        self.assertEqual(other.get('k'), 'v')
+        self.assertEqual(other.pop('q'), 'x')
+        self.assertIsNone(self.backend.pop('q'))
+        other.close()
+
+
+class TestRedisBackend(BackendContract, unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FakeRedisServer()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def make_backend(self):
+        self.server.data = MemoryBackend()
+        host, port = self.server.server_address
+        return RedisBackend(host, port)
+
+    def test_error_reply(self):
+        """Test that server errors are raised"""
+        with self.assertRaises(RedisError):
+            self.backend.execute('FLUSHALL')
+
+    def test_classroom_over_redis(self):
+        """Test that two workers pointed at one server share a leaderboard"""
+        host, port = self.server.server_address
+        worker_a = ClassroomStore(self.backend, snapshot_ttl=0)
+        worker_b = ClassroomStore(RedisBackend(host, port), snapshot_ttl=0)
+        code = worker_a.create_class('Remota')['code']
+        student = worker_b.join(code, 'Ana')
+        worker_a.record_answer(code, student['student_id'], student['token'], True)
+        leader = worker_b.leaderboard(code)['leaders'][0]
+        self.assertEqual((leader['name'], leader['score'], leader['answered']), ('Ana', 10, 1))
+        worker_b.backend.close()
+
+
+class TestCreateBackend(unittest.TestCase):
+    """Test backend URLs"""
+
+    def test_urls(self):
+        """Test each scheme"""
+        self.assertIsInstance(create_backend('memory://'), MemoryBackend)
+        self.assertIsInstance(create_backend(None), MemoryBackend)
+        sqlite = create_backend('sqlite:////tmp/state.db')
+        self.assertEqual(sqlite.path, '/tmp/state.db')
+        self.assertEqual(create_backend('sqlite:///state.db').path, 'state.db')
+        redis = create_backend('redis://:secret@cache:6380/2')
+        self.assertEqual((redis.host, redis.port, redis.db, redis.password), ('cache', 6380, 2, 'secret'))
+        with self.assertRaises(ValueError):
+            create_backend('memcached://x')
+
+
+if __name__ == '__main__':
+    unittest.main()
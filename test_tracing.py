@@ -0,0 +1,136 @@
+import unittest
+import json
+import os
+import secrets
+import shutil
+import tempfile
+import app as app_module
+from app import app
+from answer_log import AnswerLog
+from test_asgi import call
+from tracing import MAX_SPANS, NOOP_SPAN, STATUS_ERROR, Tracer, span
+
+TRACEPARENT = '00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-{}'
+
+
+class TestTracing(unittest.TestCase):
+    """Test per-request spans and their OTLP/JSON export"""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'traces.jsonl')
+        self.original = app_module.TRACER
+        app_module.TRACER = self.tracer()
+
+    def tearDown(self):
+        app_module.TRACER.close()
+        app_module.TRACER = self.original
+        shutil.rmtree(self.tmpdir)
+
+    def tracer(self, sample_rate=1.0):
+        return Tracer(AnswerLog(self.path, flush_interval=0.05), sample_rate=sample_rate)
+
+    def traces(self):
+        """Spans per exported trace, keyed by name"""
+        app_module.TRACER.log.flush()
+        if not os.path.exists(self.path):
+            return []
+        traces = []
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                [resource] = json.loads(line)['resourceSpans']
+                self.assertEqual(resource['resource']['attributes'][0]['value'], {'stringValue': 'practiverbo'})
+                traces.append({s['name']: s for s in resource['scopeSpans'][0]['spans']})
+        return traces
+
+    def assert_children(self, spans, root_name, names):
+        root = spans[root_name]
+        self.assertEqual(spans.keys(), set(names) | {root_name})
+        for name in names:
+            self.assertEqual(spans[name]['traceId'], root['traceId'])
+            self.assertLessEqual(int(root['startTimeUnixNano']), int(spans[name]['startTimeUnixNano']))
+            self.assertLessEqual(int(spans[name]['endTimeUnixNano']), int(root['endTimeUnixNano']))
+
+    def test_question_and_check_phases(self):
+        """Test that each phase of a question and a wrong answer gets a span"""
+        question = self.client.get(f'/api/question?session={secrets.token_hex(8)}').json
+        self.client.post('/api/check', json=dict(question, answer='zzz'))
+        question_trace, check_trace = self.traces()
+        self.assert_children(question_trace, 'GET /api/question',
+                             ['question.filters', 'question.sample', 'question.build', 'question.log',
+                              'question.encode'])
+        root = question_trace['GET /api/question']
+        self.assertEqual(root['kind'], 2)
+        self.assertNotIn('parentSpanId', root)
+        self.assertIn({'key': 'http.response.status_code', 'value': {'intValue': '200'}}, root['attributes'])
+        self.assertEqual(question_trace['question.build']['parentSpanId'], root['spanId'])
+        self.assertEqual(len(root['traceId']), 32)
+        self.assertEqual(len(root['spanId']), 16)
+        self.assert_children(check_trace, 'POST /api/check',
+                             ['check.decode', 'check.grade', 'check.hint', 'check.record', 'check.encode'])
+        self.assertEqual(check_trace['check.hint']['parentSpanId'], check_trace['check.grade']['spanId'])
+        stats = self.client.get('/api/metrics').json['tracing']
+        self.assertEqual((stats['traces'], stats['spans'], stats['dropped_spans']), (2, 12, 0))
+
+    def test_sampling_and_traceparent(self):
+        """Test that the sample rate applies unless a traceparent decides"""
+        app_module.TRACER.close()
+        app_module.TRACER = self.tracer(sample_rate=0)
+        self.client.get('/api/verbs')
+        self.client.get('/api/verbs', headers={'traceparent': TRACEPARENT.format('00')})
+        self.assertIs(span('unsampled'), NOOP_SPAN)
+        self.client.get('/api/verbs', headers={'traceparent': TRACEPARENT.format('01')})
+        [spans] = self.traces()
+        root = spans['GET /api/verbs']
+        self.assertEqual(root['traceId'], '0af7651916cd43dd8448eb211c80319c')
+        self.assertEqual(root['parentSpanId'], 'b7ad6b7169203331')
+
+    def test_reload_is_traced(self):
+        """Test that a verb reload is one trace with a span per rebuilt structure"""
+        app_module.TRACER.close()
+        app_module.TRACER = self.tracer(sample_rate=0)
+        app_module.reload_verbs(force=True)
+        [spans] = self.traces()
+        self.assert_children(spans, 'verbs.reload', ['verbs.load', 'verbs.bundle', 'verbs.reference',
+                                                     'verbs.search', 'verbs.lexicon', 'verbs.sampler'])
+        self.assertEqual(spans['verbs.reload']['kind'], 1)
+
+    def test_errors_and_span_limit(self):
+        """Test that exceptions mark spans as failed and long traces are capped"""
+        tracer = app_module.TRACER
+        with self.assertRaises(KeyError):
+            with tracer.start('job'):
+                for _ in range(MAX_SPANS + 5):
+                    with span('step', n=1):
+                        pass
+                with span('lookup'):
+                    {}['missing']
+        [spans] = self.traces()
+        self.assertEqual(set(spans), {'job', 'step'})
+        self.assertEqual(spans['job']['status'], {'code': STATUS_ERROR, 'message': "KeyError: 'missing'"})
+        self.assertEqual(spans['job']['events'][0]['name'], 'exception')
+        self.assertEqual(spans['step']['attributes'], [{'key': 'n', 'value': {'intValue': '1'}}])
+        self.assertEqual(tracer.stats()['dropped_spans'], 6)
+        self.assertIs(span('outside'), NOOP_SPAN)
+
+    def test_asgi_spans_cross_threads(self):
+        """Test that spans opened in the ASGI thread pool join the request's trace"""
+        original = app_module.ADAPTIVE
+        app_module.ADAPTIVE = None
+        try:
+            status, _, _ = call('GET', '/api/question', query=f'session={secrets.token_hex(8)}'.encode(),
+                                headers=[('traceparent', TRACEPARENT.format('01'))])
+        finally:
+            app_module.ADAPTIVE = original
+        self.assertEqual(status, 200)
+        [spans] = self.traces()
+        root = spans['GET /api/question']
+        self.assertEqual(root['traceId'], '0af7651916cd43dd8448eb211c80319c')
+        self.assertIn({'key': 'http.response.status_code', 'value': {'intValue': '200'}}, root['attributes'])
+        self.assertEqual(spans['question.sample']['parentSpanId'], root['spanId'])
+
+
+if __name__ == '__main__':
+    unittest.main()
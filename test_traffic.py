@@ -0,0 +1,90 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import threading
+from werkzeug.serving import make_server
+import app as app_module
+from app import app
+from answer_log import AnswerLog
+from traffic import TrafficCapture, compare, load_capture, run_replay
+
+
+class TestTrafficCapture(unittest.TestCase):
+    """Test capturing sanitized traffic and replaying it"""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'requests.jsonl')
+        self.original = app_module.TRAFFIC_CAPTURE
+        app_module.TRAFFIC_CAPTURE = TrafficCapture(AnswerLog(self.path, flush_interval=0.05))
+
+    def tearDown(self):
+        app_module.TRAFFIC_CAPTURE.close()
+        app_module.TRAFFIC_CAPTURE = self.original
+        shutil.rmtree(self.tmpdir)
+
+    def capture_session(self, questions=5):
+        for _ in range(questions):
+            question = self.client.get('/api/question?learner=learner-secret-1').json
+            self.client.post('/api/check', json=dict(
+                question, answer=question['options'][0], learner='learner-secret-1',
+                classroom={'code': 'ABCDEF', 'student_id': 1, 'token': 'secret-token'}))
+        self.client.get('/api/metrics')
+        app_module.TRAFFIC_CAPTURE.log.flush()
+        app_module.TRAFFIC_CAPTURE.log.rotate()
+        return load_capture([self.tmpdir])
+
+    def test_capture_is_sanitized(self):
+        """Test that captures hold both routes and no learner ids or credentials"""
+        records = self.capture_session()
+        self.assertEqual(len(records), 10)
+        self.assertEqual({record['path'] for record in records}, {'/api/question', '/api/check'})
+        with open(os.path.join(self.tmpdir, os.listdir(self.tmpdir)[0]), 'rb') as f:
+            self.assertTrue(f.read(2) == b'\x1f\x8b')
+        raw = json.dumps(records)
+        self.assertNotIn('learner-secret-1', raw)
+        self.assertNotIn('secret-token', raw)
+        learners = {record['query'].get('learner') for record in records if record['path'] == '/api/question'}
+        self.assertEqual(len(learners), 1)
+        check = next(record for record in records if record['path'] == '/api/check')
+        self.assertNotIn('classroom', check['body'])
+        self.assertIn('correct', check['response'])
+
+    def test_replay_compares_builds(self):
+        """Test replaying a capture against two servers with no divergence"""
+        records = self.capture_session()
+        servers = [make_server('127.0.0.1', 0, app, threaded=True) for _ in range(2)]
+        threads = [threading.Thread(target=server.serve_forever, daemon=True) for server in servers]
+        for thread in threads:
+            thread.start()
+        try:
+            urls = [f'http://127.0.0.1:{server.server_port}' for server in servers]
+            report = run_replay(records, urls[0], urls[1], speed=0, concurrency=4)
+        finally:
+            for server in servers:
+                server.shutdown()
+        self.assertEqual(report['records'], 10)
+        self.assertEqual(report['comparison']['mismatches'], {'/api/question': 0, '/api/check': 0})
+        for run in report['runs'].values():
+            self.assertEqual(run['routes']['/api/check']['requests'], 5)
+            self.assertEqual(run['routes']['/api/check']['errors'], 0)
+        self.assertIn('p95_ms', report['latency_change']['/api/question'])
+
+    def test_divergence_detected(self):
+        """Test that a changed grading result or question shape is reported"""
+        records = [{'path': '/api/check', 'body': {}, 'response': {'correct': True}},
+                   {'path': '/api/question', 'response': {'question_type': 'conjugation', 'verb': 'ser'}}]
+        same = [(200, 0.01, {'correct': True}), (200, 0.01, {'question_type': 'conjugation', 'verb': 'ir'})]
+        self.assertEqual(compare(records, same)['mismatches'], {'/api/question': 0, '/api/check': 0})
+        changed = [(200, 0.01, {'correct': False}), (200, 0.01, {'question_type': 'conjugation'})]
+        result = compare(records, changed)
+        self.assertEqual(result['mismatches'], {'/api/question': 1, '/api/check': 1})
+        self.assertEqual(len(result['examples']), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,232 @@
+import unittest
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from app import app, build_question, VERBS, TENSES, PRONOUNS, TENSE_NAMES, VERB_BUNDLE, CLIENT_GENERATION
+from verb_bundle import build_bundle, decode_bundle, encode_bundle, write_bundle
+
+GENERATOR_JS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'generator.js')
+
+# Seeded generation with the browser generator, run under node
+NODE_PARITY_SCRIPT = """
+const { QuestionGenerator } = require(process.argv[1]);
+let seed = 12345;
+function rng() {
+    seed = (seed + 0x6D2B79F5) | 0;
+    let t = Math.imul(seed ^ (seed >>> 15), 1 | seed);
+    t = (t + Math.imul(t ^ (t >>> 7), 61 | t)) ^ t;
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+}
+let input = '';
+process.stdin.on('data', chunk => input += chunk);
+process.stdin.on('end', () => {
+    const generator = new QuestionGenerator(JSON.parse(input));
+    const questions = [];
+    for (let i = 0; i < 2000; i++) questions.push(generator.generate(rng));
+    process.stdout.write(JSON.stringify(questions));
+});
+"""
+
+# Cells drawn by the browser's session walk, run under node
+NODE_WALK_SCRIPT = """
+const { QuestionGenerator, SessionWalk } = require(process.argv[1]);
+const draws = Number(process.argv[2]);
+let input = '';
+process.stdin.on('data', chunk => input += chunk);
+process.stdin.on('end', () => {
+    const generator = new QuestionGenerator(JSON.parse(input));
+    const walk = new SessionWalk(generator);
+    const questions = [];
+    for (let i = 0; i < draws; i++) questions.push(generator.generate(Math.random, walk.next()));
+    process.stdout.write(JSON.stringify(questions));
+});
+"""
+
+
+def reference_fields(question):
+    """Fields of a question that are fully determined by its (type, verb, tense, pronoun)"""
+    verb_data = VERBS[question['verb']]
+    tense, pronoun = question['tense'], question['pronoun']
+    form = verb_data[tense][pronoun]
+    fields = {'english': verb_data['english']}
+    question_type = question['question_type']
+    if question_type == 'identify-tense':
+        fields.update(conjugated_form=form, correct_answer=TENSE_NAMES[tense])
+    elif question_type == 'identify-pronoun':
+        fields.update(conjugated_form=form, correct_answer=pronoun, tense_name=TENSE_NAMES[tense],
+                      all_correct_answers=[p for p in PRONOUNS if verb_data[tense][p] == form])
+    elif question_type == 'identify-infinitive':
+        fields.update(conjugated_form=form, correct_answer=question['verb'], tense_name=TENSE_NAMES[tense])
+    else:
+        fields.update(correct_answer=form, tense_english=TENSE_NAMES[tense])
+    return fields
+
+
+def option_pool(question):
+    """Every value the server could offer as an option for this question"""
+    verb_data = VERBS[question['verb']]
+    question_type = question['question_type']
+    if question_type == 'identify-tense':
+        return set(TENSE_NAMES.values())
+    if question_type == 'identify-pronoun':
+        return set(PRONOUNS)
+    if question_type == 'identify-infinitive':
+        return set(VERBS)
+    return {form for t in TENSES for form in verb_data[t].values()}
+
+
+class TestVerbBundle(unittest.TestCase):
+    """Test building and decoding the compact verb bundle"""
+
+    def test_round_trip(self):
+        """Test that the bundle decodes back to the exact verb table"""
+        bundle = build_bundle(VERBS, TENSES, PRONOUNS, TENSE_NAMES)
+        verbs, tenses, pronouns, tense_names = decode_bundle(json.loads(encode_bundle(bundle)))
+        self.assertEqual(verbs, VERBS)
+        self.assertEqual(tenses, TENSES)
+        self.assertEqual(pronouns, PRONOUNS)
+        self.assertEqual(tense_names, TENSE_NAMES)
+
+    def test_bundle_is_compact(self):
+        """Test that the bundle is smaller than verbs.json"""
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'verbs.json'), 'rb') as f:
+            raw = f.read()
+        self.assertLess(len(VERB_BUNDLE.body), len(raw) / 2)
+        self.assertLess(len(VERB_BUNDLE.gzipped), len(VERB_BUNDLE.body) / 2)
+
+    def test_version_tracks_content(self):
+        """Test that the version changes only when the data changes"""
+        first = build_bundle(VERBS, TENSES, PRONOUNS, TENSE_NAMES)
+        self.assertEqual(first['version'], build_bundle(VERBS, TENSES, PRONOUNS, TENSE_NAMES)['version'])
+        changed = json.loads(json.dumps(VERBS))
+        changed['ser']['english'] = 'to exist'
+        self.assertNotEqual(first['version'], build_bundle(changed, TENSES, PRONOUNS, TENSE_NAMES)['version'])
+
+    def test_rejects_unknown_format(self):
+        """Test that a future bundle format is refused"""
+        with self.assertRaises(ValueError):
+            decode_bundle({'format': 99})
+
+    def test_write_bundle(self):
+        """Test the build step output"""
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = write_bundle(build_bundle(VERBS, TENSES, PRONOUNS, TENSE_NAMES), tmpdir)
+            self.assertTrue(os.path.basename(path).startswith('verbs-'))
+            with gzip.open(path + '.gz', 'rb') as f, open(path, 'rb') as plain:
+                self.assertEqual(f.read(), plain.read())
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+class TestVerbBundleRoute(unittest.TestCase):
+    """Test serving the bundle"""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.url = f'/bundle/{VERB_BUNDLE.filename}'
+
+    def test_long_cache_lifetime(self):
+        """Test that the versioned bundle is cacheable forever"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        self.assertEqual(response.headers['ETag'], VERB_BUNDLE.etag)
+        self.assertEqual(response.data, VERB_BUNDLE.body)
+
+    def test_gzip_when_accepted(self):
+        """Test that gzip-capable clients get the precompressed body"""
+        response = self.client.get(self.url, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.data), VERB_BUNDLE.body)
+
+    def test_not_modified(self):
+        """Test conditional requests"""
+        response = self.client.get(self.url, headers={'If-None-Match': VERB_BUNDLE.etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_stale_version_is_404(self):
+        """Test that an old bundle URL points at the current one"""
+        response = self.client.get('/bundle/verbs-000000000000.json')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.get_json()['current'], self.url)
+
+    def test_index_advertises_bundle(self):
+        """Test that the page tells the client where the bundle is"""
+        self.assertIn(self.url.encode(), self.client.get('/').data)
+
+
+@unittest.skipUnless(shutil.which('node'), 'node is not installed')
+class TestGeneratorParity(unittest.TestCase):
+    """Test that static/generator.js matches the server reference generator"""
+
+    @classmethod
+    def setUpClass(cls):
+        result = subprocess.run(['node', '-e', NODE_PARITY_SCRIPT, GENERATOR_JS],
+                                input=VERB_BUNDLE.body, capture_output=True, check=True)
+        cls.questions = json.loads(result.stdout)
+
+    def test_same_shape_as_server(self):
+        """Test that every question type has exactly the server's keys"""
+        server_keys = {}
+        while len(server_keys) < 4:
+            question = build_question()
+            server_keys[question['question_type']] = set(question)
+        for question in self.questions:
+            with self.subTest(question_type=question['question_type']):
+                self.assertEqual(set(question), server_keys[question['question_type']])
+
+    def test_same_answers_as_server(self):
+        """Test that answers and derived fields agree with the verb table"""
+        for question in self.questions:
+            with self.subTest(question=question):
+                for key, value in reference_fields(question).items():
+                    self.assertEqual(question[key], value)
+                self.assertIn(question['correct_answer'], question['options'])
+                self.assertEqual(len(set(question['options'])), len(question['options']))
+                self.assertLessEqual(set(question['options']), option_pool(question))
+
+    def test_same_option_counts_as_server(self):
+        """Test that the option counts match what the server produces for the same cell"""
+        for question in self.questions:
+            if question['question_type'] == 'identify-pronoun':
+                form = question['conjugated_form']
+                wrong = sum(1 for p in PRONOUNS if VERBS[question['verb']][question['tense']][p] != form)
+                expected = min(4, 1 + min(3, wrong) + max(0, len(question['all_correct_answers']) - 1))
+                self.assertEqual(len(question['options']), expected)
+            else:
+                self.assertEqual(len(question['options']), 4)
+
+    def test_session_walk_has_no_repeats(self):
+        """Test that the default page's local generation walks a session without repeated cells"""
+        self.assertTrue(CLIENT_GENERATION)
+        cells = len(VERBS) * len(TENSES) * len(PRONOUNS)
+        result = subprocess.run(['node', '-e', NODE_WALK_SCRIPT, GENERATOR_JS, str(cells + 20)],
+                                input=VERB_BUNDLE.body, capture_output=True, check=True)
+        questions = json.loads(result.stdout)
+        walked = [(q['verb'], q['tense'], q['pronoun']) for q in questions]
+        self.assertEqual(len(set(walked[:20])), 20)
+        self.assertEqual(len(set(walked[:cells])), cells)
+        for start in range(0, cells, len(VERBS)):
+            self.assertEqual(len({cell[0] for cell in walked[start:start + len(VERBS)]}), len(VERBS))
+        for question in questions[:200]:
+            for key, value in reference_fields(question).items():
+                self.assertEqual(question[key], value)
+
+    def test_question_type_mix(self):
+        """Test that the four types keep the server's 25% split"""
+        counts = {}
+        for question in self.questions:
+            counts[question['question_type']] = counts.get(question['question_type'], 0) + 1
+        self.assertEqual(len(counts), 4)
+        for count in counts.values():
+            self.assertGreater(count / len(self.questions), 0.2)
+            self.assertLess(count / len(self.questions), 0.3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+import os
+import random
+import shutil
+import tempfile
+import app as app_module
+from app import app, VERBS, TENSES, PRONOUNS, TENSE_NAMES, IRREGULAR_HINTS
+from question_types import Lexicon, QuestionRegistry
+from reference import LazyReferenceCache, ReferenceCache
+from search import SearchIndex
+from verb_store import StoreSearch, VerbStore, import_verbs
+
+
+class TestVerbStore(unittest.TestCase):
+    """Test the SQLite-backed lexicon"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        cls.path = import_verbs(VERBS, TENSES, PRONOUNS, TENSE_NAMES, os.path.join(cls.tmpdir, 'verbs.db'))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
+
+    def setUp(self):
+        self.store = VerbStore(self.path, cache_size=8)
+
+    def test_matches_json(self):
+        """Test that the store holds the same verbs and tables as verbs.json"""
+        self.assertEqual(len(self.store), len(VERBS))
+        self.assertEqual(list(self.store), list(VERBS))
+        for verb in ('ser', 'hablar', 'ir', 'tener'):
+            self.assertEqual(self.store[verb], VERBS[verb])
+        self.assertNotIn('xyzzy', self.store)
+        with self.assertRaises(KeyError):
+            self.store['xyzzy']
+        self.assertEqual((self.store.tenses, self.store.pronouns), (TENSES, PRONOUNS))
+
+    def test_lru_is_bounded(self):
+        """Test that only cache_size verbs stay loaded and repeats are hits"""
+        verbs = list(VERBS)[:20]
+        for verb in verbs:
+            self.store[verb]
+        self.store[verbs[-1]]
+        stats = self.store.stats()
+        self.assertEqual(stats['cached'], 8)
+        self.assertEqual((stats['hits'], stats['misses']), (1, 20))
+        self.store.refresh()
+        self.assertEqual(self.store.stats()['cached'], 0)
+
+    def test_search_matches_index(self):
+        """Test that SQL search ranks results exactly like the in-memory index"""
+        index = SearchIndex(VERBS, TENSES, PRONOUNS)
+        search = StoreSearch(self.store)
+        for query in ('h', 'habl', 'hablé', 'ser', 'to s', 'fu', 'TENG', 'zzz'):
+            for limit in (1, 10, 50):
+                self.assertEqual(search.search(query, limit), index.search(query, limit), (query, limit))
+
+    def test_lazy_reference(self):
+        """Test that lazily built reference payloads match the eager cache"""
+        eager = ReferenceCache(VERBS, TENSES, PRONOUNS, TENSE_NAMES, IRREGULAR_HINTS)
+        lazy = LazyReferenceCache(self.store, TENSES, PRONOUNS, TENSE_NAMES, IRREGULAR_HINTS, cache_size=2)
+        self.assertEqual(lazy.index.body, eager.index.body)
+        for verb in ('ser', ' Hablar ', 'ir', 'ser'):
+            self.assertEqual(lazy.table(verb).etag, eager.table(verb).etag)
+        self.assertIsNone(lazy.table('xyzzy'))
+        self.assertEqual(len(lazy.tables), 2)
+
+    def test_questions_from_store(self):
+        """Test that every question type generates valid questions from the store"""
+        registry = QuestionRegistry(Lexicon(self.store, TENSES, PRONOUNS, TENSE_NAMES))
+        rng = random.Random(5)
+        for name in registry.names:
+            for _ in range(50):
+                question = registry.get(name).generate(rng)
+                self.assertIn(question['correct_answer'], question['options'])
+        self.assertLessEqual(self.store.stats()['cached'], 8)
+
+    def test_app_without_bundle(self):
+        """Test that a store turns off the client bundle and the compact format, not the app"""
+        original = app_module.VERBS_DB, app_module.VERB_BUNDLE, app_module.WIRE
+        app_module.VERBS_DB = self.path
+        app_module.PAGE_CACHE.clear()
+        try:
+            app_module.VERB_BUNDLE, app_module.WIRE = app_module.bundle_codecs(
+                app_module.build_verb_bundle(self.store))
+            client = app.test_client()
+            self.assertIn(b'data-bundle-url="" data-strings-url=""', client.get('/').data)
+            self.assertNotIn(b'/bundle/', client.get('/sw.js').data)
+            self.assertEqual(client.get('/bundle/verbs-0.json').status_code, 404)
+            question = client.get('/api/question?fmt=compact')
+            self.assertEqual(question.mimetype, 'application/json')
+            self.assertIn(question.get_json()['verb'], VERBS)
+            response = client.post('/api/check?fmt=compact', json={'w': 1, 's': 'x'})
+            self.assertEqual(response.status_code, 400)
+        finally:
+            app_module.VERBS_DB, app_module.VERB_BUNDLE, app_module.WIRE = original
+            app_module.PAGE_CACHE.clear()
+
+    def test_import_rejects_incomplete_verbs(self):
+        """Test that a verb missing a form is rejected before anything is written"""
+        verbs = {'ser': dict(VERBS['ser'], presente={'yo': 'soy'})}
+        path = os.path.join(self.tmpdir, 'bad.db')
+        with self.assertRaises(ValueError):
+            import_verbs(verbs, TENSES, PRONOUNS, TENSE_NAMES, path)
+        self.assertFalse(os.path.exists(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import unittest
+import json
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+import app as app_module
+from app import app
+from wire_format import COMPACT_MIMETYPE, FORMAT_VERSION, CompactCodec, WireFormatError
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+# Decode Python-encoded payloads with wire.js and print them back as JSON
+NODE_DECODE_SCRIPT = """
+const fs = require('fs');
+const wire = require(process.argv[1]);
+const bundle = JSON.parse(fs.readFileSync(process.argv[2], 'utf8'));
+const codec = new wire.WireCodec(bundle);
+const payloads = JSON.parse(fs.readFileSync(process.argv[3], 'utf8'));
+process.stdout.write(JSON.stringify(payloads.map(payload => codec.decode(payload))));
+"""
+
+
+def node_available():
+    return shutil.which('node') is not None
+
+
+class TestCompactCodec(unittest.TestCase):
+    """Test encoding and decoding against the bundle string table"""
+
+    def setUp(self):
+        self.codec = app_module.WIRE
+        random.seed(11)
+        self.questions = [app_module.build_question() for _ in range(200)]
+
+    def test_roundtrip(self):
+        """Test that every question type survives encode then decode"""
+        for question in self.questions:
+            compact = self.codec.encode(question)
+            self.assertEqual(compact['w'], FORMAT_VERSION)
+            self.assertIsInstance(compact['v'], int)
+            self.assertEqual(self.codec.decode(compact), question)
+
+    def test_smaller(self):
+        """Test that the compact form is well under the verbose size"""
+        verbose = len(json.dumps(self.questions, ensure_ascii=False, separators=(',', ':')))
+        compact = len(json.dumps(self.codec.encode({'questions': self.questions})['qs'],
+                                 ensure_ascii=False, separators=(',', ':')))
+        self.assertLess(compact, verbose * 0.6)
+
+    def test_inline_strings(self):
+        """Test that strings outside the table stay inline"""
+        data = {'answer': 'not a spanish word', 'hint': '💡 Try again'}
+        compact = self.codec.encode(data)
+        self.assertEqual(compact['x'], 'not a spanish word')
+        self.assertEqual(self.codec.decode(compact), data)
+
+    def test_rejects_bad_payloads(self):
+        """Test version checks and index bounds"""
+        compact = self.codec.encode(self.questions[0])
+        with self.assertRaises(WireFormatError):
+            self.codec.decode(dict(compact, w=FORMAT_VERSION + 1))
+        with self.assertRaises(WireFormatError):
+            self.codec.decode(dict(compact, s='stale'))
+        with self.assertRaises(WireFormatError):
+            self.codec.decode(dict(compact, v=len(self.codec.strings)))
+        with self.assertRaises(WireFormatError):
+            self.codec.decode(['not', 'an', 'object'])
+
+    @unittest.skipUnless(node_available(), 'node is not installed')
+    def test_client_decoder_agrees(self):
+        """Test that wire.js decodes what the server encodes"""
+        tmpdir = tempfile.mkdtemp()
+        try:
+            bundle = os.path.join(tmpdir, 'bundle.json')
+            payloads = os.path.join(tmpdir, 'payloads.json')
+            with open(bundle, 'wb') as f:
+                f.write(app_module.VERB_BUNDLE.body)
+            with open(payloads, 'w', encoding='utf-8') as f:
+                json.dump([self.codec.encode(question) for question in self.questions], f)
+            result = subprocess.run(['node', '-e', NODE_DECODE_SCRIPT, os.path.join(STATIC_DIR, 'wire.js'),
+                                     bundle, payloads], check=True, capture_output=True, text=True)
+            self.assertEqual(json.loads(result.stdout), self.questions)
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+class TestWireNegotiation(unittest.TestCase):
+    """Test format negotiation on the API routes"""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def test_verbose_by_default(self):
+        """Test that plain requests still get verbose JSON"""
+        response = self.client.get('/api/question')
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertIn('question_type', response.json)
+        self.assertIn('Accept', response.headers['Vary'])
+
+    def test_question_negotiation(self):
+        """Test compact questions via ?fmt= and via Accept"""
+        for kwargs in ({'query_string': {'fmt': 'compact'}},
+                       {'headers': {'Accept': COMPACT_MIMETYPE}}):
+            response = self.client.get('/api/question', **kwargs)
+            self.assertEqual(response.mimetype, COMPACT_MIMETYPE)
+            question = app_module.WIRE.decode(json.loads(response.data))
+            self.assertIn(question['correct_answer'], question['options'])
+
+    def test_batch_negotiation(self):
+        """Test a compact batch for the offline stock"""
+        response = self.client.get('/api/questions?count=5&fmt=compact')
+        data = app_module.WIRE.decode(json.loads(response.data))
+        self.assertEqual(len(data['questions']), 5)
+        self.assertIn('verb', data['questions'][0])
+
+    def test_compact_check(self):
+        """Test grading a compact answer and replying compactly"""
+        question = app_module.build_question('conjugation')
+        payload = dict(question, answer=question['correct_answer'])
+        response = self.client.post('/api/check', data=json.dumps(app_module.WIRE.encode(payload)),
+                                    headers={'Content-Type': COMPACT_MIMETYPE, 'Accept': COMPACT_MIMETYPE})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, COMPACT_MIMETYPE)
+        self.assertTrue(app_module.WIRE.decode(json.loads(response.data))['correct'])
+
+    def test_stale_table(self):
+        """Test that a client on an old bundle is told where the current one is"""
+        codec = CompactCodec({'version': 'old', 'strings': app_module.WIRE.strings})
+        response = self.client.post('/api/check', data=json.dumps(codec.encode({'answer': 'hablo'})),
+                                    headers={'Content-Type': COMPACT_MIMETYPE})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json['current'], app_module.bundle_url())
+
+    def test_page_exposes_string_table(self):
+        """Test that the page names the string table even without client generation"""
+        response = self.client.get('/')
+        self.assertIn(f'data-strings-url="{app_module.bundle_url()}"'.encode(), response.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
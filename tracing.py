@@ -0,0 +1,276 @@
+"""
+Per-request tracing spans for PractiVerbo.
+
+A sampled request gets a trace: a root span for the request, with child
+spans for its phases (filtering, sampling a cell, building the question and
+its options, grading, hint lookup, recording, encoding). Loading and
+reloading the verb data are traced the same way. A trace's spans stay in
+memory until its root span ends. The trace is then queued as one line of
+OTLP/JSON, the OpenTelemetry export format, on a rotating ``AnswerLog``
+writer, so requests never wait on the disk. The files can be read by any
+OTLP-aware tool, for example the OpenTelemetry Collector's
+``otlpjsonfile`` receiver.
+
+Tracing is opt-in: set ``TRACE_PATH``. When it is off, or a request is not
+sampled, ``span`` costs one context-variable lookup and returns a shared
+no-op span. A W3C ``traceparent`` header continues the caller's trace and
+follows its sampling decision.
+"""
+import functools
+import os
+import random
+import re
+import time
+from contextvars import ContextVar
+
+from answer_log import AnswerLog
+
+SERVICE_NAME = 'practiverbo'
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+STATUS_ERROR = 2
+# Spans past this many in one trace are counted but not kept
+MAX_SPANS = 256
+TRACEPARENT = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+_current = ContextVar('tracing_span', default=None)
+
+
+class NoopSpan:
+    """Stands in for a span when nothing is being recorded"""
+
+    __slots__ = ()
+    recording = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def begin(self):
+        return self
+
+    def end(self, exc=None):
+        pass
+
+    def set(self, key, value):
+        pass
+
+    def fail(self, message):
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class Trace:
+    """The spans of one trace, exported together when the root span ends"""
+
+    __slots__ = ('tracer', 'trace_id', 'root', 'spans', 'dropped')
+
+    def __init__(self, tracer, trace_id):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.root = None
+        self.spans = []
+        self.dropped = 0
+
+    def finish(self, span):
+        if len(self.spans) < MAX_SPANS or span is self.root:
+            self.spans.append(span)
+        else:
+            self.dropped += 1
+        if span is self.root:
+            self.tracer.export(self)
+
+
+class Span:
+    """One timed operation; use as a context manager, or begin() and end()"""
+
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'kind', 'attributes',
+                 'start_ns', 'end_ns', 'error', 'events', '_token')
+    recording = True
+
+    def __init__(self, trace, name, parent_id=None, kind=KIND_INTERNAL, attributes=None):
+        self.trace = trace
+        self.span_id = trace.tracer.new_id(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = dict(attributes) if attributes else {}
+        self.start_ns = None
+        self.end_ns = None
+        self.error = None
+        self.events = []
+        self._token = None
+
+    def __enter__(self):
+        return self.begin()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end(exc)
+        return False
+
+    def begin(self):
+        """Start timing and make this the parent of spans opened from here"""
+        self.start_ns = time.time_ns()
+        self._token = _current.set(self)
+        return self
+
+    def end(self, exc=None):
+        self.end_ns = time.time_ns()
+        _current.reset(self._token)
+        if exc is not None:
+            self.fail(f'{type(exc).__name__}: {exc}')
+            self.events.append((self.end_ns, 'exception', {'exception.type': type(exc).__name__,
+                                                           'exception.message': str(exc)}))
+        self.trace.finish(self)
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def fail(self, message):
+        self.error = message
+
+    def child(self, name, attributes=None):
+        return Span(self.trace, name, self.span_id, KIND_INTERNAL, attributes)
+
+    def otlp(self):
+        """This span as an OTLP/JSON span object"""
+        data = {
+            'traceId': f'{self.trace.trace_id:032x}',
+            'spanId': f'{self.span_id:016x}',
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': otlp_attributes(self.attributes),
+        }
+        if self.parent_id is not None:
+            data['parentSpanId'] = f'{self.parent_id:016x}'
+        if self.events:
+            data['events'] = [{'timeUnixNano': str(ts), 'name': name, 'attributes': otlp_attributes(attributes)}
+                              for ts, name, attributes in self.events]
+        if self.error is not None:
+            data['status'] = {'code': STATUS_ERROR, 'message': self.error}
+        return data
+
+
+def otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def otlp_attributes(attributes):
+    return [{'key': key, 'value': otlp_value(value)} for key, value in attributes.items()]
+
+
+def parse_traceparent(header):
+    """(trace id, parent span id, sampled) from a W3C traceparent header, or None"""
+    match = TRACEPARENT.match(header.strip().lower()) if header else None
+    if match is None:
+        return None
+    trace_id, parent_id = int(match[1], 16), int(match[2], 16)
+    if not trace_id or not parent_id:
+        return None
+    return trace_id, parent_id, bool(int(match[3], 16) & 1)
+
+
+class Tracer:
+    """Start sampled traces and queue finished ones on a rotating OTLP/JSON writer"""
+
+    def __init__(self, log, sample_rate=1.0, service=SERVICE_NAME):
+        self.log = log
+        self.sample_rate = sample_rate
+        self.resource_attributes = otlp_attributes({'service.name': service})
+        self.rng = random.Random()
+        self.traces = 0
+        self.spans = 0
+        self.dropped_spans = 0
+
+    @classmethod
+    def from_env(cls, environ=None):
+        """Create a tracer from TRACE_* environment variables, or None if disabled"""
+        environ = os.environ if environ is None else environ
+        path = environ.get('TRACE_PATH')
+        if not path:
+            return None
+        log = AnswerLog(path,
+                        max_bytes=int(environ.get('TRACE_MAX_BYTES', 50 * 1024 * 1024)),
+                        max_age=float(environ.get('TRACE_MAX_AGE', 3600)),
+                        buffer_size=int(environ.get('TRACE_BUFFER', 10000)))
+        return cls(log, sample_rate=float(environ.get('TRACE_SAMPLE', 1.0)),
+                   service=environ.get('TRACE_SERVICE_NAME', SERVICE_NAME))
+
+    def new_id(self, bits):
+        return self.rng.getrandbits(bits) or 1
+
+    def start(self, name, attributes=None, traceparent=None, kind=KIND_SERVER, force=False):
+        """A root span for a new trace, or NOOP_SPAN if it is not sampled
+
+        Inside a recorded span this returns a child of that span instead.
+        `force` records the trace whatever the sample rate, for rare work
+        such as reloading the verb data.
+        """
+        parent = _current.get()
+        if parent is not None:
+            return parent.child(name, attributes)
+        remote = parse_traceparent(traceparent)
+        if remote is not None:
+            trace_id, parent_id, sampled = remote
+        else:
+            trace_id = parent_id = None
+            sampled = force or self.sample_rate >= 1 or self.rng.random() < self.sample_rate
+        if not sampled:
+            return NOOP_SPAN
+        trace = Trace(self, trace_id or self.new_id(128))
+        trace.root = Span(trace, name, parent_id, kind, attributes)
+        return trace.root
+
+    def export(self, trace):
+        """Queue a finished trace as one OTLP/JSON ExportTraceServiceRequest"""
+        self.traces += 1
+        self.spans += len(trace.spans)
+        self.dropped_spans += trace.dropped
+        return self.log.log({'resourceSpans': [{
+            'resource': {'attributes': self.resource_attributes},
+            'scopeSpans': [{'scope': {'name': SERVICE_NAME}, 'spans': [span.otlp() for span in trace.spans]}],
+        }]})
+
+    def stats(self):
+        stats = self.log.stats()
+        stats.update(traces=self.traces, spans=self.spans, dropped_spans=self.dropped_spans,
+                     sample_rate=self.sample_rate)
+        return stats
+
+    def close(self):
+        self.log.close()
+
+
+def span(name, **attributes):
+    """A child of the current span, or NOOP_SPAN when nothing is being traced"""
+    parent = _current.get()
+    if parent is None:
+        return NOOP_SPAN
+    return parent.child(name, attributes)
+
+
+def current_span():
+    return _current.get() or NOOP_SPAN
+
+
+def traced(name):
+    """Decorator: run the function in a span named `name` when traced"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,316 @@
+#!/usr/bin/env python
+"""
+Capture real /api/question and /api/check traffic, then replay it against one or two builds.
+
+Capture is opt-in. Set ``TRAFFIC_CAPTURE_PATH`` (for example
+``capture/requests.jsonl``) and the app hands one record per sampled request
+to a rotating ``AnswerLog`` writer, so requests never wait on the disk. Each
+record holds the method, the path, the query, the request body, the Accept
+and Content-Type headers, the status, the response body and the latency.
+Records are sanitized before they are queued:
+
+- learner ids are replaced by a keyed hash that is stable within a process,
+  so a session stays a session but cannot be traced back
+- classroom credentials are dropped
+- free-text answers are truncated
+- client addresses and every other header are never recorded
+
+Replay reads the capture files (rotated ``.jsonl.gz`` files included) and
+sends the requests at their original pace, or at ``--speed`` times that pace
+(0 means as fast as possible). With ``--baseline`` the same traffic is then
+sent to a second build. The report compares the latency distributions and
+counts diverging responses. For ``/api/check``, the whole grading response
+must match. For ``/api/question``, which is random, each question only needs
+the keys the reference run produced for its question type.
+
+Usage:
+    TRAFFIC_CAPTURE_PATH=capture/requests.jsonl python app.py
+    python traffic.py capture/ --target http://127.0.0.1:10000 --baseline http://127.0.0.1:10001 -o replay.json
+"""
+import argparse
+import hashlib
+import hmac
+import http.client
+import json
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+from analytics import find_log_files, iter_lines
+from answer_log import AnswerLog
+from loadtest import summarize
+
+CAPTURED_ROUTES = {'get_question': '/api/question', 'check_answer': '/api/check'}
+MAX_ANSWER_CHARS = 64
+MAX_EXAMPLES = 10
+
+
+class TrafficCapture:
+    """Sanitize sampled requests and queue them on a rotating JSONL writer"""
+
+    def __init__(self, log, sample_rate=1.0, salt=None):
+        self.log = log
+        self.sample_rate = sample_rate
+        self.salt = salt or secrets.token_bytes(16)
+        self.rng = random.Random()
+
+    @classmethod
+    def from_env(cls, environ=None):
+        """Create a capture from TRAFFIC_CAPTURE_* environment variables, or None if disabled"""
+        environ = os.environ if environ is None else environ
+        path = environ.get('TRAFFIC_CAPTURE_PATH')
+        if not path:
+            return None
+        log = AnswerLog(path,
+                        max_bytes=int(environ.get('TRAFFIC_CAPTURE_MAX_BYTES', 50 * 1024 * 1024)),
+                        max_age=float(environ.get('TRAFFIC_CAPTURE_MAX_AGE', 3600)))
+        return cls(log, sample_rate=float(environ.get('TRAFFIC_CAPTURE_SAMPLE', 1.0)))
+
+    def sampled(self):
+        return self.sample_rate >= 1 or self.rng.random() < self.sample_rate
+
+    def pseudonym(self, learner):
+        digest = hmac.new(self.salt, learner.encode('utf-8'), hashlib.sha256).hexdigest()[:16]
+        return f'cap-{digest}'
+
+    def sanitize_query(self, args):
+        query = {key: value for key, value in args.items() if key != 'learner'}
+        if args.get('learner'):
+            query['learner'] = self.pseudonym(args['learner'])
+        return query
+
+    def sanitize_body(self, body):
+        if not isinstance(body, dict):
+            return body
+        body = {key: value for key, value in body.items() if key not in ('classroom', 'k')}
+        for key in ('learner', 'l'):
+            if isinstance(body.get(key), str):
+                body[key] = self.pseudonym(body[key])
+        for key in ('answer', 'x'):
+            if isinstance(body.get(key), str):
+                body[key] = body[key][:MAX_ANSWER_CHARS]
+        return body
+
+    def record(self, method, path, args, headers, body, status, response_body, latency):
+        """Queue one exchange; `body` and `response_body` are raw bytes"""
+        try:
+            request_body = json.loads(body) if body else None
+        except ValueError:
+            request_body = None
+        try:
+            response = json.loads(response_body) if response_body else None
+        except ValueError:
+            response = None
+        return self.log.log({
+            'ts': time.time(),
+            'method': method,
+            'path': path,
+            'query': self.sanitize_query(args),
+            'headers': {name: headers[name] for name in ('Accept', 'Content-Type') if headers.get(name)},
+            'body': self.sanitize_body(request_body),
+            'status': status,
+            'response': response,
+            'latency_ms': round(latency * 1000, 3),
+        })
+
+    def stats(self):
+        return self.log.stats()
+
+    def close(self):
+        self.log.close()
+
+
+def load_capture(paths):
+    """Every captured record from files and directories, oldest first"""
+    records = []
+    for path in find_log_files(paths):
+        for line in iter_lines(path):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and record.get('path') in CAPTURED_ROUTES.values():
+                records.append(record)
+    records.sort(key=lambda record: record.get('ts', 0))
+    return records
+
+
+class Target:
+    """A server under replay; one keep-alive connection per worker thread"""
+
+    def __init__(self, url, timeout=30):
+        parts = urlsplit(url)
+        self.url = url
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def send(self, record):
+        """Replay one record; returns (status or error name, latency, parsed body or None)"""
+        path = record['path']
+        if record.get('query'):
+            path += '?' + urlencode(record['query'])
+        body = None if record.get('body') is None else json.dumps(record['body']).encode('utf-8')
+        headers = dict(record.get('headers') or {})
+        if body is not None:
+            headers.setdefault('Content-Type', 'application/json')
+        started = time.perf_counter()
+        try:
+            conn = getattr(self.local, 'conn', None)
+            if conn is None:
+                conn = self.local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            conn.request(record.get('method', 'GET'), path, body=body, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            self.local.conn = None
+            return type(e).__name__, time.perf_counter() - started, None
+        latency = time.perf_counter() - started
+        try:
+            return response.status, latency, json.loads(data)
+        except ValueError:
+            return response.status, latency, None
+
+
+def replay(records, target, speed=1.0, concurrency=64):
+    """Send records at `speed` times their captured pace; returns results in record order"""
+    results = [None] * len(records)
+    if not records:
+        return results
+    first = records[0].get('ts', 0)
+    started = time.monotonic()
+
+    def run(index):
+        results[index] = target.send(records[index])
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        for index, record in enumerate(records):
+            if speed > 0:
+                delay = (record.get('ts', first) - first) / speed - (time.monotonic() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            pool.submit(run, index)
+    return results
+
+
+def response_signature(body):
+    """Shape of a question response: its type and keys (the content itself is random)"""
+    if not isinstance(body, dict):
+        return body
+    return body.get('question_type', body.get('t')), tuple(sorted(body))
+
+
+def route_summary(records, results, seconds):
+    report = {}
+    for route in CAPTURED_ROUTES.values():
+        latencies = []
+        errors = 0
+        for record, (status, latency, _) in zip(records, results):
+            if record['path'] != route:
+                continue
+            if isinstance(status, int) and status == record.get('status', status):
+                latencies.append(latency)
+            else:
+                errors += 1
+        report[route] = summarize(latencies, errors, seconds)
+    return report
+
+
+def compare(records, candidate, baseline=None):
+    """Count responses that diverge from the baseline run, or from the capture without one"""
+    expected_bodies = [baseline[index][2] if baseline is not None else record.get('response')
+                       for index, record in enumerate(records)]
+    # Questions are random, so a question only has to have the keys the reference
+    # produced for its type; types the reference never drew cannot be judged
+    question_shapes = {}
+    for record, body in zip(records, expected_bodies):
+        if record['path'] == '/api/question' and isinstance(body, dict):
+            question_type, keys = response_signature(body)
+            question_shapes.setdefault(question_type, set()).add(keys)
+    mismatches = {route: 0 for route in CAPTURED_ROUTES.values()}
+    examples = []
+    for index, record in enumerate(records):
+        expected = expected_bodies[index]
+        actual = candidate[index][2]
+        if record['path'] == '/api/check':
+            diverged = expected != actual
+        else:
+            diverged = not isinstance(actual, dict)
+            if not diverged:
+                question_type, keys = response_signature(actual)
+                diverged = question_type in question_shapes and keys not in question_shapes[question_type]
+        if diverged:
+            mismatches[record['path']] += 1
+            if len(examples) < MAX_EXAMPLES:
+                examples.append({'request': {key: record.get(key) for key in ('path', 'query', 'body')},
+                                 'expected': expected, 'actual': actual})
+    return {'mismatches': mismatches, 'examples': examples}
+
+
+def run_replay(records, target_url, baseline_url=None, speed=1.0, concurrency=64):
+    """Replay against the target (and the baseline, one after the other); returns the report dict"""
+    report = {'records': len(records), 'speed': speed, 'runs': {}}
+    runs = {}
+    for name, url in (('baseline', baseline_url), ('target', target_url)):
+        if url is None:
+            continue
+        started = time.monotonic()
+        runs[name] = replay(records, Target(url), speed, concurrency)
+        seconds = time.monotonic() - started
+        report['runs'][name] = {'url': url, 'seconds': round(seconds, 2),
+                                'routes': route_summary(records, runs[name], seconds)}
+    report['comparison'] = compare(records, runs['target'], runs.get('baseline'))
+    if 'baseline' in runs:
+        report['latency_change'] = {
+            route: {key: latency_ratio(report['runs']['baseline']['routes'][route][key],
+                                       report['runs']['target']['routes'][route][key])
+                    for key in ('p50_ms', 'p95_ms', 'p99_ms')}
+            for route in CAPTURED_ROUTES.values()
+        }
+    return report
+
+
+def latency_ratio(before, after):
+    """Target latency as a multiple of the baseline's"""
+    if not before or after is None:
+        return None
+    return round(after / before, 3)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay captured traffic and compare builds')
+    parser.add_argument('paths', nargs='+', help='Capture files or directories')
+    parser.add_argument('--target', default='http://127.0.0.1:10000', help='Build under test')
+    parser.add_argument('--baseline', help='Build to compare against; without it, compare to the capture')
+    parser.add_argument('--speed', type=float, default=1.0, help='Pace multiplier; 0 sends as fast as possible')
+    parser.add_argument('--concurrency', type=int, default=64, help='Maximum requests in flight')
+    parser.add_argument('--limit', type=int, help='Only replay the first N records')
+    parser.add_argument('-o', '--output', help='Write the JSON report here instead of stdout')
+    args = parser.parse_args(argv)
+
+    records = load_capture(args.paths)
+    if args.limit:
+        records = records[:args.limit]
+    if not records:
+        print('No captured traffic found', file=sys.stderr)
+        return 1
+    report = run_replay(records, args.target, args.baseline, args.speed, args.concurrency)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        print(f"Replayed {len(records)} requests; mismatches: {report['comparison']['mismatches']}",
+              file=sys.stderr)
+    else:
+        print(text)
+    return 1 if any(report['comparison']['mismatches'].values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""
+Compact, versioned verb bundle for in-browser question generation.
+
+The bundle stores every distinct string once in a string table and refers to
+them by index from flat integer arrays, which keeps it small and compresses
+well. ``static/generator.js`` decodes it and ports the four question-type
+generators from ``app.build_question``; the server stays the reference
+implementation and ``test_verb_bundle.py`` checks the two agree.
+
+Usage:
+    python verb_bundle.py -o static/bundle
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+
+from verb_schema import PRONOUNS, TENSES, TENSE_NAMES
+
+BUNDLE_FORMAT = 1
+
+
+def build_bundle(verbs, tenses, pronouns, tense_names):
+    """Build the bundle dict for a verb table"""
+    strings = []
+    index = {}
+
+    def ref(value):
+        if value not in index:
+            index[value] = len(strings)
+            strings.append(value)
+        return index[value]
+
+    infinitives = list(verbs)
+    body = {
+        'format': BUNDLE_FORMAT,
+        'tenses': [ref(t) for t in tenses],
+        'tense_names': [ref(tense_names[t]) for t in tenses],
+        'pronouns': [ref(p) for p in pronouns],
+        'verbs': [ref(v) for v in infinitives],
+        'english': [ref(verbs[v]['english']) for v in infinitives],
+        'irregular': [1 if verbs[v]['type'] == 'irregular' else 0 for v in infinitives],
+        # Forms are laid out verb-major, then tense, then pronoun
+        'forms': [ref(verbs[v][t][p]) for v in infinitives for t in tenses for p in pronouns],
+    }
+    body['strings'] = strings
+    body['version'] = hashlib.sha256(encode_bundle(body)).hexdigest()[:12]
+    return body
+
+
+def encode_bundle(bundle):
+    """Serialize a bundle as compact UTF-8 JSON"""
+    return json.dumps(bundle, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+
+def decode_bundle(bundle):
+    """Rebuild (verbs, tenses, pronouns, tense_names) from a bundle"""
+    if bundle.get('format') != BUNDLE_FORMAT:
+        raise ValueError(f"Unsupported bundle format: {bundle.get('format')}")
+    strings = bundle['strings']
+    tenses = [strings[i] for i in bundle['tenses']]
+    pronouns = [strings[i] for i in bundle['pronouns']]
+    tense_names = {t: strings[i] for t, i in zip(tenses, bundle['tense_names'])}
+    forms = bundle['forms']
+    cells = len(tenses) * len(pronouns)
+    verbs = {}
+    for n, verb_ref in enumerate(bundle['verbs']):
+        verb = {
+            'english': strings[bundle['english'][n]],
+            'type': 'irregular' if bundle['irregular'][n] else 'regular',
+        }
+        for t, tense in enumerate(tenses):
+            offset = n * cells + t * len(pronouns)
+            verb[tense] = {p: strings[forms[offset + i]] for i, p in enumerate(pronouns)}
+        verbs[strings[verb_ref]] = verb
+    return verbs, tenses, pronouns, tense_names
+
+
+class BundleCache:
+    """Pre-encoded bundle bytes (plain and gzip) for serving"""
+
+    def __init__(self, bundle):
+        self.version = bundle['version']
+        self.body = encode_bundle(bundle)
+        self.gzipped = gzip.compress(self.body, 9, mtime=0)
+        self.etag = f'"{self.version}"'
+
+    @property
+    def filename(self):
+        return f'verbs-{self.version}.json'
+
+
+def write_bundle(bundle, directory):
+    """Write the bundle (and a .gz twin for static servers) into `directory`"""
+    os.makedirs(directory, exist_ok=True)
+    cache = BundleCache(bundle)
+    path = os.path.join(directory, cache.filename)
+    with open(path, 'wb') as f:
+        f.write(cache.body)
+    with open(path + '.gz', 'wb') as f:
+        f.write(cache.gzipped)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the compact verb bundle')
+    parser.add_argument('-o', '--output', default=os.path.join('static', 'bundle'),
+                        help='Directory to write the bundle into')
+    parser.add_argument('--verbs', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'verbs.json'),
+                        help='Verb table in the verbs.json layout')
+    args = parser.parse_args(argv)
+
+    with open(args.verbs, 'r', encoding='utf-8') as f:
+        verbs = json.load(f)
+    bundle = build_bundle(verbs, TENSES, PRONOUNS, TENSE_NAMES)
+    path = write_bundle(bundle, args.output)
+    cache = BundleCache(bundle)
+    print(f'Wrote {path} ({len(cache.body)} bytes, {len(cache.gzipped)} gzipped)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,23 @@
+"""
+The shape of the verb table: the pronouns and tenses every verb is
+conjugated for, and the display name of each tense.
+
+The app and the command-line tools (bulk_grade.py, deck.py, verb_store.py,
+verb_bundle.py) import these from here, so a tool does not have to start
+the whole app just to know the table layout.
+"""
+
+PRONOUNS = ['yo', 'tú', 'él/ella', 'nosotros', 'vosotros', 'ellos']
+TENSES = ['presente', 'pretérito', 'imperfecto', 'futuro', 'condicional', 'perfecto', 'pluscuamperfecto', 'futuro perfecto', 'presente subjuntivo', 'imperfecto subjuntivo']
+TENSE_NAMES = {
+    'presente': 'Presente',
+    'pretérito': 'Pretérito',
+    'imperfecto': 'Imperfecto',
+    'futuro': 'Futuro',
+    'condicional': 'Condicional',
+    'perfecto': 'Pretérito Perfecto',
+    'pluscuamperfecto': 'Pluscuamperfecto',
+    'futuro perfecto': 'Futuro Perfecto',
+    'presente subjuntivo': 'Presente de Subjuntivo',
+    'imperfecto subjuntivo': 'Imperfecto de Subjuntivo'
+}
@@ -0,0 +1,296 @@
+#!/usr/bin/env python
+"""
+SQLite-backed lexicon for large verb sets.
+
+``import_verbs`` turns ``verbs.json`` into an indexed SQLite file. It holds
+one row per verb, one row per (verb, tense, pronoun) form and the normalized
+search keys. ``VerbStore`` opens that file read-only and behaves like the
+``VERBS`` dict. Only the list of infinitives is kept in memory, for sampling.
+Each verb's table is fetched the first time it is used and kept in a bounded
+LRU of hot verbs. Startup reads a few metadata rows and the infinitives, and
+memory grows with the cache size, not with the lexicon. The client bundle
+would hold every form, so the app serves a store without one.
+
+``StoreSearch`` answers ``/api/search`` with range queries on the indexed
+keys, ranked like ``search.SearchIndex``, so the search trie is never
+built in memory either. Each key row carries its rank, worked out at import,
+and its bucket: the match kind and text length that ranking orders by first.
+A search walks the buckets in order and reads a few rows from each in rank
+order, so its cost follows the results it returns, not every key that
+shares the prefix.
+
+Usage:
+    python verb_store.py verbs.json -o verbs.db
+    VERBS_DB=verbs.db python app.py
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from functools import lru_cache
+
+from search import (ENGLISH, FORM, INFINITIVE, KIND_NAMES, MAX_LIMIT, MEMOIZED_PREFIX_LENGTH, normalize,
+                    search_keys)
+from verb_schema import PRONOUNS, TENSES, TENSE_NAMES
+STORE_FORMAT = 2
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value BLOB NOT NULL);
+CREATE TABLE verbs (
+    id INTEGER PRIMARY KEY,
+    infinitive TEXT NOT NULL UNIQUE,
+    english TEXT NOT NULL,
+    type TEXT NOT NULL
+);
+CREATE TABLE forms (
+    verb_id INTEGER NOT NULL,
+    tense INTEGER NOT NULL,
+    pronoun INTEGER NOT NULL,
+    form TEXT NOT NULL,
+    PRIMARY KEY (verb_id, tense, pronoun)
+) WITHOUT ROWID;
+CREATE TABLE search_keys (
+    key TEXT NOT NULL,
+    kind INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    verb_id INTEGER NOT NULL,
+    tense TEXT NOT NULL,
+    pronoun TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    rank INTEGER NOT NULL
+);
+CREATE INDEX search_keys_key ON search_keys (key, rank);
+CREATE INDEX search_keys_bucket ON search_keys (bucket, key, rank);
+"""
+# Text lengths per kind in the bucket number: kind * BUCKET_SPAN + length
+BUCKET_SPAN = 1 << 16
+# Rows read per query while filling a page of results
+SEARCH_BATCH = 32
+
+
+def import_verbs(verbs, tenses, pronouns, tense_names, path):
+    """Write a verb dict (the verbs.json layout) to a new SQLite file at `path`"""
+    for verb, verb_data in verbs.items():
+        for tense in tenses:
+            missing = [p for p in pronouns if p not in verb_data.get(tense, {})]
+            if missing:
+                raise ValueError(f'{verb} has no {tense} form for {", ".join(missing)}')
+    tmp = path + '.tmp'
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.executescript(SCHEMA)
+        entries = set()
+        for verb_id, (verb, verb_data) in enumerate(verbs.items(), 1):
+            conn.execute('INSERT INTO verbs (id, infinitive, english, type) VALUES (?, ?, ?, ?)',
+                         (verb_id, verb, verb_data['english'], verb_data['type']))
+            conn.executemany('INSERT INTO forms (verb_id, tense, pronoun, form) VALUES (?, ?, ?, ?)', [
+                (verb_id, t, p, verb_data[tense][pronoun])
+                for t, tense in enumerate(tenses) for p, pronoun in enumerate(pronouns)
+            ])
+            # The same entries search.SearchIndex builds in memory
+            entries.update((key, INFINITIVE, verb, verb, '', '') for key in search_keys(verb))
+            entries.update((key, ENGLISH, verb_data['english'], verb, '', '')
+                           for key in search_keys(verb_data['english']))
+            seen_forms = set()
+            for tense in tenses:
+                for pronoun in pronouns:
+                    form = verb_data[tense][pronoun]
+                    if form in seen_forms:
+                        continue
+                    seen_forms.add(form)
+                    entries.update((key, FORM, form, verb, tense, pronoun) for key in search_keys(form))
+        # SearchIndex's order: kind, text length and text, then the rest of the entry
+        ranked = sorted(entries, key=lambda e: (e[1], len(e[2]), e[2], e[0], e[3], e[4], e[5]))
+        ids = {verb: verb_id for verb_id, verb in enumerate(verbs, 1)}
+        conn.executemany(
+            'INSERT INTO search_keys (key, kind, text, verb_id, tense, pronoun, bucket, rank) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            [(key, kind, text, ids[verb], tense, pronoun, kind * BUCKET_SPAN + len(text), rank)
+             for rank, (key, kind, text, verb, tense, pronoun) in enumerate(ranked)])
+        buckets = sorted({kind * BUCKET_SPAN + len(text) for _, kind, text, _, _, _ in entries})
+        conn.executemany('INSERT INTO meta (key, value) VALUES (?, ?)', [
+            ('format', str(STORE_FORMAT)),
+            ('tenses', json.dumps(tenses, ensure_ascii=False)),
+            ('pronouns', json.dumps(pronouns, ensure_ascii=False)),
+            ('tense_names', json.dumps(tense_names, ensure_ascii=False)),
+            ('search_buckets', json.dumps(buckets)),
+        ])
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp, path)
+    return path
+
+
+class VerbStore(Mapping):
+    """Read-only, dict-like view of a verb database with an LRU of hot verbs"""
+
+    def __init__(self, path, cache_size=256):
+        self.path = path
+        self.cache_size = cache_size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.refresh()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'generation', None) != self.generation:
+            conn = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True)
+            self._local.conn = conn
+            self._local.generation = self.generation
+        return conn
+
+    def refresh(self):
+        """(Re)read the metadata and infinitive list, dropping every cached verb"""
+        self.generation = getattr(self, 'generation', 0) + 1
+        conn = self._conn()
+        meta = dict(conn.execute('SELECT key, value FROM meta'))
+        if int(meta.get('format', 0)) != STORE_FORMAT:
+            raise ValueError(f"Unsupported verb store format: {meta.get('format')}; re-run verb_store.py")
+        self.tenses = json.loads(meta['tenses'])
+        self.pronouns = json.loads(meta['pronouns'])
+        self.tense_names = json.loads(meta['tense_names'])
+        self.search_buckets = json.loads(meta['search_buckets'])
+        # Index i holds the verb with id i + 1; sampling only ever touches this list
+        self.names = [row[0] for row in conn.execute('SELECT infinitive FROM verbs ORDER BY id')]
+        self.ids = {name: i + 1 for i, name in enumerate(self.names)}
+        with self._lock:
+            self._cache.clear()
+
+    def __getitem__(self, verb):
+        with self._lock:
+            verb_data = self._cache.get(verb)
+            if verb_data is not None:
+                self._cache.move_to_end(verb)
+                self.hits += 1
+                return verb_data
+        verb_id = self.ids.get(verb)
+        if verb_id is None:
+            raise KeyError(verb)
+        verb_data = self._fetch(verb_id)
+        with self._lock:
+            self.misses += 1
+            self._cache[verb] = verb_data
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return verb_data
+
+    def _fetch(self, verb_id):
+        conn = self._conn()
+        english, verb_type = conn.execute('SELECT english, type FROM verbs WHERE id = ?', (verb_id,)).fetchone()
+        verb_data = {'english': english, 'type': verb_type}
+        tables = [{} for _ in self.tenses]
+        for tense, pronoun, form in conn.execute(
+                'SELECT tense, pronoun, form FROM forms WHERE verb_id = ?', (verb_id,)):
+            tables[tense][self.pronouns[pronoun]] = form
+        for tense, table in zip(self.tenses, tables):
+            verb_data[tense] = table
+        return verb_data
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, verb):
+        return verb in self.ids
+
+    def summaries(self):
+        """(infinitive, english, type) for every verb, without loading any forms"""
+        return self._conn().execute('SELECT infinitive, english, type FROM verbs ORDER BY infinitive').fetchall()
+
+    def english(self, verb):
+        row = self._conn().execute('SELECT english FROM verbs WHERE infinitive = ?', (verb,)).fetchone()
+        return row[0] if row else None
+
+    def stats(self):
+        with self._lock:
+            return {'verbs': len(self.names), 'cached': len(self._cache), 'cache_size': self.cache_size,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+class StoreSearch:
+    """Prefix search over a verb store's indexed keys, ranked like SearchIndex"""
+
+    def __init__(self, store):
+        self.store = store
+        # Short prefixes match a large share of the keys, so remember their results
+        self._cached_search = lru_cache(maxsize=4096)(self._search)
+
+    def __len__(self):
+        return self.store._conn().execute('SELECT COUNT(*) FROM search_keys').fetchone()[0]
+
+    def search(self, query, limit=10):
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        limit = max(1, min(limit, MAX_LIMIT))
+        if len(prefix) <= MEMOIZED_PREFIX_LENGTH:
+            return self._cached_search(prefix, limit)
+        return self._search(prefix, limit)
+
+    def _search(self, prefix, limit):
+        conn = self.store._conn()
+        results = []
+        seen = set()
+
+        def take(where, args):
+            """Add matches in rank order, a batch at a time; True once the page is full"""
+            last = -1
+            while True:
+                rows = conn.execute(
+                    'SELECT s.rank, s.kind, s.text, v.infinitive, v.english, s.tense, s.pronoun '
+                    'FROM search_keys s JOIN verbs v ON v.id = s.verb_id '
+                    f'WHERE {where} AND s.rank > ? ORDER BY s.rank LIMIT ?',
+                    args + (last, SEARCH_BATCH)).fetchall()
+                for _, kind, text, verb, english, tense, pronoun in rows:
+                    identity = (verb, kind, text)
+                    if identity in seen:
+                        continue
+                    seen.add(identity)
+                    result = {'match': text, 'kind': KIND_NAMES[kind], 'verb': verb, 'english': english}
+                    if kind == FORM:
+                        result['tense'] = tense
+                        result['pronoun'] = pronoun
+                    results.append(result)
+                    if len(results) >= limit:
+                        return True
+                if len(rows) < SEARCH_BATCH:
+                    return False
+                last = rows[-1][0]
+
+        # Exact matches rank first, then prefix matches bucket by bucket
+        if take('s.key = ?', (prefix,)):
+            return results
+        upper = prefix + '\uffff'
+        for bucket in self.store.search_buckets:
+            if take('s.bucket = ? AND s.key >= ? AND s.key < ?', (bucket, prefix, upper)):
+                break
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import verbs.json into an indexed SQLite lexicon')
+    parser.add_argument('source', nargs='?', default='verbs.json', help='Verb table in the verbs.json layout')
+    parser.add_argument('-o', '--output', default='verbs.db', help='SQLite file to write')
+    args = parser.parse_args(argv)
+
+    with open(args.source, 'r', encoding='utf-8') as f:
+        verbs = json.load(f)
+    path = import_verbs(verbs, TENSES, PRONOUNS, TENSE_NAMES, args.output)
+    print(f'Wrote {len(verbs)} verbs to {path} ({os.path.getsize(path)} bytes)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
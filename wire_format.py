@@ -0,0 +1,129 @@
+"""
+Compact wire format for question and check payloads.
+
+The verbose JSON is the default. A client that already holds the verb bundle
+(``/bundle/verbs-<version>.json``) can ask for the compact format, either
+with ``?fmt=compact`` or with ``Accept: application/vnd.practiverbo.compact+json``.
+
+In the compact format, long keys become one or two letters. Any string value
+that appears in the bundle's string table becomes its integer index there:
+infinitives, glosses, tenses, tense names, pronouns and conjugated forms.
+Strings that are not in the table, such as hints and descriptions, stay
+inline. Every payload carries the format version (``w``) and the bundle
+version (``s``). A client whose table is out of date can then refetch the
+bundle before decoding. ``/api/check`` also accepts a compact request body.
+"""
+COMPACT_MIMETYPE = 'application/vnd.practiverbo.compact+json'
+FORMAT_VERSION = 1
+
+KEYS = {
+    'question_type': 't',
+    'verb': 'v',
+    'english': 'e',
+    'tense': 'n',
+    'tense_name': 'tn',
+    'tense_english': 'te',
+    'pronoun': 'p',
+    'conjugated_form': 'f',
+    'options': 'o',
+    'correct_answer': 'a',
+    'all_correct_answers': 'm',
+    'answer': 'x',
+    'correct': 'c',
+    'tense_description': 'd',
+    'hint': 'h',
+    'questions': 'qs',
+    'learner': 'l',
+    'classroom': 'k',
+}
+LONG_KEYS = {short: long for long, short in KEYS.items()}
+
+# Fields whose values are table strings (or lists of them) when compact
+STRING_FIELDS = {'verb', 'english', 'tense', 'tense_name', 'tense_english', 'pronoun',
+                 'conjugated_form', 'options', 'correct_answer', 'all_correct_answers', 'answer'}
+
+
+class WireFormatError(ValueError):
+    """Raised for compact payloads that cannot be decoded"""
+
+
+def wants_compact(request):
+    """Whether a request negotiated the compact format"""
+    fmt = request.args.get('fmt')
+    if fmt is not None:
+        return fmt == 'compact'
+    return COMPACT_MIMETYPE in request.headers.get('Accept', '')
+
+
+def is_compact_body(request):
+    return (request.mimetype == COMPACT_MIMETYPE
+            or request.args.get('fmt') == 'compact')
+
+
+class CompactCodec:
+    """Encode and decode payloads against one version of the bundle string table"""
+
+    def __init__(self, bundle):
+        self.version = bundle['version']
+        self.strings = bundle['strings']
+        self.index = {value: i for i, value in enumerate(self.strings)}
+
+    def encode(self, data):
+        """Compact form of a verbose payload dict"""
+        compact = {'w': FORMAT_VERSION, 's': self.version}
+        for key, value in data.items():
+            if key == 'questions':
+                value = [self._encode_fields(question) for question in value]
+            elif key in STRING_FIELDS:
+                value = self._ref(value)
+            compact[KEYS.get(key, key)] = value
+        return compact
+
+    def _encode_fields(self, data):
+        return {KEYS.get(key, key): self._ref(value) if key in STRING_FIELDS else value
+                for key, value in data.items()}
+
+    def _ref(self, value):
+        if isinstance(value, list):
+            return [self._ref(item) for item in value]
+        if isinstance(value, str):
+            return self.index.get(value, value)
+        return value
+
+    def decode(self, compact):
+        """Verbose payload dict from a compact one"""
+        if not isinstance(compact, dict):
+            raise WireFormatError('Expected an object')
+        if compact.get('w') != FORMAT_VERSION:
+            raise WireFormatError(f"Unsupported wire format: {compact.get('w')}")
+        if compact.get('s') != self.version:
+            raise WireFormatError('Stale string table')
+        data = {}
+        for key, value in compact.items():
+            if key in ('w', 's'):
+                continue
+            key = LONG_KEYS.get(key, key)
+            if key == 'questions':
+                value = [self._decode_fields(question) for question in value]
+            elif key in STRING_FIELDS:
+                value = self._deref(value)
+            data[key] = value
+        return data
+
+    def _decode_fields(self, compact):
+        if not isinstance(compact, dict):
+            raise WireFormatError('Expected an object')
+        data = {}
+        for key, value in compact.items():
+            key = LONG_KEYS.get(key, key)
+            data[key] = self._deref(value) if key in STRING_FIELDS else value
+        return data
+
+    def _deref(self, value):
+        if isinstance(value, list):
+            return [self._deref(item) for item in value]
+        if isinstance(value, int) and not isinstance(value, bool):
+            if not 0 <= value < len(self.strings):
+                raise WireFormatError(f'String index out of range: {value}')
+            return self.strings[value]
+        return value